@@ -0,0 +1,314 @@
+import os
+import json
+import stat
+import time
+import shutil
+import hashlib
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+import packager_core
+import proc_utils
+
+
+# 默认每个配置保留的产物版本数
+DEFAULT_KEEP_VERSIONS = 5
+
+# Linux 的 FICLONE ioctl，用于在支持的文件系统（btrfs、xfs）上创建写时复制的副本
+FICLONE = 0x40049409
+
+_lock = threading.Lock()
+
+
+def get_store_dir():
+    store_dir = os.path.join(packager_core.get_app_data_dir(), "artifacts")
+    os.makedirs(store_dir, exist_ok=True)
+    return store_dir
+
+
+@contextlib.contextmanager
+def _store_lock():
+    """保护对象库写入、版本记录和回收的锁: 进程内的线程锁加上跨进程文件锁
+
+    存入文件到写好版本记录之间新增的文件还没有被引用，回收必须等待存入完成后再统计引用。
+    """
+    with _lock, proc_utils.file_lock(os.path.join(get_store_dir(), "store.lock")):
+        yield
+
+
+def blob_path(digest):
+    return os.path.join(get_store_dir(), "objects", digest[:2], digest)
+
+
+def versions_dir(config):
+    return os.path.join(get_store_dir(), "versions", packager_core.config_hash(config))
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _reflink(src, dst):
+    import fcntl
+    with open(src, 'rb') as source, open(dst, 'wb') as target:
+        fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+
+
+def link_or_copy(src, dst):
+    """按 硬链接 → reflink → 复制 的顺序创建文件，返回使用的方式"""
+    try:
+        os.link(src, dst)
+        return "link"
+    except OSError:
+        pass
+    try:
+        _reflink(src, dst)
+        shutil.copystat(src, dst)
+        return "reflink"
+    except (OSError, ImportError):
+        if os.path.exists(dst):
+            os.remove(dst)
+    shutil.copy2(src, dst)
+    return "copy"
+
+
+def _blob_key(path):
+    """内容哈希，可执行文件另加后缀（硬链接共享权限位，可执行与否不同的相同内容需要分别存放）"""
+    executable = os.stat(path).st_mode & stat.S_IXUSR
+    return hash_file(path) + ("-x" if executable else "")
+
+
+def artifact_files(path):
+    """产物中的所有文件 [(相对路径, 绝对路径)]，单文件模式时相对路径为空字符串"""
+    if os.path.isfile(path):
+        return [("", path)]
+    files = []
+    for root, _, names in os.walk(path):
+        for name in names:
+            full_path = os.path.join(root, name)
+            if not os.path.islink(full_path):
+                files.append((os.path.relpath(full_path, path).replace(os.sep, "/"), full_path))
+    files.sort()
+    return files
+
+
+def _ingest_file(full_path, key):
+    """把文件存入对象库并让产物中的文件指向同一份内容，返回新存入的字节数"""
+    target = blob_path(key)
+    if os.path.exists(target):
+        _make_writable(target)
+        # 已存在相同内容: 用对象库中的文件替换产物中的文件
+        if os.path.samefile(full_path, target):
+            return 0
+        temp_path = full_path + ".store-tmp"
+        link_or_copy(target, temp_path)
+        os.replace(temp_path, full_path)
+        return 0
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    temp_path = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+    link_or_copy(full_path, temp_path)
+    os.replace(temp_path, target)
+    return os.path.getsize(target)
+
+
+def _make_writable(path):
+    """恢复旧版本设置为只读的文件的写权限
+
+    对象库中的文件与产物共用权限位，产物需要保持可写。PyInstaller 和本工具重新生成产物时都是删除或替换文件，
+    不会通过硬链接原地修改对象库中的内容。
+    """
+    mode = stat.S_IMODE(os.stat(path).st_mode)
+    if not mode & stat.S_IWUSR:
+        os.chmod(path, mode | stat.S_IWUSR)
+
+
+def store(config, keep=None):
+    """把打包产物存入对象库并记录版本，返回版本记录
+
+    产物中的每个文件按内容哈希存放一次，产物本身改为指向对象库的硬链接（不支持时使用
+    reflink 或复制），多次打包和多个配置共用相同的文件。
+    """
+    config = packager_core.normalize_config(config)
+    path = packager_core.artifact_path(config)
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+
+    start = time.time()
+    files = artifact_files(path)
+    with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as executor:
+        keys = list(executor.map(lambda item: _blob_key(item[1]), files))
+        with _store_lock():
+            added = sum(executor.map(_ingest_file, [full_path for _, full_path in files], keys))
+            return _add_version(config, path, files, keys, added, start, keep)
+
+
+def _add_version(config, path, files, keys, added, start, keep):
+    """写入版本记录并清理旧版本（需持有对象库锁）"""
+    version = {
+        "id": time.strftime("%Y%m%d-%H%M%S") + f"-{int(time.time() * 1000) % 1000:03d}",
+        "created_at": time.time(),
+        "name": packager_core.script_name(config),
+        "artifact": path,
+        "onefile": os.path.isfile(path),
+        "files": [[rel_path, key, os.path.getsize(full_path)] for (rel_path, full_path), key in zip(files, keys)],
+        "added_bytes": added,
+        "duration": time.time() - start,
+    }
+    version["size"] = sum(item[2] for item in version["files"])
+    # 与最新版本的文件完全相同（如跳过打包后再次存入）时不新建版本，否则会挤掉真正的旧版本
+    latest = next(iter(list_versions(config)), None)
+    if latest is not None and latest.get("files") == version["files"]:
+        latest["added_bytes"] = added
+        latest["duration"] = version["duration"]
+        return latest
+    directory = versions_dir(config)
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, version["id"] + ".json"), 'w', encoding='utf-8') as f:
+        json.dump(version, f, ensure_ascii=False)
+    _prune(config, keep if keep is not None else config.get("artifact_versions", DEFAULT_KEEP_VERSIONS))
+    return version
+
+
+def list_versions(config):
+    """配置的所有产物版本，最新的在前"""
+    directory = versions_dir(config)
+    try:
+        names = sorted((name for name in os.listdir(directory) if name.endswith(".json")), reverse=True)
+    except OSError:
+        return []
+    versions = []
+    for name in names:
+        try:
+            with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+                versions.append(json.load(f))
+        except (OSError, ValueError):
+            pass
+    return versions
+
+
+def prune(config, keep):
+    """只保留最近 keep 个版本，然后回收不再被引用的文件"""
+    with _store_lock():
+        return _prune(config, keep)
+
+
+def _prune(config, keep):
+    for version in list_versions(config)[max(1, keep):]:
+        try:
+            os.remove(os.path.join(versions_dir(config), version["id"] + ".json"))
+        except OSError:
+            pass
+    return _collect_garbage()
+
+
+def collect_garbage():
+    """删除没有被任何版本引用的文件，返回释放的字节数
+
+    产物目录中的硬链接不受影响，删除的只是对象库中的那一份链接。
+    """
+    with _store_lock():
+        return _collect_garbage()
+
+
+def _collect_garbage():
+    referenced = set()
+    versions_root = os.path.join(get_store_dir(), "versions")
+    for root, _, names in os.walk(versions_root):
+        for name in names:
+            try:
+                with open(os.path.join(root, name), 'r', encoding='utf-8') as f:
+                    referenced.update(item[1] for item in json.load(f)["files"])
+            except (OSError, ValueError, KeyError):
+                pass
+
+    freed = 0
+    for root, _, names in os.walk(os.path.join(get_store_dir(), "objects")):
+        for name in names:
+            if name in referenced:
+                continue
+            full_path = os.path.join(root, name)
+            try:
+                info = os.stat(full_path)
+                # 产物中仍有硬链接时删除不会释放空间
+                if info.st_nlink <= 1:
+                    freed += info.st_size
+                os.chmod(full_path, stat.S_IWRITE | stat.S_IREAD)
+                os.remove(full_path)
+            except OSError:
+                pass
+    return freed
+
+
+def restore(config, version_id):
+    """把产物恢复为指定版本: 在临时目录中按记录链接文件，再替换现有产物"""
+    config = packager_core.normalize_config(config)
+    with _store_lock():
+        return _restore(config, version_id)
+
+
+def _restore(config, version_id):
+    version = next((item for item in list_versions(config) if item["id"] == version_id), None)
+    if version is None:
+        raise packager_core.ConfigError(f"没有找到产物版本: {version_id}")
+    missing = [rel_path for rel_path, key, _ in version["files"] if not os.path.exists(blob_path(key))]
+    if missing:
+        raise packager_core.ConfigError(f"产物版本不完整，缺少 {len(missing)} 个文件")
+
+    path = packager_core.artifact_path(config)
+    temp_path = path + ".restore-tmp"
+    packager_core.remove_tree(temp_path)
+    if version["onefile"]:
+        link_or_copy(blob_path(version["files"][0][1]), temp_path)
+    else:
+        for rel_path, key, _ in version["files"]:
+            target = os.path.join(temp_path, *rel_path.split("/"))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            link_or_copy(blob_path(key), target)
+    packager_core.remove_tree(path)
+    os.replace(temp_path, path)
+    return version
+
+
+def stats():
+    """对象库统计: {"objects", "stored"(实际占用), "logical"(所有版本的总大小)}"""
+    objects = stored = 0
+    for root, _, names in os.walk(os.path.join(get_store_dir(), "objects")):
+        for name in names:
+            try:
+                stored += os.path.getsize(os.path.join(root, name))
+                objects += 1
+            except OSError:
+                pass
+    logical = 0
+    for root, _, names in os.walk(os.path.join(get_store_dir(), "versions")):
+        for name in names:
+            try:
+                with open(os.path.join(root, name), 'r', encoding='utf-8') as f:
+                    logical += json.load(f).get("size", 0)
+            except (OSError, ValueError):
+                pass
+    return {"objects": objects, "stored": stored, "logical": logical}
+
+
+def format_version(version):
+    """产物版本的单行描述"""
+    created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(version["created_at"]))
+    return (f"{version['id']}  {created}  {len(version['files'])} 个文件  "
+            f"{proc_utils.format_size(version['size'])}  新增 {proc_utils.format_size(version['added_bytes'])}")
+
+
+def after_build(config):
+    """打包成功后按配置存入对象库，返回日志说明；未启用时返回 None"""
+    if not config.get("artifact_store"):
+        return None
+    try:
+        version = store(config)
+    except OSError as e:
+        return f"产物存入对象库失败: {str(e)}"
+    return (f"产物已存入对象库: 版本 {version['id']}，{len(version['files'])} 个文件，"
+            f"新增 {proc_utils.format_size(version['added_bytes'])}，耗时 {version['duration']:.1f}s")
@@ -0,0 +1,242 @@
+"""跨项目的二进制依赖分析缓存
+
+PyInstaller 对每个收集到的动态库运行 ldd/objdump（Windows 为 pefile，macOS 为 macholib）分析依赖，结果只在
+当前进程中有效。本模块在目标解释器中运行PyInstaller之前替换 bindepend 中的分析函数，把每个文件的分析结果
+按 文件内容哈希 + 文件路径 + 平台 + 解释器 + PyInstaller版本 保存在共享目录中，不同项目打包时复用。
+
+命中时检查结果中的依赖文件仍然存在，否则重新分析。依赖的解析结果与文件位置（rpath、$ORIGIN）有关，
+因此同一个库在不同位置（如不同的虚拟环境）各自缓存。
+
+与 pyi_worker 一样只能使用标准库，目标解释器中不一定能导入本工具的其他模块。
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import platform
+import argparse
+
+CACHE_VERSION = 1
+
+# 打包结束时输出的统计行前缀，打包进度解析该行显示在打包报告中
+REPORT_PREFIX = "二进制依赖缓存:"
+
+# 可执行文件格式的文件头（ELF、PE、Mach-O），其他文件的分析本身很快，不缓存
+BINARY_MAGICS = (b"\x7fELF", b"MZ", b"\xfe\xed\xfa\xce", b"\xfe\xed\xfa\xcf", b"\xce\xfa\xed\xfe",
+                 b"\xcf\xfa\xed\xfe", b"\xca\xfe\xba\xbe")
+
+_state = {"dir": None, "tag": None, "hits": 0, "misses": 0, "miss_time": 0.0, "hashes": {}}
+
+
+# ---------------------------------------------------------------- 目标解释器中运行
+
+def _entry_path(kind, key):
+    return os.path.join(_state["dir"], kind, key[:2], key + ".json")
+
+
+def _read_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, value):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = "%s.%d.tmp" % (path, os.getpid())
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(value, f)
+        os.replace(temp_path, path)
+    except OSError:
+        pass
+
+
+def file_digest(path):
+    """文件内容的 sha256，按 路径+大小+修改时间+inode 记录在缓存中，文件不变时不重新读取"""
+    try:
+        info = os.stat(path)
+    except OSError:
+        return None
+    stat_key = hashlib.sha1(("%s\0%d\0%d\0%d" % (path, info.st_size, info.st_mtime_ns, info.st_ino))
+                            .encode("utf-8", "surrogateescape")).hexdigest()
+    if stat_key in _state["hashes"]:
+        return _state["hashes"][stat_key]
+    memo_path = _entry_path("hashes", stat_key)
+    digest = _read_json(memo_path)
+    if not isinstance(digest, str):
+        sha = hashlib.sha256()
+        try:
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    sha.update(chunk)
+        except OSError:
+            return None
+        digest = sha.hexdigest()
+        _write_json(memo_path, digest)
+    _state["hashes"][stat_key] = digest
+    return digest
+
+
+def _is_binary(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read(4).startswith(BINARY_MAGICS)
+    except OSError:
+        return False
+
+
+def _key(kind, filename, extra=None):
+    path = os.path.realpath(filename)
+    digest = file_digest(path)
+    if digest is None:
+        return None
+    data = json.dumps([CACHE_VERSION, kind, digest, path, _state["tag"], extra])
+    return hashlib.sha1(data.encode("utf-8", "surrogateescape")).hexdigest()
+
+
+def _cached(kind, original, validate=None):
+    """包装分析函数: 命中时返回缓存结果，否则调用原函数并保存结果"""
+    def wrapper(filename, *args, **kwargs):
+        if not _is_binary(filename):
+            return original(filename, *args, **kwargs)
+        key = None
+        try:
+            extra = [list(arg) if isinstance(arg, (list, tuple)) else arg for arg in args]
+            extra += sorted((name, list(value) if isinstance(value, (list, tuple)) else value)
+                            for name, value in kwargs.items())
+            key = _key(kind, filename, extra)
+        except (TypeError, ValueError, OSError):
+            pass
+        if key is not None:
+            entry = _read_json(_entry_path(kind, key))
+            if isinstance(entry, dict) and "result" in entry and (validate is None or validate(entry["result"])):
+                _state["hits"] += 1
+                return entry["result"]
+        start = time.perf_counter()
+        result = original(filename, *args, **kwargs)
+        _state["miss_time"] += time.perf_counter() - start
+        _state["misses"] += 1
+        if key is not None and result is not None:
+            _write_json(_entry_path(kind, key), {"result": result if isinstance(result, str) else list(result)})
+        return result
+    return wrapper
+
+
+def _imports_valid(result):
+    # 缓存的依赖文件必须仍然存在（解析失败的依赖记为 None）
+    return all(path is None or os.path.exists(path) for _, path in result)
+
+
+def install(cache_dir):
+    """替换 PyInstaller.depend.bindepend 中的分析函数；PyInstaller 版本不兼容时不做任何修改，返回是否成功"""
+    try:
+        import PyInstaller
+        from PyInstaller.depend import bindepend
+    except ImportError:
+        return False
+    if not callable(getattr(bindepend, "get_imports", None)) \
+            or not callable(getattr(bindepend, "classify_binary_vs_data", None)):
+        return False
+    _state["dir"] = cache_dir
+    _state["tag"] = [sys.platform, platform.machine(), sys.version, sys.executable, PyInstaller.__version__]
+
+    get_imports = _cached("imports", bindepend.get_imports, _imports_valid)
+
+    def cached_get_imports(filename, search_paths=None):
+        # 调用方会修改返回的集合
+        result = get_imports(filename, search_paths)
+        return {tuple(item) for item in result}
+
+    bindepend.get_imports = cached_get_imports
+    bindepend.classify_binary_vs_data = _cached("classify", bindepend.classify_binary_vs_data)
+    return True
+
+
+def report():
+    """输出命中统计（打包进度解析该行）"""
+    if _state["dir"] is None:
+        return
+    total = _state["hits"] + _state["misses"]
+    if not total:
+        return
+    print("%s 命中 %d/%d (%.0f%%)，未命中的分析耗时 %.1fs"
+          % (REPORT_PREFIX, _state["hits"], total, _state["hits"] * 100 / total, _state["miss_time"]), flush=True)
+
+
+# ---------------------------------------------------------------- 本工具中使用
+
+def is_supported():
+    """本工具被打包成可执行文件时无法用目标解释器运行本脚本"""
+    return not getattr(sys, "frozen", False)
+
+
+def get_cache_dir():
+    import packager_core
+    cache_dir = os.path.join(packager_core.get_app_data_dir(), "bindep_cache")
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def cache_dir_for(config):
+    """配置启用缓存时返回缓存目录，否则返回 None"""
+    if not config.get("bindep_cache") or not is_supported():
+        return None
+    return get_cache_dir()
+
+
+def wrap_command(config, cmd):
+    """启用缓存时，把 [python, -m, PyInstaller, ...] 替换为通过本脚本运行PyInstaller的命令"""
+    cache_dir = cache_dir_for(config)
+    if cache_dir is None or cmd[1:3] != ["-m", "PyInstaller"]:
+        return cmd
+    return [cmd[0], os.path.abspath(__file__), "--cache-dir", cache_dir, "--"] + cmd[3:]
+
+
+def cache_stats():
+    """缓存中的分析结果数量和占用空间: {"imports", "classify", "size"}"""
+    cache_dir = get_cache_dir()
+    stats = {"imports": 0, "classify": 0, "size": 0}
+    for root, _, names in os.walk(cache_dir):
+        kind = os.path.relpath(root, cache_dir).split(os.sep)[0]
+        for name in names:
+            try:
+                stats["size"] += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+            if kind in ("imports", "classify"):
+                stats[kind] += 1
+    return stats
+
+
+def clear_cache():
+    """删除所有缓存的分析结果，返回释放的空间"""
+    import shutil
+    size = cache_stats()["size"]
+    shutil.rmtree(get_cache_dir(), ignore_errors=True)
+    return size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="使用二进制依赖分析缓存运行PyInstaller")
+    parser.add_argument("--cache-dir", required=True)
+    parser.add_argument("args", nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+    argv = args.args[1:] if args.args[:1] == ["--"] else args.args
+
+    # 与 python -m PyInstaller 一致: 模块搜索路径以当前目录开头，而不是本脚本所在目录
+    sys.path[0] = os.getcwd()
+    sys.argv = ["pyinstaller"] + argv
+    install(args.cache_dir)
+    import PyInstaller.__main__
+    try:
+        PyInstaller.__main__.run(argv)
+    finally:
+        report()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,736 @@
+"""分布式打包: 构建代理和协调端
+
+代理 (agent serve) 在其他 Linux 主机上无界面运行，报告可用的解释器和空闲的打包槽位；协调端把配置和
+源码快照发送给负载最低的代理，代理打包时把日志实时传回，打包成功后协调端取回产物。
+
+远程打包由 `agent run` 客户端进程完成，输出和退出码与直接运行PyInstaller相同，因此界面、批量队列和
+命令行都按普通打包进程处理（日志、进度、强制停止都不需要改变）。
+
+协议: TCP 上的长度前缀帧，每帧是一个 JSON 消息或一段二进制数据；文件以 tar 流的形式在若干帧中传输，
+空帧表示结束。连接建立后代理发送随机数，客户端用共享令牌计算 HMAC 应答。
+"""
+import os
+import sys
+import hmac
+import json
+import time
+import socket
+import select
+import struct
+import tarfile
+import hashlib
+import secrets
+import threading
+import socketserver
+from concurrent.futures import ThreadPoolExecutor
+
+import packager_core
+import proc_utils
+
+
+DEFAULT_PORT = 8765
+
+# 连接和状态查询的超时（秒）
+CONNECT_TIMEOUT = 5
+
+# 传输文件时每帧的大小
+CHUNK_SIZE = 1024 * 1024
+
+# 接收的单帧上限: 认证完成前只接收很小的帧，之后的帧（文件块、文件清单）也不超过该大小
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+AUTH_FRAME_SIZE = 4096
+
+# 没有被任何工作区引用、且超过该天数未使用的源码文件在代理启动时删除
+BLOB_MAX_AGE_DAYS = 7
+
+_FRAME_HEADER = struct.Struct("!I")
+
+
+class AgentError(Exception):
+    """代理返回错误或无法连接，消息可直接展示给用户"""
+    pass
+
+
+# ---------------------------------------------------------------- 传输
+
+def send_frame(sock, data):
+    sock.sendall(_FRAME_HEADER.pack(len(data)) + data)
+
+
+def _recv_exact(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(min(size - len(data), CHUNK_SIZE))
+        if not chunk:
+            raise ConnectionError("连接已断开")
+        data.extend(chunk)
+    return bytes(data)
+
+
+def recv_frame(sock, max_size=MAX_FRAME_SIZE):
+    size, = _FRAME_HEADER.unpack(_recv_exact(sock, _FRAME_HEADER.size))
+    if size > max_size:
+        raise ConnectionError(f"帧长度 {size} 超过上限 {max_size}")
+    return _recv_exact(sock, size) if size else b""
+
+
+def send_json(sock, message):
+    send_frame(sock, json.dumps(message, ensure_ascii=False).encode("utf-8"))
+
+
+def recv_json(sock, max_size=MAX_FRAME_SIZE):
+    message = json.loads(recv_frame(sock, max_size).decode("utf-8"))
+    if not isinstance(message, dict):
+        raise ValueError("消息格式错误")
+    return message
+
+
+class FrameWriter:
+    """把写入的数据按帧发送的文件对象，close 时发送空帧表示结束（供 tarfile 流模式使用）"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.buffer = bytearray()
+        self.bytes = 0
+
+    def write(self, data):
+        self.buffer.extend(data)
+        self.bytes += len(data)
+        if len(self.buffer) >= CHUNK_SIZE:
+            send_frame(self.sock, bytes(self.buffer))
+            self.buffer.clear()
+        return len(data)
+
+    def close(self):
+        if self.buffer:
+            send_frame(self.sock, bytes(self.buffer))
+            self.buffer.clear()
+        send_frame(self.sock, b"")
+
+
+class FrameReader:
+    """FrameWriter 的接收端"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.buffer = b""
+        self.done = False
+        self.bytes = 0
+
+    def read(self, size=-1):
+        while not self.done and (size < 0 or len(self.buffer) < size):
+            frame = recv_frame(self.sock)
+            if not frame:
+                self.done = True
+            self.buffer += frame
+            self.bytes += len(frame)
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def drain(self):
+        """读完剩余的帧（tar 流结束标记之后可能还有填充数据）"""
+        while not self.done:
+            self.read(CHUNK_SIZE)
+
+
+def _signature(token, nonce):
+    return hmac.new(token.encode("utf-8"), nonce.encode("ascii"), hashlib.sha256).hexdigest()
+
+
+def safe_join(base, rel_path):
+    """把协调端发来的 "/" 分隔的相对路径拼接到 base 下，拒绝绝对路径、".." 和 base 之外的路径"""
+    if not isinstance(rel_path, str) or not rel_path:
+        raise AgentError(f"不安全的路径: {rel_path!r}")
+    parts = rel_path.split("/")
+    if rel_path.startswith("/") or "\\" in rel_path or any(part in ("", ".", "..") for part in parts) \
+            or os.path.isabs(rel_path) or os.path.splitdrive(rel_path)[0]:
+        raise AgentError(f"不安全的路径: {rel_path}")
+    base = os.path.abspath(base)
+    path = os.path.abspath(os.path.join(base, *parts))
+    if os.path.commonpath([base, path]) != base:
+        raise AgentError(f"不安全的路径: {rel_path}")
+    return path
+
+
+def _check_digest(digest):
+    if not isinstance(digest, str) or len(digest) != 64 or digest.strip("0123456789abcdef"):
+        raise AgentError(f"文件哈希格式错误: {digest!r}")
+    return digest
+
+
+def _safe_members(archive, target):
+    """逐个检查 tar 成员，拒绝写到目标目录之外的路径"""
+    target = os.path.realpath(target)
+    for member in archive:
+        path = os.path.realpath(os.path.join(target, member.name))
+        if os.path.commonpath([target, path]) != target or member.isdev():
+            raise AgentError(f"产物中包含不安全的路径: {member.name}")
+        if member.issym() or member.islnk():
+            link = os.path.realpath(os.path.join(os.path.dirname(path), member.linkname)
+                                    if member.issym() else os.path.join(target, member.linkname))
+            if os.path.commonpath([target, link]) != target:
+                raise AgentError(f"产物中包含不安全的链接: {member.name}")
+        yield member
+
+
+def _extract_all(reader, target):
+    with tarfile.open(fileobj=reader, mode="r|") as archive:
+        for member in _safe_members(archive, target):
+            archive.extract(member, target, set_attrs=not member.issym())
+    reader.drain()
+
+
+# ---------------------------------------------------------------- 代理
+
+def get_agent_dir():
+    agent_dir = os.path.join(packager_core.get_app_data_dir(), "agent")
+    os.makedirs(agent_dir, exist_ok=True)
+    return agent_dir
+
+
+def load_token():
+    """代理的访问令牌，第一次运行时随机生成"""
+    path = os.path.join(get_agent_dir(), "token")
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            token = f.read().strip()
+        if token:
+            return token
+    except OSError:
+        pass
+    token = secrets.token_hex(16)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(token)
+    return token
+
+
+def blob_path(digest):
+    return os.path.join(get_agent_dir(), "blobs", digest[:2], digest)
+
+
+def prune_blobs(max_age_days=BLOB_MAX_AGE_DAYS):
+    """删除没有工作区引用（没有其他硬链接）且长时间未使用的源码文件，返回删除的数量"""
+    removed = 0
+    deadline = time.time() - max_age_days * 86400
+    for root, _, names in os.walk(os.path.join(get_agent_dir(), "blobs")):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                info = os.stat(path)
+                if info.st_nlink <= 1 and info.st_mtime < deadline:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+def choose_interpreter(interpreters, version):
+    """选择与协调端主次版本相同且安装了PyInstaller的解释器"""
+    matches = [item for item in interpreters
+               if item.get("pyinstaller") and (not version or item["version"].split(".")[:2] == version.split(".")[:2])]
+    return matches[0] if matches else None
+
+
+class AgentServer(socketserver.ThreadingTCPServer):
+    """构建代理: 每个连接一个线程，最多同时执行 max_jobs 个打包"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, token, max_jobs=None):
+        super().__init__(address, AgentHandler)
+        import interpreters
+        self.token = token
+        self.max_jobs = max(1, max_jobs or os.cpu_count() or 1)
+        self.running = 0
+        self.lock = threading.Lock()
+        self.interpreters = interpreters.discover()
+
+    def status(self):
+        load = os.getloadavg()[0] if hasattr(os, "getloadavg") else 0.0
+        return {
+            "host": socket.gethostname(),
+            "cpu_count": os.cpu_count() or 1,
+            "load": load,
+            "running": self.running,
+            "max_jobs": self.max_jobs,
+            "interpreters": [{"version": item["version"], "pyinstaller": item["pyinstaller"]}
+                             for item in self.interpreters if item.get("pyinstaller")],
+        }
+
+    def try_acquire(self):
+        with self.lock:
+            if self.running >= self.max_jobs:
+                return False
+            self.running += 1
+            return True
+
+    def release(self):
+        with self.lock:
+            self.running -= 1
+
+
+class AgentHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        sock = self.request
+        sock.settimeout(60)
+        try:
+            nonce = secrets.token_hex(16)
+            send_json(sock, {"nonce": nonce})
+            auth = recv_json(sock, AUTH_FRAME_SIZE).get("auth")
+            if not isinstance(auth, str) or not hmac.compare_digest(auth, _signature(self.server.token, nonce)):
+                send_json(sock, {"type": "error", "message": "令牌错误"})
+                return
+            request = recv_json(sock)
+            if request.get("type") == "status":
+                send_json(sock, dict(self.server.status(), type="status"))
+            elif request.get("type") == "build":
+                self.build(sock, request)
+        except (OSError, ValueError, KeyError, TypeError, ConnectionError, AgentError) as e:
+            print(f"[{self.client_address[0]}] 连接中断: {e}", flush=True)
+
+    def build(self, sock, request):
+        server = self.server
+        interpreter = choose_interpreter(server.interpreters, request.get("python"))
+        if interpreter is None:
+            send_json(sock, {"type": "error",
+                             "message": f"代理 {socket.gethostname()} 上没有安装了PyInstaller的 Python {request.get('python')}"})
+            return
+        if not server.try_acquire():
+            send_json(sock, {"type": "busy"})
+            return
+        try:
+            self._build(sock, request, interpreter)
+        finally:
+            server.release()
+
+    def _build(self, sock, request, interpreter):
+        # 工作区名称、文件清单和配置中的路径来自网络，拼接路径前检查
+        try:
+            workspace = safe_join(os.path.join(get_agent_dir(), "workspaces"), request["workspace"])
+            source_dir = os.path.join(workspace, "src")
+            files = [(rel_path, _check_digest(digest)) for rel_path, digest in request["files"]]
+            for rel_path, _ in files:
+                safe_join(source_dir, rel_path)
+
+            config = dict(request["config"])
+            config["script_path"] = safe_join(source_dir, config["script_path"])
+            config["output_path"] = os.path.join(workspace, "dist")
+            config["python_path"] = interpreter["path"]
+            if config.get("icon_path"):
+                config["icon_path"] = safe_join(source_dir, config["icon_path"])
+            config["data_files"] = [f"{safe_join(source_dir, src)};{dst}"
+                                    for src, dst in (entry.rsplit(";", 1) for entry in config["data_files"])]
+        except (AgentError, KeyError, TypeError, ValueError) as e:
+            send_json(sock, {"type": "error", "message": f"打包请求无效: {e}"})
+            return
+
+        # 只接收代理上还没有的文件
+        missing = sorted({digest for _, digest in files if not os.path.exists(blob_path(digest))})
+        send_json(sock, {"type": "missing", "hashes": missing})
+        if missing:
+            self.receive_blobs(sock, set(missing))
+        materialize(source_dir, files)
+
+        name = request.get("name") or packager_core.script_name(config)
+        print(f"[{self.client_address[0]}] 开始打包 {name} (Python {interpreter['version']})", flush=True)
+        code, error = self.run_build(sock, config, name)
+        print(f"[{self.client_address[0]}] {name} 结束，退出码 {code}", flush=True)
+
+        artifact = packager_core.artifact_path(config)
+        send_json(sock, {"type": "exit", "code": code, "error": error, "host": socket.gethostname(),
+                         "artifact": os.path.basename(artifact)})
+        if code == 0:
+            writer = FrameWriter(sock)
+            with tarfile.open(fileobj=writer, mode="w|") as archive:
+                archive.add(artifact, arcname=os.path.basename(artifact))
+            writer.close()
+
+    def receive_blobs(self, sock, expected):
+        reader = FrameReader(sock)
+        with tarfile.open(fileobj=reader, mode="r|") as archive:
+            for member in archive:
+                if member.name not in expected or not member.isfile():
+                    raise AgentError(f"收到未请求的文件: {member.name}")
+                target = blob_path(member.name)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                temp_path = f"{target}.{threading.get_ident()}.tmp"
+                digest = hashlib.sha256()
+                source = archive.extractfile(member)
+                with open(temp_path, 'wb') as f:
+                    for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                        digest.update(chunk)
+                        f.write(chunk)
+                if digest.hexdigest() != member.name:
+                    os.remove(temp_path)
+                    raise AgentError(f"文件校验失败: {member.name}")
+                os.replace(temp_path, target)
+        reader.drain()
+
+    def run_build(self, sock, config, name):
+        """在代理上用批量队列执行一次打包，日志实时发回；协调端断开时取消打包"""
+        import build_queue
+
+        send_lock = threading.Lock()
+
+        def on_output(job, line):
+            try:
+                with send_lock:
+                    send_json(sock, {"type": "log", "line": line})
+            except OSError:
+                queue.cancel()
+
+        queue = build_queue.BuildQueue(max_workers=1, work_root=os.path.join(get_agent_dir(), "queue"),
+                                       on_output=on_output)
+        job = queue.add_config(config, name)
+        queue.start()
+        # 协调端在打包期间不发送数据，连接可读说明已断开（客户端被停止）
+        sock.settimeout(None)
+        while queue.is_running():
+            try:
+                readable, _, _ = select.select([sock], [], [], 0.5)
+                if readable and not sock.recv(1):
+                    queue.cancel()
+                    break
+            except OSError:
+                queue.cancel()
+                break
+        queue.wait()
+        if job.state == build_queue.SUCCESS:
+            return 0, ""
+        return job.exit_code if job.exit_code not in (None, 0) else 1, job.error
+
+
+def materialize(source_dir, files):
+    """按文件清单把源码文件硬链接到工作区，删除清单之外的文件；内容未变的文件保持不变（修改时间也不变）"""
+    import artifact_store
+    wanted = set()
+    for rel_path, digest in files:
+        target = safe_join(source_dir, rel_path)
+        wanted.add(os.path.normcase(target))
+        blob = blob_path(digest)
+        try:
+            if os.path.samefile(target, blob):
+                continue
+        except OSError:
+            pass
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temp_path = target + ".agent-tmp"
+        if os.path.lexists(temp_path):
+            os.remove(temp_path)
+        artifact_store.link_or_copy(blob, temp_path)
+        os.replace(temp_path, target)
+        # 触碰 blob 的修改时间，避免被当作长期未使用的文件清理
+        os.utime(blob)
+    for root, _, names in os.walk(source_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            if os.path.normcase(path) not in wanted:
+                os.remove(path)
+
+
+def serve(host="0.0.0.0", port=DEFAULT_PORT, token=None, max_jobs=None):
+    token = token or load_token()
+    removed = prune_blobs()
+    server = AgentServer((host, port), token, max_jobs)
+    host, port = server.server_address[:2]
+    versions = ", ".join(item["version"] for item in server.status()["interpreters"]) or "无"
+    print(f"构建代理已启动: {host}:{port}，最多同时打包 {server.max_jobs} 个，可用解释器: {versions}", flush=True)
+    if removed:
+        print(f"清理了 {removed} 个长期未使用的源码文件", flush=True)
+    print(f"在协调端添加: pyinstaller_tool.py agent add {socket.gethostname()}:{port} --token {token}", flush=True)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+# ---------------------------------------------------------------- 协调端
+
+def get_agents_path():
+    return os.path.join(packager_core.get_app_data_dir(), "agents.json")
+
+
+def load_agents():
+    """协调端配置的代理 [{"address": "host:port", "token"}]"""
+    try:
+        with open(get_agents_path(), 'r', encoding='utf-8') as f:
+            return json.load(f).get("agents", [])
+    except (OSError, ValueError):
+        return []
+
+
+def save_agents(agents):
+    fd = os.open(get_agents_path(), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump({"agents": agents}, f, ensure_ascii=False, indent=1)
+
+
+def add_agent(address, token):
+    if ":" not in address:
+        address = f"{address}:{DEFAULT_PORT}"
+    agents = [agent for agent in load_agents() if agent["address"] != address]
+    agents.append({"address": address, "token": token})
+    save_agents(agents)
+    return address
+
+
+def remove_agent(address):
+    agents = load_agents()
+    remaining = [agent for agent in agents if agent["address"] != address]
+    save_agents(remaining)
+    return len(remaining) != len(agents)
+
+
+def connect(agent, timeout=CONNECT_TIMEOUT):
+    """连接代理并完成认证"""
+    host, _, port = agent["address"].rpartition(":")
+    try:
+        sock = socket.create_connection((host, int(port)), timeout=timeout)
+        nonce = recv_json(sock)["nonce"]
+        send_json(sock, {"auth": _signature(agent["token"], nonce)})
+    except (OSError, ValueError, KeyError, ConnectionError) as e:
+        raise AgentError(f"无法连接代理 {agent['address']}: {e}")
+    return sock
+
+
+def query_status(agent):
+    """查询代理状态，无法连接时返回 {"error": ...}"""
+    try:
+        sock = connect(agent)
+        try:
+            send_json(sock, {"type": "status"})
+            status = recv_json(sock)
+        finally:
+            sock.close()
+    except (AgentError, OSError, ValueError, ConnectionError) as e:
+        return {"address": agent["address"], "error": str(e)}
+    if status.get("type") == "error":
+        return {"address": agent["address"], "error": status.get("message", "")}
+    return dict(status, address=agent["address"])
+
+
+def query_all(agents=None):
+    agents = load_agents() if agents is None else agents
+    if not agents:
+        return []
+    with ThreadPoolExecutor(max_workers=min(16, len(agents))) as executor:
+        return list(executor.map(query_status, agents))
+
+
+def total_slots(statuses=None):
+    """所有可用代理的打包槽位总数"""
+    statuses = query_all() if statuses is None else statuses
+    return sum(status["max_jobs"] for status in statuses if "error" not in status)
+
+
+def rank_agents(statuses, version):
+    """有匹配解释器的代理，按负载从低到高排序: 空闲槽位比例，其次每核平均负载"""
+    candidates = [status for status in statuses
+                  if "error" not in status and choose_interpreter(status["interpreters"], version)]
+    return sorted(candidates, key=lambda status: (status["running"] / status["max_jobs"],
+                                                  status["load"] / max(1, status["cpu_count"])))
+
+
+def format_status(status):
+    """代理状态的单行描述"""
+    if "error" in status:
+        return f"{status['address']}  不可用: {status['error']}"
+    versions = ", ".join(item["version"] for item in status["interpreters"]) or "没有可用的解释器"
+    return (f"{status['address']}  {status['host']}  打包中 {status['running']}/{status['max_jobs']}  "
+            f"{status['cpu_count']} 核，负载 {status['load']:.1f}  Python: {versions}")
+
+
+def build_snapshot(config):
+    """源码快照: 返回 (远程配置, 文件清单 [(相对路径, sha256)], {sha256: 本地路径})
+
+    入口脚本和本地导入的模块按相对脚本目录的路径发送；数据文件按配置项展开（已应用排除规则），
+    放在 __data__/<序号>/ 下，保持产物中的相对路径；图标放在 __icon__/ 下。
+    """
+    import import_graph
+    import data_files
+    import artifact_store
+
+    config = packager_core.normalize_config(config)
+    script_path = os.path.abspath(config["script_path"].strip())
+    root = os.path.dirname(script_path)
+    files = {}
+
+    def add(rel_path, path):
+        files[rel_path] = path
+
+    for path in import_graph.local_modules(script_path):
+        add(os.path.relpath(path, root).replace(os.sep, "/"), path)
+    import_graph.save_cache()
+
+    remote = dict(config)
+    remote["script_path"] = os.path.relpath(script_path, root).replace(os.sep, "/")
+    remote["data_files"] = []
+    for index, entry in enumerate(config["data_files"]):
+        items = data_files.resolve_entry(entry, root, config["data_excludes"])[0]
+        for src, dest, _, _ in items:
+            add(f"__data__/{index}/{dest}", src)
+        if items:
+            remote["data_files"].append(f"__data__/{index};.")
+    remote["data_excludes"] = []
+    icon_path = config["icon_path"].strip()
+    if icon_path:
+        icon_path = os.path.join(root, icon_path)
+        if os.path.exists(icon_path):
+            add(f"__icon__/{os.path.basename(icon_path)}", icon_path)
+            remote["icon_path"] = f"__icon__/{os.path.basename(icon_path)}"
+    # 在代理上只打包；UPX压缩和数据文件复制由代理完成，存档和归档在取回产物后由协调端完成
+    remote.update(remote_build=False, artifact_store=False, archive_formats=[], upx_dir="", output_path="")
+
+    paths = list(files.items())
+    with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as executor:
+        digests = list(executor.map(lambda item: artifact_store.hash_file(item[1]), paths))
+    manifest = [[rel_path, digest] for (rel_path, _), digest in zip(paths, digests)]
+    blobs = {digest: path for (_, path), digest in zip(paths, digests)}
+    return remote, manifest, blobs
+
+
+def python_version(config):
+    """协调端解释器的版本号 (如 3.11.7)"""
+    import build_cache
+    return build_cache.interpreter_version(packager_core.resolve_python(config)).split(" ")[0]
+
+
+def run_remote(config, output=None, name=None, wait_timeout=3600):
+    """把打包任务发送给负载最低的代理，日志写到 output，成功后取回产物；返回退出码"""
+    output = output or sys.stdout
+    config = packager_core.normalize_config(config)
+
+    def say(text):
+        output.write(text + "\n")
+        output.flush()
+
+    agents = load_agents()
+    if not agents:
+        say("没有配置构建代理，请先运行: pyinstaller_tool.py agent add HOST:PORT --token TOKEN")
+        return 1
+    version = python_version(config)
+    remote, manifest, blobs = build_snapshot(config)
+    tokens = {agent["address"]: agent for agent in agents}
+    request = {
+        "type": "build",
+        "config": remote,
+        "files": manifest,
+        "python": version,
+        "name": name or packager_core.script_name(config),
+        "workspace": hashlib.sha1(json.dumps([socket.gethostname(), os.path.abspath(config["script_path"]),
+                                              packager_core.config_hash(config)]).encode("utf-8")).hexdigest()[:16],
+    }
+
+    deadline = time.time() + wait_timeout
+    waiting = False
+    while True:
+        ranked = rank_agents(query_all(agents), version)
+        if not ranked:
+            say(f"没有可用的构建代理（需要安装了PyInstaller的 Python {version}）")
+            return 1
+        for status in ranked:
+            agent = tokens[status["address"]]
+            try:
+                result = _run_on_agent(agent, request, blobs, config, say)
+            except (AgentError, OSError, ValueError, ConnectionError) as e:
+                say(f"代理 {agent['address']} 出错: {e}")
+                continue
+            if result is not None:
+                return result
+        # 所有代理都忙
+        if time.time() > deadline:
+            say("等待构建代理超时")
+            return 1
+        if not waiting:
+            say("所有构建代理都在打包，等待空闲...")
+            waiting = True
+        time.sleep(1)
+
+
+def _run_on_agent(agent, request, blobs, config, say):
+    """在指定代理上打包，代理忙时返回 None"""
+    sock = connect(agent)
+    try:
+        send_json(sock, request)
+        sock.settimeout(None)
+        reply = recv_json(sock)
+        if reply.get("type") == "busy":
+            return None
+        if reply.get("type") == "error":
+            raise AgentError(reply.get("message", ""))
+
+        start = time.time()
+        missing = reply["hashes"]
+        size = sum(os.path.getsize(blobs[digest]) for digest in missing)
+        say(f"使用构建代理 {agent['address']}: 源码 {len(request['files'])} 个文件，"
+            f"需要上传 {len(missing)} 个 ({proc_utils.format_size(size)})")
+        if missing:
+            writer = FrameWriter(sock)
+            with tarfile.open(fileobj=writer, mode="w|") as archive:
+                for digest in missing:
+                    archive.add(blobs[digest], arcname=digest, recursive=False)
+            writer.close()
+            say(f"上传完成，耗时 {time.time() - start:.1f}s")
+
+        while True:
+            message = recv_json(sock)
+            if message["type"] == "log":
+                say(message["line"])
+            elif message["type"] == "exit":
+                break
+        if message["code"] != 0:
+            if message.get("error"):
+                say(message["error"])
+            return message["code"]
+
+        start = time.time()
+        reader = FrameReader(sock)
+        pull_artifact(reader, config, message["artifact"])
+        say(f"已从 {message['host']} 取回产物 ({proc_utils.format_size(reader.bytes)})，"
+            f"耗时 {time.time() - start:.1f}s")
+        return 0
+    finally:
+        sock.close()
+
+
+def pull_artifact(reader, config, name):
+    """接收产物 tar 流，解压到临时目录后替换本地产物"""
+    output_dir = packager_core.resolve_output_dir(config)
+    os.makedirs(output_dir, exist_ok=True)
+    temp_dir = os.path.join(output_dir, f".remote-{os.getpid()}")
+    packager_core.remove_tree(temp_dir)
+    os.makedirs(temp_dir)
+    try:
+        _extract_all(reader, temp_dir)
+        source = os.path.join(temp_dir, name)
+        if not os.path.lexists(source):
+            raise AgentError("代理没有返回产物")
+        target = packager_core.artifact_path(config)
+        packager_core.remove_tree(target)
+        os.replace(source, target)
+    finally:
+        packager_core.remove_tree(temp_dir)
+
+
+def request_path(config):
+    """远程打包客户端读取的配置文件"""
+    directory = os.path.join(get_agent_dir(), "requests")
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha1(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(directory, f"{digest}.json")
+
+
+def client_command(config):
+    """远程打包时实际启动的进程命令（代替 python -m PyInstaller ...）"""
+    path = request_path(config)
+    packager_core.save_config_file(config, path)
+    if getattr(sys, "frozen", False):
+        return [sys.executable, "agent", "run", "--config", path]
+    tool = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pyinstaller_tool.py")
+    return [sys.executable, tool, "agent", "run", "--config", path]
@@ -0,0 +1,170 @@
+import os
+import sys
+import json
+import hashlib
+import subprocess
+
+import packager_core
+import import_graph
+import data_files
+import venv_snapshot
+
+
+# 打包决策
+SKIP = "skip"                # 没有任何变化，直接使用上次的产物
+INCREMENTAL = "incremental"  # 只有本地源码变化，保留工作目录（不使用 --clean）
+FULL = "full"                # 按用户设置完整打包
+
+# 解释器版本缓存: (路径, mtime) -> 版本字符串
+_version_cache = {}
+
+
+def get_cache_dir():
+    """构建缓存记录所在目录"""
+    cache_dir = os.path.join(packager_core.get_app_data_dir(), "build_cache")
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def file_hash(file_path):
+    """计算文件内容的 sha256"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def interpreter_version(python):
+    """获取解释器版本，按解释器文件的修改时间缓存"""
+    if python == sys.executable:
+        return sys.version
+    try:
+        key = (python, os.stat(python).st_mtime_ns)
+    except OSError:
+        key = (python, None)
+    if key not in _version_cache:
+        try:
+            _version_cache[key] = subprocess.run(
+                [python, "-c", "import sys; print(sys.version)"],
+                capture_output=True, text=True, timeout=30,
+            ).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            _version_cache[key] = ""
+    return _version_cache[key]
+
+
+def data_files_state(config):
+    """数据文件的状态（产物中的相对路径、大小、修改时间），目录和通配符会展开，排除的文件不计入"""
+    state = []
+    base_dir = data_files.base_dir_for(config)
+    for entry in config["data_files"]:
+        files = data_files.resolve_entry(entry, base_dir, config["data_excludes"])[0]
+        if not files:
+            state.append([entry, None, None, None])
+        for _, dest, size, mtime in files:
+            state.append([entry, dest, size, mtime])
+    state.sort(key=lambda item: (item[0], item[1] or ""))
+    return state
+
+
+def artifact_state(path):
+    """产物的大小和修改时间，用于判断产物是否被外部修改或删除"""
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return [stat.st_size if os.path.isfile(path) else 0, stat.st_mtime_ns]
+
+
+def compute_fingerprint(config, cmd):
+    """计算打包输入的指纹
+
+    sources: 入口脚本及本地导入模块的内容哈希
+    env: 打包参数（不含 --clean）、数据文件、隐藏依赖和解释器版本
+    packages: 解释器中已安装的发行包（版本和 RECORD 哈希）
+    """
+    config = packager_core.normalize_config(config)
+    sources = {}
+    for path in import_graph.local_modules(config["script_path"]):
+        sources[path] = file_hash(path)
+    import_graph.save_cache()
+
+    env = {
+        "argv": [arg for arg in cmd if arg != "--clean"],
+        "data_files": data_files_state(config),
+        "data_excludes": config["data_excludes"],
+        "hidden_imports": config["hidden_imports"],
+        "python": interpreter_version(cmd[0]),
+    }
+
+    packages = venv_snapshot.snapshot(cmd[0])
+
+    def digest(value):
+        return hashlib.sha256(json.dumps(value, sort_keys=True).encode("utf-8")).hexdigest()
+
+    return {
+        "sources": sources,
+        "source_hash": digest(sources),
+        "env_hash": digest(env),
+        "packages": packages,
+        "packages_hash": digest(packages),
+    }
+
+
+def record_path(config):
+    return os.path.join(get_cache_dir(), packager_core.config_hash(config) + ".json")
+
+
+def load_record(config):
+    try:
+        with open(record_path(config), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def plan_build(config, cmd):
+    """根据上次成功打包的记录决定本次如何打包
+
+    返回 (决策, 命令, 指纹, 说明)。
+    """
+    config = packager_core.normalize_config(config)
+    fingerprint = compute_fingerprint(config, cmd)
+    record = load_record(config)
+    if not record or "packages_hash" not in record:
+        return FULL, cmd, fingerprint, "没有上次打包的记录，完整打包"
+
+    # 已安装的包有变化时，工作目录和PyInstaller全局缓存中的分析结果可能已经过期，必须清理
+    if record["packages_hash"] != fingerprint["packages_hash"]:
+        changes = venv_snapshot.diff(record.get("packages", {}), fingerprint["packages"])
+        cmd = cmd if "--clean" in cmd else cmd[:3] + ["--clean"] + cmd[3:]
+        return (FULL, cmd, fingerprint,
+                "依赖包有变化，使用 --clean 完整打包:\n" + "\n".join(f"  {change}" for change in changes))
+
+    # 依赖环境没有变化时，PyInstaller 会按各目标的输入重新生成变化的部分，不需要清理工作目录
+    if record.get("env_hash") != fingerprint["env_hash"]:
+        return (FULL, [arg for arg in cmd if arg != "--clean"], fingerprint,
+                "打包参数或数据文件有变化，依赖包未变化，复用工作目录打包")
+
+    path = packager_core.artifact_path(config)
+    if record.get("source_hash") == fingerprint["source_hash"]:
+        if record.get("artifact") == path and record.get("artifact_state") == artifact_state(path):
+            return SKIP, cmd, fingerprint, f"未检测到变化，跳过打包，使用上次产物: {path}"
+        return INCREMENTAL, [arg for arg in cmd if arg != "--clean"], fingerprint, "产物不存在或已被修改，复用工作目录重新打包"
+
+    changed = sorted(p for p, h in fingerprint["sources"].items() if record.get("sources", {}).get(p) != h)
+    removed = sorted(set(record.get("sources", {})) - set(fingerprint["sources"]))
+    names = [os.path.basename(p) for p in changed + removed]
+    return (INCREMENTAL, [arg for arg in cmd if arg != "--clean"], fingerprint,
+            f"仅源码有变化 ({', '.join(names[:5])}{' ...' if len(names) > 5 else ''})，复用工作目录增量打包")
+
+
+def record_build(config, fingerprint):
+    """打包成功后保存指纹和产物信息"""
+    config = packager_core.normalize_config(config)
+    path = packager_core.artifact_path(config)
+    record = dict(fingerprint)
+    record["artifact"] = path
+    record["artifact_state"] = artifact_state(path)
+    with open(record_path(config), 'w', encoding='utf-8') as f:
+        json.dump(record, f, ensure_ascii=False, indent=1)
@@ -0,0 +1,223 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import statistics
+
+import packager_core
+import build_progress
+import proc_utils
+import pyi_worker
+
+
+# 判定为性能退化的阈值: 变慢超过20%且至少1秒
+REGRESSION_RATIO = 0.2
+REGRESSION_MIN_SECONDS = 1.0
+
+_db_lock = threading.Lock()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS builds (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    config_hash TEXT NOT NULL,
+    name TEXT,
+    started_at REAL NOT NULL,
+    duration REAL,
+    exit_code INTEGER,
+    peak_rss INTEGER,
+    artifact_size INTEGER,
+    command TEXT
+);
+CREATE INDEX IF NOT EXISTS builds_config ON builds (config_hash, started_at);
+CREATE TABLE IF NOT EXISTS phases (
+    build_id INTEGER NOT NULL REFERENCES builds (id),
+    phase TEXT NOT NULL,
+    start REAL NOT NULL,
+    end REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS phases_build ON phases (build_id);
+"""
+
+
+def get_db_path():
+    return os.path.join(packager_core.get_app_data_dir(), "build_history.db")
+
+
+def connect(db_path=None):
+    """打开历史数据库，不存在时自动创建表"""
+    conn = sqlite3.connect(db_path or get_db_path(), timeout=10)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def record_build(config, started_at, duration, exit_code, timeline, peak_rss=None,
+                 artifact_size=None, command=None, name=None):
+    """保存一次打包记录，返回记录ID"""
+    with _db_lock:
+        conn = connect()
+        try:
+            with conn:
+                cursor = conn.execute(
+                    "INSERT INTO builds (config_hash, name, started_at, duration, exit_code, peak_rss,"
+                    " artifact_size, command) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (packager_core.config_hash(config), name or packager_core.script_name(config),
+                     started_at, duration, exit_code, peak_rss, artifact_size,
+                     json.dumps(command, ensure_ascii=False) if command else None))
+                build_id = cursor.lastrowid
+                conn.executemany(
+                    "INSERT INTO phases (build_id, phase, start, end) VALUES (?, ?, ?, ?)",
+                    [(build_id, phase, start, end) for phase, start, end in timeline])
+            return build_id
+        finally:
+            conn.close()
+
+
+def phase_durations(conn, build_id):
+    """某次打包各阶段的耗时 {阶段: 秒数}"""
+    durations = {}
+    for row in conn.execute("SELECT phase, start, end FROM phases WHERE build_id = ?", (build_id,)):
+        durations[row["phase"]] = durations.get(row["phase"], 0) + row["end"] - row["start"]
+    return durations
+
+
+def recent_builds(config_hash=None, limit=50):
+    """最近的打包记录，每项包含各阶段耗时"""
+    conn = connect()
+    try:
+        if config_hash:
+            rows = conn.execute("SELECT * FROM builds WHERE config_hash = ? ORDER BY started_at DESC LIMIT ?",
+                                (config_hash, limit)).fetchall()
+        else:
+            rows = conn.execute("SELECT * FROM builds ORDER BY started_at DESC LIMIT ?", (limit,)).fetchall()
+        builds = []
+        for row in rows:
+            build = dict(row)
+            build["phases"] = phase_durations(conn, row["id"])
+            builds.append(build)
+        return builds
+    finally:
+        conn.close()
+
+
+def resource_estimate(config_hash, limit=5):
+    """根据最近几次成功打包估算资源需求: (峰值内存字节数, 耗时秒数)，没有记录的项为 None
+
+    峰值内存取最大值（宁可少并发，不要内存不足），耗时取中位数。
+    """
+    conn = connect()
+    try:
+        rows = conn.execute("SELECT peak_rss, duration FROM builds WHERE config_hash = ? AND exit_code = 0 "
+                            "ORDER BY started_at DESC LIMIT ?", (config_hash, limit)).fetchall()
+    finally:
+        conn.close()
+    peaks = [row["peak_rss"] for row in rows if row["peak_rss"]]
+    durations = [row["duration"] for row in rows if row["duration"]]
+    return (max(peaks) if peaks else None), (statistics.median(durations) if durations else None)
+
+
+def find_regressions(config_hash, baseline_days=7):
+    """比较最近一次成功打包与基准，返回退化/改善说明列表
+
+    基准取一周前的成功打包耗时中位数，没有足够旧的记录时取之前所有成功打包的中位数。
+    """
+    builds = [b for b in recent_builds(config_hash, limit=200) if b["exit_code"] == 0]
+    if len(builds) < 2:
+        return []
+    latest, previous = builds[0], builds[1:]
+    older = [b for b in previous if b["started_at"] <= latest["started_at"] - baseline_days * 86400]
+    baseline = older or previous
+    period = "上周" if older else "之前"
+
+    messages = []
+    metrics = [("总耗时", latest["duration"], [b["duration"] for b in baseline])]
+    for phase, seconds in latest["phases"].items():
+        metrics.append((f"{build_progress.PHASE_LABELS.get(phase, phase)} 阶段", seconds,
+                        [b["phases"][phase] for b in baseline if phase in b["phases"]]))
+    for label, current, history in metrics:
+        if current is None or not history:
+            continue
+        reference = statistics.median(history)
+        if reference <= 0:
+            continue
+        change = (current - reference) / reference
+        if abs(change) >= REGRESSION_RATIO and abs(current - reference) >= REGRESSION_MIN_SECONDS:
+            trend = "慢" if change > 0 else "快"
+            messages.append(f"{label}比{period}{trend} {abs(change) * 100:.0f}% ({reference:.1f}s → {current:.1f}s)")
+
+    if latest["peak_rss"] and any(b["peak_rss"] for b in baseline):
+        reference = statistics.median(b["peak_rss"] for b in baseline if b["peak_rss"])
+        if reference and (latest["peak_rss"] - reference) / reference >= REGRESSION_RATIO:
+            messages.append(f"峰值内存比{period}高 {(latest['peak_rss'] - reference) * 100 / reference:.0f}% "
+                            f"({proc_utils.format_size(reference)} → {proc_utils.format_size(latest['peak_rss'])})")
+    return messages
+
+
+def format_build(build):
+    """单条打包记录的摘要文本"""
+    started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(build["started_at"]))
+    slowest = ""
+    if build["phases"]:
+        phase = max(build["phases"], key=build["phases"].get)
+        slowest = f"{build_progress.PHASE_LABELS.get(phase, phase)} {build['phases'][phase]:.1f}s"
+    return [started, build["name"] or "", f"{build['duration'] or 0:.1f}s", str(build["exit_code"]),
+            proc_utils.format_size(build["peak_rss"]), proc_utils.format_size(build["artifact_size"]), slowest]
+
+
+class BuildRun:
+    """一次打包的测量: 阶段进度、子进程内存峰值，结束后写入历史数据库"""
+
+    def __init__(self, config, command=None, name=None):
+        self.config = packager_core.normalize_config(config)
+        self.command = command
+        self.name = name
+        self.tracker = build_progress.ProgressTracker(self.config)
+        self.sampler = None
+        self.started_at = None
+        # 通过常驻进程打包时实际的打包进程不是启动的进程的子进程，需要等它在输出中报告 pid
+        self.uses_worker = bool(command) and pyi_worker.wrap_command(self.config, command) != command
+        self.build_pid = None
+
+    def start(self):
+        self.started_at = time.time()
+        self.tracker.start()
+
+    def process_started(self, pid):
+        """子进程启动后开始采样内存；远程打包时启动的只是代理客户端，不采样"""
+        if pid and not self.config.get("remote_build"):
+            self.sampler = proc_utils.PeakRssSampler(pid).start()
+
+    def feed(self, text):
+        self.tracker.feed(text)
+        self._check_build_pid()
+
+    def feed_line(self, line):
+        self.tracker.feed_line(line)
+        self._check_build_pid()
+
+    def _check_build_pid(self):
+        if self.tracker.build_pid and self.tracker.build_pid != self.build_pid:
+            self.build_pid = self.tracker.build_pid
+            if self.sampler:
+                self.sampler.watch(self.build_pid)
+
+    @property
+    def peak_rss(self):
+        """打包进程树的内存峰值；没有采样、或常驻进程没有报告打包子进程（只采到客户端）时为 None"""
+        if self.sampler is None or (self.uses_worker and self.build_pid is None):
+            return None
+        return self.sampler.peak or None
+
+    def finish(self, exit_code):
+        """结束测量并保存记录，返回记录ID"""
+        if self.sampler:
+            self.sampler.stop()
+        peak_rss = self.peak_rss
+        self.tracker.finish(exit_code == 0)
+        artifact_size = packager_core.path_size(packager_core.artifact_path(self.config)) if exit_code == 0 else None
+        try:
+            return record_build(self.config, self.started_at, time.time() - self.started_at, exit_code,
+                                self.tracker.timeline, peak_rss or None, artifact_size, self.command, self.name)
+        except sqlite3.Error:
+            return None
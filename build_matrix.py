@@ -0,0 +1,103 @@
+import os
+import json
+import time
+
+import packager_core
+import build_queue
+import build_cache
+import proc_utils
+
+
+# 窗口模式在任务名中的简称，顺序与 packager_core.WINDOW_MODES 一致
+WINDOW_LABELS = ["windowed", "console", "default"]
+
+LAYOUT_LABELS = {True: "onefile", False: "onedir"}
+
+
+def python_version(python):
+    """解释器的简短版本号，如 3.11.7"""
+    version = build_cache.interpreter_version(python)
+    return version.split()[0] if version else "unknown"
+
+
+def expand(config, pythons=None, window_modes=None, layouts=None, output_root=None):
+    """把 解释器 × 窗口模式 × 单文件/目录 展开为任务列表 [(任务名, 配置)]
+
+    未指定的维度使用配置中的当前值；每个任务输出到 output_root 下以任务名命名的目录。
+    """
+    config = packager_core.normalize_config(config)
+    pythons = pythons or [config["python_path"]]
+    window_modes = window_modes if window_modes is not None else [config["window_mode"]]
+    layouts = layouts if layouts is not None else [config["onefile"]]
+    output_root = output_root or os.path.join(packager_core.resolve_output_dir(config), "matrix")
+
+    jobs = []
+    for python in pythons:
+        version = python_version(python or packager_core.resolve_python(config))
+        for window_mode in window_modes:
+            for onefile in layouts:
+                label = f"py{version}-{WINDOW_LABELS[window_mode]}-{LAYOUT_LABELS[onefile]}"
+                variant = dict(config)
+                variant["python_path"] = python
+                variant["window_mode"] = window_mode
+                variant["onefile"] = onefile
+                variant["output_path"] = os.path.join(output_root, label)
+                jobs.append((label, variant))
+    return jobs
+
+
+def create_queue(config, pythons=None, window_modes=None, layouts=None, max_workers=None,
+                 on_output=None, on_state=None):
+    """创建包含所有矩阵任务的打包队列"""
+    queue = build_queue.BuildQueue(max_workers=max_workers, on_output=on_output, on_state=on_state)
+    for label, variant in expand(config, pythons, window_modes, layouts):
+        queue.add_config(variant, label)
+    return queue
+
+
+def report(queue):
+    """矩阵打包结果 [{任务名, 解释器, 窗口模式, 打包方式, 状态, 耗时, 产物大小, 退出码, 日志}]"""
+    rows = []
+    for job in queue.jobs:
+        config = job.config
+        size = None
+        if job.state == build_queue.SUCCESS:
+            size = packager_core.path_size(packager_core.artifact_path(config))
+        rows.append({
+            "name": job.name,
+            "python": packager_core.resolve_python(config),
+            "window_mode": WINDOW_LABELS[config["window_mode"]],
+            "layout": LAYOUT_LABELS[config["onefile"]],
+            "state": job.state,
+            "duration": job.duration,
+            "artifact": packager_core.artifact_path(config),
+            "artifact_size": size,
+            "exit_code": job.exit_code,
+            "error": job.error,
+            "log": job.log_path,
+        })
+    return rows
+
+
+def save_report(rows, path):
+    """把矩阵打包结果写入JSON文件"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"created_at": time.time(), "jobs": rows}, f, ensure_ascii=False, indent=1)
+
+
+def format_report(rows):
+    """矩阵打包结果的文本表格"""
+    headers = ["任务", "状态", "耗时", "产物大小", "退出码", "说明"]
+    table = []
+    for row in rows:
+        table.append([row["name"], build_queue.STATE_LABELS.get(row["state"], row["state"]),
+                      "" if row["duration"] is None else f"{row['duration']:.1f}s",
+                      proc_utils.format_size(row["artifact_size"]),
+                      "" if row["exit_code"] is None else str(row["exit_code"]),
+                      row["error"] or (row["artifact"] if row["state"] == build_queue.SUCCESS else row["log"] or "")])
+    widths = [max(len(line[i]) for line in table + [headers]) for i in range(len(headers))]
+    lines = ["  ".join(value.ljust(width) for value, width in zip(line, widths)).rstrip()
+             for line in [headers] + table]
+    succeeded = sum(1 for row in rows if row["state"] == build_queue.SUCCESS)
+    lines.append(f"\n成功 {succeeded}/{len(rows)}")
+    return "\n".join(lines)
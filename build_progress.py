@@ -0,0 +1,225 @@
+import os
+import re
+import json
+import time
+import threading
+
+import packager_core
+import onefile_cache
+import bindep_cache
+import pyi_worker
+
+
+# PyInstaller 的打包阶段: (名称, 显示文本, 进入该阶段的日志标记, 默认耗时权重)
+PHASES = [
+    ("startup", "启动进程", None, 2.0),
+    ("analysis", "Analysis", re.compile(r"INFO: (checking|Running) Analysis"), 2.0),
+    ("graph", "模块依赖图", re.compile(r"INFO: ((Initializing|Reusing cached) module dependency graph|Analyzing modules for base_library)"), 20.0),
+    ("hooks", "模块hook", re.compile(r"INFO: Processing module hooks \(post-graph stage\)"), 5.0),
+    ("binaries", "二进制依赖", re.compile(r"INFO: (Looking for dynamic libraries|Looking for ctypes DLLs)"), 3.0),
+    ("pyz", "PYZ", re.compile(r"INFO: (checking|Building) PYZ"), 2.0),
+    ("pkg", "PKG", re.compile(r"INFO: (checking|Building) PKG"), 5.0),
+    ("exe", "EXE", re.compile(r"INFO: (checking|Building) EXE"), 2.0),
+    ("collect", "COLLECT", re.compile(r"INFO: (checking|Building) COLLECT"), 3.0),
+]
+
+PHASE_LABELS = {name: label for name, label, _, _ in PHASES}
+
+# 单个hook的日志行，用于细分模块依赖图阶段的进度
+HOOK_PATTERN = re.compile(r"INFO: (Loading module hook|Processing (standard |pre-\w+ )?module hook|Processing pre-)")
+DONE_PATTERN = re.compile(r"INFO: Build complete!")
+BINDEP_CACHE_PATTERN = re.compile(re.escape(bindep_cache.REPORT_PREFIX) + r" 命中 (\d+)/(\d+)")
+
+# 常驻打包进程报告的打包子进程 pid
+BUILD_PID_PATTERN = re.compile("^" + re.escape(pyi_worker.BUILD_PID_PREFIX) + r" (\d+)\s*$")
+
+# 每个阶段保留最近几次的耗时用于估算
+HISTORY_SIZE = 5
+
+_history_lock = threading.Lock()
+
+
+def get_timings_path():
+    return os.path.join(packager_core.get_app_data_dir(), "phase_timings.json")
+
+
+def load_timings():
+    """读取所有配置的阶段耗时记录"""
+    try:
+        with open(get_timings_path(), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_timings(key, durations, hooks):
+    """追加一次成功打包的阶段耗时"""
+    with _history_lock:
+        timings = load_timings()
+        record = timings.setdefault(key, {"phases": {}, "hooks": []})
+        for name, seconds in durations.items():
+            values = record["phases"].setdefault(name, [])
+            values.append(round(seconds, 3))
+            del values[:-HISTORY_SIZE]
+        record["hooks"].append(hooks)
+        del record["hooks"][:-HISTORY_SIZE]
+        record["expected"] = list(durations)
+        with open(get_timings_path(), 'w', encoding='utf-8') as f:
+            json.dump(timings, f, indent=1)
+
+
+def format_seconds(seconds):
+    seconds = int(round(seconds))
+    if seconds >= 60:
+        return f"{seconds // 60}分{seconds % 60:02d}秒"
+    return f"{seconds}秒"
+
+
+class ProgressTracker:
+    """根据PyInstaller日志中的阶段标记计算打包进度和剩余时间
+
+    每个阶段的权重取自同一配置历史打包的平均耗时，没有历史记录时使用默认权重。
+    """
+
+    def __init__(self, config, clock=time.monotonic):
+        config = packager_core.normalize_config(config)
+        self.key = packager_core.config_hash(config)
+        self.clock = clock
+        self.pending_text = ""
+
+        record = load_timings().get(self.key, {})
+        self.has_history = bool(record.get("phases"))
+        self.expected = {}
+        for name, _, _, weight in PHASES:
+            values = record.get("phases", {}).get(name)
+            self.expected[name] = sum(values) / len(values) if values else weight
+        hooks = record.get("hooks") or []
+        self.expected_hooks = sum(hooks) / len(hooks) if hooks else 0
+
+        # 预计会经历的阶段: 优先使用上次实际经历的阶段
+        if record.get("expected"):
+            self.phases = [name for name, _, _, _ in PHASES if name in record["expected"]]
+        else:
+            self.phases = [name for name, _, _, _ in PHASES
+                           if not (config["onefile"] and not onefile_cache.enabled(config) and name == "collect")]
+
+        self.current = None
+        self.phase_start = None
+        self.start_time = None
+        self.durations = {}
+        self.timeline = []  # [(阶段, 开始偏移秒数, 结束偏移秒数)]
+        self.hooks = 0
+        self.done = False
+        self.bindep_cache = None  # 二进制依赖分析缓存的 (命中数, 分析次数)
+        self.build_pid = None  # 常驻打包进程 fork 出的打包子进程
+
+    def start(self):
+        self.start_time = self.clock()
+        self._enter("startup")
+
+    def _enter(self, name):
+        now = self.clock()
+        if self.current is not None:
+            self.durations[self.current] = self.durations.get(self.current, 0) + now - self.phase_start
+            self.timeline.append((self.current, self.phase_start - self.start_time, now - self.start_time))
+        self.current = name
+        self.phase_start = now
+        if name not in self.phases:
+            self.phases.append(name)
+            self.phases.sort(key=[p[0] for p in PHASES].index)
+
+    def feed(self, text):
+        """处理一段日志输出，可以是不完整的行"""
+        text = self.pending_text + text
+        lines = text.split("\n")
+        self.pending_text = lines.pop()
+        for line in lines:
+            self.feed_line(line)
+
+    def feed_line(self, line):
+        if DONE_PATTERN.search(line):
+            self.done = True
+            return
+        match = BINDEP_CACHE_PATTERN.search(line)
+        if match:
+            self.bindep_cache = (int(match.group(1)), int(match.group(2)))
+            return
+        match = BUILD_PID_PATTERN.search(line)
+        if match:
+            self.build_pid = int(match.group(1))
+            return
+        if HOOK_PATTERN.search(line):
+            self.hooks += 1
+        order = [p[0] for p in PHASES]
+        for name, _, pattern, _ in PHASES:
+            # 阶段只会向后推进，避免重复的标记导致进度倒退
+            if pattern and pattern.search(line) and order.index(name) > order.index(self.current):
+                self._enter(name)
+                break
+
+    def _phase_fraction(self):
+        """当前阶段内部的完成比例（0~0.95）"""
+        elapsed = self.clock() - self.phase_start
+        fraction = elapsed / self.expected[self.current] if self.expected[self.current] else 0
+        if self.current == "graph" and self.expected_hooks:
+            fraction = max(fraction, self.hooks / self.expected_hooks)
+        return min(fraction, 0.95)
+
+    def progress(self):
+        """当前进度百分比（0~99）"""
+        if self.done:
+            return 99
+        if self.current is None:
+            return 0
+        total = sum(self.expected[name] for name in self.phases)
+        index = self.phases.index(self.current)
+        finished = sum(self.expected[name] for name in self.phases[:index])
+        current = self.expected[self.current] * self._phase_fraction()
+        return min(99, int((finished + current) * 100 / total)) if total else 0
+
+    def eta(self):
+        """预计剩余秒数，没有历史记录时返回 None"""
+        if not self.has_history or self.current is None:
+            return None
+        index = self.phases.index(self.current)
+        elapsed = self.clock() - self.phase_start
+        remaining = max(0.0, self.expected[self.current] - elapsed)
+        remaining += sum(self.expected[name] for name in self.phases[index + 1:])
+        return remaining
+
+    def status_text(self):
+        """进度条上显示的文本"""
+        if self.current is None:
+            return ""
+        text = f"{PHASE_LABELS[self.current]} 阶段 {self.progress()}%"
+        eta = self.eta()
+        if eta is not None:
+            text += f" 预计剩余 {format_seconds(eta)}"
+        return text
+
+    def finish(self, success):
+        """打包结束，成功时保存各阶段耗时，返回 {阶段: 秒数}"""
+        if self.pending_text:
+            self.feed_line(self.pending_text)
+            self.pending_text = ""
+        if self.current is not None:
+            self._enter(self.current)
+            self.current = None
+        if success and self.durations:
+            save_timings(self.key, self.durations, self.hooks)
+        return dict(self.durations)
+
+    def summary(self):
+        """各阶段耗时的摘要文本"""
+        total = sum(self.durations.values())
+        if not total:
+            return ""
+        parts = [f"{PHASE_LABELS[name]} {seconds:.1f}s"
+                 for name, seconds in sorted(self.durations.items(), key=lambda item: -item[1])]
+        dominant = max(self.durations, key=self.durations.get)
+        text = (f"阶段耗时: {', '.join(parts)}\n"
+                f"耗时最多的阶段: {PHASE_LABELS[dominant]} ({self.durations[dominant] * 100 / total:.0f}%)")
+        if self.bindep_cache:
+            hits, total_count = self.bindep_cache
+            text += f"\n二进制依赖分析缓存: 命中 {hits}，未命中 {total_count - hits}"
+        return text
@@ -0,0 +1,387 @@
+import os
+import time
+import threading
+import subprocess
+
+import packager_core
+import proc_utils
+import build_cache
+import build_history
+import workpath_pool
+import pyi_worker
+import artifact_store
+import dist_archive
+import upx_tool
+import data_files
+import build_agent
+import onefile_cache
+import bindep_cache
+import build_scheduler
+import job_limits
+
+
+# 任务状态
+PENDING = "pending"
+RUNNING = "running"
+SUCCESS = "success"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+STATE_LABELS = {
+    PENDING: "等待中",
+    RUNNING: "打包中",
+    SUCCESS: "成功",
+    FAILED: "失败",
+    CANCELLED: "已取消",
+}
+
+
+def default_workers():
+    """默认并发数: CPU核心数"""
+    return os.cpu_count() or 1
+
+
+def launch_command(config, cmd):
+    """实际启动的进程命令: 远程打包时由代理客户端执行，启用常驻进程时通过常驻进程执行，
+    启用二进制依赖分析缓存时在PyInstaller进程中使用缓存，配置了资源限制时先应用限制"""
+    if config.get("remote_build"):
+        return build_agent.client_command(config)
+    return job_limits.wrap_command(config, bindep_cache.wrap_command(config, pyi_worker.wrap_command(config, cmd)))
+
+
+def post_build(config, on_message):
+    """打包成功后的处理: 增量复制数据文件、UPX压缩（目录模式）、生成单文件启动缓存产物、存入产物对象库、
+    生成归档，说明通过 on_message 输出
+
+    远程打包的产物已在代理上完成前三步。数据文件复制失败时抛出 OSError，调用方应视为打包失败且不写入构建缓存。
+    """
+    if not config.get("remote_build"):
+        # 启用单文件启动缓存时，数据文件和UPX在暂存目录中的目录模式产物上处理
+        build_config = onefile_cache.pyinstaller_config(config)
+        data_files.after_build(build_config, on_message)
+        upx_tool.after_build(build_config, on_message)
+        onefile_cache.after_build(config, on_message)
+    message = artifact_store.after_build(config)
+    if message:
+        on_message(message)
+    dist_archive.after_build(config, on_message)
+
+
+def insert_options(cmd, options):
+    """在脚本路径（命令最后一项）之前插入参数，已存在的参数不覆盖"""
+    cmd = list(cmd)
+    extra = []
+    for i in range(0, len(options), 2):
+        if options[i] not in cmd:
+            extra.extend(options[i:i + 2])
+    return cmd[:-1] + extra + cmd[-1:]
+
+
+def replace_option(cmd, option, value):
+    """替换命令中已有参数的值，不存在时插入"""
+    cmd = list(cmd)
+    if option in cmd and cmd.index(option) + 1 < len(cmd) - 1:
+        cmd[cmd.index(option) + 1] = value
+        return cmd
+    return insert_options(cmd, [option, value])
+
+
+class BuildJob:
+    """批量打包中的单个任务"""
+
+    def __init__(self, job_id, config, name=None, config_path=None):
+        self.job_id = job_id
+        self.config = packager_core.normalize_config(config)
+        self.config_path = config_path
+        self.name = name or packager_core.script_name(self.config) or f"job{job_id}"
+        self.command = None
+        self.work_dir = None
+        self.log_path = None
+        self.state = PENDING
+        self.exit_code = None
+        self.error = ""
+        self.message = ""
+        self.start_time = None
+        self.end_time = None
+        self.process = None
+        self.run = None
+        self.reservation = None
+        self.preempted = False
+
+    @property
+    def progress(self):
+        """进度百分比"""
+        if self.state == SUCCESS:
+            return 100
+        return self.run.tracker.progress() if self.run else 0
+
+    @property
+    def duration(self):
+        """任务耗时（秒），未开始时为 None"""
+        if self.start_time is None:
+            return None
+        return (self.end_time or time.time()) - self.start_time
+
+    @property
+    def state_label(self):
+        return STATE_LABELS.get(self.state, self.state)
+
+
+class BuildQueue:
+    """批量打包队列，使用有限数量的并发PyInstaller进程
+
+    任务由资源调度器（默认为进程内共用的调度器）按历史峰值内存和耗时安排启动，内存不足时排队或被中止后重新排队。
+    每个任务使用独立的 --workpath/--specpath，避免并发构建互相覆盖。
+    回调在工作线程中调用，界面需自行转到主线程处理。
+    discard_cancelled 为 False 时，取消的任务保留复用池中的工作目录（监视模式中取消后马上会重新打包，
+    PyInstaller 只在每个阶段完成后才写入记录，中断的阶段下次会重新执行）。
+    """
+
+    def __init__(self, max_workers=None, work_root=None, on_output=None, on_state=None, discard_cancelled=True,
+                 scheduler=None):
+        self.max_workers = max(1, max_workers or default_workers())
+        self.work_root = work_root or os.path.join(packager_core.get_app_data_dir(), "queue")
+        self.on_output = on_output
+        self.on_state = on_state
+        self.discard_cancelled = discard_cancelled
+        self.jobs = []
+        self.scheduler = scheduler or build_scheduler.get_scheduler()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._cancelled = False
+
+    def add_config(self, config, name=None, config_path=None):
+        """添加一个配置到队列"""
+        job = BuildJob(len(self.jobs) + 1, config, name, config_path)
+        self.jobs.append(job)
+        return job
+
+    def add_config_file(self, file_path):
+        """从配置文件添加任务"""
+        config = packager_core.load_config_file(file_path)
+        name = os.path.splitext(os.path.basename(file_path))[0]
+        return self.add_config(config, name, file_path)
+
+    def prepare_job(self, job):
+        """生成任务的命令，并分配独立的工作目录"""
+        job.work_dir = os.path.join(self.work_root, f"{job.name}-{packager_core.config_hash(job.config)[:10]}")
+        os.makedirs(job.work_dir, exist_ok=True)
+        job.log_path = os.path.join(job.work_dir, "build.log")
+        cmd = packager_core.build_command(packager_core.absolutize_paths(job.config))
+        if packager_core.use_workpath_pool(job.config):
+            workpath = workpath_pool.workpath_for(job.config)
+        else:
+            workpath = os.path.join(job.work_dir, "build")
+        # spec文件模式的工作目录由spec决定，且PyInstaller不接受 --specpath
+        if not job.config["use_spec"]:
+            cmd = insert_options(cmd, [
+                "--workpath", workpath,
+                "--specpath", job.work_dir,
+            ])
+        job.command = packager_core.build_process_command(job.config, cmd)
+
+    def start(self):
+        """开始执行队列（非阻塞）"""
+        # 输出目录和产物名相同的任务会互相覆盖，提前拒绝
+        targets = {}
+        submitted = 0
+        for job in self.jobs:
+            if job.state != PENDING:
+                continue
+            try:
+                self.prepare_job(job)
+            except (packager_core.ConfigError, OSError) as e:
+                self._finish(job, FAILED, error=str(e))
+                continue
+            target = (os.path.normcase(os.path.abspath(packager_core.resolve_output_dir(job.config))),
+                      packager_core.script_name(job.config))
+            if target in targets:
+                self._finish(job, FAILED, error=f"与任务 {targets[target].name} 的输出冲突")
+                continue
+            targets[target] = job
+            self._submit(job)
+            submitted += 1
+
+        for _ in range(min(self.max_workers, submitted)):
+            thread = threading.Thread(target=self._worker, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def wait(self):
+        """等待所有任务结束"""
+        for thread in self._threads:
+            thread.join()
+
+    def run(self):
+        """执行队列并等待结束，全部成功时返回 True"""
+        self.start()
+        self.wait()
+        return all(job.state == SUCCESS for job in self.jobs)
+
+    def cancel(self):
+        """取消所有未完成的任务（非阻塞）: 终止进程树，超时仍未退出的强制杀死"""
+        self._cancelled = True
+        self.scheduler.wake()
+        with self._lock:
+            for job in self.jobs:
+                if job.state == RUNNING and job.process and job.process.poll() is None:
+                    self._stop_job(job)
+
+    def is_running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def _submit(self, job):
+        """按历史记录估算资源需求并交给调度器"""
+        memory, duration = build_scheduler.estimate(job.config)
+        job.reservation = build_scheduler.Reservation(job.name, self, memory, duration,
+                                                      local=not job.config["remote_build"],
+                                                      on_preempt=lambda: self._preempt(job), item=job)
+        self.scheduler.submit(job.reservation)
+
+    def _worker(self):
+        while True:
+            reservation = self.scheduler.take(self, lambda: self._cancelled)
+            if reservation is None:
+                break
+            requeued = False
+            try:
+                requeued = self._run_job(reservation.item)
+            except Exception as e:
+                # 其他意外的异常也不能结束工作线程，否则任务会一直处于运行中
+                self._finish(reservation.item, FAILED, error=f"打包失败: {str(e)}")
+            finally:
+                if not requeued:
+                    self.scheduler.release(reservation)
+        if self._cancelled:
+            for reservation in self.scheduler.withdraw(self):
+                self._finish(reservation.item, CANCELLED)
+
+    def _preempt(self, job):
+        """调度器要求释放内存: 中止任务，进程退出后重新排队"""
+        with self._lock:
+            if job.state == RUNNING and job.process and job.process.poll() is None:
+                job.preempted = True
+                self._stop_job(job)
+
+    def _stop_job(self, job):
+        """终止任务的进程树；常驻进程的打包子进程不在其中，一起终止（客户端断开时它也会自行退出）"""
+        proc_utils.stop_process(job.process)
+        if job.run and job.run.build_pid:
+            pids = proc_utils.process_tree(job.run.build_pid)
+            proc_utils.signal_processes(pids)
+            proc_utils.kill_later(pids)
+
+    def _requeue(self, job):
+        job.preempted = False
+        job.process = None
+        job.state = PENDING
+        if job.reservation.exclusive:
+            message = "内存不足，已中止并重新排队，等其他任务结束后单独打包"
+        else:
+            message = "内存不足，已中止并重新排队"
+        if self.on_output:
+            self.on_output(job, message)
+        self._notify(job)
+        self.scheduler.requeue(job.reservation)
+        return True
+
+    def _run_job(self, job):
+        """执行任务，被中止并重新排队时返回 True"""
+        os.makedirs(packager_core.resolve_output_dir(job.config), exist_ok=True)
+        job.start_time = time.time()
+
+        # 构建缓存: 没有变化时跳过，只有源码变化时保留工作目录
+        fingerprint = None
+        if job.config["build_cache"]:
+            try:
+                action, job.command, fingerprint, job.message = build_cache.plan_build(job.config, job.command)
+            except Exception as e:
+                # 任务线程中的异常不能向外抛出，否则任务会一直处于运行中
+                self._finish(job, FAILED, error=f"检查构建缓存失败: {str(e)}")
+                return False
+            if self.on_output:
+                self.on_output(job, job.message)
+            if action == build_cache.SKIP:
+                self._finish(job, SUCCESS, 0)
+                return False
+
+        if not packager_core.use_workpath_pool(job.config):
+            return self._run_process(job, fingerprint)
+        # 同一配置的另一个打包正在使用共享目录时得到独立的工作目录
+        workpath, _ = workpath_pool.acquire(job.config)
+        job.command = replace_option(job.command, "--workpath", workpath)
+        try:
+            return self._run_process(job, fingerprint)
+        finally:
+            workpath_pool.release(workpath, discard=self.discard_cancelled and job.state == CANCELLED)
+
+    def _run_process(self, job, fingerprint):
+        job.run = build_history.BuildRun(job.config, job.command, job.name)
+        job.run.start()
+        try:
+            with self._lock:
+                job.process = subprocess.Popen(
+                    launch_command(job.config, job.command),
+                    cwd=os.path.dirname(job.config["script_path"]) or None,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                )
+                job.state = RUNNING
+            job.run.process_started(job.process.pid)
+            self.scheduler.started(job.reservation, job.process.pid)
+            self._notify(job)
+            with open(job.log_path, 'w', encoding='utf-8') as log_file:
+                log_file.write(f"执行命令: {' '.join(job.command)}\n")
+                for raw in job.process.stdout:
+                    line = raw.decode("utf-8", errors="ignore")
+                    log_file.write(line)
+                    job.run.feed_line(line)
+                    if job.run.build_pid and job.run.build_pid not in job.reservation.pids:
+                        # 常驻进程 fork 的打包子进程也计入任务的内存占用
+                        self.scheduler.started(job.reservation, job.run.build_pid)
+                    if self.on_output:
+                        self.on_output(job, line.rstrip("\r\n"))
+            exit_code = job.process.wait()
+            job.run.finish(-1 if self._cancelled or job.preempted else exit_code)
+        except OSError as e:
+            self._finish(job, FAILED, error=f"启动进程失败: {str(e)}")
+            return False
+
+        if self._cancelled:
+            self._finish(job, CANCELLED, exit_code)
+            return False
+        if job.preempted:
+            return self._requeue(job)
+        if exit_code == 0:
+            messages = []
+            error = ""
+            try:
+                post_build(job.config, messages.append)
+                if fingerprint:
+                    build_cache.record_build(job.config, fingerprint)
+            except Exception as e:
+                error = f"打包后处理失败: {str(e)}"
+                messages.append(error)
+            if messages:
+                with open(job.log_path, 'a', encoding='utf-8') as log_file:
+                    log_file.write("\n".join(messages) + "\n")
+                if self.on_output:
+                    for message in messages:
+                        self.on_output(job, message)
+            if error:
+                self._finish(job, FAILED, exit_code, error=error)
+                return False
+        self._finish(job, SUCCESS if exit_code == 0 else FAILED, exit_code)
+        return False
+
+    def _finish(self, job, state, exit_code=None, error=""):
+        job.state = state
+        job.exit_code = exit_code
+        job.error = error
+        if job.start_time is not None:
+            job.end_time = time.time()
+        self._notify(job)
+
+    def _notify(self, job):
+        if self.on_state:
+            self.on_state(job)
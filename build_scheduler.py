@@ -0,0 +1,301 @@
+"""按内存和CPU预算调度并发打包
+
+每个任务按同一配置历史打包的峰值内存和耗时估算资源需求；任务只在预算（和系统当前可用内存）允许时启动，
+否则排队。可同时启动的任务中优先启动预计耗时最长的任务，等待过久的大任务会阻止后来的小任务插队。
+运行中的任务实际占用超过预算或系统可用内存过低时，中止最后启动的任务并重新排队，而不是让系统 OOM。
+
+同一进程中的所有批量队列（包括构建代理上每个请求的队列）共用一个调度器。不依赖Qt。
+"""
+import os
+import sys
+import time
+import itertools
+import threading
+
+import packager_core
+import proc_utils
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+# 默认内存预算: 物理内存的比例
+DEFAULT_BUDGET_RATIO = 0.8
+
+# 没有历史记录时假定的峰值内存和耗时
+DEFAULT_JOB_MEMORY = 1024 * 1024 * 1024
+DEFAULT_JOB_DURATION = 60.0
+
+# 系统可用内存低于物理内存的该比例时中止任务
+LOW_MEMORY_RATIO = 0.05
+
+# 同一任务被中止达到该次数后单独打包（只在没有其他任务运行时启动，运行时不再启动其他任务）
+MAX_PREEMPTIONS = 2
+
+# 等待超过该时间（秒）的任务不再被后来的任务插队
+STARVATION_SECONDS = 300
+
+MONITOR_INTERVAL = 1.0
+
+
+def system_memory():
+    """(物理内存总量, 当前可用内存)，单位字节，无法获取的项为 None"""
+    if psutil is not None:
+        memory = psutil.virtual_memory()
+        return memory.total, memory.available
+    if sys.platform.startswith("linux"):
+        values = {}
+        try:
+            with open("/proc/meminfo") as f:
+                for line in f:
+                    name, value = line.split(":", 1)
+                    values[name] = int(value.split()[0]) * 1024
+        except (OSError, ValueError, IndexError):
+            pass
+        return values.get("MemTotal"), values.get("MemAvailable")
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES"), None
+    except (ValueError, OSError, AttributeError):
+        return None, None
+
+
+def default_memory_budget():
+    total, _ = system_memory()
+    return int(total * DEFAULT_BUDGET_RATIO) if total else None
+
+
+def estimate(config):
+    """任务的 (峰值内存, 耗时) 估算，取自同一配置的历史打包记录"""
+    import build_history
+    memory, duration = build_history.resource_estimate(packager_core.config_hash(config))
+    return memory or DEFAULT_JOB_MEMORY, duration or DEFAULT_JOB_DURATION
+
+
+class Reservation:
+    """一个任务的资源预留
+
+    local 为 False 的任务（远程打包）不占用本机资源，总是可以立即启动。
+    on_preempt 在需要中止任务时调用（在监视线程中），任务结束后由提交方调用 requeue。item 是提交方的任务对象。
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, name, group, memory, duration, local=True, on_preempt=None, item=None):
+        self.seq = next(self._ids)
+        self.name = name
+        self.item = item
+        self.group = group
+        self.memory = memory if local else 0
+        self.duration = duration
+        self.local = local
+        self.on_preempt = on_preempt
+        self.pids = []
+        self.rss = 0
+        self.started = None
+        self.waiting_since = time.time()
+        self.preemptions = 0
+        self.preempting = False
+        self.exclusive = False
+
+
+class ResourceScheduler:
+    """线程安全的资源调度器
+
+    cpu_budget 为同时运行的本机任务总数上限，None 表示只受各队列自身并发数的限制。
+    提交方用 submit 加入任务，各自的工作线程用 take 取得可以启动的任务，进程启动后调用 started，
+    结束后调用 release（被中止时调用 requeue）。
+    """
+
+    def __init__(self, memory_budget=None, cpu_budget=None, monitor_interval=MONITOR_INTERVAL):
+        self.memory_budget = memory_budget or default_memory_budget()
+        self.cpu_budget = cpu_budget or None
+        self.monitor_interval = monitor_interval
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._running = []
+        self._monitor = None
+
+    def configure(self, memory_budget=None, cpu_budget=None):
+        """修改预算，未指定的项恢复默认值"""
+        with self._cond:
+            self.memory_budget = memory_budget or default_memory_budget()
+            self.cpu_budget = cpu_budget or None
+            self._cond.notify_all()
+
+    def submit(self, reservation):
+        with self._cond:
+            reservation.waiting_since = time.time()
+            self._waiting.append(reservation)
+            self._cond.notify_all()
+
+    def withdraw(self, group):
+        """移除该组所有等待中的任务，返回被移除的预留"""
+        with self._cond:
+            removed = [r for r in self._waiting if r.group is group]
+            self._waiting = [r for r in self._waiting if r.group is not group]
+            self._cond.notify_all()
+            return removed
+
+    def wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def take(self, group, cancelled=lambda: False):
+        """阻塞直到该组有任务可以启动，返回其预留；该组没有等待和运行中的任务或 cancelled() 为真时返回 None
+
+        该组有运行中的任务时继续等待，因为它们可能被中止后重新排队。
+        """
+        with self._cond:
+            while True:
+                if cancelled():
+                    return None
+                if not any(r.group is group for r in self._waiting):
+                    if not any(r.group is group for r in self._running):
+                        return None
+                else:
+                    reservation = self._next(group)
+                    if reservation is not None:
+                        self._waiting.remove(reservation)
+                        reservation.started = time.time()
+                        reservation.rss = 0
+                        reservation.preempting = False
+                        self._running.append(reservation)
+                        self._ensure_monitor()
+                        return reservation
+                self._cond.wait(self.monitor_interval)
+
+    def started(self, reservation, pid):
+        """任务进程已启动，开始监视其内存；可以多次调用加入不在该进程树中的进程（常驻进程 fork 的打包子进程）"""
+        with self._cond:
+            if pid not in reservation.pids:
+                reservation.pids.append(pid)
+
+    def release(self, reservation):
+        with self._cond:
+            if reservation in self._running:
+                self._running.remove(reservation)
+            reservation.pids = []
+            self._cond.notify_all()
+
+    def requeue(self, reservation):
+        """被中止的任务重新排队，内存估算不低于实际观察到的占用"""
+        with self._cond:
+            if reservation in self._running:
+                self._running.remove(reservation)
+            reservation.memory = max(reservation.memory, reservation.rss)
+            reservation.pids = []
+            reservation.waiting_since = time.time()
+            self._waiting.append(reservation)
+            self._cond.notify_all()
+
+    def status(self):
+        """当前状态: {"memory_budget", "cpu_budget", "committed", "running", "waiting"}"""
+        with self._cond:
+            local = [r for r in self._running if r.local]
+            return {
+                "memory_budget": self.memory_budget,
+                "cpu_budget": self.cpu_budget,
+                "committed": sum(max(r.memory, r.rss) for r in local),
+                "running": len(local),
+                "waiting": len(self._waiting),
+            }
+
+    def _admissible(self, reservation):
+        if not reservation.local:
+            return True
+        running = [r for r in self._running if r.local]
+        # 没有其他任务时总是启动，即使估算超过预算
+        if not running:
+            return True
+        if reservation.exclusive or any(r.exclusive for r in running):
+            return False
+        if self.cpu_budget and len(running) >= self.cpu_budget:
+            return False
+        if self.memory_budget and \
+                sum(max(r.memory, r.rss) for r in running) + reservation.memory > self.memory_budget:
+            return False
+        # 本机其他程序占用的内存也要考虑: 运行中任务还会继续增长的部分加上新任务不能超过当前可用内存
+        _, available = system_memory()
+        if available is not None:
+            growth = sum(max(0, r.memory - r.rss) for r in running)
+            if growth + reservation.memory > available:
+                return False
+        return True
+
+    def _next(self, group):
+        """按预计耗时从长到短选择该组可以启动的任务"""
+        now = time.time()
+        for reservation in sorted(self._waiting, key=lambda r: (-r.duration, r.seq)):
+            if self._admissible(reservation):
+                if reservation.group is group:
+                    return reservation
+            elif reservation.local and now - reservation.waiting_since > STARVATION_SECONDS:
+                break
+        return None
+
+    def _ensure_monitor(self):
+        if self._monitor is None or not self._monitor.is_alive():
+            self._monitor = threading.Thread(target=self._monitor_loop, daemon=True)
+            self._monitor.start()
+
+    def _monitor_loop(self):
+        while True:
+            with self._cond:
+                if not self._running:
+                    self._monitor = None
+                    return
+            self.check_memory()
+            time.sleep(self.monitor_interval)
+
+    def check_memory(self):
+        """采样运行中任务的内存，超出预算或系统内存不足时中止最后启动的任务，返回被中止的预留"""
+        with self._cond:
+            running = [(r, list(r.pids)) for r in self._running if r.local and r.pids and not r.preempting]
+        for reservation, pids in running:
+            reservation.rss = sum(proc_utils.tree_rss(pid) for pid in pids)
+        running = [reservation for reservation, _ in running]
+        total, available = system_memory()
+        victim = None
+        with self._cond:
+            used = sum(r.rss for r in running)
+            low = bool(total and available is not None and available < total * LOW_MEMORY_RATIO)
+            over = bool(self.memory_budget and used > self.memory_budget)
+            candidates = [r for r in running if r.on_preempt and r in self._running]
+            if (over or low) and len(running) > 1 and candidates:
+                victim = max(candidates, key=lambda r: r.started)
+                victim.preempting = True
+                victim.preemptions += 1
+                victim.memory = max(victim.memory, victim.rss)
+                if victim.preemptions >= MAX_PREEMPTIONS:
+                    victim.exclusive = True
+            # 实际占用变化后，等待中的任务可能可以启动了
+            self._cond.notify_all()
+        if victim is not None:
+            victim.on_preempt()
+        return victim
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """进程内共用的调度器"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ResourceScheduler()
+        return _scheduler
+
+
+def configure(memory_budget=None, cpu_budget=None):
+    """设置进程内共用调度器的预算（字节、并发数），未指定的项使用默认值"""
+    get_scheduler().configure(memory_budget, cpu_budget)
+
+
+def format_status(status):
+    budget = proc_utils.format_size(status["memory_budget"]) if status["memory_budget"] else "不限"
+    return (f"内存预算 {budget}（已预留 {proc_utils.format_size(status['committed'])}），"
+            f"CPU预算 {status['cpu_budget'] or '不限'}，运行中 {status['running']}，等待 {status['waiting']}")
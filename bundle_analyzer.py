@@ -0,0 +1,252 @@
+import os
+import ast
+import json
+import time
+import struct
+import marshal
+import tempfile
+import subprocess
+
+import packager_core
+import proc_utils
+
+
+# TOC 中的文件类型
+BINARY_TYPES = {"BINARY", "EXTENSION"}
+DATA_TYPES = {"DATA", "ZIPFILE", "SYMLINK"}
+MODULE_TYPES = {"PYMODULE"}
+
+# 导入耗时分析的 runtime hook；只有设置了环境变量时才生效，不影响正常运行
+IMPORTTIME_HOOK = '''\
+# 由 pyinstaller_tool 生成: 记录启动过程中每个模块的导入耗时
+import os
+
+_output = os.environ.get("PYI_IMPORTTIME_OUT")
+if _output:
+    import sys
+    import time
+    import json
+    import atexit
+    import threading
+    import _frozen_importlib
+
+    _hook_time = time.time()
+    _t0 = float(os.environ.get("PYI_IMPORTTIME_T0") or _hook_time)
+    _records = []
+    _stack = []
+    _original = _frozen_importlib._find_and_load
+    _dumped = []
+
+    def _timed_find_and_load(name, import_):
+        _stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return _original(name, import_)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = _stack.pop()
+            if _stack:
+                _stack[-1] += elapsed
+            _records.append((name, elapsed - children, elapsed, len(_stack)))
+
+    def _dump():
+        if _dumped:
+            return
+        _dumped.append(True)
+        with open(_output, "w", encoding="utf-8") as f:
+            json.dump({"bootstrap": _hook_time - _t0, "elapsed": time.time() - _hook_time,
+                       "imports": _records}, f)
+
+    _frozen_importlib._find_and_load = _timed_find_and_load
+    atexit.register(_dump)
+    # 图形界面程序不会自动退出，到时间后先写出结果
+    _timer = threading.Timer(float(os.environ.get("PYI_IMPORTTIME_SECONDS", "10")), _dump)
+    _timer.daemon = True
+    _timer.start()
+'''
+
+
+def importtime_hook_path():
+    """生成导入耗时 runtime hook 文件，返回路径"""
+    hook_dir = os.path.join(packager_core.get_app_data_dir(), "rthooks")
+    os.makedirs(hook_dir, exist_ok=True)
+    path = os.path.join(hook_dir, "pyi_rth_importtime.py")
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == IMPORTTIME_HOOK:
+                return path
+    except OSError:
+        pass
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(IMPORTTIME_HOOK)
+    return path
+
+
+def read_toc(path):
+    """读取PyInstaller的 .toc 文件，返回所有 (名称, 路径, 类型) 条目"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = ast.literal_eval(f.read())
+
+    entries = []
+    pending = [data]
+    while pending:
+        item = pending.pop()
+        if isinstance(item, (list, tuple)):
+            if len(item) == 3 and all(isinstance(v, str) for v in item) and item[2].isupper():
+                entries.append(tuple(item))
+            else:
+                pending.extend(item)
+        elif isinstance(item, dict):
+            pending.extend(item.values())
+    return entries
+
+
+def read_pyz(path):
+    """读取PYZ归档的目录，返回 {模块名: 压缩后字节数}"""
+    with open(path, 'rb') as f:
+        if f.read(4) != b"PYZ\0":
+            raise ValueError("不是有效的PYZ归档")
+        f.read(4)  # Python字节码magic
+        toc_offset, = struct.unpack("!i", f.read(4))
+        f.seek(toc_offset)
+        toc = marshal.load(f)
+    if isinstance(toc, dict):
+        toc = toc.items()
+    return {name: entry[-1] for name, entry in toc}
+
+
+def owner_of(name):
+    """文件所属的顶层包（目录或模块名的第一段）"""
+    name = name.replace("\\", "/")
+    if "/lib-dynload/" in name:
+        # 标准库扩展模块，按模块名统计
+        return name.rsplit("/", 1)[1].split(".")[0]
+    if "/" in name:
+        return name.split("/")[0]
+    if name.endswith((".so", ".dll", ".pyd", ".dylib")) or ".so." in name:
+        return "(动态库)"
+    return name.split(".")[0]
+
+
+def analyze_bundle(workpath):
+    """分析工作目录中的TOC和PYZ归档，按包统计产物大小
+
+    返回 {"packages": [(包, 总字节数, {类别: 字节数})], "files": [(名称, 类别, 字节数)], "total": 总字节数}
+    """
+    if not os.path.isdir(workpath):
+        raise FileNotFoundError(f"工作目录不存在: {workpath}")
+
+    files = []
+
+    # 纯Python模块: 优先使用PYZ中实际的压缩大小
+    pyz_path = os.path.join(workpath, "PYZ-00.pyz")
+    module_sizes = {}
+    if os.path.exists(pyz_path):
+        try:
+            module_sizes = read_pyz(pyz_path)
+        except (OSError, ValueError, EOFError, TypeError, struct.error):
+            module_sizes = {}
+    if module_sizes:
+        for name, size in module_sizes.items():
+            files.append((name, "模块", size))
+    elif os.path.exists(os.path.join(workpath, "PYZ-00.toc")):
+        for name, path, typecode in read_toc(os.path.join(workpath, "PYZ-00.toc")):
+            if typecode in MODULE_TYPES and os.path.exists(path):
+                files.append((name, "模块", os.path.getsize(path)))
+
+    # 二进制和数据文件: 目录模式读取 COLLECT，单文件模式读取 PKG
+    for toc_name in ("COLLECT-00.toc", "PKG-00.toc"):
+        toc_path = os.path.join(workpath, toc_name)
+        if not os.path.exists(toc_path):
+            continue
+        seen = set()
+        for name, path, typecode in read_toc(toc_path):
+            if name in seen or not os.path.isfile(path):
+                continue
+            seen.add(name)
+            if typecode in BINARY_TYPES:
+                files.append((name, "二进制", os.path.getsize(path)))
+            elif typecode in DATA_TYPES:
+                files.append((name, "数据", os.path.getsize(path)))
+        break
+
+    packages = {}
+    for name, category, size in files:
+        owner = name.split(".")[0] if category == "模块" else owner_of(name)
+        total, categories = packages.get(owner, (0, {}))
+        categories[category] = categories.get(category, 0) + size
+        packages[owner] = (total + size, categories)
+
+    return {
+        "packages": sorted(((name, total, categories) for name, (total, categories) in packages.items()),
+                           key=lambda item: -item[1]),
+        "files": sorted(files, key=lambda item: -item[2]),
+        "total": sum(size for _, _, size in files),
+    }
+
+
+def format_bundle(result, top=15):
+    """产物分析的文本摘要"""
+    lines = [f"产物组成（按包统计，共 {proc_utils.format_size(result['total'])}）:"]
+    for name, total, categories in result["packages"][:top]:
+        detail = ", ".join(f"{category} {proc_utils.format_size(size)}" for category, size in sorted(categories.items()))
+        percent = total * 100 / result["total"] if result["total"] else 0
+        lines.append(f"  {name:<30}{proc_utils.format_size(total):>10} {percent:5.1f}%  ({detail})")
+    lines.append("最大的文件:")
+    for name, category, size in result["files"][:top]:
+        lines.append(f"  {proc_utils.format_size(size):>10}  {category:<4}{name}")
+    return "\n".join(lines)
+
+
+def profile_startup(executable, args=None, timeout=15, extra_env=None):
+    """启动打包后的程序并读取导入耗时（程序需要使用导入耗时 runtime hook 打包）
+
+    返回 {"bootstrap": 启动到执行hook的秒数, "elapsed": 记录时长, "imports": [(模块, 自身耗时, 累计耗时, 层级)]}
+    """
+    if not os.path.exists(executable):
+        raise FileNotFoundError(f"可执行文件不存在: {executable}")
+
+    fd, output = tempfile.mkstemp(prefix="importtime-", suffix=".json")
+    os.close(fd)
+    os.remove(output)
+    env = dict(os.environ)
+    env["PYI_IMPORTTIME_OUT"] = output
+    env["PYI_IMPORTTIME_SECONDS"] = str(max(1, timeout - 2))
+    env["PYI_IMPORTTIME_T0"] = repr(time.time())
+    env.update(extra_env or {})
+    process = subprocess.Popen([executable] + list(args or []), env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+    if not os.path.exists(output):
+        raise RuntimeError("未获取到导入耗时数据，请确认打包时启用了启动耗时分析")
+    try:
+        with open(output, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    finally:
+        os.remove(output)
+
+
+def format_startup(result, top=20):
+    """导入耗时的文本摘要，按包汇总自身耗时"""
+    imports = result["imports"]
+    total_import = sum(record[1] for record in imports)
+    lines = [f"启动耗时: 程序启动到执行Python代码 {result['bootstrap'] * 1000:.0f}ms，"
+             f"导入模块共 {len(imports)} 个，耗时 {total_import * 1000:.0f}ms"]
+
+    packages = {}
+    for name, self_time, _, _ in imports:
+        top_name = name.split(".")[0]
+        packages[top_name] = packages.get(top_name, 0) + self_time
+    lines.append("按包统计的导入耗时:")
+    for name, seconds in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        lines.append(f"  {name:<30}{seconds * 1000:9.1f}ms")
+    lines.append("最慢的模块（累计耗时，含子模块）:")
+    top_level = [record for record in imports if record[3] == 0]
+    for name, _, cumulative, _ in sorted(top_level, key=lambda record: -record[2])[:top]:
+        lines.append(f"  {name:<50}{cumulative * 1000:9.1f}ms")
+    return "\n".join(lines)
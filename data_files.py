@@ -0,0 +1,354 @@
+import os
+import glob
+import json
+import time
+import shutil
+import fnmatch
+import hashlib
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import packager_core
+import proc_utils
+
+
+GLOB_CHARS = "*?["
+
+_lock = threading.Lock()
+
+
+def has_glob(path):
+    return any(char in path for char in GLOB_CHARS)
+
+
+def glob_root(path):
+    """通配符路径中不含通配符的最长前缀目录，如 assets/**/*.png → assets"""
+    parts = path.replace("\\", "/").split("/")
+    for index, part in enumerate(parts):
+        if has_glob(part):
+            # 绝对路径拆分后第一段为空，直接拼接以保留开头的 /
+            root = "/".join(parts[:index])
+            return os.path.normpath(root or "/") if index else "."
+    return path
+
+
+def is_excluded(rel_path, patterns):
+    """按排除规则判断相对路径（使用 / 分隔）是否排除，规则同时匹配完整相对路径和文件名"""
+    name = rel_path.rsplit("/", 1)[-1]
+    return any(fnmatch.fnmatch(rel_path, pattern) or fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+
+class TreeScan:
+    """目录扫描结果
+
+    files: [(相对路径, 路径, 大小, 修改时间)]，按相对路径排序
+    excluded_dirs: 其中有内容被排除的目录（相对路径，根目录为空字符串）
+    """
+
+    def __init__(self):
+        self.files = []
+        self.excluded_dirs = set()
+
+
+def _scan_dir(path, rel_dir, patterns):
+    files, dirs, excluded = [], [], False
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                if patterns and is_excluded(rel_path, patterns):
+                    excluded = True
+                    continue
+                try:
+                    if entry.is_dir():
+                        dirs.append((entry.path, rel_path))
+                    else:
+                        stat = entry.stat()
+                        files.append((rel_path, entry.path, stat.st_size, stat.st_mtime_ns))
+                except OSError:
+                    pass
+    except OSError:
+        pass
+    return files, dirs, excluded
+
+
+def scan_tree(root, patterns=(), workers=None):
+    """并行扫描目录树（每个子目录一个 os.scandir 任务），返回 TreeScan"""
+    result = TreeScan()
+    patterns = list(patterns)
+    with ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) * 4)) as executor:
+        pending = {executor.submit(_scan_dir, root, "", patterns): ""}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                rel_dir = pending.pop(future)
+                files, dirs, excluded = future.result()
+                result.files.extend(files)
+                if excluded:
+                    result.excluded_dirs.add(rel_dir)
+                for path, rel_path in dirs:
+                    pending[executor.submit(_scan_dir, path, rel_path, patterns)] = rel_path
+    result.files.sort()
+    return result
+
+
+def entry_sources(entry, base_dir):
+    """数据文件配置对应的源路径列表（展开通配符），返回 (源路径列表, 目标目录)"""
+    src, dst = packager_core.split_data_entry(entry)
+    if not os.path.isabs(src):
+        src = os.path.join(base_dir, src)
+    if has_glob(src):
+        sources = sorted(glob.glob(src, recursive=True))
+    else:
+        sources = [src] if os.path.exists(src) else []
+    return sources, dst
+
+
+def _dest(dst, rel_path):
+    return posixpath.normpath(posixpath.join(dst.replace("\\", "/"), rel_path))
+
+
+def resolve_entry(entry, base_dir, patterns=()):
+    """展开单个数据文件配置，返回 (文件列表 [(源路径, 产物中的相对路径, 大小, 修改时间)], 目录扫描结果列表)
+
+    与 PyInstaller 相同: 源是目录时把目录的内容放到目标目录下，是文件时放到目标目录中。
+    """
+    sources, dst = entry_sources(entry, base_dir)
+    files, scans = [], []
+    for source in sources:
+        if os.path.isdir(source):
+            scan = scan_tree(source, patterns)
+            scans.append((source, scan))
+            files.extend((path, _dest(dst, rel_path), size, mtime) for rel_path, path, size, mtime in scan.files)
+        elif os.path.isfile(source) and not (patterns and is_excluded(os.path.basename(source), patterns)):
+            stat = os.stat(source)
+            files.append((source, _dest(dst, os.path.basename(source)), stat.st_size, stat.st_mtime_ns))
+    return files, scans
+
+
+def base_dir_for(config):
+    return os.path.dirname(os.path.abspath(config["script_path"].strip()))
+
+
+def scan_entries(config):
+    """扫描配置中的所有数据文件，返回 [(配置项, 文件列表)]"""
+    config = packager_core.normalize_config(config)
+    base_dir = base_dir_for(config)
+    return [(entry, resolve_entry(entry, base_dir, config["data_excludes"])[0]) for entry in config["data_files"]]
+
+
+def format_summary(files):
+    """数据文件的数量和总大小"""
+    if not files:
+        return "没有文件"
+    return f"{len(files)} 个文件, {proc_utils.format_size(sum(item[2] for item in files))}"
+
+
+def _collapse(source, scan, dst):
+    """有文件被排除的目录树按目录展开: 没有排除内容的子目录整体添加，其余目录逐个文件添加"""
+    dirty = set()
+    for rel_dir in scan.excluded_dirs:
+        parts = rel_dir.split("/") if rel_dir else []
+        for index in range(len(parts) + 1):
+            dirty.add("/".join(parts[:index]))
+    pairs = []
+    for rel_path, path, _, _ in scan.files:
+        parts = rel_path.split("/")
+        for index in range(1, len(parts)):
+            rel_dir = "/".join(parts[:index])
+            if rel_dir not in dirty:
+                pairs.append((os.path.join(source, *parts[:index]), _dest(dst, rel_dir)))
+                break
+        else:
+            pairs.append((path, _dest(dst, posixpath.dirname(rel_path) or ".")))
+    return list(dict.fromkeys(pairs))
+
+
+def expand_datas(config):
+    """传给 PyInstaller 的数据文件 [(源路径, 目标目录)]
+
+    没有排除规则生效的配置项原样传递（通配符由 PyInstaller 展开），否则按目录展开。
+    """
+    config = packager_core.normalize_config(config)
+    patterns = config["data_excludes"]
+    base_dir = base_dir_for(config)
+    datas = []
+    for entry in config["data_files"]:
+        src, dst = packager_core.split_data_entry(entry)
+        if not patterns:
+            datas.append((src, dst))
+            continue
+        sources, _ = entry_sources(entry, base_dir)
+        expanded, changed = [], False
+        for source in sources:
+            if os.path.isdir(source):
+                scan = scan_tree(source, patterns)
+                if scan.excluded_dirs:
+                    changed = True
+                    expanded.extend(_collapse(source, scan, dst))
+                else:
+                    expanded.append((source, dst))
+            elif is_excluded(os.path.basename(source), patterns):
+                changed = True
+            else:
+                expanded.append((source, dst))
+        datas.extend(expanded if changed else [(src, dst)])
+    return datas
+
+
+def use_incremental(config):
+    """是否由本工具增量复制数据文件: 仅目录模式（单文件模式的数据必须打包进可执行文件）"""
+    return (bool(config.get("incremental_data")) and not config["onefile"] and not config["use_spec"]
+            and bool(config["data_files"]))
+
+
+def pyinstaller_args(config):
+    """数据文件对应的 --add-data 参数；增量复制时数据文件在打包后由本工具放入产物，不传给 PyInstaller"""
+    config = packager_core.normalize_config(config)
+    if use_incremental(config):
+        return []
+    args = []
+    for src, dst in expand_datas(config):
+        args.extend(["--add-data", f"{src}{os.pathsep}{dst}"])
+    return args
+
+
+def stage_dir(config):
+    return os.path.join(packager_core.get_app_data_dir(), "data_stage", packager_core.config_hash(config)[:16])
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _sync_file(item, staged_root, previous):
+    """把一个源文件同步到暂存目录，返回 (相对路径, 索引记录, 是否复制)"""
+    src, dest, size, mtime = item
+    target = os.path.join(staged_root, *dest.split("/"))
+    record = previous.get(dest)
+    try:
+        staged = os.stat(target)
+        staged_state = [staged.st_size, staged.st_mtime_ns]
+    except OSError:
+        staged_state = None
+    # 暂存文件被修改过（例如程序运行时写入了产物中的硬链接）时重新复制
+    staged_ok = record is not None and staged_state == record["staged"]
+    if staged_ok and record["src"] == src and record["size"] == size and record["mtime"] == mtime:
+        return dest, record, False
+    digest = file_hash(src)
+    if staged_ok and record["hash"] == digest:
+        return dest, dict(record, src=src, size=size, mtime=mtime), False
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    temp_path = f"{target}.{threading.get_ident()}.tmp"
+    shutil.copy2(src, temp_path)
+    os.replace(temp_path, target)
+    staged = os.stat(target)
+    return dest, {"src": src, "size": size, "mtime": mtime, "hash": digest,
+                  "staged": [staged.st_size, staged.st_mtime_ns]}, True
+
+
+def sync_stage(config, workers=None):
+    """把数据文件增量同步到暂存目录，返回 (文件列表 [相对路径], 统计)
+
+    大小和修改时间未变化的文件直接跳过；变化的文件比较内容哈希，内容相同时也不复制。
+    """
+    config = packager_core.normalize_config(config)
+    start = time.time()
+    base_dir = base_dir_for(config)
+    items = {}
+    for entry in config["data_files"]:
+        for item in resolve_entry(entry, base_dir, config["data_excludes"])[0]:
+            items[item[1]] = item  # 后面的配置项覆盖前面相同目标的文件
+
+    directory = stage_dir(config)
+    staged_root = os.path.join(directory, "files")
+    index_path = os.path.join(directory, "index.json")
+    with _lock:
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+        except (OSError, ValueError):
+            previous = {}
+        with ThreadPoolExecutor(max_workers=workers or min(8, os.cpu_count() or 1)) as executor:
+            results = list(executor.map(lambda item: _sync_file(item, staged_root, previous), items.values()))
+        index = {dest: record for dest, record, _ in results}
+        removed = 0
+        for dest in set(previous) - set(index):
+            try:
+                os.remove(os.path.join(staged_root, *dest.split("/")))
+                removed += 1
+            except OSError:
+                pass
+        os.makedirs(directory, exist_ok=True)
+        with open(index_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+
+    copied = [dest for dest, _, was_copied in results if was_copied]
+    stats = {
+        "files": len(results),
+        "size": sum(record["size"] for _, record, _ in results),
+        "copied": len(copied),
+        "copied_bytes": sum(index[dest]["size"] for dest in copied),
+        "removed": removed,
+        "seconds": time.time() - start,
+    }
+    return sorted(index), stats
+
+
+def contents_dir(config):
+    """目录模式产物中数据文件的根目录（PyInstaller 6 为 _internal 或 --contents-directory 指定的目录）"""
+    dist_dir = packager_core.artifact_path(config)
+    if os.path.exists(os.path.join(dist_dir, "base_library.zip")):
+        return dist_dir
+    try:
+        with os.scandir(dist_dir) as entries:
+            for entry in entries:
+                if entry.is_dir() and os.path.exists(os.path.join(entry.path, "base_library.zip")):
+                    return entry.path
+    except OSError:
+        pass
+    return dist_dir
+
+
+def link_into_dist(config, dests):
+    """把暂存目录中的文件硬链接到产物中（不支持时复制），返回使用的方式统计"""
+    import artifact_store
+    staged_root = os.path.join(stage_dir(config), "files")
+    root = contents_dir(config)
+    methods = {}
+    for dest in dests:
+        target = os.path.join(root, *dest.split("/"))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if os.path.lexists(target):
+            os.remove(target)
+        method = artifact_store.link_or_copy(os.path.join(staged_root, *dest.split("/")), target)
+        methods[method] = methods.get(method, 0) + 1
+    return methods
+
+
+def after_build(config, on_message=None):
+    """打包成功后按配置增量复制数据文件到目录模式产物
+
+    复制失败时抛出 OSError: 缺少数据文件的产物不能算打包成功，也不能写入构建缓存（否则下次会跳过打包）。
+    """
+    config = packager_core.normalize_config(config)
+    if not use_incremental(config):
+        return None
+    try:
+        dests, stats = sync_stage(config)
+        start = time.time()
+        methods = link_into_dist(config, dests)
+    except OSError as e:
+        raise OSError(f"复制数据文件失败: {str(e)}") from e
+    stats["seconds"] += time.time() - start
+    if on_message:
+        linked = "硬链接" if set(methods) == {"link"} else "、".join(methods)
+        on_message(f"数据文件: {stats['files']} 个 ({proc_utils.format_size(stats['size'])})，"
+                   f"复制 {stats['copied']} 个 ({proc_utils.format_size(stats['copied_bytes'])})，"
+                   f"删除 {stats['removed']} 个，{linked}到产物，耗时 {stats['seconds']:.1f}s")
+    return stats
@@ -0,0 +1,330 @@
+import os
+import stat
+import time
+import zlib
+import shutil
+import struct
+import hashlib
+import tarfile
+import threading
+import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import packager_core
+import proc_utils
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# 支持的归档格式
+FORMATS = ["zip", "tar.zst"]
+
+# 大文件按块并行压缩，同时也是内存中待写出数据的粒度
+CHUNK_SIZE = 1024 * 1024
+
+# 本身已经压缩过的文件，直接存储
+COMPRESSED_SUFFIXES = {
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".zst", ".7z", ".rar", ".whl", ".egg", ".jar",
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".ico", ".mp3", ".mp4", ".ogg", ".avi", ".mkv", ".woff", ".woff2",
+}
+
+# 用文件开头的样本试压缩，压缩率低于该值时直接存储
+STORE_RATIO = 0.97
+SAMPLE_SIZE = 64 * 1024
+
+
+class _HashingWriter:
+    """写入文件的同时计算 sha256 和写入位置"""
+
+    def __init__(self, f):
+        self.f = f
+        self.offset = 0
+        self.digest = hashlib.sha256()
+
+    def write(self, data):
+        self.f.write(data)
+        self.digest.update(data)
+        self.offset += len(data)
+        return len(data)
+
+    def flush(self):
+        self.f.flush()
+
+
+def archive_path(config, fmt):
+    """归档文件路径: 输出目录下与产物同名"""
+    return os.path.join(packager_core.resolve_output_dir(config), f"{packager_core.script_name(config)}.{fmt}")
+
+
+def archive_members(path):
+    """要归档的文件 [(归档内路径, 文件路径)]，目录模式下以产物目录名作为顶层目录"""
+    base = os.path.basename(path.rstrip(os.sep))
+    if os.path.isfile(path):
+        return [(base, path)]
+    members = []
+    for root, dirs, names in os.walk(path):
+        # 指向目录的符号链接作为链接本身归档，不进入
+        for name in list(dirs):
+            if os.path.islink(os.path.join(root, name)):
+                dirs.remove(name)
+                names.append(name)
+        for name in names:
+            full_path = os.path.join(root, name)
+            members.append((base + "/" + os.path.relpath(full_path, path).replace(os.sep, "/"), full_path))
+    members.sort()
+    return members
+
+
+# ---------------------------------------------------------------- zip
+
+def _dos_time(mtime):
+    t = time.localtime(max(mtime, 315532800))  # zip 时间从 1980 年开始
+    return (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2), \
+        ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+
+
+def _deflate_chunk(data, level, final):
+    """把一块数据压缩为独立的 deflate 片段
+
+    非最后一块以 Z_SYNC_FLUSH 结束（字节对齐且不设置结束标记），多块依次拼接后仍是合法的
+    deflate 数据流，因此同一个文件的各块可以在不同线程中并行压缩。
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+def _should_store(full_path, sample):
+    if os.path.splitext(full_path)[1].lower() in COMPRESSED_SUFFIXES:
+        return True
+    return not sample or len(zlib.compress(sample, 1)) >= len(sample) * STORE_RATIO
+
+
+class _ZipEntry:
+    def __init__(self, arcname, mode, mtime, size, method):
+        self.name = arcname.encode("utf-8")
+        self.mode = mode
+        self.time, self.date = _dos_time(mtime)
+        self.size = size
+        self.method = method
+        self.zip64 = size >= 0xF0000000
+        self.crc = 0
+        self.compressed = 0
+        self.offset = 0
+
+
+def _local_header(entry):
+    extra = struct.pack("<HHQQ", 1, 16, 0, 0) if entry.zip64 else b""
+    # 标志位: 3 = CRC和大小写在数据之后（流式写入），11 = 文件名使用UTF-8
+    return struct.pack("<IHHHHHIIIHH", 0x04034B50, 45 if entry.zip64 else 20, 0x0808, entry.method,
+                       entry.time, entry.date, 0, 0xFFFFFFFF if entry.zip64 else 0,
+                       0xFFFFFFFF if entry.zip64 else 0, len(entry.name), len(extra)) + entry.name + extra
+
+
+def _data_descriptor(entry):
+    if entry.zip64:
+        return struct.pack("<IIQQ", 0x08074B50, entry.crc, entry.compressed, entry.size)
+    return struct.pack("<IIII", 0x08074B50, entry.crc, entry.compressed, entry.size)
+
+
+def _central_header(entry):
+    fields = []
+    size, compressed, offset = entry.size, entry.compressed, entry.offset
+    if size >= 0xFFFFFFFF:
+        fields.append(size)
+        size = 0xFFFFFFFF
+    if compressed >= 0xFFFFFFFF:
+        fields.append(compressed)
+        compressed = 0xFFFFFFFF
+    if offset >= 0xFFFFFFFF:
+        fields.append(offset)
+        offset = 0xFFFFFFFF
+    extra = struct.pack("<HH", 1, 8 * len(fields)) + struct.pack(f"<{len(fields)}Q", *fields) if fields else b""
+    version = 45 if fields or entry.zip64 else 20
+    # 创建系统为 Unix (3)，外部属性高16位保存权限位，解压后保留可执行权限和符号链接
+    return struct.pack("<IHHHHHHIIIHHHHHII", 0x02014B50, (3 << 8) | version, version, 0x0808, entry.method,
+                       entry.time, entry.date, entry.crc, compressed, size, len(entry.name), len(extra), 0, 0, 0,
+                       (entry.mode & 0xFFFF) << 16, offset) + entry.name + extra
+
+
+def _end_records(writer, entries, cd_offset, cd_size):
+    count = len(entries)
+    if count >= 0xFFFF or cd_offset >= 0xFFFFFFFF or cd_size >= 0xFFFFFFFF:
+        zip64_offset = writer.offset
+        writer.write(struct.pack("<IQHHIIQQQQ", 0x06064B50, 44, 45, 45, 0, 0, count, count, cd_size, cd_offset))
+        writer.write(struct.pack("<IIQI", 0x07064B50, 0, zip64_offset, 1))
+        count, cd_offset, cd_size = min(count, 0xFFFF), min(cd_offset, 0xFFFFFFFF), min(cd_size, 0xFFFFFFFF)
+    writer.write(struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, count, count, cd_size, cd_offset, 0))
+
+
+def write_zip(path, output, level=6, workers=None):
+    """把产物写成zip，多线程压缩，返回 {"members", "stored"}
+
+    按块读取和压缩，内存中最多保留 线程数×4 块数据；写入顺序与读取顺序一致。
+    """
+    workers = workers or os.cpu_count() or 1
+    entries = []
+    stored = 0
+    with open(output, 'wb') as f, ThreadPoolExecutor(max_workers=workers) as executor:
+        writer = _HashingWriter(f)
+        pending = deque()
+
+        def write_item(item):
+            kind, entry, payload = item
+            if kind == "header":
+                entry.offset = writer.offset
+                writer.write(_local_header(entry))
+            elif kind == "data":
+                data = payload.result() if hasattr(payload, "result") else payload
+                entry.compressed += len(data)
+                writer.write(data)
+            else:
+                writer.write(_data_descriptor(entry))
+
+        def push(item):
+            pending.append(item)
+            while len(pending) > workers * 4:
+                write_item(pending.popleft())
+
+        for arcname, full_path in archive_members(path):
+            info = os.lstat(full_path)
+            if stat.S_ISLNK(info.st_mode):
+                target = os.readlink(full_path).encode("utf-8")
+                entry = _ZipEntry(arcname, info.st_mode, info.st_mtime, len(target), 0)
+                entry.crc = zlib.crc32(target)
+                for item in (("header", entry, None), ("data", entry, target), ("end", entry, None)):
+                    push(item)
+                entries.append(entry)
+                continue
+
+            with open(full_path, 'rb') as source:
+                chunk = source.read(CHUNK_SIZE)
+                store = _should_store(full_path, chunk[:SAMPLE_SIZE])
+                entry = _ZipEntry(arcname, info.st_mode, info.st_mtime, info.st_size, 0 if store else 8)
+                stored += store and info.st_size > 0
+                push(("header", entry, None))
+                # 读取过程中文件大小变化时以实际读取的为准
+                entry.size = 0
+                while True:
+                    next_chunk = source.read(CHUNK_SIZE) if chunk else b""
+                    entry.crc = zlib.crc32(chunk, entry.crc)
+                    entry.size += len(chunk)
+                    final = not next_chunk
+                    if store:
+                        push(("data", entry, chunk))
+                    elif chunk or final:
+                        push(("data", entry, executor.submit(_deflate_chunk, chunk, level, final)))
+                    if final:
+                        break
+                    chunk = next_chunk
+                push(("end", entry, None))
+            entries.append(entry)
+
+        while pending:
+            write_item(pending.popleft())
+
+        cd_offset = writer.offset
+        for entry in entries:
+            writer.write(_central_header(entry))
+        _end_records(writer, entries, cd_offset, writer.offset - cd_offset)
+    return {"members": len(entries), "stored": stored, "sha256": writer.digest.hexdigest()}
+
+
+# ---------------------------------------------------------------- tar.zst
+
+def zstd_available():
+    return zstandard is not None or shutil.which("zstd") is not None
+
+
+def write_tar_zst(path, output, level=3, workers=None):
+    """把产物写成 tar.zst，使用 zstd 的多线程压缩，返回 {"members", "stored"}"""
+    workers = workers or os.cpu_count() or 1
+    members = archive_members(path)
+    with open(output, 'wb') as f:
+        writer = _HashingWriter(f)
+        if zstandard is not None:
+            compressor = zstandard.ZstdCompressor(level=level, threads=workers)
+            with compressor.stream_writer(writer, closefd=False) as stream:
+                _write_tar(stream, members)
+        elif shutil.which("zstd"):
+            process = subprocess.Popen([shutil.which("zstd"), f"-{level}", f"-T{workers}", "-q", "-c"],
+                                       stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+            def copy_output():
+                for chunk in iter(lambda: process.stdout.read(CHUNK_SIZE), b""):
+                    writer.write(chunk)
+
+            reader = threading.Thread(target=copy_output, daemon=True)
+            reader.start()
+            try:
+                _write_tar(process.stdin, members)
+            finally:
+                process.stdin.close()
+                reader.join()
+            if process.wait() != 0:
+                raise OSError(f"zstd 退出码 {process.returncode}")
+        else:
+            raise OSError("需要安装 zstandard (pip install zstandard) 或 zstd 命令行工具")
+    return {"members": len(members), "stored": 0, "sha256": writer.digest.hexdigest()}
+
+
+def _write_tar(stream, members):
+    # 流式模式，按块读取文件内容，不需要在输出中回写
+    with tarfile.open(fileobj=stream, mode="w|", format=tarfile.PAX_FORMAT) as tar:
+        for arcname, full_path in members:
+            tar.add(full_path, arcname=arcname, recursive=False)
+
+
+# ---------------------------------------------------------------- 打包后处理
+
+WRITERS = {"zip": write_zip, "tar.zst": write_tar_zst}
+
+
+def create_archive(config, fmt, workers=None):
+    """把配置的产物归档为指定格式，并在旁边写入 .sha256 校验文件
+
+    返回 {"format", "path", "size", "sha256", "members", "stored", "duration"}。
+    """
+    config = packager_core.normalize_config(config)
+    source = packager_core.artifact_path(config)
+    if not os.path.exists(source):
+        raise FileNotFoundError(source)
+    output = archive_path(config, fmt)
+    temp_path = f"{output}.{os.getpid()}.tmp"
+    start = time.time()
+    try:
+        result = WRITERS[fmt](source, temp_path, workers=workers)
+        os.replace(temp_path, output)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    with open(output + ".sha256", 'w', encoding='utf-8') as f:
+        f.write(f"{result['sha256']}  {os.path.basename(output)}\n")
+    result.update(format=fmt, path=output, size=os.path.getsize(output), duration=time.time() - start)
+    return result
+
+
+def format_result(result):
+    """归档结果的单行描述"""
+    stored = f"，{result['stored']} 个已压缩文件直接存储" if result["stored"] else ""
+    return (f"已生成 {result['path']} ({proc_utils.format_size(result['size'])}，{result['members']} 个文件{stored}，"
+            f"耗时 {result['duration']:.1f}s) sha256: {result['sha256']}")
+
+
+def after_build(config, on_message=None):
+    """打包成功后按配置中的 archive_formats 生成归档，返回结果列表"""
+    results = []
+    for fmt in config.get("archive_formats") or []:
+        try:
+            result = create_archive(config, fmt)
+        except (OSError, KeyError) as e:
+            if on_message:
+                on_message(f"生成 {fmt} 归档失败: {str(e)}")
+            continue
+        results.append(result)
+        if on_message:
+            on_message(format_result(result))
+    return results
@@ -0,0 +1,248 @@
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import threading
+
+import packager_core
+import import_graph
+import data_files
+
+
+# 连续保存时等待文件安静下来的时间（秒）
+DEFAULT_DEBOUNCE = 0.5
+
+# 轮询模式的扫描间隔（秒）
+POLL_INTERVAL = 0.5
+
+# inotify 事件: 写入完成、移入、创建、删除、移出、修改
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def watch_targets(config):
+    """需要监视的输入 (文件集合, 目录集合)
+
+    文件: 入口脚本及其本地导入的模块、数据文件、图标；目录: 数据文件中的目录（通配符取不含通配符的部分），
+    其下所有文件都会被监视。
+    """
+    config = packager_core.absolutize_paths(config)
+    script_path = os.path.abspath(config["script_path"].strip())
+    files = set(import_graph.local_modules(script_path)) if os.path.isfile(script_path) else {script_path}
+    import_graph.save_cache()
+    directories = set()
+    for entry in config["data_files"]:
+        src, _ = packager_core.split_data_entry(entry)
+        src = os.path.abspath(data_files.glob_root(src))
+        if os.path.isdir(src):
+            directories.add(src)
+        else:
+            files.add(src)
+    if config["icon_path"].strip():
+        files.add(os.path.abspath(config["icon_path"].strip()))
+    return files, directories
+
+
+def _is_under(path, directories):
+    return any(path == directory or path.startswith(directory + os.sep) for directory in directories)
+
+
+class _InotifyBackend:
+    """基于 inotify 的后端，监视相关文件所在的目录（编辑器通常用替换文件的方式保存）"""
+
+    name = "inotify"
+
+    def __init__(self):
+        import ctypes
+        import ctypes.util
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        self._ctypes = ctypes
+        self._watches = {}  # wd -> 目录
+
+    def set_directories(self, directories):
+        current = set(self._watches.values())
+        for wd, directory in list(self._watches.items()):
+            if directory not in directories:
+                self._libc.inotify_rm_watch(self._fd, wd)
+                del self._watches[wd]
+        for directory in directories - current:
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+            if wd >= 0:
+                self._watches[wd] = directory
+
+    def read(self, timeout):
+        """等待事件，返回发生变化的路径集合；事件队列溢出时返回 None"""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return set()
+            raise
+        paths = set()
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                return None
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            directory = self._watches.get(wd)
+            if directory is not None:
+                paths.add(os.path.join(directory, os.fsdecode(name)) if name else directory)
+        return paths
+
+    def close(self):
+        os.close(self._fd)
+
+
+class _PollingBackend:
+    """轮询后端: 定期比较文件的大小和修改时间"""
+
+    name = "polling"
+
+    def __init__(self, interval=POLL_INTERVAL):
+        self.interval = interval
+        self._snapshot = None
+        self._scan = lambda: {}
+
+    def set_scanner(self, scan):
+        self._scan = scan
+        self._snapshot = scan()
+
+    def read(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        snapshot = self._scan()
+        old = self._snapshot or {}
+        self._snapshot = snapshot
+        return {path for path in set(old) | set(snapshot) if old.get(path) != snapshot.get(path)}
+
+    def close(self):
+        pass
+
+
+class Watcher:
+    """监视打包输入的变化，一批修改安静 debounce 秒之后调用 on_change(变化的路径列表)
+
+    回调在监视线程中调用，界面需自行转到主线程处理。
+    """
+
+    def __init__(self, on_change, debounce=DEFAULT_DEBOUNCE, polling=False):
+        self.on_change = on_change
+        self.debounce = debounce
+        self._files = set()
+        self._directories = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._backend = None
+        if not polling and sys.platform.startswith("linux"):
+            try:
+                self._backend = _InotifyBackend()
+            except (OSError, AttributeError):
+                self._backend = None
+        if self._backend is None:
+            self._backend = _PollingBackend()
+
+    @property
+    def backend_name(self):
+        return self._backend.name
+
+    def watch_config(self, config):
+        """按配置更新监视范围（打包后调用，导入关系可能已经变化）"""
+        files, directories = watch_targets(config)
+        self.set_targets(files, directories)
+        return files, directories
+
+    def set_targets(self, files, directories):
+        with self._lock:
+            self._files = {os.path.abspath(path) for path in files}
+            self._directories = {os.path.abspath(path) for path in directories}
+            if isinstance(self._backend, _InotifyBackend):
+                watched = {os.path.dirname(path) for path in self._files}
+                for directory in self._directories:
+                    for root, _, _ in os.walk(directory):
+                        watched.add(root)
+                self._backend.set_directories({path for path in watched if os.path.isdir(path)})
+            else:
+                self._backend.set_scanner(self._scan)
+
+    def _scan(self):
+        state = {}
+        paths = list(self._files)
+        for directory in self._directories:
+            for root, _, names in os.walk(directory):
+                paths.extend(os.path.join(root, name) for name in names)
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                state[path] = (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                state[path] = None
+        return state
+
+    def _relevant(self, path):
+        return path in self._files or _is_under(path, self._directories)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def close(self):
+        self.stop()
+        self._backend.close()
+
+    def _run(self):
+        pending = set()
+        last_event = 0.0
+        while not self._stop.is_set():
+            timeout = self.debounce if pending else 0.5
+            changed = self._backend.read(timeout)
+            with self._lock:
+                if changed is None:
+                    # 事件丢失，视为所有文件都发生了变化
+                    changed = set(self._files)
+                changed = {path for path in changed if self._relevant(path)}
+                if changed:
+                    pending |= changed
+                    last_event = time.time()
+                    # 数据目录中新建的子目录也需要监视
+                    new_dirs = {path for path in changed if os.path.isdir(path)}
+                    if new_dirs and isinstance(self._backend, _InotifyBackend):
+                        watched = set(self._backend._watches.values())
+                        for directory in new_dirs:
+                            for root, _, _ in os.walk(directory):
+                                watched.add(root)
+                        self._backend.set_directories(watched)
+            if pending and time.time() - last_event >= self.debounce and not self._stop.is_set():
+                paths, pending = sorted(pending), set()
+                self.on_change(paths)
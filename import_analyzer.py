@@ -0,0 +1,166 @@
+import os
+import json
+import time
+import subprocess
+
+import packager_core
+import import_graph
+
+
+# 体积大、通常不需要打包的模块: 模块名 -> 说明
+HEAVY_MODULES = {
+    "tkinter": "Tk图形界面库",
+    "unittest": "单元测试框架",
+    "doctest": "文档测试",
+    "pydoc": "文档生成工具",
+    "lib2to3": "2to3转换工具",
+    "test": "Python自带测试集",
+    "pytest": "测试框架",
+    "IPython": "交互式解释器",
+    "jedi": "代码补全库",
+    "notebook": "Jupyter Notebook",
+    "setuptools": "打包工具",
+    "pip": "包管理工具",
+    "sphinx": "文档生成工具",
+    "matplotlib.backends.backend_tkagg": "matplotlib Tk后端",
+    "matplotlib.backends.backend_wxagg": "matplotlib wx后端",
+    "matplotlib.backends.backend_gtk3agg": "matplotlib GTK3后端",
+    "matplotlib.backends.backend_gtk4agg": "matplotlib GTK4后端",
+    "matplotlib.backends.backend_webagg": "matplotlib Web后端",
+}
+
+# 同一程序只应打包一种Qt绑定
+QT_BINDINGS = ["PyQt5", "PyQt6", "PySide2", "PySide6"]
+
+# 解释器中可导入模块的缓存: (解释器, mtime) -> {模块名: 是否可导入}
+_available_cache = {}
+
+
+def available_modules(python, names):
+    """检查目标解释器中哪些模块可以导入（不实际导入，只查找 spec）"""
+    try:
+        key = (python, os.stat(python).st_mtime_ns)
+    except OSError:
+        key = (python, None)
+    cache = _available_cache.setdefault(key, {})
+    missing = [name for name in names if name not in cache]
+    if missing:
+        code = ("import sys, json, importlib.util\n"
+                "def find(name):\n"
+                "    try:\n"
+                "        return importlib.util.find_spec(name) is not None\n"
+                "    except Exception:\n"
+                "        return False\n"
+                "print(json.dumps({n: find(n) for n in json.loads(sys.argv[1])}))")
+        try:
+            output = subprocess.run([python, "-c", code, json.dumps(missing)],
+                                    capture_output=True, text=True, timeout=60).stdout
+            cache.update(json.loads(output))
+        except (OSError, ValueError, subprocess.SubprocessError):
+            cache.update({name: False for name in missing})
+    return {name for name in names if cache.get(name)}
+
+
+def package_submodules(init_file, package):
+    """列出本地包下所有子模块"""
+    result = []
+    package_dir = os.path.dirname(init_file)
+    for root, dirs, files in os.walk(package_dir):
+        dirs[:] = [d for d in dirs if os.path.isfile(os.path.join(root, d, "__init__.py"))]
+        for name in files:
+            if name.endswith(".py") and name != "__init__.py":
+                rel = os.path.relpath(os.path.join(root, name[:-3]), package_dir)
+                result.append(package + "." + rel.replace(os.sep, "."))
+    return sorted(result)
+
+
+def analyze(config):
+    """静态分析入口脚本及本地模块，给出隐藏依赖和排除模块建议
+
+    返回 {"hidden": [(模块, 原因)], "excludes": [(模块, 原因)], "warnings": [...],
+          "files": 分析的文件数, "elapsed": 耗时}
+    """
+    start = time.time()
+    config = packager_core.normalize_config(config)
+    script_path = os.path.abspath(config["script_path"])
+    roots = [os.path.dirname(script_path)]
+
+    modules = {}
+    graph = import_graph.local_import_graph(script_path, roots, modules)
+
+    static_imports = set()
+    dynamic_imports = {}
+    warnings = []
+    hidden = {}
+    for file_path, module_name in modules.items():
+        data = import_graph.parse_file(file_path)
+        is_package = os.path.basename(file_path) == "__init__.py"
+        package = module_name if is_package else module_name.rpartition(".")[0]
+        rel_path = os.path.relpath(file_path, roots[0])
+
+        for name, level, names in data["imports"]:
+            name = import_graph.resolve_relative(name, level, package)
+            if name:
+                static_imports.add(name)
+                static_imports.update(f"{name}.{sub}" for sub in names if sub != "*")
+        for name, level in data["dynamic"]:
+            name = import_graph.resolve_relative(name, level, package)
+            if name:
+                dynamic_imports.setdefault(name, rel_path)
+
+        # 包内按目录加载插件: 建议把该包的所有子模块加入隐藏依赖
+        scans_package = is_package and any(kind.startswith("pkgutil") for _, kind in data["plugins"])
+        if scans_package:
+            for submodule in package_submodules(file_path, module_name):
+                hidden.setdefault(submodule, f"{rel_path} 中使用 pkgutil 动态加载子模块")
+        else:
+            for lineno, kind in data["plugins"]:
+                warnings.append(f"{rel_path}:{lineno} 使用了 {kind}，无法静态确定加载的模块")
+
+    # PyInstaller 只识别 import 语句，字符串形式的动态导入需要作为隐藏依赖
+    for name, rel_path in dynamic_imports.items():
+        if name not in static_imports:
+            hidden.setdefault(name, f"{rel_path} 中通过 import_module/__import__ 动态导入")
+    for name in config["hidden_imports"]:
+        hidden.pop(name, None)
+
+    # 没有被本地代码导入、但目标环境中已安装的大体积模块
+    imported_tops = {name.split(".")[0] for name in static_imports | set(dynamic_imports)}
+    candidates = {}
+    for name, reason in HEAVY_MODULES.items():
+        if name not in static_imports and name not in dynamic_imports and \
+                (name.split(".")[0] not in imported_tops or "." in name):
+            candidates[name] = f"{reason}，未被本地代码导入"
+    used_qt = [name for name in QT_BINDINGS if name in imported_tops]
+    if len(used_qt) == 1:
+        for name in QT_BINDINGS:
+            if name != used_qt[0]:
+                candidates[name] = f"程序使用 {used_qt[0]}，避免打包多个Qt绑定"
+
+    python = packager_core.resolve_python(config)
+    installed = available_modules(python, sorted(candidates))
+    excludes = [(name, reason) for name, reason in sorted(candidates.items())
+                if name in installed and name not in config["exclude_modules"]]
+
+    import_graph.save_cache()
+    return {
+        "hidden": sorted(hidden.items()),
+        "excludes": excludes,
+        "warnings": warnings,
+        "files": len(graph),
+        "elapsed": time.time() - start,
+    }
+
+
+def format_result(result):
+    """分析结果的文本摘要"""
+    lines = [f"依赖分析: 共分析 {result['files']} 个本地文件，耗时 {result['elapsed']:.2f}s"]
+    for name, reason in result["hidden"]:
+        lines.append(f"  建议添加隐藏依赖: {name} ({reason})")
+    for name, reason in result["excludes"]:
+        lines.append(f"  建议排除模块: {name} ({reason})")
+    for warning in result["warnings"]:
+        lines.append(f"  注意: {warning}")
+    if len(lines) == 1:
+        lines.append("  没有新的建议")
+    return "\n".join(lines)
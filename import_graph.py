@@ -0,0 +1,207 @@
+import os
+import ast
+import json
+import hashlib
+import threading
+
+import packager_core
+
+
+# 插件式动态加载的常见写法
+PLUGIN_CALLS = {
+    "iter_modules": "pkgutil.iter_modules",
+    "walk_packages": "pkgutil.walk_packages",
+    "entry_points": "entry_points",
+    "iter_entry_points": "pkg_resources.iter_entry_points",
+}
+
+# 解析结果缓存: 文件路径 -> {"mtime", "size", "hash", "data"}
+_parse_cache = {}
+_cache_loaded = False
+_cache_dirty = False
+_cache_lock = threading.Lock()
+
+
+def get_cache_path():
+    return os.path.join(packager_core.get_app_data_dir(), "import_cache.json")
+
+
+def _load_cache():
+    global _cache_loaded
+    if _cache_loaded:
+        return
+    _cache_loaded = True
+    try:
+        with open(get_cache_path(), 'r', encoding='utf-8') as f:
+            _parse_cache.update(json.load(f))
+    except (OSError, ValueError):
+        pass
+
+
+def save_cache():
+    """把解析结果缓存写入磁盘"""
+    global _cache_dirty
+    with _cache_lock:
+        if not _cache_dirty:
+            return
+        # 删除已不存在的文件
+        for path in [p for p in _parse_cache if not os.path.exists(p)]:
+            del _parse_cache[path]
+        try:
+            with open(get_cache_path(), 'w', encoding='utf-8') as f:
+                json.dump(_parse_cache, f)
+            _cache_dirty = False
+        except OSError:
+            pass
+
+
+def _call_name(func):
+    if isinstance(func, ast.Attribute):
+        return func.attr
+    if isinstance(func, ast.Name):
+        return func.id
+    return None
+
+
+def _parse_source(source, file_path):
+    """解析源码，收集静态导入、字符串形式的动态导入和插件加载写法"""
+    imports = []
+    dynamic = []
+    plugins = []
+    try:
+        tree = ast.parse(source, filename=file_path)
+    except (SyntaxError, ValueError):
+        return {"imports": imports, "dynamic": dynamic, "plugins": plugins}
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                imports.append([alias.name, 0, []])
+        elif isinstance(node, ast.ImportFrom):
+            imports.append([node.module or "", node.level, [alias.name for alias in node.names]])
+        elif isinstance(node, ast.Call):
+            name = _call_name(node.func)
+            if name in ("import_module", "__import__"):
+                arg = node.args[0] if node.args else None
+                if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+                    module = arg.value
+                    level = len(module) - len(module.lstrip("."))
+                    dynamic.append([module.lstrip("."), level])
+                else:
+                    plugins.append([node.lineno, f"{name}(<变量>)"])
+            elif name in PLUGIN_CALLS:
+                plugins.append([node.lineno, PLUGIN_CALLS[name]])
+    return {"imports": imports, "dynamic": dynamic, "plugins": plugins}
+
+
+def parse_file(file_path):
+    """解析单个文件，结果按文件修改时间和内容哈希缓存"""
+    with _cache_lock:
+        _load_cache()
+        stat = os.stat(file_path)
+        cached = _parse_cache.get(file_path)
+        if cached and cached["mtime"] == stat.st_mtime_ns and cached["size"] == stat.st_size:
+            return cached["data"]
+
+    with open(file_path, 'rb') as f:
+        source = f.read()
+    digest = hashlib.sha1(source).hexdigest()
+    if cached and cached["hash"] == digest:
+        data = cached["data"]
+    else:
+        data = _parse_source(source, file_path)
+
+    global _cache_dirty
+    with _cache_lock:
+        _parse_cache[file_path] = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "hash": digest, "data": data}
+        _cache_dirty = True
+    return data
+
+
+def parse_imports(file_path):
+    """解析单个文件中的导入语句，返回 [(模块名, 相对层级, 导入的名称列表)]
+
+    importlib.import_module / __import__ 的字符串参数也作为导入处理。
+    """
+    data = parse_file(file_path)
+    return [tuple(item) for item in data["imports"]] + [(name, level, []) for name, level in data["dynamic"]]
+
+
+def resolve_relative(name, level, package):
+    """把相对导入转换为绝对模块名"""
+    if not level:
+        return name
+    base_parts = package.split(".") if package else []
+    if level > 1:
+        base_parts = base_parts[:len(base_parts) - (level - 1)]
+    return ".".join(p for p in base_parts + ([name] if name else []) if p)
+
+
+def resolve_module(name, roots):
+    """在本地目录中查找模块文件，返回 (文件路径, 是否为包)，找不到返回 (None, False)"""
+    parts = name.split(".")
+    for root in roots:
+        base = os.path.join(root, *parts)
+        init_file = os.path.join(base, "__init__.py")
+        if os.path.isfile(init_file):
+            return init_file, True
+        if os.path.isfile(base + ".py"):
+            return base + ".py", False
+    return None, False
+
+
+def module_name_for(file_path, root):
+    """根据文件路径计算模块名"""
+    rel = os.path.relpath(file_path, root)
+    parts = os.path.splitext(rel)[0].split(os.sep)
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    return ".".join(parts)
+
+
+def local_import_graph(script_path, roots=None, modules=None):
+    """从入口脚本开始，收集所有能在本地目录中解析到的模块文件
+
+    返回 {文件路径: [直接导入的本地文件路径]}，入口脚本本身也包含在内。
+    传入 modules 字典时，同时记录 {文件路径: 模块名}。
+    """
+    script_path = os.path.abspath(script_path)
+    if roots is None:
+        roots = [os.path.dirname(script_path)]
+
+    graph = {}
+    pending = [(script_path, "__main__", False)]
+    while pending:
+        file_path, module_name, is_package = pending.pop()
+        if file_path in graph:
+            continue
+        deps = []
+        graph[file_path] = deps
+        if modules is not None:
+            modules[file_path] = module_name
+
+        # 当前模块所在的包，用于解析相对导入
+        package = module_name if is_package else module_name.rpartition(".")[0]
+
+        for name, level, names in parse_imports(file_path):
+            name = resolve_relative(name, level, package)
+            if not name:
+                continue
+
+            candidates = [name] + [f"{name}.{sub}" for sub in names if sub != "*"]
+            # 父包的 __init__.py 也会被执行
+            parts = name.split(".")
+            candidates += [".".join(parts[:i]) for i in range(1, len(parts))]
+
+            for candidate in candidates:
+                dep_path, dep_is_package = resolve_module(candidate, roots)
+                if dep_path:
+                    deps.append(dep_path)
+                    pending.append((dep_path, candidate, dep_is_package))
+
+    return graph
+
+
+def local_modules(script_path, roots=None):
+    """返回入口脚本及其本地导入的所有文件（排序后的列表）"""
+    return sorted(local_import_graph(script_path, roots))
@@ -0,0 +1,214 @@
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import packager_core
+
+
+# 在目标解释器中运行，兼容 Python 2
+PROBE_CODE = """\
+import sys, json
+version = None
+try:
+    from importlib.metadata import version as get_version
+    version = get_version("pyinstaller")
+except Exception:
+    try:
+        import imp
+        imp.find_module("PyInstaller")
+        version = "?"
+    except Exception:
+        pass
+print(json.dumps({"version": "%d.%d.%d" % tuple(sys.version_info[:3]), "executable": sys.executable,
+                  "bits": 64 if sys.maxsize > 2 ** 32 else 32, "pyinstaller": version}))
+"""
+
+
+def get_cache_path():
+    return os.path.join(packager_core.get_app_data_dir(), "interpreters.json")
+
+
+def _bin_dir(prefix):
+    return os.path.join(prefix, "Scripts" if sys.platform == "win32" else "bin")
+
+
+def _executables(directory):
+    """目录中名称像Python解释器的可执行文件"""
+    try:
+        names = sorted(os.listdir(directory))
+    except OSError:
+        return []
+    result = []
+    for name in names:
+        path = os.path.join(directory, name)
+        if packager_core.PYTHON_NAME.match(name) and os.path.isfile(path) and os.access(path, os.X_OK):
+            result.append(path)
+    return result
+
+
+def _env_python(prefix):
+    """虚拟环境或conda环境中的解释器"""
+    for directory in (_bin_dir(prefix), prefix):
+        for name in ("python.exe", "python3", "python"):
+            path = os.path.join(directory, name)
+            if os.path.isfile(path):
+                return path
+    return None
+
+
+def candidates():
+    """从 PATH、pyenv、虚拟环境和conda环境中收集解释器，返回 [(路径, 来源)]"""
+    home = os.path.expanduser("~")
+    found = []
+
+    for directory in os.environ.get("PATH", "").split(os.pathsep):
+        # pyenv 的 shims 是转发脚本，实际版本取决于当前目录，单独从 versions 目录收集
+        if directory and "shims" not in directory.split(os.sep):
+            found.extend((path, "PATH") for path in _executables(directory))
+
+    # Windows 的 py 启动器可以列出所有已安装版本
+    if sys.platform == "win32" and shutil.which("py"):
+        try:
+            output = subprocess.run(["py", "-0p"], capture_output=True, text=True, timeout=10).stdout
+            for line in output.splitlines():
+                path = line.split()[-1] if line.split() else ""
+                if path.lower().endswith(".exe"):
+                    found.append((path, "py"))
+        except (OSError, subprocess.SubprocessError):
+            pass
+        base = os.environ.get("LOCALAPPDATA", "")
+        for path in glob.glob(os.path.join(base, "Programs", "Python", "Python*", "python.exe")):
+            found.append((path, "安装目录"))
+
+    pyenv_root = os.environ.get("PYENV_ROOT") or os.path.join(home, ".pyenv")
+    for prefix in sorted(glob.glob(os.path.join(pyenv_root, "versions", "*"))):
+        path = _env_python(prefix)
+        if path:
+            found.append((path, "pyenv"))
+
+    venv_roots = [os.environ.get("WORKON_HOME") or os.path.join(home, ".virtualenvs"),
+                  os.path.join(home, ".venvs"), os.path.join(home, ".local", "share", "virtualenvs")]
+    for root in venv_roots:
+        for prefix in sorted(glob.glob(os.path.join(root, "*"))):
+            if os.path.isfile(os.path.join(prefix, "pyvenv.cfg")):
+                path = _env_python(prefix)
+                if path:
+                    found.append((path, "venv"))
+    if os.environ.get("VIRTUAL_ENV"):
+        path = _env_python(os.environ["VIRTUAL_ENV"])
+        if path:
+            found.append((path, "venv"))
+
+    conda_prefixes = []
+    try:
+        with open(os.path.join(home, ".conda", "environments.txt"), 'r', encoding='utf-8') as f:
+            conda_prefixes.extend(line.strip() for line in f if line.strip())
+    except OSError:
+        pass
+    for base in ("anaconda3", "miniconda3", "miniconda", "miniforge3", "mambaforge"):
+        conda_prefixes.append(os.path.join(home, base))
+        conda_prefixes.extend(sorted(glob.glob(os.path.join(home, base, "envs", "*"))))
+    if os.environ.get("CONDA_PREFIX"):
+        conda_prefixes.append(os.environ["CONDA_PREFIX"])
+    for prefix in conda_prefixes:
+        path = _env_python(prefix)
+        if path:
+            found.append((path, "conda"))
+
+    return found
+
+
+def probe(path):
+    """运行解释器获取版本和PyInstaller版本，失败时返回 None"""
+    try:
+        output = subprocess.run([path, "-c", PROBE_CODE], capture_output=True, text=True, timeout=30).stdout
+        return json.loads(output)
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return None
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def load_cache():
+    try:
+        with open(get_cache_path(), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_cache(interpreters):
+    try:
+        with open(get_cache_path(), 'w', encoding='utf-8') as f:
+            json.dump({"scanned_at": time.time(), "interpreters": interpreters}, f, ensure_ascii=False, indent=1)
+    except OSError:
+        pass
+
+
+def discover(refresh=False):
+    """列出可用的解释器 [{"path", "version", "pyinstaller", "bits", "source"}]
+
+    结果缓存在数据目录中；不刷新时只检查缓存中的解释器文件是否还存在、是否被修改过。
+    """
+    cache = None if refresh else load_cache()
+    if cache is not None:
+        interpreters = []
+        changed = False
+        for item in cache.get("interpreters", []):
+            mtime = _mtime(item["path"])
+            if mtime is None:
+                changed = True
+                continue
+            if mtime != item.get("mtime"):
+                info = probe(item["path"])
+                if not info:
+                    changed = True
+                    continue
+                item.update(version=info["version"], pyinstaller=info["pyinstaller"], bits=info["bits"], mtime=mtime)
+                changed = True
+            interpreters.append(item)
+        if changed:
+            save_cache(interpreters)
+        return interpreters
+
+    # 同一个解释器可能以多个名字出现（python3 / python3.11 / 软链接），按实际文件去重
+    unique = {}
+    for path, source in candidates():
+        real = os.path.normcase(os.path.realpath(path))
+        unique.setdefault(real, (os.path.abspath(path), source))
+
+    paths = list(unique.values())
+    with ThreadPoolExecutor(max_workers=min(8, len(paths) or 1)) as executor:
+        infos = list(executor.map(lambda item: probe(item[0]), paths))
+
+    interpreters = []
+    seen = set()
+    for (path, source), info in zip(paths, infos):
+        if not info:
+            continue
+        # 解释器报告的 sys.executable 相同时视为同一个
+        key = os.path.normcase(os.path.realpath(info.get("executable") or path))
+        if key in seen:
+            continue
+        seen.add(key)
+        interpreters.append({"path": path, "version": info["version"], "pyinstaller": info["pyinstaller"],
+                             "bits": info["bits"], "source": source, "mtime": _mtime(path)})
+    interpreters.sort(key=lambda item: [int(part) for part in item["version"].split(".")], reverse=True)
+    save_cache(interpreters)
+    return interpreters
+
+
+def format_interpreter(item):
+    """解释器的单行描述"""
+    pyinstaller = f"PyInstaller {item['pyinstaller']}" if item.get("pyinstaller") else "未安装PyInstaller"
+    return f"Python {item['version']} ({item.get('bits', 64)}位, {item['source']}, {pyinstaller})  {item['path']}"
@@ -0,0 +1,129 @@
+"""打包进程的资源限制
+
+以 `python job_limits.py [--nice N] [--ionice] [--memory-mb M] -- 命令...` 的形式运行: 设置本进程的调度优先级、
+IO优先级和内存上限后 exec 打包命令，限制由PyInstaller及其子进程继承。命令由常驻打包进程执行时，限制只通过
+环境变量传给常驻进程 fork 出的打包子进程。
+
+内存上限使用 RLIMIT_DATA（Linux 4.7 起统计堆和匿名映射，不含共享库），超出时分配失败，打包以 MemoryError
+失败，而不是触发系统的 OOM 杀死其他进程。同一打包的每个子进程分别受该上限限制。
+
+与 pyi_worker 一样只能使用标准库，目标解释器中不一定能导入本工具的其他模块。
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import subprocess
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# 常驻打包进程的请求环境中设置该变量时，打包子进程应用其中的限制（JSON）
+LIMITS_ENV = "PYI_TOOL_JOB_LIMITS"
+
+
+def is_supported():
+    """需要 POSIX 的 setpriority/setrlimit；本工具被打包成可执行文件时也无法启动本脚本"""
+    return resource is not None and hasattr(os, "setpriority") and not getattr(sys, "frozen", False)
+
+
+def limits_for(config):
+    """配置中的资源限制: {"nice", "ionice", "memory"}，没有设置任何限制时返回空字典"""
+    limits = {}
+    if config.get("build_nice"):
+        limits["nice"] = int(config["build_nice"])
+    if config.get("low_io_priority"):
+        limits["ionice"] = True
+    if config.get("memory_limit_mb"):
+        limits["memory"] = int(config["memory_limit_mb"]) * 1024 * 1024
+    return limits
+
+
+def apply(limits):
+    """对当前进程应用限制，返回无法应用的限制说明列表"""
+    errors = []
+    if limits.get("nice"):
+        try:
+            # 只降低优先级，已经更低时保持不变
+            current = os.getpriority(os.PRIO_PROCESS, 0)
+            os.setpriority(os.PRIO_PROCESS, 0, max(current, min(19, int(limits["nice"]))))
+        except OSError as e:
+            errors.append(f"nice: {e}")
+    if limits.get("ionice"):
+        # 尽力而为类的最低级别；ionice 命令不存在（非 Linux）时跳过
+        ionice = shutil.which("ionice")
+        if ionice:
+            if subprocess.call([ionice, "-c", "2", "-n", "7", "-p", str(os.getpid())],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) != 0:
+                errors.append("ionice 失败")
+        else:
+            errors.append("找不到 ionice")
+    if limits.get("memory") and hasattr(resource, "RLIMIT_DATA"):
+        try:
+            _, hard = resource.getrlimit(resource.RLIMIT_DATA)
+            limit = int(limits["memory"])
+            if hard != resource.RLIM_INFINITY:
+                limit = min(limit, hard)
+            resource.setrlimit(resource.RLIMIT_DATA, (limit, hard))
+        except (OSError, ValueError) as e:
+            errors.append(f"内存上限: {e}")
+    return errors
+
+
+def apply_from_env():
+    """应用环境变量中的限制（常驻打包进程的打包子进程中调用）"""
+    value = os.environ.pop(LIMITS_ENV, None)
+    if not value:
+        return []
+    try:
+        return apply(json.loads(value))
+    except ValueError:
+        return []
+
+
+def wrap_command(config, cmd):
+    """配置了资源限制时，把命令包装为先应用限制再执行的命令"""
+    limits = limits_for(config)
+    if not limits or not is_supported():
+        return cmd
+    options = []
+    # 常驻打包进程的客户端可能启动常驻进程，限制不能被常驻进程继承，只传给它 fork 出的打包子进程
+    if len(cmd) > 1 and os.path.basename(cmd[1]) == "pyi_worker.py":
+        options.append("--env-only")
+    if limits.get("nice"):
+        options += ["--nice", str(limits["nice"])]
+    if limits.get("ionice"):
+        options.append("--ionice")
+    if limits.get("memory"):
+        options += ["--memory-mb", str(limits["memory"] // (1024 * 1024))]
+    return [sys.executable, os.path.abspath(__file__)] + options + ["--"] + list(cmd)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="应用资源限制后执行命令")
+    parser.add_argument("--nice", type=int, default=0)
+    parser.add_argument("--ionice", action="store_true")
+    parser.add_argument("--memory-mb", type=int, default=0)
+    parser.add_argument("--env-only", action="store_true", help="不限制本进程，只通过环境变量传递限制")
+    parser.add_argument("command", nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+    command = args.command[1:] if args.command[:1] == ["--"] else args.command
+    if not command:
+        parser.error("缺少要执行的命令")
+
+    limits = {"nice": args.nice, "ionice": args.ionice, "memory": args.memory_mb * 1024 * 1024}
+    for error in ([] if args.env_only else apply(limits)):
+        print(f"资源限制未生效: {error}", file=sys.stderr, flush=True)
+    os.environ[LIMITS_ENV] = json.dumps(limits)
+    try:
+        os.execvp(command[0], command)
+    except OSError as e:
+        print(f"启动进程失败: {e}", file=sys.stderr)
+        return 127
+
+
+if __name__ == "__main__":
+    sys.exit(main())
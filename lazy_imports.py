@@ -0,0 +1,127 @@
+"""延迟导入
+
+生成 runtime hook，把指定的模块改为延迟导入: `import numpy` 只得到模块代理，第一次访问模块属性时才真正
+执行导入。启动时不立即使用的重量级模块因此不再计入启动耗时，程序代码不需要修改。
+
+`from numpy import array` 形式的导入会立即访问属性，不会延迟；`from PyQt5 import QtWebEngineWidgets`
+中的子模块可以延迟（需要把 PyQt5.QtWebEngineWidgets 加入列表）。
+"""
+import os
+import sys
+import hashlib
+
+import packager_core
+import import_graph
+
+
+# 导入耗时不低于该值的模块才建议延迟导入（秒）
+DEFAULT_THRESHOLD = 0.02
+
+# 运行打包后的程序时设置该环境变量为 0 可关闭延迟导入，用于对比启动耗时
+DISABLE_ENV = "PYI_LAZY_IMPORTS"
+
+LAZY_HOOK_TEMPLATE = '''\
+# 由 pyinstaller_tool 生成: 以下模块改为延迟导入，第一次访问模块属性时才真正导入；
+# 运行时设置环境变量 PYI_LAZY_IMPORTS=0 可关闭
+import os
+import sys
+
+if os.environ.get("PYI_LAZY_IMPORTS") != "0":
+    import importlib.util
+
+    _LAZY_MODULES = frozenset(%r)
+
+    class _LazyImportFinder:
+        _finding = set()
+
+        @classmethod
+        def find_spec(cls, fullname, path=None, target=None):
+            if fullname not in _LAZY_MODULES or fullname in cls._finding:
+                return None
+            # 由其他查找器定位模块，再用 LazyLoader 包装加载器
+            cls._finding.add(fullname)
+            try:
+                spec = importlib.util.find_spec(fullname)
+            finally:
+                cls._finding.discard(fullname)
+            if spec is not None and spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                spec.loader = importlib.util.LazyLoader(spec.loader)
+            return spec
+
+    sys.meta_path.insert(0, _LazyImportFinder)
+'''
+
+
+def hook_path(modules):
+    """生成延迟导入 runtime hook 文件，返回路径；文件名包含内容哈希，模块列表不变时文件不变"""
+    content = LAZY_HOOK_TEMPLATE % (sorted(set(modules)),)
+    digest = hashlib.sha1(content.encode("utf-8")).hexdigest()[:12]
+    hook_dir = os.path.join(packager_core.get_app_data_dir(), "rthooks")
+    os.makedirs(hook_dir, exist_ok=True)
+    path = os.path.join(hook_dir, f"pyi_rth_lazy_{digest}.py")
+    if not os.path.exists(path):
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(temp_path, path)
+    return path
+
+
+def runtime_hooks(config):
+    """配置需要的 runtime hook 路径列表"""
+    modules = config.get("lazy_imports") or []
+    return [hook_path(modules)] if modules else []
+
+
+def pyinstaller_args(config):
+    args = []
+    for path in runtime_hooks(config):
+        args.extend(["--runtime-hook", path])
+    return args
+
+
+def _local_names(config):
+    """程序自身的模块名，不建议延迟导入"""
+    script_path = os.path.abspath(config["script_path"].strip())
+    if not os.path.isfile(script_path):
+        return set()
+    root = os.path.dirname(script_path)
+    names = {import_graph.module_name_for(path, root) for path in import_graph.local_modules(script_path)}
+    import_graph.save_cache()
+    return {name for name in names if name} | {name.split(".")[0] for name in names if name}
+
+
+def suggest(profile, config, threshold=DEFAULT_THRESHOLD):
+    """根据启动耗时分析结果建议延迟导入的模块，返回 [(模块, 累计导入秒数)]，按耗时从高到低
+
+    只考虑程序代码直接导入的（最外层的）第三方模块，排除标准库和程序自身的模块。
+    """
+    stdlib = set(getattr(sys, "stdlib_module_names", ()))
+    local = _local_names(config)
+    totals = {}
+    for name, _, cumulative, depth in profile["imports"]:
+        top = name.split(".")[0]
+        if depth != 0 or top in stdlib or name in local or top.startswith(("_", "pyimod", "pyi_")):
+            continue
+        totals[name] = totals.get(name, 0.0) + cumulative
+    return sorted(((name, seconds) for name, seconds in totals.items() if seconds >= threshold),
+                  key=lambda item: -item[1])
+
+
+def format_suggestions(rows, current=()):
+    """建议列表的文本，current 中已延迟导入的模块加标记"""
+    if not rows:
+        return "没有发现适合延迟导入的模块"
+    lines = ["建议延迟导入的模块（启动时直接导入的第三方模块，累计导入耗时）:"]
+    for name, seconds in rows:
+        mark = "  [已延迟]" if name in current else ""
+        lines.append(f"  {name:<40}{seconds * 1000:9.1f}ms{mark}")
+    lines.append("启动后立即使用的模块延迟导入没有效果；导入时有副作用（注册插件、设置后端等）的模块请谨慎选择")
+    return "\n".join(lines)
+
+
+def disabled_env():
+    """关闭延迟导入的运行环境"""
+    env = dict(os.environ)
+    env[DISABLE_ENV] = "0"
+    return env
@@ -0,0 +1,86 @@
+import os
+import re
+import time
+import threading
+
+import packager_core
+
+
+# 保留的日志文件数量
+MAX_LOG_FILES = 30
+
+
+def get_log_dir():
+    log_dir = os.path.join(packager_core.get_app_data_dir(), "logs")
+    os.makedirs(log_dir, exist_ok=True)
+    return log_dir
+
+
+def prune_logs(log_dir, keep=MAX_LOG_FILES):
+    """删除最旧的日志文件，只保留最近的 keep 个"""
+    try:
+        files = [os.path.join(log_dir, name) for name in os.listdir(log_dir) if name.endswith(".log")]
+        files.sort(key=os.path.getmtime, reverse=True)
+        for path in files[keep:]:
+            os.remove(path)
+    except OSError:
+        pass
+
+
+class LogSpool:
+    """日志缓冲与落盘
+
+    完整日志写入磁盘文件；界面只定时取出新增的文本显示，不必每次输出都刷新控件。
+    """
+
+    def __init__(self, name="session", log_dir=None):
+        log_dir = log_dir or get_log_dir()
+        prune_logs(log_dir, MAX_LOG_FILES - 1)
+        safe_name = re.sub(r"[^\w.-]", "_", name) or "session"
+        self.path = os.path.join(log_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_name}.log")
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._pending = []
+        self._lock = threading.Lock()
+        self.total_chars = 0
+
+    def write(self, text):
+        """追加日志文本（不会自动添加换行）"""
+        if not text:
+            return
+        with self._lock:
+            self._pending.append(text)
+            self.total_chars += len(text)
+            if self._file:
+                self._file.write(text)
+
+    def take_pending(self):
+        """取出上次调用以来新增的文本"""
+        with self._lock:
+            text = "".join(self._pending)
+            self._pending = []
+            return text
+
+    def flush(self):
+        with self._lock:
+            if self._file:
+                self._file.flush()
+
+    def search(self, pattern, regex=False, case_sensitive=False, limit=5000):
+        """在完整日志中搜索，返回 [(行号, 行内容)]"""
+        self.flush()
+        flags = 0 if case_sensitive else re.IGNORECASE
+        matcher = re.compile(pattern if regex else re.escape(pattern), flags)
+        results = []
+        with open(self.path, 'r', encoding='utf-8', errors='replace') as f:
+            for line_no, line in enumerate(f, 1):
+                if matcher.search(line):
+                    results.append((line_no, line.rstrip("\n")))
+                    if len(results) >= limit:
+                        break
+        return results
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,231 @@
+"""单文件启动缓存
+
+PyInstaller 的单文件产物每次启动都把整个包解压到新的临时目录。启用后先按目录模式打包到暂存目录，
+再生成一个单文件: 开头是 POSIX shell 启动脚本，后面附加产物目录的 tar.gz。第一次启动时解压到
+按内容哈希区分的用户缓存目录，以后启动只检查标记文件和主程序大小，直接运行缓存中的程序。
+
+PyInstaller 的 runtime hook 在引导程序解压完成之后才执行，无法跳过解压，因此由外层启动脚本处理。
+"""
+import os
+import sys
+import gzip
+import time
+import hashlib
+import tarfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import packager_core
+import proc_utils
+
+
+# 同一程序的其他版本在缓存中最多占用的空间，运行时可用环境变量 PYI_ONEFILE_CACHE_LIMIT_MB 覆盖
+DEFAULT_LIMIT_MB = 1024
+
+# 按块并行压缩，每块是一个独立的 gzip 成员（多个成员拼接后仍是合法的 gzip 文件）
+CHUNK_SIZE = 4 * 1024 * 1024
+
+COMPRESS_LEVEL = 6
+
+KEY_LENGTH = 16
+
+STUB_TEMPLATE = r"""#!/bin/sh
+# pyinstaller_tool 单文件启动缓存: 第一次运行时把附加在脚本后面的程序解压到缓存目录，以后直接运行缓存中的程序
+NAME='@NAME@'
+KEY='@KEY@'
+PAYLOAD_SIZE=@PAYLOAD_SIZE@
+EXE_SIZE=@EXE_SIZE@
+ROOT="${PYI_ONEFILE_CACHE:-${XDG_CACHE_HOME:-$HOME/.cache}/pyinstaller_tool/onefile}"
+LIMIT_KB=$(( ${PYI_ONEFILE_CACHE_LIMIT_MB:-@LIMIT_MB@} * 1024 ))
+DIR="$ROOT/$NAME-$KEY"
+SELF="$0"
+case "$SELF" in */*) ;; *) SELF=$(command -v -- "$SELF") ;; esac
+
+valid() {
+    [ -f "$DIR/.complete" ] || return 1
+    size=$(wc -c < "$DIR/$NAME" 2>/dev/null) || return 1
+    [ $size -eq $EXE_SIZE ]
+}
+
+# 按最近使用时间保留同一程序的其他版本，总大小超过上限时删除较旧的版本
+prune() {
+    total=0
+    ls -dt "$ROOT/$NAME"-@KEY_GLOB@ 2>/dev/null | while IFS= read -r old; do
+        [ "$old" = "$DIR" ] && continue
+        size=$(du -sk "$old" 2>/dev/null | cut -f1)
+        total=$((total + ${size:-0}))
+        [ $total -gt $LIMIT_KB ] && rm -rf "$old"
+    done
+}
+
+if ! valid; then
+    mkdir -p "$ROOT" || exit 1
+    TMP="$ROOT/.tmp-$NAME-$KEY-$$"
+    rm -rf "$TMP"
+    mkdir "$TMP" || exit 1
+    if ! tail -c "$PAYLOAD_SIZE" "$SELF" | tar -xzf - -C "$TMP"; then
+        rm -rf "$TMP"
+        echo "$NAME: 解压到 $ROOT 失败" >&2
+        exit 1
+    fi
+    echo "$KEY" > "$TMP/.complete"
+    # 同时启动的其他进程可能已经解压完成
+    if valid; then
+        rm -rf "$TMP"
+    else
+        rm -rf "$DIR"
+        mv "$TMP" "$DIR" || { rm -rf "$TMP"; exit 1; }
+    fi
+    prune
+fi
+# 清理按目录的修改时间排序，复用时同时更新目录本身的时间
+touch "$DIR" "$DIR/.complete" 2>/dev/null
+exec "$DIR/$NAME" "$@"
+exit 1
+"""
+
+
+def is_supported():
+    """启动脚本需要 /bin/sh 和 tar"""
+    return sys.platform != "win32"
+
+
+def enabled(config):
+    return bool(config.get("onefile_cache")) and config.get("onefile", True) and is_supported()
+
+
+def stage_dir(config):
+    """目录模式产物的暂存目录，按配置区分"""
+    return os.path.join(packager_core.get_app_data_dir(), "onefile_stage", packager_core.config_hash(config)[:16])
+
+
+def pyinstaller_config(config):
+    """交给PyInstaller的配置: 启用时改为目录模式，输出到暂存目录"""
+    if not enabled(config):
+        return config
+    return dict(config, onefile=False, output_path=stage_dir(config))
+
+
+class _GzipWriter:
+    """把写入的数据按块在线程池中压缩为独立的 gzip 成员，按顺序写出并计算 sha256"""
+
+    def __init__(self, f, level=COMPRESS_LEVEL, workers=None):
+        self.f = f
+        self.level = level
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        self.pending = deque()
+        self.buffer = bytearray()
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.buffer.extend(data)
+        if len(self.buffer) >= CHUNK_SIZE:
+            self._submit()
+        return len(data)
+
+    def _submit(self):
+        self.pending.append(self.executor.submit(gzip.compress, bytes(self.buffer), self.level, mtime=0))
+        self.buffer.clear()
+        # 限制内存中待写出的块数
+        while len(self.pending) > self.workers * 2:
+            self._write_next()
+
+    def _write_next(self):
+        data = self.pending.popleft().result()
+        self.f.write(data)
+        self.digest.update(data)
+        self.size += len(data)
+
+    def close(self):
+        if self.buffer:
+            self._submit()
+        while self.pending:
+            self._write_next()
+        self.executor.shutdown()
+
+
+def _reset_info(info):
+    # 固定时间和属主，内容相同的产物生成相同的压缩包和缓存键
+    info.mtime = 0
+    info.uid = info.gid = 0
+    info.uname = info.gname = ""
+    return info
+
+
+def write_payload(bundle, output, workers=None):
+    """把目录模式产物写成 tar.gz（归档内路径相对产物目录），返回 (大小, sha256)"""
+    members = []
+    for root, dirs, names in os.walk(bundle):
+        for name in list(dirs):
+            if os.path.islink(os.path.join(root, name)):
+                dirs.remove(name)
+                names.append(name)
+        for name in names:
+            full_path = os.path.join(root, name)
+            members.append((os.path.relpath(full_path, bundle).replace(os.sep, "/"), full_path))
+    members.sort()
+    writer = _GzipWriter(output, workers=workers)
+    with tarfile.open(fileobj=writer, mode="w|", format=tarfile.PAX_FORMAT) as tar:
+        for arcname, full_path in members:
+            tar.add(full_path, arcname=arcname, recursive=False, filter=_reset_info)
+    writer.close()
+    return writer.size, writer.digest.hexdigest()
+
+
+def pack(bundle, output, name, limit_mb=DEFAULT_LIMIT_MB, workers=None):
+    """把目录模式产物打成带启动脚本的单文件，返回 {"path", "key", "size", "bundle_size", "duration"}"""
+    start = time.time()
+    executable = os.path.join(bundle, name)
+    if not os.path.isfile(executable):
+        raise FileNotFoundError(executable)
+    # PyInstaller 输出到暂存目录，输出目录可能还不存在
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    payload_path = f"{output}.{os.getpid()}.payload"
+    temp_path = f"{output}.{os.getpid()}.tmp"
+    try:
+        with open(payload_path, 'wb') as f:
+            payload_size, digest = write_payload(bundle, f, workers)
+        key = digest[:KEY_LENGTH]
+        stub = STUB_TEMPLATE
+        for placeholder, value in (("@NAME@", name), ("@KEY@", key), ("@PAYLOAD_SIZE@", str(payload_size)),
+                                   ("@EXE_SIZE@", str(os.path.getsize(executable))),
+                                   ("@LIMIT_MB@", str(limit_mb)), ("@KEY_GLOB@", "?" * KEY_LENGTH)):
+            stub = stub.replace(placeholder, value)
+        with open(temp_path, 'wb') as out, open(payload_path, 'rb') as payload:
+            out.write(stub.encode("utf-8"))
+            while True:
+                chunk = payload.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                out.write(chunk)
+        os.chmod(temp_path, 0o755)
+        os.replace(temp_path, output)
+    finally:
+        for path in (payload_path, temp_path):
+            if os.path.exists(path):
+                os.remove(path)
+    return {"path": output, "key": key, "size": os.path.getsize(output),
+            "bundle_size": packager_core.path_size(bundle), "duration": time.time() - start}
+
+
+def after_build(config, on_message=None):
+    """打包成功后把暂存目录中的产物打成带启动缓存的单文件"""
+    config = packager_core.normalize_config(config)
+    if not enabled(config):
+        return None
+    name = packager_core.artifact_name(config)
+    bundle = os.path.join(stage_dir(config), name)
+    output = packager_core.artifact_path(config)
+    try:
+        result = pack(bundle, output, name)
+    except OSError as e:
+        if on_message:
+            on_message(f"生成单文件启动缓存产物失败: {str(e)}")
+        return None
+    if on_message:
+        on_message(f"已生成 {output} ({proc_utils.format_size(result['size'])}，解压后 "
+                   f"{proc_utils.format_size(result['bundle_size'])}，耗时 {result['duration']:.1f}s)；"
+                   f"第一次运行时解压到用户缓存目录 pyinstaller_tool/onefile/{name}-{result['key']}，以后直接启动")
+    return result
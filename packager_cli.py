@@ -0,0 +1,731 @@
+import os
+import sys
+import argparse
+import subprocess
+
+import packager_core
+
+
+def configure_scheduler(args):
+    """按命令行参数设置批量打包的内存和CPU预算"""
+    import build_scheduler
+
+    build_scheduler.configure(args.memory_budget * 1024 * 1024 if args.memory_budget else None, args.cpu_budget)
+    print(build_scheduler.format_status(build_scheduler.get_scheduler().status()), flush=True)
+
+
+def cmd_build(args):
+    """build 子命令: 按配置文件打包"""
+    import build_queue
+    import build_cache
+    import build_history
+    import workpath_pool
+
+    configs = []
+    for config_path in args.config:
+        try:
+            config = packager_core.load_config_file(config_path)
+        except packager_core.ConfigError as e:
+            print(f"错误: {e}", file=sys.stderr)
+            return 2
+        if args.no_cache:
+            config["build_cache"] = False
+        if args.remote:
+            config["remote_build"] = True
+        configs.append((config_path, config))
+
+    # 单个配置且未指定并发数时，与图形界面完全一致地直接运行
+    if len(configs) == 1 and args.jobs is None:
+        config_path, config = configs[0]
+        try:
+            cmd = packager_core.build_process_command(config)
+        except packager_core.ConfigError as e:
+            print(f"错误: {e}", file=sys.stderr)
+            return 2
+        if config["use_spec"]:
+            import spec_builder
+            print(spec_builder.change_message(cmd[-1]), flush=True)
+        if packager_core.use_workpath_pool(config):
+            cmd = build_queue.insert_options(cmd, ["--workpath", workpath_pool.workpath_for(config)])
+        if args.dry_run:
+            print(f"执行命令: {' '.join(cmd)}")
+            return 0
+
+        fingerprint = None
+        if config["build_cache"]:
+            action, cmd, fingerprint, message = build_cache.plan_build(config, cmd)
+            print(message, flush=True)
+            if action == build_cache.SKIP:
+                return 0
+
+        os.makedirs(packager_core.resolve_output_dir(config), exist_ok=True)
+        if packager_core.use_workpath_pool(config):
+            workpath, hit = workpath_pool.acquire(config)
+            cmd = build_queue.replace_option(cmd, "--workpath", workpath)
+            print(f"{'使用已有' if hit else '新建'}工作目录: {workpath}", flush=True)
+        print(f"执行命令: {' '.join(cmd)}", flush=True)
+        run = build_history.BuildRun(config, cmd)
+        run.start()
+        interrupted = False
+        try:
+            process = subprocess.Popen(build_queue.launch_command(config, cmd),
+                                       cwd=os.path.dirname(config["script_path"]) or None,
+                                       stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            run.process_started(process.pid)
+            for raw in process.stdout:
+                line = raw.decode("utf-8", errors="ignore")
+                sys.stdout.write(line)
+                sys.stdout.flush()
+                run.feed_line(line)
+            exit_code = process.wait()
+        except OSError as e:
+            print(f"启动进程失败: {str(e)}", file=sys.stderr)
+            return 1
+        except KeyboardInterrupt:
+            interrupted = True
+            process.terminate()
+            process.wait()
+            return 130
+        finally:
+            if packager_core.use_workpath_pool(config):
+                workpath_pool.release(workpath, discard=interrupted)
+        run.finish(exit_code)
+        if exit_code == 0:
+            print(run.tracker.summary())
+            try:
+                build_queue.post_build(config, print)
+            except OSError as e:
+                print(f"打包后处理失败: {str(e)}", file=sys.stderr)
+                exit_code = 1
+            else:
+                if fingerprint:
+                    build_cache.record_build(config, fingerprint)
+        for message in build_history.find_regressions(packager_core.config_hash(config)):
+            print(message)
+        return exit_code
+
+    def on_output(job, line):
+        print(f"[{job.name}] {line}", flush=True)
+
+    def on_state(job):
+        if job.state in (build_queue.PENDING, build_queue.RUNNING):
+            return
+        duration = "" if job.duration is None else f" {job.duration:.1f}s"
+        print(f"[{job.name}] {job.state_label}{duration} 退出码: {job.exit_code} {job.error}".rstrip(), flush=True)
+
+    jobs = args.jobs
+    if jobs is None and any(config["remote_build"] for _, config in configs):
+        # 远程打包的并发数默认为所有代理的槽位总数
+        import build_agent
+        jobs = build_agent.total_slots() or None
+    configure_scheduler(args)
+    queue = build_queue.BuildQueue(max_workers=jobs, on_output=on_output, on_state=on_state)
+    for config_path, config in configs:
+        queue.add_config(config, os.path.splitext(os.path.basename(config_path))[0], config_path)
+
+    if args.dry_run:
+        for job in queue.jobs:
+            queue.prepare_job(job)
+            print(f"[{job.name}] 执行命令: {' '.join(job.command)}")
+        return 0
+
+    try:
+        ok = queue.run()
+    except KeyboardInterrupt:
+        queue.cancel()
+        queue.wait()
+        return 130
+    return 0 if ok else 1
+
+
+def cmd_history(args):
+    """history 子命令: 查看打包历史和耗时趋势"""
+    import build_history
+
+    config_hash = None
+    if args.config:
+        try:
+            config_hash = packager_core.config_hash(packager_core.load_config_file(args.config))
+        except packager_core.ConfigError as e:
+            print(f"错误: {e}", file=sys.stderr)
+            return 2
+
+    builds = build_history.recent_builds(config_hash, args.limit)
+    if not builds:
+        print("没有打包记录")
+        return 0
+
+    headers = ["时间", "名称", "耗时", "退出码", "峰值内存", "产物大小", "最慢阶段"]
+    rows = [build_history.format_build(build) for build in builds]
+    widths = [max(len(str(row[i])) for row in rows + [headers]) for i in range(len(headers))]
+    for row in [headers] + rows:
+        print("  ".join(str(value).ljust(width) for value, width in zip(row, widths)).rstrip())
+
+    # 按配置分组给出退化提示
+    for config_hash in dict.fromkeys(build["config_hash"] for build in builds):
+        messages = build_history.find_regressions(config_hash)
+        if messages:
+            name = next(build["name"] for build in builds if build["config_hash"] == config_hash)
+            print(f"\n[{name}]")
+            for message in messages:
+                print(f"  {message}")
+    return 0
+
+
+def cmd_analyze(args):
+    """analyze 子命令: 静态分析依赖，给出隐藏依赖和排除模块建议"""
+    import import_analyzer
+
+    try:
+        config = packager_core.load_config_file(args.config)
+        if not os.path.isfile(config["script_path"]):
+            raise packager_core.ConfigError("Python脚本不存在")
+    except packager_core.ConfigError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 2
+
+    result = import_analyzer.analyze(config)
+    print(import_analyzer.format_result(result))
+
+    if args.apply and (result["hidden"] or result["excludes"]):
+        config["hidden_imports"].extend(name for name, _ in result["hidden"])
+        config["exclude_modules"].extend(name for name, _ in result["excludes"])
+        packager_core.save_config_file(config, args.config)
+        print(f"已写入配置文件: {args.config}")
+    return 0
+
+
+def cmd_inspect(args):
+    """inspect 子命令: 分析打包产物的组成和启动耗时"""
+    import bundle_analyzer
+
+    try:
+        config = packager_core.load_config_file(args.config)
+    except packager_core.ConfigError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 2
+
+    workpath = args.workpath or packager_core.resolve_workpath(config)
+    try:
+        result = bundle_analyzer.analyze_bundle(workpath)
+    except (OSError, ValueError, SyntaxError) as e:
+        print(f"错误: 无法读取打包中间文件，请先完成一次打包: {e}", file=sys.stderr)
+        return 1
+    print(bundle_analyzer.format_bundle(result, args.top))
+
+    if args.startup:
+        try:
+            startup = bundle_analyzer.profile_startup(packager_core.executable_path(config), timeout=args.timeout)
+        except (OSError, RuntimeError, ValueError) as e:
+            print(f"错误: {e}", file=sys.stderr)
+            return 1
+        print()
+        print(bundle_analyzer.format_startup(startup, args.top))
+    return 0
+
+
+def cmd_benchmark(args):
+    """benchmark 子命令: 对比单文件/目录模式等打包方式的启动耗时和体积"""
+    import startup_benchmark
+
+    try:
+        config = packager_core.load_config_file(args.config)
+        packager_core.validate_config(config)
+    except packager_core.ConfigError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 2
+
+    try:
+        results = startup_benchmark.run_benchmark(
+            config, runs=args.runs, cold_runs=args.cold_runs, args=args.args, upx=args.upx,
+            optimize_levels=args.optimize, jobs=args.jobs, timeout=args.timeout,
+            on_output=lambda text: print(text, flush=True), lazy=args.lazy)
+    except KeyboardInterrupt:
+        return 130
+    print()
+    print(startup_benchmark.format_results(results))
+    return 0 if all(not result["errors"] for _, result in results) else 1
+
+
+def cmd_lazy(args):
+    """lazy 子命令: 根据启动耗时分析建议延迟导入的模块，写入配置"""
+    import shlex
+    import bundle_analyzer
+    import lazy_imports
+
+    try:
+        config = packager_core.load_config_file(args.config)
+    except packager_core.ConfigError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 2
+
+    if args.modules is not None:
+        modules = args.modules
+    else:
+        if not config["importtime_hook"]:
+            print("错误: 需要在配置中启用 \"importtime_hook\": true（界面中的\"启动耗时分析\"）并打包", file=sys.stderr)
+            return 2
+        # 关闭已有的延迟导入，统计所有模块的实际导入耗时
+        try:
+            profile = bundle_analyzer.profile_startup(
+                packager_core.executable_path(config), shlex.split(args.args, posix=sys.platform != "win32"),
+                timeout=args.timeout, extra_env={lazy_imports.DISABLE_ENV: "0"})
+        except (OSError, RuntimeError, ValueError) as e:
+            print(f"错误: {e}", file=sys.stderr)
+            return 1
+        rows = lazy_imports.suggest(profile, config, args.threshold / 1000)
+        print(lazy_imports.format_suggestions(rows, config["lazy_imports"]))
+        modules = [name for name, _ in rows]
+
+    if args.apply:
+        config["lazy_imports"] = modules
+        packager_core.save_config_file(config, args.config)
+        print(f"已写入配置文件: {args.config}，延迟导入: {', '.join(modules) or '无'}（重新打包后生效）")
+    return 0
+
+
+def cmd_spec(args):
+    """spec 子命令: 生成spec文件，多个配置时生成共用依赖分析的多入口spec"""
+    import spec_builder
+    import build_history
+    import build_queue
+
+    try:
+        configs = [packager_core.load_config_file(config_path) for config_path in args.config]
+        if args.output:
+            spec_builder.write_spec(configs, args.name, os.path.abspath(args.output))
+            print(f"已生成spec文件: {args.output}")
+            return 0
+        cmd = spec_builder.build_command(configs, args.name)
+        cmd = packager_core.build_process_command(configs[0], cmd)
+    except packager_core.ConfigError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 2
+
+    print(spec_builder.change_message(cmd[-1]))
+    if not args.build:
+        return 0
+
+    print(f"执行命令: {' '.join(cmd)}", flush=True)
+    os.makedirs(packager_core.resolve_output_dir(configs[0]), exist_ok=True)
+    run = build_history.BuildRun(configs[0], cmd, args.name or os.path.splitext(os.path.basename(cmd[-1]))[0])
+    run.start()
+    try:
+        # 多入口spec只在本机打包（远程打包发送的是单个配置的源码快照）；资源限制等与普通打包相同
+        launch_config = dict(configs[0], remote_build=False)
+        process = subprocess.Popen(build_queue.launch_command(launch_config, cmd),
+                                   cwd=os.path.dirname(configs[0]["script_path"]) or None,
+                                   stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        run.process_started(process.pid)
+        for raw in process.stdout:
+            line = raw.decode("utf-8", errors="ignore")
+            sys.stdout.write(line)
+            sys.stdout.flush()
+            run.feed_line(line)
+        exit_code = process.wait()
+    except OSError as e:
+        print(f"启动进程失败: {str(e)}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        process.terminate()
+        process.wait()
+        return 130
+    run.finish(exit_code)
+    if exit_code == 0:
+        print(run.tracker.summary())
+    return exit_code
+
+
+def cmd_interpreters(args):
+    """interpreters 子命令: 列出自动发现的Python解释器"""
+    import interpreters
+
+    found = interpreters.discover(refresh=args.refresh)
+    if not found:
+        print("没有找到Python解释器")
+    for item in found:
+        print(interpreters.format_interpreter(item))
+    return 0
+
+
+def cmd_matrix(args):
+    """matrix 子命令: 按 解释器 × 窗口模式 × 单文件/目录 并发打包"""
+    import build_matrix
+    import build_queue
+    import interpreters
+
+    try:
+        config = packager_core.load_config_file(args.config)
+    except packager_core.ConfigError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 2
+
+    pythons = list(args.python or [])
+    if args.all_pythons:
+        pythons.extend(item["path"] for item in interpreters.discover() if item.get("pyinstaller"))
+    window_modes = [build_matrix.WINDOW_LABELS.index(mode) for mode in args.window] if args.window else None
+    layouts = [layout == "onefile" for layout in args.layout] if args.layout else None
+
+    def on_state(job):
+        if job.state in (build_queue.PENDING, build_queue.RUNNING):
+            return
+        duration = "" if job.duration is None else f" {job.duration:.1f}s"
+        print(f"[{job.name}] {job.state_label}{duration} {job.error}".rstrip(), flush=True)
+
+    queue = build_matrix.create_queue(config, pythons, window_modes, layouts, args.jobs, on_state=on_state)
+    if args.dry_run:
+        for job in queue.jobs:
+            queue.prepare_job(job)
+            print(f"[{job.name}] 执行命令: {' '.join(job.command)}")
+        return 0
+
+    print(f"共 {len(queue.jobs)} 个任务", flush=True)
+    configure_scheduler(args)
+    try:
+        ok = queue.run()
+    except KeyboardInterrupt:
+        queue.cancel()
+        queue.wait()
+        return 130
+    rows = build_matrix.report(queue)
+    print()
+    print(build_matrix.format_report(rows))
+    if args.report:
+        build_matrix.save_report(rows, args.report)
+        print(f"报告已保存: {args.report}")
+    return 0 if ok else 1
+
+
+def cmd_artifacts(args):
+    """artifacts 子命令: 查看、回滚产物版本，清理对象库"""
+    import artifact_store
+    import proc_utils
+
+    if args.gc:
+        print(f"释放了 {proc_utils.format_size(artifact_store.collect_garbage())}")
+        if not args.config:
+            return 0
+    if not args.config:
+        stats = artifact_store.stats()
+        print(f"对象库共 {stats['objects']} 个文件，占用 {proc_utils.format_size(stats['stored'])}，"
+              f"所有版本合计 {proc_utils.format_size(stats['logical'])}")
+        return 0
+    try:
+        config = packager_core.load_config_file(args.config)
+        if args.restore:
+            version = artifact_store.restore(config, args.restore)
+            print(f"已回滚到版本 {version['id']}: {packager_core.artifact_path(config)}")
+            return 0
+    except packager_core.ConfigError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 2
+    versions = artifact_store.list_versions(config)
+    if not versions:
+        print("没有产物版本记录（需要在配置中启用 \"artifact_store\": true）")
+    for version in versions:
+        print(artifact_store.format_version(version))
+    return 0
+
+
+def cmd_worker(args):
+    """worker 子命令: 查看或停止常驻打包进程"""
+    import time
+    import pyi_worker
+
+    if not pyi_worker.is_supported():
+        print("当前系统不支持常驻打包进程")
+        return 1
+    workers = pyi_worker.list_workers()
+    if not workers:
+        print("没有运行中的常驻打包进程")
+        return 0
+    for info in workers:
+        if args.action == "stop":
+            pyi_worker.stop_worker(info)
+            print(f"已停止: {info['python']} (PID {info['pid']})")
+        else:
+            uptime = (time.time() - info["started_at"]) / 60
+            print(f"PID {info['pid']}  PyInstaller {info['pyinstaller']}  已运行 {uptime:.0f} 分钟  {info['python']}")
+    return 0
+
+
+def cmd_bindep(args):
+    """bindep 子命令: 查看或清空二进制依赖分析缓存"""
+    import bindep_cache
+    import proc_utils
+
+    if args.action == "clear":
+        print(f"已清空二进制依赖分析缓存，释放了 {proc_utils.format_size(bindep_cache.clear_cache())}")
+        return 0
+    stats = bindep_cache.cache_stats()
+    print(f"二进制依赖分析缓存: 依赖分析 {stats['imports']} 项，文件类型判断 {stats['classify']} 项，"
+          f"占用 {proc_utils.format_size(stats['size'])}")
+    print(f"缓存目录: {bindep_cache.get_cache_dir()}")
+    return 0
+
+
+def cmd_watch(args):
+    """watch 子命令: 监视源码和数据文件，修改后自动增量打包"""
+    import time
+    import threading
+    import build_queue
+    import file_watcher
+
+    try:
+        config = packager_core.load_config_file(args.config)
+        packager_core.validate_config(config)
+    except packager_core.ConfigError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 2
+    name = os.path.splitext(os.path.basename(args.config))[0]
+    state = {"queue": None}
+    lock = threading.Lock()
+
+    def on_output(job, line):
+        print(line, flush=True)
+
+    def on_state(job):
+        if job.state in (build_queue.PENDING, build_queue.RUNNING):
+            return
+        duration = "" if job.duration is None else f" {job.duration:.1f}s"
+        print(f"[{time.strftime('%H:%M:%S')}] {job.state_label}{duration} {job.error}".rstrip(), flush=True)
+
+    def rebuild():
+        # 导入关系可能已经变化，每次打包前更新监视范围
+        files, directories = watcher.watch_config(config)
+        queue = build_queue.BuildQueue(max_workers=1, on_output=on_output, on_state=on_state,
+                                       discard_cancelled=False)
+        queue.add_config(config, name, args.config)
+        state["queue"] = queue
+        queue.start()
+        return files, directories
+
+    def on_change(paths):
+        with lock:
+            shown = ", ".join(os.path.relpath(path) for path in paths[:3])
+            more = f" 等 {len(paths)} 个文件" if len(paths) > 3 else ""
+            print(f"\n[{time.strftime('%H:%M:%S')}] 检测到修改: {shown}{more}", flush=True)
+            queue = state["queue"]
+            if queue and queue.is_running():
+                print("取消当前打包", flush=True)
+                queue.cancel()
+                queue.wait()
+            rebuild()
+
+    watcher = file_watcher.Watcher(on_change, debounce=args.debounce, polling=args.poll)
+    with lock:
+        files, directories = rebuild()
+    print(f"监视 {len(files)} 个文件和 {len(directories)} 个目录（{watcher.backend_name}），按 Ctrl+C 退出",
+          flush=True)
+    watcher.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        watcher.close()
+        with lock:
+            if state["queue"]:
+                state["queue"].cancel()
+                state["queue"].wait()
+    return 0
+
+
+def cmd_agent(args):
+    """agent 子命令: 运行构建代理，管理协调端的代理列表"""
+    import build_agent
+
+    if args.action == "serve":
+        configure_scheduler(args)
+        try:
+            build_agent.serve(args.host, args.port, args.token, args.jobs)
+        except KeyboardInterrupt:
+            pass
+        except OSError as e:
+            print(f"错误: 无法启动构建代理: {e}", file=sys.stderr)
+            return 1
+        return 0
+    if args.action == "run":
+        try:
+            config = packager_core.load_config_file(args.config)
+        except packager_core.ConfigError as e:
+            print(f"错误: {e}", file=sys.stderr)
+            return 2
+        return build_agent.run_remote(config)
+    if args.action == "add":
+        if not args.address or not args.token:
+            print("错误: 需要指定代理地址和 --token", file=sys.stderr)
+            return 2
+        address = build_agent.add_agent(args.address, args.token)
+        print(build_agent.format_status(build_agent.query_status({"address": address, "token": args.token})))
+        return 0
+    if args.action == "remove":
+        if not args.address or not build_agent.remove_agent(args.address):
+            print(f"错误: 没有找到代理 {args.address}", file=sys.stderr)
+            return 1
+        print(f"已移除: {args.address}")
+        return 0
+
+    statuses = build_agent.query_all()
+    if not statuses:
+        print("没有配置构建代理")
+        return 0
+    for status in statuses:
+        print(build_agent.format_status(status))
+    print(f"可用打包槽位: {build_agent.total_slots(statuses)}")
+    return 0
+
+
+def add_budget_arguments(parser):
+    parser.add_argument("--memory-budget", type=int, default=None, metavar="MB",
+                        help="同时打包的任务按历史峰值内存合计不超过该值，超出时排队；默认为物理内存的80%%")
+    parser.add_argument("--cpu-budget", type=int, default=None, metavar="N",
+                        help="本进程中同时打包的任务总数上限（所有队列合计），默认只受 --jobs 限制")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="pyinstaller_tool.py",
+        description="PyInstaller 打包工具（命令行模式），不带参数运行时启动图形界面",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    build_cmd = subparsers.add_parser("build", help="按配置文件打包")
+    build_cmd.add_argument("--config", action="append", required=True,
+                           help="配置文件路径（图形界面导出的JSON），可指定多次")
+    build_cmd.add_argument("--jobs", type=int, default=None,
+                           help="并发打包进程数，默认为CPU核心数")
+    build_cmd.add_argument("--dry-run", action="store_true",
+                           help="只打印将要执行的命令")
+    build_cmd.add_argument("--remote", action="store_true",
+                           help="在构建代理上打包（并发数默认为所有代理的槽位总数）")
+    build_cmd.add_argument("--no-cache", action="store_true",
+                           help="不使用构建缓存，按配置完整打包")
+    add_budget_arguments(build_cmd)
+    build_cmd.set_defaults(func=cmd_build)
+
+    history_cmd = subparsers.add_parser("history", help="查看打包历史和耗时趋势")
+    history_cmd.add_argument("--config", help="只显示该配置文件的记录")
+    history_cmd.add_argument("--limit", type=int, default=20, help="显示的记录数")
+    history_cmd.set_defaults(func=cmd_history)
+
+    analyze_cmd = subparsers.add_parser("analyze", help="分析依赖，建议隐藏依赖和排除模块")
+    analyze_cmd.add_argument("--config", required=True, help="配置文件路径")
+    analyze_cmd.add_argument("--apply", action="store_true", help="把建议写入配置文件")
+    analyze_cmd.set_defaults(func=cmd_analyze)
+
+    spec_cmd = subparsers.add_parser("spec", help="生成spec文件并按spec打包，多个配置共用一次依赖分析")
+    spec_cmd.add_argument("--config", action="append", required=True,
+                          help="配置文件路径，指定多次时生成多入口spec（打包方式以第一个配置为准）")
+    spec_cmd.add_argument("--name", help="spec名称，目录模式下为输出目录名，默认为第一个脚本名")
+    spec_cmd.add_argument("--output", help="只把spec文件写到指定路径，不打包")
+    spec_cmd.add_argument("--build", action="store_true", help="生成后按spec打包")
+    spec_cmd.set_defaults(func=cmd_spec)
+
+    interpreters_cmd = subparsers.add_parser("interpreters", help="列出自动发现的Python解释器")
+    interpreters_cmd.add_argument("--refresh", action="store_true", help="重新扫描，不使用缓存")
+    interpreters_cmd.set_defaults(func=cmd_interpreters)
+
+    matrix_cmd = subparsers.add_parser("matrix", help="按多个解释器、窗口模式和打包方式并发打包")
+    matrix_cmd.add_argument("--config", required=True, help="配置文件路径")
+    matrix_cmd.add_argument("--python", action="append", help="解释器路径，可指定多次")
+    matrix_cmd.add_argument("--all-pythons", action="store_true", help="使用所有已安装PyInstaller的解释器")
+    matrix_cmd.add_argument("--window", nargs="+", choices=["windowed", "console", "default"],
+                            help="窗口模式，默认使用配置中的设置")
+    matrix_cmd.add_argument("--layout", nargs="+", choices=["onefile", "onedir"],
+                            help="打包方式，默认使用配置中的设置")
+    matrix_cmd.add_argument("--jobs", type=int, default=None, help="并发打包进程数")
+    matrix_cmd.add_argument("--report", help="把结果保存为JSON文件")
+    matrix_cmd.add_argument("--dry-run", action="store_true", help="只打印将要执行的命令")
+    add_budget_arguments(matrix_cmd)
+    matrix_cmd.set_defaults(func=cmd_matrix)
+
+    inspect_cmd = subparsers.add_parser("inspect", help="分析打包产物的组成和启动耗时")
+    inspect_cmd.add_argument("--config", required=True, help="配置文件路径")
+    inspect_cmd.add_argument("--workpath", help="PyInstaller工作目录，默认为脚本目录下的 build/<名称>")
+    inspect_cmd.add_argument("--startup", action="store_true",
+                             help="运行产物并统计导入耗时（需启用 importtime_hook 打包）")
+    inspect_cmd.add_argument("--timeout", type=int, default=15, help="启动耗时分析的最长运行秒数")
+    inspect_cmd.add_argument("--top", type=int, default=15, help="显示的条目数")
+    inspect_cmd.set_defaults(func=cmd_inspect)
+
+    benchmark_cmd = subparsers.add_parser("benchmark", help="对比单文件/目录模式的启动耗时和体积")
+    benchmark_cmd.add_argument("--config", required=True, help="配置文件路径")
+    benchmark_cmd.add_argument("--runs", type=int, default=10, help="每种方式的热启动次数")
+    benchmark_cmd.add_argument("--cold-runs", type=int, default=3, help="每种方式的冷启动次数")
+    benchmark_cmd.add_argument("--args", default="",
+                               help="启动程序时传入的测试参数，程序需要能自行退出，如 \"--version\"")
+    benchmark_cmd.add_argument("--upx", action="store_true", help="同时对比使用和不使用UPX压缩")
+    benchmark_cmd.add_argument("--optimize", type=int, nargs="+", choices=[0, 1, 2],
+                               help="同时对比的字节码优化级别 (--optimize)")
+    benchmark_cmd.add_argument("--jobs", type=int, default=None, help="并发打包进程数")
+    benchmark_cmd.add_argument("--timeout", type=int, default=30, help="单次启动的超时秒数")
+    benchmark_cmd.add_argument("--lazy", action="store_true",
+                               help="同时对比关闭延迟导入的启动耗时（配置中需要有 lazy_imports）")
+    benchmark_cmd.set_defaults(func=cmd_benchmark)
+
+    lazy_cmd = subparsers.add_parser("lazy", help="根据启动耗时分析建议延迟导入的模块")
+    lazy_cmd.add_argument("--config", required=True, help="配置文件路径")
+    lazy_cmd.add_argument("--threshold", type=float, default=20,
+                          help="累计导入耗时不低于该毫秒数的模块才建议延迟导入")
+    lazy_cmd.add_argument("--args", default="", help="启动程序时传入的参数")
+    lazy_cmd.add_argument("--timeout", type=int, default=15, help="运行程序的最长秒数")
+    lazy_cmd.add_argument("--modules", nargs="*", help="直接指定延迟导入的模块（不运行分析）")
+    lazy_cmd.add_argument("--apply", action="store_true", help="把建议（或 --modules 指定的模块）写入配置文件")
+    lazy_cmd.set_defaults(func=cmd_lazy)
+
+    artifacts_cmd = subparsers.add_parser("artifacts", help="查看、回滚产物版本，清理产物对象库")
+    artifacts_cmd.add_argument("--config", help="配置文件路径，列出该配置的产物版本")
+    artifacts_cmd.add_argument("--restore", metavar="VERSION", help="把产物回滚到指定版本")
+    artifacts_cmd.add_argument("--gc", action="store_true", help="删除没有被任何版本引用的文件")
+    artifacts_cmd.set_defaults(func=cmd_artifacts)
+
+    worker_cmd = subparsers.add_parser("worker", help="查看或停止常驻打包进程")
+    worker_cmd.add_argument("action", nargs="?", choices=["status", "stop"], default="status")
+    worker_cmd.set_defaults(func=cmd_worker)
+
+    bindep_cmd = subparsers.add_parser("bindep", help="查看或清空所有项目共享的二进制依赖分析缓存")
+    bindep_cmd.add_argument("action", nargs="?", choices=["status", "clear"], default="status")
+    bindep_cmd.set_defaults(func=cmd_bindep)
+
+    watch_cmd = subparsers.add_parser("watch", help="监视源码和数据文件，修改后自动增量打包")
+    watch_cmd.add_argument("--config", required=True, help="配置文件路径")
+    watch_cmd.add_argument("--debounce", type=float, default=0.5,
+                           help="连续修改时等待的安静时间（秒）")
+    watch_cmd.add_argument("--poll", action="store_true", help="使用轮询代替 inotify")
+    watch_cmd.set_defaults(func=cmd_watch)
+
+    agent_cmd = subparsers.add_parser("agent", help="分布式打包: 运行构建代理，管理代理列表")
+    agent_cmd.add_argument("action", nargs="?", choices=["list", "add", "remove", "serve", "run"], default="list",
+                           help="list: 查看代理状态; add/remove: 添加/移除代理; serve: 在本机运行代理; "
+                                "run: 按配置远程打包一次")
+    agent_cmd.add_argument("address", nargs="?", help="代理地址 HOST:PORT（add/remove）")
+    agent_cmd.add_argument("--token", help="代理的访问令牌（add/serve，serve 未指定时自动生成）")
+    agent_cmd.add_argument("--host", default="0.0.0.0", help="代理监听地址（serve）")
+    agent_cmd.add_argument("--port", type=int, default=8765, help="代理监听端口（serve）")
+    agent_cmd.add_argument("--jobs", type=int, default=None, help="代理同时打包的数量，默认为CPU核心数（serve）")
+    agent_cmd.add_argument("--config", help="配置文件路径（run）")
+    add_budget_arguments(agent_cmd)
+    agent_cmd.set_defaults(func=cmd_agent)
+
+    parser.commands = subparsers.choices
+    return parser
+
+
+def is_cli_invocation(argv):
+    """判断命令行参数是否为子命令调用（不需要图形界面）"""
+    if not argv:
+        return False
+    return argv[0] in build_parser().commands or argv[0] in ("-h", "--help")
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not getattr(args, "func", None):
+        parser.print_help()
+        return 2
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,411 @@
+import os
+import re
+import sys
+import json
+import stat
+import time
+import shutil
+import hashlib
+import argparse
+import threading
+
+
+# 窗口模式选项 (显示文本, PyInstaller参数)，顺序与配置中的 window_mode 索引一致
+WINDOW_MODES = [
+    ("无控制台窗口 (--windowed)", "--windowed"),
+    ("显示控制台窗口 (--console)", "--console"),
+    ("默认模式 (不添加参数)", ""),
+]
+
+# Python解释器可执行文件名: python、python3、python3.11、pythonw.exe 等
+PYTHON_NAME = re.compile(r"^python(\d+(\.\d+)?)?w?(\.exe)?$", re.IGNORECASE)
+
+# 配置文件默认值，与界面控件的初始状态保持一致
+DEFAULT_CONFIG = {
+    "python_path": "",
+    "script_path": "",
+    "output_path": "",
+    "icon_path": "",
+    "onefile": True,
+    "onefile_cache": False,
+    "window_mode": 0,
+    "clean": True,
+    "no_confirm": True,
+    "auto_save": True,
+    "build_cache": True,
+    "workpath_pool": True,
+    "use_spec": False,
+    "importtime_hook": False,
+    "pyi_worker": False,
+    "bindep_cache": False,
+    "artifact_store": False,
+    "artifact_versions": 5,
+    "archive_formats": [],
+    # None: 不指定，由PyInstaller决定（PATH 中有 upx 时压缩）；True/False: 由本工具管理UPX或明确关闭
+    "upx": None,
+    "upx_level": 10,
+    "upx_dir": "",
+    "extra_args": "",
+    "data_files": [],
+    "data_excludes": [],
+    "incremental_data": False,
+    "remote_build": False,
+    "build_nice": 0,
+    "low_io_priority": False,
+    "memory_limit_mb": 0,
+    "hidden_imports": [],
+    "exclude_modules": [],
+    "lazy_imports": [],
+}
+
+# 不影响打包产物的配置项，不参与配置哈希的计算
+NON_ARTIFACT_KEYS = {"auto_save", "clean", "build_cache", "workpath_pool", "use_spec", "pyi_worker",
+                     "bindep_cache", "artifact_store", "artifact_versions", "archive_formats",
+                     "upx_dir", "incremental_data", "remote_build", "build_nice", "low_io_priority",
+                     "memory_limit_mb"}
+
+
+class ConfigError(Exception):
+    """配置无效时抛出，消息可直接展示给用户"""
+    pass
+
+
+def get_app_data_dir():
+    """获取工具的数据目录（不依赖Qt）"""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    app_data_dir = os.path.join(base, "pyinstaller_tool")
+    os.makedirs(app_data_dir, exist_ok=True)
+    return app_data_dir
+
+
+def normalize_config(config):
+    """补全缺省配置项"""
+    result = dict(DEFAULT_CONFIG)
+    result.update(config or {})
+    result["data_files"] = list(result.get("data_files") or [])
+    result["data_excludes"] = list(result.get("data_excludes") or [])
+    result["hidden_imports"] = list(result.get("hidden_imports") or [])
+    result["exclude_modules"] = list(result.get("exclude_modules") or [])
+    result["lazy_imports"] = list(result.get("lazy_imports") or [])
+    return result
+
+
+def load_config_file(file_path):
+    """从JSON文件加载配置"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ConfigError(f"加载配置失败: {file_path}: {str(e)}")
+    if not isinstance(config, dict):
+        raise ConfigError(f"配置格式错误: {file_path}")
+    return normalize_config(config)
+
+
+def save_config_file(config, file_path):
+    """保存配置到JSON文件"""
+    with open(file_path, 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False, indent=4)
+
+
+def config_hash(config):
+    """计算配置的哈希值，只包含影响打包结果的配置项"""
+    config = normalize_config(config)
+    payload = {k: v for k, v in config.items() if k not in NON_ARTIFACT_KEYS}
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+def script_name(config):
+    """脚本名（不含扩展名），即PyInstaller默认的产物名"""
+    return os.path.splitext(os.path.basename(config.get("script_path", "").strip()))[0]
+
+
+def artifact_name(config):
+    """产物名: 其他参数中的 --name/-n（PyInstaller 用它命名产物目录和可执行文件），没有时为脚本名"""
+    parser = argparse.ArgumentParser(add_help=False, exit_on_error=False)
+    parser.add_argument("--name", "-n")
+    try:
+        options, _ = parser.parse_known_args(config.get("extra_args", "").split())
+    except argparse.ArgumentError:
+        return script_name(config)
+    return options.name or script_name(config)
+
+
+def resolve_output_dir(config):
+    """获取输出目录，未设置时默认为脚本目录下的 dist"""
+    output_dir = config.get("output_path", "").strip()
+    if not output_dir:
+        output_dir = os.path.join(os.path.dirname(config.get("script_path", "").strip()), "dist")
+    return output_dir
+
+
+def artifact_path(config):
+    """PyInstaller产物路径（单文件模式为可执行文件，目录模式为目录）"""
+    name = artifact_name(config)
+    output_dir = resolve_output_dir(config)
+    if config.get("onefile", True) and sys.platform == "win32":
+        name += ".exe"
+    return os.path.join(output_dir, name)
+
+
+def executable_path(config):
+    """打包后可执行文件的路径"""
+    name = artifact_name(config)
+    exe_name = name + ".exe" if sys.platform == "win32" else name
+    if config.get("onefile", True):
+        return os.path.join(resolve_output_dir(config), exe_name)
+    return os.path.join(resolve_output_dir(config), name, exe_name)
+
+
+def resolve_workpath(config, cmd=None):
+    """PyInstaller的工作目录（TOC、PYZ等中间文件所在位置）
+
+    PyInstaller 在 --workpath 下按spec文件名建立子目录: 直接打包时spec文件名取 --name，spec文件模式取脚本名。
+    """
+    if config.get("use_spec"):
+        import spec_builder
+        return os.path.join(spec_builder.spec_dir_for([config]), "build", script_name(config))
+    name = artifact_name(config)
+    if cmd and "--workpath" in cmd:
+        index = cmd.index("--workpath")
+        if index + 1 < len(cmd):
+            return os.path.join(cmd[index + 1], name)
+    if config.get("workpath_pool"):
+        import workpath_pool
+        return os.path.join(workpath_pool.workpath_for(config), name)
+    script_dir = os.path.dirname(os.path.abspath(config.get("script_path", "").strip()))
+    return os.path.join(script_dir, "build", name)
+
+
+def use_workpath_pool(config):
+    """是否使用共享工作目录缓存（spec文件模式使用spec目录下固定的工作目录，远程打包在代理上使用自己的缓存）"""
+    return bool(config.get("workpath_pool")) and not config.get("use_spec") and not config.get("remote_build")
+
+
+def path_size(path):
+    """文件或目录的总大小（字节），不存在时返回 None"""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    if not os.path.isdir(path):
+        return None
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def remove_tree(path):
+    """删除目录树（跨平台），只读文件会先去掉只读属性再删除"""
+    def on_error(func, failed_path, exc_info):
+        try:
+            os.chmod(failed_path, stat.S_IWRITE)
+            func(failed_path)
+        except OSError:
+            pass
+
+    if os.path.isdir(path):
+        shutil.rmtree(path, onerror=on_error)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def remove_tree_async(path):
+    """在后台删除目录树，立即返回
+
+    先把目录移到数据目录下的 trash 中（同一文件系统内的重命名很快），原路径马上可以重新使用；
+    无法移动时（跨文件系统）在原位置旁重命名，都失败时直接同步删除。
+    """
+    if not os.path.lexists(path):
+        return
+    trash_dir = os.path.join(get_app_data_dir(), "trash")
+    name = f"{os.getpid()}-{time.time_ns()}-{os.path.basename(path.rstrip(os.sep))}"
+    try:
+        os.makedirs(trash_dir, exist_ok=True)
+        tombstone = os.path.join(trash_dir, name)
+        os.rename(path, tombstone)
+    except OSError:
+        tombstone = os.path.join(os.path.dirname(path), f".deleting-{name}")
+        try:
+            os.rename(path, tombstone)
+        except OSError:
+            remove_tree(path)
+            return
+    threading.Thread(target=_purge_trash, args=(tombstone, trash_dir), daemon=True).start()
+
+
+def _purge_trash(tombstone, trash_dir):
+    remove_tree(tombstone)
+    # 上次退出时没有删完的目录
+    try:
+        names = os.listdir(trash_dir)
+    except OSError:
+        return
+    for name in names:
+        remove_tree(os.path.join(trash_dir, name))
+
+
+def resolve_python(config):
+    """获取用于运行PyInstaller的Python解释器"""
+    python_interpreter = config.get("python_path", "").strip()
+    if python_interpreter:
+        return python_interpreter
+    # 未设置时使用当前解释器；如果本工具自身是打包后的程序则依赖系统PATH
+    if getattr(sys, "frozen", False):
+        return "python"
+    return sys.executable
+
+
+def split_data_entry(entry):
+    """拆分数据文件配置 "源路径;目标路径"，返回 (源路径, 目标路径)"""
+    for sep in (";", os.pathsep):
+        if sep in entry:
+            src, dst = entry.rsplit(sep, 1)
+            return src, dst
+    return entry, "."
+
+
+def absolutize_paths(config):
+    """将数据文件和图标的相对路径转换为相对脚本目录的绝对路径
+
+    使用独立的 --specpath 时，PyInstaller 会相对spec目录解析这些路径。
+    """
+    config = normalize_config(config)
+    base_dir = os.path.dirname(os.path.abspath(config["script_path"].strip()))
+    data_files = []
+    for entry in config["data_files"]:
+        src, dst = split_data_entry(entry)
+        if not os.path.isabs(src):
+            src = os.path.join(base_dir, src)
+        data_files.append(f"{src};{dst}")
+    config["data_files"] = data_files
+    icon_path = config["icon_path"].strip()
+    if icon_path and not os.path.isabs(icon_path):
+        config["icon_path"] = os.path.join(base_dir, icon_path)
+    return config
+
+
+def validate_python_path(path):
+    """验证Python解释器路径是否有效"""
+    if not os.path.isfile(path):
+        return False
+
+    # 检查是否包含Python可执行文件（python、python3、python3.11、pythonw.exe 等）
+    return bool(PYTHON_NAME.match(os.path.basename(path)))
+
+
+def build_command(config, write_spec=True):
+    """根据配置构建PyInstaller命令（不含解释器部分）
+
+    spec文件模式下会生成spec文件；write_spec=False 时不写入（见 validate_config）。
+    """
+    config = normalize_config(config)
+
+    script_path = config["script_path"].strip()
+    if not script_path:
+        raise ConfigError("请选择要打包的Python脚本")
+
+    # 单文件启动缓存: 先按目录模式打包到暂存目录，打包后再生成单文件
+    import onefile_cache
+    config = onefile_cache.pyinstaller_config(config)
+
+    if not os.path.exists(script_path):
+        raise ConfigError("Python脚本不存在")
+
+    # spec文件模式: 根据配置生成spec文件，基于spec打包
+    if config["use_spec"]:
+        import spec_builder
+        return spec_builder.build_command([config], write=write_spec)
+
+    output_dir = resolve_output_dir(config)
+
+    # 基本命令
+    cmd = ["pyinstaller"]
+
+    # 单文件选项
+    if config["onefile"]:
+        cmd.append("--onefile")
+
+    # 窗口选项
+    window_index = config["window_mode"]
+    if 0 <= window_index < len(WINDOW_MODES):
+        window_mode = WINDOW_MODES[window_index][1]
+        if window_mode:
+            cmd.append(window_mode)
+
+    # 添加图标
+    icon_path = config["icon_path"].strip()
+    if icon_path and os.path.exists(icon_path):
+        # 处理包含空格的路径
+        if " " in icon_path:
+            icon_path = f'"{icon_path}"'
+        cmd.extend(["--icon", icon_path])
+
+    # 添加数据文件，分隔符使用当前平台PyInstaller要求的格式；按排除规则展开，目录模式增量复制时由本工具处理
+    import data_files
+    cmd.extend(data_files.pyinstaller_args(config))
+
+    # 添加隐藏依赖
+    for module in config["hidden_imports"]:
+        cmd.extend(["--hidden-import", module])
+
+    # 排除模块
+    for module in config["exclude_modules"]:
+        cmd.extend(["--exclude-module", module])
+
+    # 启动耗时分析: 添加记录导入耗时的 runtime hook
+    if config["importtime_hook"]:
+        import bundle_analyzer
+        cmd.extend(["--runtime-hook", bundle_analyzer.importtime_hook_path()])
+
+    # 延迟导入: 添加把指定模块改为延迟导入的 runtime hook
+    import lazy_imports
+    cmd.extend(lazy_imports.pyinstaller_args(config))
+
+    # UPX: 目录模式由本工具在打包后并行压缩，PyInstaller 不再压缩
+    import upx_tool
+    cmd.extend(upx_tool.pyinstaller_args(config))
+
+    # 清理选项
+    if config["clean"]:
+        cmd.append("--clean")
+
+    if config["no_confirm"]:
+        cmd.append("--noconfirm")
+
+    # 其他参数
+    extra_args = config["extra_args"].strip()
+    if extra_args:
+        cmd.extend(extra_args.split())
+
+    # 添加输出目录和工作目录
+    cmd.extend(["--distpath", output_dir])
+    cmd.append(script_path)
+
+    return cmd
+
+
+def validate_config(config):
+    """检查配置能否生成打包命令，有问题时抛出 ConfigError
+
+    只用于检查（打开窗口、开始监视等），不写入spec文件: spec文件只在真正打包时生成，
+    否则打包时与上一次的比较结果为"没有变化"，会漏掉 Analysis 变化所需的 --clean。
+    """
+    build_command(config, write_spec=False)
+
+
+def build_process_command(config, cmd=None):
+    """构建完整的进程命令: [python, -m, PyInstaller, ...]"""
+    if cmd is None:
+        cmd = build_command(config)
+    python_interpreter = config.get("python_path", "").strip()
+    if python_interpreter and not validate_python_path(python_interpreter):
+        raise ConfigError("指定的Python解释器路径无效")
+    return [resolve_python(config), "-m", "PyInstaller"] + cmd[1:]
@@ -0,0 +1,213 @@
+import os
+import sys
+import signal
+import threading
+import contextlib
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+# 终止进程后等待退出的时间（秒），超时后强制杀死
+STOP_TIMEOUT = 5.0
+
+_PROCESS_ERRORS = (OSError, psutil.Error) if psutil is not None else (OSError,)
+
+
+def _linux_children(pid):
+    """Linux下获取直接子进程"""
+    children = []
+    try:
+        for tid in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{tid}/children") as f:
+                children.extend(int(child) for child in f.read().split())
+    except OSError:
+        pass
+    return children
+
+
+def process_tree(pid):
+    """返回进程及其所有子孙进程的pid列表"""
+    if psutil is not None:
+        try:
+            root = psutil.Process(pid)
+            return [pid] + [child.pid for child in root.children(recursive=True)]
+        except psutil.Error:
+            return []
+    if sys.platform.startswith("linux"):
+        result = []
+        pending = [pid]
+        while pending:
+            current = pending.pop()
+            if os.path.exists(f"/proc/{current}"):
+                result.append(current)
+                pending.extend(_linux_children(current))
+        return result
+    return [pid]
+
+
+def pid_exists(pid):
+    """进程是否存在，无法判断时（Windows 上没有 psutil）视为存在"""
+    if psutil is not None:
+        return psutil.pid_exists(pid)
+    if os.name == "nt":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # 其他用户的进程
+        return True
+    return True
+
+
+def signal_processes(pids, kill=False):
+    """向一组进程发送终止信号（kill=True 时强制杀死），已退出的进程忽略"""
+    # 先处理子孙进程，避免父进程退出后子进程被重新收养而漏掉
+    for pid in reversed(pids):
+        try:
+            if psutil is not None:
+                process = psutil.Process(pid)
+                if kill:
+                    process.kill()
+                else:
+                    process.terminate()
+            else:
+                os.kill(pid, signal.SIGKILL if kill and hasattr(signal, "SIGKILL") else signal.SIGTERM)
+        except _PROCESS_ERRORS:
+            pass
+
+
+def kill_later(pids, timeout=STOP_TIMEOUT):
+    """timeout 秒后强制杀死仍在运行的进程（非阻塞），返回定时器线程"""
+    timer = threading.Timer(timeout, signal_processes, args=(pids,), kwargs={"kill": True})
+    timer.daemon = True
+    timer.start()
+    return timer
+
+
+def stop_process(process, timeout=STOP_TIMEOUT):
+    """非阻塞地停止 subprocess.Popen 启动的进程树: 立即终止，timeout 秒后仍未退出的强制杀死
+
+    返回负责强制杀死的定时器线程。
+    """
+    pids = process_tree(process.pid) or [process.pid]
+    signal_processes(pids)
+
+    def escalate():
+        # 主进程已退出时仍检查子孙进程，避免留下孤儿进程
+        remaining = [pid for pid in pids if pid != process.pid or process.poll() is None]
+        signal_processes(remaining, kill=True)
+
+    timer = threading.Timer(timeout, escalate)
+    timer.daemon = True
+    timer.start()
+    return timer
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    """持有锁文件 path 上的跨进程排他锁（界面、命令行、代理可能同时操作同一个数据目录）
+
+    同一进程内的多个线程也会互相等待，但不可重入。
+    """
+    with open(path, 'a+b') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _linux_status(pid, field):
+    """读取 /proc/<pid>/status 中的内存字段（字节）"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+
+def tree_rss(pid):
+    """进程树当前占用的物理内存总和（字节），无法获取时返回 0"""
+    total = 0
+    for child in process_tree(pid):
+        if psutil is not None:
+            try:
+                total += psutil.Process(child).memory_info().rss
+            except psutil.Error:
+                pass
+        elif sys.platform.startswith("linux"):
+            total += _linux_status(child, "VmRSS")
+    return total
+
+
+class PeakRssSampler:
+    """后台线程定时采样子进程树的内存，记录峰值；watch 可以加入不在该进程树中的其他进程（如常驻进程的打包子进程）"""
+
+    def __init__(self, pid, interval=0.5):
+        self.pid = pid
+        self.pids = [pid]
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sample()
+            self._stop.wait(self.interval)
+
+    def watch(self, pid):
+        if pid not in self.pids:
+            self.pids.append(pid)
+
+    def sample(self):
+        pids = list(self.pids)
+        rss = sum(tree_rss(pid) for pid in pids)
+        if sys.platform.startswith("linux") and psutil is None:
+            # VmHWM 是主进程的历史峰值，可以弥补采样间隔内的遗漏
+            rss = max(rss, sum(_linux_status(pid, "VmHWM") for pid in pids))
+        self.peak = max(self.peak, rss)
+        return rss
+
+    def stop(self):
+        """停止采样并返回峰值（字节）"""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=self.interval * 2)
+        return self.peak
+
+
+def format_size(size):
+    """格式化字节数"""
+    if size is None:
+        return ""
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(size) < 1024 or unit == "GB":
+            return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
@@ -0,0 +1,480 @@
+"""常驻PyInstaller打包进程
+
+serve 模式在目标解释器中运行: 预先导入PyInstaller并构建标准库的模块依赖图，之后每个打包请求
+fork 出一个子进程执行，子进程继承已导入的模块和缓存的依赖图，省去解释器启动和基础分析的时间。
+client 模式由本工具启动，把打包参数发送给常驻进程并转发输出，退出码与直接运行PyInstaller相同，
+因此可以直接替换 `python -m PyInstaller ...` 命令。
+
+serve 模式只能使用标准库，目标解释器中不一定能导入本工具的其他模块。
+"""
+import os
+import sys
+import json
+import time
+import socket
+import signal
+import hashlib
+import argparse
+import threading
+import subprocess
+
+# 输出结束标记，后面跟退出码
+EXIT_MARKER = b"\x00PYI-WORKER-EXIT:"
+
+# 打包子进程启动时输出的行，后面跟其 pid: 打包子进程由常驻进程 fork，不在客户端的进程树中，
+# 本工具据此统计内存占用
+BUILD_PID_PREFIX = "打包进程 pid:"
+
+# 空闲超过该时间（秒）后常驻进程自动退出
+IDLE_TIMEOUT = 1800
+
+# 保留的模块依赖图数量（按排除模块列表区分）
+MAX_GRAPHS = 3
+
+# 打包请求的环境中设置该变量时，子进程使用二进制依赖分析缓存（值为缓存目录）
+BINDEP_CACHE_ENV = "PYI_TOOL_BINDEP_CACHE"
+
+
+def is_supported():
+    """常驻进程依赖 fork，只支持类 Unix 系统；本工具被打包成可执行文件时也无法启动本脚本"""
+    return hasattr(os, "fork") and not getattr(sys, "frozen", False)
+
+
+# ---------------------------------------------------------------- 常驻进程
+
+def _spec_excludes(spec_path):
+    """读取spec文件中 Analysis 的 excludes 参数，无法确定时返回 None"""
+    import ast
+    try:
+        with open(spec_path, 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+    except (OSError, SyntaxError, ValueError):
+        return None
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and getattr(node.func, "id", None) == "Analysis":
+            for keyword in node.keywords:
+                if keyword.arg == "excludes":
+                    try:
+                        return list(ast.literal_eval(keyword.value))
+                    except ValueError:
+                        return None
+            return []
+    return None
+
+
+def request_excludes(argv):
+    """根据打包参数推算 Analysis 使用的排除模块列表，用于选择预先构建的依赖图"""
+    if argv and argv[-1].endswith(".spec"):
+        return _spec_excludes(argv[-1])
+    excludes = []
+    for index, arg in enumerate(argv):
+        if arg == "--exclude-module" and index + 1 < len(argv):
+            excludes.append(argv[index + 1])
+        elif arg.startswith("--exclude-module="):
+            excludes.append(arg.split("=", 1)[1])
+    return excludes
+
+
+class WorkerServer:
+    """常驻进程: 接受打包请求并为每个请求 fork 子进程"""
+
+    def __init__(self, info_path, idle_timeout=IDLE_TIMEOUT):
+        self.info_path = info_path
+        self.idle_timeout = idle_timeout
+        self.token = os.urandom(16).hex()
+        self.graphs = []  # [(排除模块, 依赖图)]，最近使用的在最后
+        self.children = set()
+
+    def warm_up(self):
+        """导入PyInstaller并构建不排除任何模块时的依赖图"""
+        import PyInstaller.__main__  # noqa: F401
+        import PyInstaller.building.build_main  # noqa: F401
+        from PyInstaller.depend import analysis
+        self.analysis = analysis
+        self.graph_for([])
+
+    def graph_for(self, excludes):
+        """取得（必要时构建）指定排除模块列表的依赖图，并设为PyInstaller的缓存"""
+        key = list(excludes) + ["__main__"]
+        for index, (graph_key, graph) in enumerate(self.graphs):
+            if graph_key == key:
+                self.graphs.append(self.graphs.pop(index))
+                self.analysis._cached_module_graph_ = graph
+                return
+        self.analysis._cached_module_graph_ = None
+        self.analysis.initialize_modgraph(excludes=list(excludes))
+        self.graphs.append((key, self.analysis._cached_module_graph_))
+        del self.graphs[:-MAX_GRAPHS]
+
+    def write_info(self, port):
+        import PyInstaller
+        python = os.path.realpath(sys.executable)
+        info = {
+            "pid": os.getpid(),
+            "port": port,
+            "token": self.token,
+            "python": python,
+            "python_mtime": os.stat(python).st_mtime_ns,
+            "pyinstaller": PyInstaller.__version__,
+            "pyinstaller_file": PyInstaller.__file__,
+            "pyinstaller_mtime": os.stat(PyInstaller.__file__).st_mtime_ns,
+            "started_at": time.time(),
+        }
+        temp_path = self.info_path + ".tmp"
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(info, f)
+        os.replace(temp_path, self.info_path)
+
+    def reap(self):
+        for pid in list(self.children):
+            try:
+                done, _ = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                done = pid
+            if done:
+                self.children.discard(pid)
+
+    def serve(self):
+        # 本脚本所在目录不应出现在分析路径中
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        sys.path[:] = [path for path in sys.path if os.path.abspath(path or ".") != script_dir]
+
+        self.warm_up()
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(("127.0.0.1", 0))
+        server.listen(16)
+        server.settimeout(1.0)
+        self.write_info(server.getsockname()[1])
+        print(f"worker ready on port {server.getsockname()[1]}", flush=True)
+
+        last_active = time.time()
+        try:
+            while True:
+                self.reap()
+                if self.children:
+                    last_active = time.time()
+                elif time.time() - last_active > self.idle_timeout:
+                    break
+                try:
+                    conn, _ = server.accept()
+                except socket.timeout:
+                    continue
+                last_active = time.time()
+                if self.handle(server, conn) == "shutdown":
+                    break
+        finally:
+            server.close()
+            try:
+                with open(self.info_path, 'r', encoding='utf-8') as f:
+                    if json.load(f).get("pid") == os.getpid():
+                        os.remove(self.info_path)
+            except (OSError, ValueError):
+                pass
+
+    def handle(self, server, conn):
+        conn.settimeout(10)
+        try:
+            data = b""
+            while not data.endswith(b"\n"):
+                chunk = conn.recv(65536)
+                if not chunk:
+                    break
+                data += chunk
+            request = json.loads(data.decode("utf-8"))
+        except (OSError, ValueError):
+            conn.close()
+            return None
+        if request.get("token") != self.token:
+            conn.close()
+            return None
+        if request.get("command") == "shutdown":
+            conn.close()
+            return "shutdown"
+
+        excludes = request_excludes(request["argv"])
+        if excludes is not None:
+            try:
+                self.graph_for(excludes)
+            except Exception as e:
+                print(f"failed to build module graph: {e}", flush=True)
+                self.analysis._cached_module_graph_ = None
+
+        pid = os.fork()
+        if pid == 0:
+            server.close()
+            conn.settimeout(None)
+            code = run_build(conn, request)
+            os._exit(code)
+        self.children.add(pid)
+        conn.close()
+        return None
+
+
+def run_build(conn, request):
+    """在 fork 出的子进程中执行一次打包，输出写入连接，返回退出码"""
+    os.setsid()
+
+    # 客户端断开（被终止）时结束整个进程组，包括PyInstaller启动的子进程
+    def watch():
+        try:
+            while conn.recv(4096):
+                pass
+        except OSError:
+            pass
+        os.killpg(0, signal.SIGKILL)
+
+    threading.Thread(target=watch, daemon=True).start()
+
+    fd = conn.fileno()
+    os.dup2(fd, 1)
+    os.dup2(fd, 2)
+    sys.stdout.reconfigure(line_buffering=True)
+    sys.stderr.reconfigure(line_buffering=True)
+    print("%s %d" % (BUILD_PID_PREFIX, os.getpid()), flush=True)
+
+    os.environ.clear()
+    os.environ.update(request.get("env") or {})
+    cwd = request.get("cwd") or os.getcwd()
+    os.chdir(cwd)
+    sys.path.insert(0, cwd)
+    sys.argv = ["pyinstaller"] + list(request["argv"])
+    bindep_cache = _load_bindep_cache(os.environ.pop(BINDEP_CACHE_ENV, None))
+    # 请求通过 job_limits 启动时，在打包子进程中应用相同的资源限制
+    job_limits = _load_helper("job_limits") if os.environ.get("PYI_TOOL_JOB_LIMITS") else None
+    if job_limits:
+        for error in job_limits.apply_from_env():
+            print(f"资源限制未生效: {error}", file=sys.stderr, flush=True)
+
+    code = 0
+    try:
+        import PyInstaller.__main__
+        PyInstaller.__main__.run(list(request["argv"]))
+    except SystemExit as e:
+        if isinstance(e.code, int):
+            code = e.code
+        elif e.code is not None:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        import traceback
+        traceback.print_exc()
+        code = 1
+    if bindep_cache:
+        bindep_cache.report()
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        conn.sendall(EXIT_MARKER + str(code).encode("ascii") + b"\n")
+    except OSError:
+        pass
+    return code
+
+
+def _load_helper(name):
+    """从本脚本所在目录加载同样只依赖标准库的辅助模块，失败返回 None"""
+    import importlib.util
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), name + ".py")
+    try:
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    except (OSError, ImportError, SyntaxError):
+        return None
+    return module
+
+
+def _load_bindep_cache(cache_dir):
+    """加载 bindep_cache 并替换PyInstaller的二进制依赖分析函数，返回模块"""
+    if not cache_dir:
+        return None
+    module = _load_helper("bindep_cache")
+    return module if module and module.install(cache_dir) else None
+
+
+# ---------------------------------------------------------------- 客户端
+
+def get_worker_dir():
+    import packager_core
+    worker_dir = os.path.join(packager_core.get_app_data_dir(), "workers")
+    os.makedirs(worker_dir, exist_ok=True)
+    return worker_dir
+
+
+def info_path_for(python):
+    digest = hashlib.sha1(os.path.normcase(os.path.realpath(python)).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(get_worker_dir(), f"{digest}.json")
+
+
+def load_info(info_path):
+    try:
+        with open(info_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except OSError:
+        return False
+
+
+def is_stale(info):
+    """解释器或PyInstaller被更新后，常驻进程中已导入的模块已经过期"""
+    try:
+        return (os.stat(info["python"]).st_mtime_ns != info["python_mtime"] or
+                os.stat(info["pyinstaller_file"]).st_mtime_ns != info["pyinstaller_mtime"])
+    except (OSError, KeyError):
+        return True
+
+
+def send_request(info, request, timeout=5):
+    conn = socket.create_connection(("127.0.0.1", info["port"]), timeout=timeout)
+    request = dict(request, token=info["token"])
+    conn.sendall(json.dumps(request).encode("utf-8") + b"\n")
+    return conn
+
+
+def stop_worker(info):
+    """请求常驻进程退出"""
+    try:
+        send_request(info, {"command": "shutdown"}).close()
+    except OSError:
+        pass
+
+
+def ensure_worker(python, timeout=120):
+    """返回可用的常驻进程信息，不存在或已过期时启动新的常驻进程，失败返回 None"""
+    import fcntl
+
+    info_path = info_path_for(python)
+    # 并发打包时只由一个客户端启动常驻进程，其余等待
+    with open(os.path.splitext(info_path)[0] + ".lock", 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return _ensure_worker(python, info_path, timeout)
+
+
+def _ensure_worker(python, info_path, timeout):
+    info = load_info(info_path)
+    if info and _alive(info["pid"]):
+        if not is_stale(info):
+            return info
+        stop_worker(info)
+
+    print("正在启动常驻打包进程（首次需要预加载PyInstaller）...", flush=True)
+    log_path = os.path.splitext(info_path)[0] + ".log"
+    with open(log_path, 'ab') as log_file:
+        process = subprocess.Popen([python, os.path.abspath(__file__), "serve", "--info", info_path],
+                                   stdin=subprocess.DEVNULL, stdout=log_file, stderr=subprocess.STDOUT,
+                                   start_new_session=True, close_fds=True)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            return None
+        info = load_info(info_path)
+        if info and info.get("pid") == process.pid:
+            return info
+        time.sleep(0.1)
+    process.kill()
+    return None
+
+
+def run_client(python, argv, bindep_cache=None):
+    """通过常驻进程打包，输出写到标准输出，返回退出码；常驻进程不可用时直接运行PyInstaller
+
+    bindep_cache 为二进制依赖分析缓存目录。
+    """
+    if bindep_cache:
+        os.environ[BINDEP_CACHE_ENV] = bindep_cache
+    info = ensure_worker(python)
+    conn = None
+    if info:
+        try:
+            conn = send_request(info, {"argv": argv, "env": dict(os.environ), "cwd": os.getcwd()})
+        except OSError:
+            conn = None
+    if conn is None:
+        print("常驻打包进程不可用，直接运行PyInstaller", flush=True)
+        if bindep_cache:
+            script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bindep_cache.py")
+            process = subprocess.Popen([python, script, "--cache-dir", bindep_cache, "--"] + argv)
+        else:
+            process = subprocess.Popen([python, "-m", "PyInstaller"] + argv)
+        print("%s %d" % (BUILD_PID_PREFIX, process.pid), flush=True)
+        return process.wait()
+
+    conn.settimeout(None)
+    output = sys.stdout.buffer
+    pending = b""
+    code = None
+    while True:
+        chunk = conn.recv(65536)
+        if not chunk:
+            break
+        pending += chunk
+        index = pending.find(EXIT_MARKER)
+        if index >= 0:
+            output.write(pending[:index])
+            tail = pending[index + len(EXIT_MARKER):].split(b"\n", 1)[0]
+            code = int(tail or b"1")
+            break
+        # 保留可能是结束标记开头的部分
+        keep = len(EXIT_MARKER) - 1
+        output.write(pending[:-keep])
+        pending = pending[-keep:]
+        output.flush()
+    output.flush()
+    conn.close()
+    if code is None:
+        print("常驻打包进程意外断开", file=sys.stderr, flush=True)
+        return 1
+    return code
+
+
+def wrap_command(config, cmd):
+    """启用常驻进程时，把 [python, -m, PyInstaller, ...] 替换为通过常驻进程打包的命令"""
+    if not config.get("pyi_worker") or not is_supported() or cmd[1:3] != ["-m", "PyInstaller"]:
+        return cmd
+    import bindep_cache
+    options = ["--python", cmd[0]]
+    cache_dir = bindep_cache.cache_dir_for(config)
+    if cache_dir:
+        options += ["--bindep-cache", cache_dir]
+    return [sys.executable, os.path.abspath(__file__), "client"] + options + ["--"] + cmd[3:]
+
+
+def list_workers():
+    """所有正在运行的常驻进程信息"""
+    workers = []
+    for name in sorted(os.listdir(get_worker_dir())):
+        if name.endswith(".json"):
+            info = load_info(os.path.join(get_worker_dir(), name))
+            if info and _alive(info["pid"]):
+                workers.append(info)
+    return workers
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="常驻PyInstaller打包进程")
+    subparsers = parser.add_subparsers(dest="mode", required=True)
+    serve_parser = subparsers.add_parser("serve")
+    serve_parser.add_argument("--info", required=True)
+    serve_parser.add_argument("--idle-timeout", type=int, default=IDLE_TIMEOUT)
+    client_parser = subparsers.add_parser("client")
+    client_parser.add_argument("--python", required=True)
+    client_parser.add_argument("--bindep-cache")
+    client_parser.add_argument("args", nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+
+    if args.mode == "serve":
+        WorkerServer(args.info, args.idle_timeout).serve()
+        return 0
+    pyinstaller_args = args.args[1:] if args.args[:1] == ["--"] else args.args
+    return run_client(args.python, pyinstaller_args, args.bindep_cache)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
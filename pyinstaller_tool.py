@@ -1,17 +1,102 @@
 import sys
 import os
+import re
 import json
-import subprocess
 import tempfile
+import time
+
+import packager_cli
+
+# 命令行子命令（如 build）不需要图形界面，在导入PyQt5之前处理
+if __name__ == "__main__" and packager_cli.is_cli_invocation(sys.argv[1:]):
+    sys.exit(packager_cli.main(sys.argv[1:]))
+
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QLabel, QLineEdit, QPushButton, QCheckBox, QFileDialog,
-                             QListWidget, QListWidgetItem, QGroupBox, QTextEdit,
-                             QMessageBox, QComboBox, QSplitter, QProgressBar, QAction)
-from PyQt5.QtCore import Qt, QProcess, QTimer, QSettings, QStandardPaths
-from PyQt5.QtGui import QIcon, QFont, QColor, QCloseEvent
+                             QListWidget, QListWidgetItem, QGroupBox, QTextEdit, QPlainTextEdit,
+                             QMessageBox, QComboBox, QSplitter, QProgressBar, QAction,
+                             QDialog, QTableWidget, QTableWidgetItem, QSpinBox, QHeaderView,
+                             QAbstractItemView)
+from PyQt5.QtCore import Qt, QProcess, QTimer, QSettings, QStandardPaths, QUrl, QThread, pyqtSignal
+from PyQt5.QtGui import (QIcon, QFont, QColor, QCloseEvent, QTextCursor, QSyntaxHighlighter,
+                         QTextCharFormat, QDesktopServices)
+
+import packager_core
+import build_queue
+import build_cache
+import build_history
+import build_progress
+import proc_utils
+import log_spool
+import import_analyzer
+import bundle_analyzer
+import startup_benchmark
+import workpath_pool
+import spec_builder
+import interpreters
+import build_matrix
+import pyi_worker
+import bindep_cache
+import job_limits
+import build_scheduler
+import build_agent
+import onefile_cache
+import lazy_imports
+import artifact_store
+import file_watcher
+import data_files
+import dist_archive
+import upx_tool
+
+
+# 日志控件最多显示的行数，更早的内容只保存在日志文件中
+LOG_MAX_LINES = 50000
+# 日志刷新到界面的间隔（毫秒）
+LOG_FLUSH_INTERVAL = 50
+# 打包进程的启动超时（毫秒）
+PROCESS_START_TIMEOUT = 5000
+
+
+class LogHighlighter(QSyntaxHighlighter):
+    """日志高亮: 错误和警告行使用不同颜色"""
+
+    def __init__(self, document):
+        super().__init__(document)
+        self.error_format = QTextCharFormat()
+        self.error_format.setForeground(QColor("#d32f2f"))
+        self.warning_format = QTextCharFormat()
+        self.warning_format.setForeground(QColor("#b26a00"))
+
+    def highlightBlock(self, text):
+        if "ERROR" in text or "Traceback" in text or "打包失败" in text or "强制" in text:
+            self.setFormat(0, len(text), self.error_format)
+        elif "WARNING" in text or "慢" in text:
+            self.setFormat(0, len(text), self.warning_format)
+
+
+class LogSearchDialog(QDialog):
+    """日志搜索结果"""
+
+    def __init__(self, parent, pattern, results, log_path):
+        super().__init__(parent)
+        self.setWindowTitle(f"搜索: {pattern}")
+        self.resize(800, 450)
+
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+
+        layout.addWidget(QLabel(f"共 {len(results)} 条匹配 ({log_path})"))
+        output = QPlainTextEdit()
+        output.setReadOnly(True)
+        output.setFont(QFont("Consolas", 10))
+        output.setPlainText("\n".join(f"{line_no:>7}: {line}" for line_no, line in results))
+        layout.addWidget(output)
 
 
 class PyInstallerPackager(QMainWindow):
+    # 监视线程检测到源码修改，转到主线程处理
+    watch_changed = pyqtSignal(list)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("PyInstaller 打包工具")
@@ -49,11 +134,41 @@ class PyInstallerPackager(QMainWindow):
         log_layout = QVBoxLayout()
         log_group.setLayout(log_layout)
 
-        self.log_output = QTextEdit()
+        # 纯文本日志控件，只保留最近的行，完整日志写入磁盘
+        self.log_output = QPlainTextEdit()
         self.log_output.setReadOnly(True)
+        self.log_output.setUndoRedoEnabled(False)
+        self.log_output.setMaximumBlockCount(LOG_MAX_LINES)
         self.log_output.setFont(QFont("Consolas", 10))
+        self.log_highlighter = LogHighlighter(self.log_output.document())
         log_layout.addWidget(self.log_output)
 
+        # 日志搜索
+        log_search_layout = QHBoxLayout()
+        log_layout.addLayout(log_search_layout)
+
+        self.log_search = QLineEdit()
+        self.log_search.setPlaceholderText("在完整日志中搜索")
+        self.log_search.returnPressed.connect(self.search_log)
+        log_search_layout.addWidget(self.log_search)
+
+        self.log_regex_check = QCheckBox("正则")
+        log_search_layout.addWidget(self.log_regex_check)
+
+        self.log_search_btn = QPushButton("搜索")
+        self.log_search_btn.clicked.connect(self.search_log)
+        log_search_layout.addWidget(self.log_search_btn)
+
+        self.open_log_btn = QPushButton("打开完整日志")
+        self.open_log_btn.clicked.connect(self.open_log_file)
+        log_search_layout.addWidget(self.open_log_btn)
+
+        # 日志缓冲: 输出先写入缓冲和日志文件，按固定间隔批量刷新到界面
+        self.log_spool = log_spool.LogSpool()
+        self.log_flush_timer = QTimer(self)
+        self.log_flush_timer.setSingleShot(True)
+        self.log_flush_timer.timeout.connect(self.flush_log)
+
         splitter.addWidget(settings_group)
         splitter.addWidget(log_group)
         splitter.setSizes([400, 300])
@@ -103,9 +218,20 @@ class PyInstallerPackager(QMainWindow):
         output_layout.addWidget(self.output_browse_btn)
 
         # 3. 单文件选项
+        onefile_layout = QHBoxLayout()
+        form_layout.addLayout(onefile_layout)
         self.onefile_check = QCheckBox("打包为单文件 (--onefile)")
         self.onefile_check.setChecked(True)
-        form_layout.addWidget(self.onefile_check)
+        onefile_layout.addWidget(self.onefile_check)
+
+        self.onefile_cache_check = QCheckBox("启动缓存")
+        self.onefile_cache_check.setToolTip("第一次运行时解压到用户缓存目录（按产物内容区分版本），以后启动直接运行，"
+                                            "接近目录模式的启动速度（仅限 Linux/macOS）")
+        self.onefile_cache_check.setEnabled(onefile_cache.is_supported())
+        self.onefile_check.toggled.connect(
+            lambda checked: self.onefile_cache_check.setEnabled(checked and onefile_cache.is_supported()))
+        onefile_layout.addWidget(self.onefile_cache_check)
+        onefile_layout.addStretch()
 
         # 4. 窗口选项
         window_layout = QHBoxLayout()
@@ -113,9 +239,8 @@ class PyInstallerPackager(QMainWindow):
 
         window_layout.addWidget(QLabel("窗口模式:"))
         self.window_combo = QComboBox()
-        self.window_combo.addItem("无控制台窗口 (--windowed)", "--windowed")
-        self.window_combo.addItem("显示控制台窗口 (--console)", "--console")
-        self.window_combo.addItem("默认模式 (不添加参数)", "")
+        for label, option in packager_core.WINDOW_MODES:
+            self.window_combo.addItem(label, option)
         window_layout.addWidget(self.window_combo)
 
         # 5. 添加图标
@@ -144,6 +269,14 @@ class PyInstallerPackager(QMainWindow):
         self.data_add_btn.clicked.connect(self.add_data)
         data_layout.addWidget(self.data_add_btn)
 
+        data_layout.addWidget(QLabel("排除:"))
+        self.data_excludes = QLineEdit()
+        self.data_excludes.setPlaceholderText("如: *.psd,__pycache__,.git")
+        self.data_excludes.setToolTip("数据目录中不打包的文件或目录，逗号分隔，匹配文件名或相对路径；\n"
+                                      "源路径支持通配符，如 assets/**/*.png;assets")
+        self.data_excludes.editingFinished.connect(self.scan_data_files)
+        data_layout.addWidget(self.data_excludes, 1)
+
         # 7. 添加依赖项
         hidden_layout = QHBoxLayout()
         form_layout.addLayout(hidden_layout)
@@ -157,6 +290,35 @@ class PyInstallerPackager(QMainWindow):
         self.hidden_add_btn.clicked.connect(self.add_hidden)
         hidden_layout.addWidget(self.hidden_add_btn)
 
+        self.analyze_btn = QPushButton("分析依赖")
+        self.analyze_btn.setToolTip("静态分析脚本的导入，建议隐藏依赖和可排除的模块")
+        self.analyze_btn.clicked.connect(lambda: self.analyze_imports(show_dialog=True))
+        hidden_layout.addWidget(self.analyze_btn)
+
+        # 7.1 排除模块
+        exclude_layout = QHBoxLayout()
+        form_layout.addLayout(exclude_layout)
+
+        exclude_layout.addWidget(QLabel("排除模块:"))
+        self.exclude_module = QLineEdit()
+        self.exclude_module.setPlaceholderText("输入模块名 (如: tkinter,matplotlib.tests)")
+        exclude_layout.addWidget(self.exclude_module, 2)
+
+        self.exclude_add_btn = QPushButton("添加")
+        self.exclude_add_btn.clicked.connect(self.add_exclude)
+        exclude_layout.addWidget(self.exclude_add_btn)
+
+        # 7.2 延迟导入
+        lazy_layout = QHBoxLayout()
+        form_layout.addLayout(lazy_layout)
+
+        lazy_layout.addWidget(QLabel("延迟导入:"))
+        self.lazy_imports = QLineEdit()
+        self.lazy_imports.setPlaceholderText("启动时不立即使用的模块，逗号分隔 (如: numpy,pandas,PyQt5.QtWebEngineWidgets)")
+        self.lazy_imports.setToolTip("打包时加入 runtime hook，这些模块在第一次访问属性时才真正导入，程序代码不需要修改；\n"
+                                     "可在 工具 > 产物分析 中根据启动耗时选择")
+        lazy_layout.addWidget(self.lazy_imports)
+
         # 8. 高级选项
         advanced_group = QGroupBox("高级选项")
         advanced_layout = QVBoxLayout()
@@ -180,6 +342,132 @@ class PyInstallerPackager(QMainWindow):
         self.auto_save_check.setChecked(True)
         clean_layout.addWidget(self.auto_save_check)
 
+        # 构建缓存
+        self.build_cache_check = QCheckBox("增量构建缓存")
+        self.build_cache_check.setToolTip("没有变化时跳过打包；根据已安装包的变化自动决定是否执行 --clean，\n"
+                                          "依赖包没有变化时保留工作目录，有变化时强制清理并在日志中列出变化的包")
+        self.build_cache_check.setChecked(True)
+        clean_layout.addWidget(self.build_cache_check)
+
+        # 共享工作目录缓存
+        self.workpath_pool_check = QCheckBox("共享工作目录缓存")
+        self.workpath_pool_check.setToolTip("使用工具数据目录中按配置和解释器区分的 --workpath，重复打包时复用分析结果")
+        self.workpath_pool_check.setChecked(True)
+        clean_layout.addWidget(self.workpath_pool_check)
+
+        # spec文件模式
+        self.use_spec_check = QCheckBox("使用spec文件打包")
+        self.use_spec_check.setToolTip("根据配置生成spec文件并按spec打包；只有依赖分析部分变化时才清理工作目录，"
+                                       "其他修改只重新生成变化的目标")
+        clean_layout.addWidget(self.use_spec_check)
+
+        # 启动耗时分析
+        self.importtime_check = QCheckBox("启动耗时分析")
+        self.importtime_check.setToolTip("打包时加入记录模块导入耗时的 runtime hook，可在 工具 > 产物分析 中运行统计")
+        clean_layout.addWidget(self.importtime_check)
+
+        # 常驻打包进程
+        self.pyi_worker_check = QCheckBox("常驻打包进程")
+        self.pyi_worker_check.setToolTip("通过预加载了PyInstaller的常驻进程打包，省去每次启动解释器和分析标准库的时间"
+                                         "（仅限 Linux/macOS）")
+        self.pyi_worker_check.setEnabled(pyi_worker.is_supported())
+        clean_layout.addWidget(self.pyi_worker_check)
+
+        # 二进制依赖分析缓存
+        self.bindep_cache_check = QCheckBox("二进制依赖缓存")
+        self.bindep_cache_check.setToolTip("按文件内容、平台和解释器缓存每个动态库的依赖分析结果（ldd/objdump等），\n"
+                                           "所有项目共享；打包日志末尾显示命中次数")
+        self.bindep_cache_check.setChecked(False)
+        self.bindep_cache_check.setEnabled(bindep_cache.is_supported())
+        clean_layout.addWidget(self.bindep_cache_check)
+
+        # 分布式打包
+        self.remote_build_check = QCheckBox("远程打包")
+        self.remote_build_check.setToolTip("把源码快照发送给负载最低的构建代理打包，完成后取回产物；"
+                                           "代理在 工具 > 构建代理 中管理")
+        clean_layout.addWidget(self.remote_build_check)
+
+        # 产物处理选项
+        output_layout = QHBoxLayout()
+        advanced_layout.addLayout(output_layout)
+
+        self.incremental_data_check = QCheckBox("数据文件增量复制")
+        self.incremental_data_check.setToolTip("目录模式: 数据文件不交给PyInstaller复制，打包后由本工具同步到暂存目录\n"
+                                               "（只复制大小、修改时间和内容有变化的文件），再硬链接到产物中")
+        output_layout.addWidget(self.incremental_data_check)
+
+        self.artifact_store_check = QCheckBox("产物去重存储")
+        self.artifact_store_check.setToolTip("打包成功后把产物按内容存入对象库，相同文件只保存一份，输出目录改为硬链接；"
+                                             "可在 工具 > 产物版本 中回滚到以前的版本")
+        output_layout.addWidget(self.artifact_store_check)
+        output_layout.addWidget(QLabel("保留版本数:"))
+        self.artifact_versions_spin = QSpinBox()
+        self.artifact_versions_spin.setRange(1, 100)
+        self.artifact_versions_spin.setValue(artifact_store.DEFAULT_KEEP_VERSIONS)
+        output_layout.addWidget(self.artifact_versions_spin)
+
+        # 打包成功后生成归档
+        output_layout.addWidget(QLabel("打包后归档:"))
+        self.archive_checks = {}
+        for fmt in dist_archive.FORMATS:
+            check = QCheckBox(fmt)
+            check.setToolTip("打包成功后在输出目录中生成多线程压缩的归档文件和 .sha256 校验文件")
+            output_layout.addWidget(check)
+            self.archive_checks[fmt] = check
+        if not dist_archive.zstd_available():
+            self.archive_checks["tar.zst"].setEnabled(False)
+            self.archive_checks["tar.zst"].setToolTip("需要安装 zstandard (pip install zstandard) 或 zstd 命令行工具")
+        output_layout.addStretch()
+
+        # UPX压缩
+        upx_layout = QHBoxLayout()
+        advanced_layout.addLayout(upx_layout)
+
+        self.upx_check = QCheckBox("UPX压缩")
+        self.upx_check.setTristate(True)
+        self.upx_check.setCheckState(Qt.PartiallyChecked)
+        self.upx_check.setToolTip("目录模式: 打包后由本工具并行压缩各个二进制文件，结果按文件内容缓存，未变化的文件不再重复压缩；\n"
+                                  "单文件模式: 由PyInstaller压缩。两种模式都会自动排除Qt插件和运行时库等不适合压缩的文件\n"
+                                  "半选（默认）: 不指定，由PyInstaller决定（PATH 中有 upx 时压缩）")
+        self.upx_check.setEnabled(upx_tool.is_supported())
+        upx_layout.addWidget(self.upx_check)
+        upx_layout.addWidget(QLabel("级别:"))
+        self.upx_level_combo = QComboBox()
+        for level in sorted(upx_tool.LEVEL_FLAGS):
+            self.upx_level_combo.addItem(upx_tool.LEVEL_FLAGS[level], level)
+        self.upx_level_combo.setCurrentIndex(self.upx_level_combo.findData(10))
+        upx_layout.addWidget(self.upx_level_combo)
+        upx_layout.addWidget(QLabel("UPX目录:"))
+        self.upx_dir = QLineEdit()
+        self.upx_dir.setPlaceholderText("留空时从 PATH 中查找 upx")
+        upx_layout.addWidget(self.upx_dir)
+        self.upx_dir_btn = QPushButton("浏览...")
+        self.upx_dir_btn.clicked.connect(self.select_upx_dir)
+        upx_layout.addWidget(self.upx_dir_btn)
+
+        # 打包进程的资源限制
+        limits_layout = QHBoxLayout()
+        advanced_layout.addLayout(limits_layout)
+
+        limits_layout.addWidget(QLabel("进程优先级(nice):"))
+        self.build_nice_spin = QSpinBox()
+        self.build_nice_spin.setRange(0, 19)
+        self.build_nice_spin.setToolTip("打包进程的 nice 值，越大优先级越低；在共享的构建主机上可以减少对其他程序的影响")
+        limits_layout.addWidget(self.build_nice_spin)
+        self.low_io_check = QCheckBox("低IO优先级")
+        self.low_io_check.setToolTip("使用 ionice 把打包进程设为最低的尽力而为IO优先级（仅限 Linux）")
+        limits_layout.addWidget(self.low_io_check)
+        limits_layout.addWidget(QLabel("内存上限(MB):"))
+        self.memory_limit_spin = QSpinBox()
+        self.memory_limit_spin.setRange(0, 1024 * 1024)
+        self.memory_limit_spin.setSingleStep(512)
+        self.memory_limit_spin.setSpecialValueText("不限")
+        self.memory_limit_spin.setToolTip("打包进程（每个子进程分别计算）可分配的内存上限，超出时打包失败而不是耗尽系统内存")
+        limits_layout.addWidget(self.memory_limit_spin)
+        for widget in (self.build_nice_spin, self.low_io_check, self.memory_limit_spin):
+            widget.setEnabled(job_limits.is_supported())
+        limits_layout.addStretch()
+
         # 其他参数
         other_layout = QHBoxLayout()
         advanced_layout.addLayout(other_layout)
@@ -201,6 +489,12 @@ class PyInstallerPackager(QMainWindow):
         form_layout.addWidget(QLabel("已添加隐藏依赖:"))
         form_layout.addWidget(self.hidden_list)
 
+        # 排除模块列表
+        self.exclude_list = QListWidget()
+        self.exclude_list.setMinimumHeight(60)
+        form_layout.addWidget(QLabel("已排除模块:"))
+        form_layout.addWidget(self.exclude_list)
+
         # 进度条
         self.progress_bar = QProgressBar()
         self.progress_bar.setRange(0, 100)
@@ -218,6 +512,15 @@ class PyInstallerPackager(QMainWindow):
         self.package_btn.setMinimumHeight(40)
         button_layout.addWidget(self.package_btn)
 
+        # 监视模式: 源码或数据文件修改后自动增量打包
+        self.watch_btn = QPushButton("监视并自动打包")
+        self.watch_btn.setCheckable(True)
+        self.watch_btn.setToolTip("监视入口脚本、本地导入的模块和数据文件，修改后自动重新打包；\n"
+                                  "打包过程中再次修改会取消当前打包，使用最新的源码重新打包")
+        self.watch_btn.toggled.connect(self.toggle_watch)
+        self.watch_btn.setMinimumHeight(40)
+        button_layout.addWidget(self.watch_btn)
+
         # 强制停止按钮
         self.force_stop_btn = QPushButton("强制停止")
         self.force_stop_btn.setStyleSheet("background-color: #f44336; color: white; font-weight: bold;")
@@ -252,11 +555,42 @@ class PyInstallerPackager(QMainWindow):
         self.process.readyReadStandardError.connect(self.handle_stderr)
         self.process.finished.connect(self.packaging_finished)
         self.process.stateChanged.connect(self.process_state_changed)
+        self.process.started.connect(self.process_started)
+        self.process.errorOccurred.connect(self.process_error)
+
+        # 启动超时和强制停止的计时器，避免在界面线程中等待进程
+        self.start_timer = QTimer(self)
+        self.start_timer.setSingleShot(True)
+        self.start_timer.timeout.connect(self.start_timed_out)
+        self.kill_timer = QTimer(self)
+        self.kill_timer.setSingleShot(True)
+        self.kill_timer.timeout.connect(self.kill_process_tree)
+        self.stop_pids = []
+        self.stop_keep_workpath = False
 
         # 进度更新计时器
         self.progress_timer = QTimer(self)
         self.progress_timer.timeout.connect(self.update_progress)
         self.progress_value = 0
+        self.build_run = None
+
+        # 本次打包的缓存指纹，成功后写入构建缓存
+        self.build_plan = None
+
+        # 本次打包从共享工作目录缓存取得的工作目录，结束后释放
+        self.pool_workpath = None
+
+        # 打包前在后台检查构建缓存、取得工作目录
+        self.prepare_thread = None
+
+        # 打包成功后的UPX压缩、存档等后台处理
+        self.post_build_thread = None
+        self.build_stopped = False
+
+        # 监视模式
+        self.watcher = None
+        self.watch_rebuild_pending = False
+        self.watch_changed.connect(self.on_watch_changed)
 
         # 状态栏
         self.statusBar().showMessage("就绪")
@@ -290,6 +624,10 @@ class PyInstallerPackager(QMainWindow):
         import_config_action.triggered.connect(self.import_config)
         file_menu.addAction(import_config_action)
 
+        export_spec_action = QAction('导出spec文件', self)
+        export_spec_action.triggered.connect(self.export_spec)
+        file_menu.addAction(export_spec_action)
+
         file_menu.addSeparator()
 
         exit_action = QAction('退出', self)
@@ -297,6 +635,41 @@ class PyInstallerPackager(QMainWindow):
         exit_action.triggered.connect(self.close)
         file_menu.addAction(exit_action)
 
+        # 工具菜单
+        tools_menu = menubar.addMenu('工具')
+
+        queue_action = QAction('批量打包', self)
+        queue_action.triggered.connect(self.show_build_queue)
+        tools_menu.addAction(queue_action)
+
+        matrix_action = QAction('矩阵打包', self)
+        matrix_action.triggered.connect(self.show_build_matrix)
+        tools_menu.addAction(matrix_action)
+
+        history_action = QAction('构建历史', self)
+        history_action.triggered.connect(self.show_build_history)
+        tools_menu.addAction(history_action)
+
+        workpath_action = QAction('工作目录缓存', self)
+        workpath_action.triggered.connect(self.show_workpath_pool)
+        tools_menu.addAction(workpath_action)
+
+        agent_action = QAction('构建代理', self)
+        agent_action.triggered.connect(self.show_build_agents)
+        tools_menu.addAction(agent_action)
+
+        artifact_action = QAction('产物版本', self)
+        artifact_action.triggered.connect(self.show_artifact_versions)
+        tools_menu.addAction(artifact_action)
+
+        bundle_action = QAction('产物分析', self)
+        bundle_action.triggered.connect(self.show_bundle_analysis)
+        tools_menu.addAction(bundle_action)
+
+        benchmark_action = QAction('启动性能对比', self)
+        benchmark_action.triggered.connect(self.show_benchmark)
+        tools_menu.addAction(benchmark_action)
+
         # 帮助菜单
         help_menu = menubar.addMenu('帮助')
 
@@ -320,6 +693,9 @@ class PyInstallerPackager(QMainWindow):
         """重写关闭事件，保存配置"""
         if self.auto_save_check.isChecked():
             self.save_config_to_file(self.config_path)
+        if self.watcher:
+            self.watcher.close()
+        self.log_spool.close()
         event.accept()
 
     def load_last_config(self):
@@ -329,16 +705,16 @@ class PyInstallerPackager(QMainWindow):
                 with open(self.config_path, 'r', encoding='utf-8') as f:
                     config = json.load(f)
                 self.apply_config(config)
-                self.log_output.append(f"已加载上次配置: {self.config_path}")
+                self.append_log(f"已加载上次配置: {self.config_path}")
                 self.statusBar().showMessage("已加载上次配置")
             except Exception as e:
-                self.log_output.append(f"加载配置失败: {str(e)}")
+                self.append_log(f"加载配置失败: {str(e)}")
 
     def save_config(self):
         """保存当前配置"""
         try:
             self.save_config_to_file(self.config_path)
-            self.log_output.append(f"配置已保存: {self.config_path}")
+            self.append_log(f"配置已保存: {self.config_path}")
             self.statusBar().showMessage("配置已保存")
             QMessageBox.information(self, "保存成功", "当前配置已成功保存！")
         except Exception as e:
@@ -351,7 +727,7 @@ class PyInstallerPackager(QMainWindow):
                 with open(self.config_path, 'r', encoding='utf-8') as f:
                     config = json.load(f)
                 self.apply_config(config)
-                self.log_output.append(f"配置已加载: {self.config_path}")
+                self.append_log(f"配置已加载: {self.config_path}")
                 self.statusBar().showMessage("配置已加载")
                 QMessageBox.information(self, "加载成功", "配置已成功加载！")
             else:
@@ -369,12 +745,30 @@ class PyInstallerPackager(QMainWindow):
                 if not file_path.endswith('.json'):
                     file_path += '.json'
                 self.save_config_to_file(file_path)
-                self.log_output.append(f"配置已导出: {file_path}")
+                self.append_log(f"配置已导出: {file_path}")
                 self.statusBar().showMessage("配置已导出")
                 QMessageBox.information(self, "导出成功", f"配置已成功导出到: {file_path}")
             except Exception as e:
                 QMessageBox.critical(self, "导出失败", f"导出配置时出错: {str(e)}")
 
+    def export_spec(self):
+        """根据当前配置生成spec文件"""
+        config = self.get_current_config()
+        if not config["script_path"]:
+            QMessageBox.warning(self, "警告", "请先选择要打包的Python脚本")
+            return
+        default_path = os.path.splitext(config["script_path"])[0] + ".spec"
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "导出spec文件", default_path, "spec文件 (*.spec);;所有文件 (*.*)"
+        )
+        if file_path:
+            try:
+                spec_builder.write_spec([config], spec_path=file_path)
+                self.append_log(f"spec文件已导出: {file_path}")
+                self.statusBar().showMessage("spec文件已导出")
+            except (packager_core.ConfigError, OSError) as e:
+                QMessageBox.critical(self, "导出失败", f"生成spec文件时出错: {str(e)}")
+
     def import_config(self):
         """从文件导入配置"""
         file_path, _ = QFileDialog.getOpenFileName(
@@ -385,7 +779,7 @@ class PyInstallerPackager(QMainWindow):
                 with open(file_path, 'r', encoding='utf-8') as f:
                     config = json.load(f)
                 self.apply_config(config)
-                self.log_output.append(f"配置已导入: {file_path}")
+                self.append_log(f"配置已导入: {file_path}")
                 self.statusBar().showMessage("配置已导入")
                 QMessageBox.information(self, "导入成功", "配置已成功导入！")
             except Exception as e:
@@ -394,8 +788,7 @@ class PyInstallerPackager(QMainWindow):
     def save_config_to_file(self, file_path):
         """保存配置到指定文件"""
         config = self.get_current_config()
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(config, f, ensure_ascii=False, indent=4)
+        packager_core.save_config_file(config, file_path)
 
     def get_current_config(self):
         """获取当前配置"""
@@ -405,23 +798,48 @@ class PyInstallerPackager(QMainWindow):
             "output_path": self.output_path.text(),
             "icon_path": self.icon_path.text(),
             "onefile": self.onefile_check.isChecked(),
+            "onefile_cache": self.onefile_cache_check.isChecked(),
             "window_mode": self.window_combo.currentIndex(),
             "clean": self.clean_check.isChecked(),
             "no_confirm": self.no_confirm_check.isChecked(),
             "auto_save": self.auto_save_check.isChecked(),
+            "build_cache": self.build_cache_check.isChecked(),
+            "workpath_pool": self.workpath_pool_check.isChecked(),
+            "use_spec": self.use_spec_check.isChecked(),
+            "importtime_hook": self.importtime_check.isChecked(),
+            "pyi_worker": self.pyi_worker_check.isChecked(),
+            "bindep_cache": self.bindep_cache_check.isChecked(),
+            "build_nice": self.build_nice_spin.value(),
+            "low_io_priority": self.low_io_check.isChecked(),
+            "memory_limit_mb": self.memory_limit_spin.value(),
+            "remote_build": self.remote_build_check.isChecked(),
+            "artifact_store": self.artifact_store_check.isChecked(),
+            "artifact_versions": self.artifact_versions_spin.value(),
+            "archive_formats": [fmt for fmt, check in self.archive_checks.items() if check.isChecked()],
+            "upx": {Qt.Checked: True, Qt.Unchecked: False}.get(self.upx_check.checkState()),
+            "upx_level": self.upx_level_combo.currentData(),
+            "upx_dir": self.upx_dir.text(),
             "extra_args": self.extra_args.text(),
+            "incremental_data": self.incremental_data_check.isChecked(),
+            "data_excludes": [pattern.strip() for pattern in self.data_excludes.text().split(",") if pattern.strip()],
+            "lazy_imports": [module.strip() for module in self.lazy_imports.text().split(",") if module.strip()],
             "data_files": [],
-            "hidden_imports": []
+            "hidden_imports": [],
+            "exclude_modules": []
         }
 
         # 保存数据文件列表
         for i in range(self.data_list.count()):
-            config["data_files"].append(self.data_list.item(i).text())
+            config["data_files"].append(self.data_list.item(i).data(Qt.UserRole))
 
         # 保存隐藏依赖列表
         for i in range(self.hidden_list.count()):
             config["hidden_imports"].append(self.hidden_list.item(i).text())
 
+        # 保存排除模块列表
+        for i in range(self.exclude_list.count()):
+            config["exclude_modules"].append(self.exclude_list.item(i).text())
+
         return config
 
     def apply_config(self, config):
@@ -432,6 +850,7 @@ class PyInstallerPackager(QMainWindow):
         self.output_path.setText(config.get("output_path", ""))
         self.icon_path.setText(config.get("icon_path", ""))
         self.onefile_check.setChecked(config.get("onefile", True))
+        self.onefile_cache_check.setChecked(config.get("onefile_cache", False))
 
         # 恢复窗口模式
         window_index = config.get("window_mode", 0)
@@ -442,18 +861,46 @@ class PyInstallerPackager(QMainWindow):
         self.clean_check.setChecked(config.get("clean", True))
         self.no_confirm_check.setChecked(config.get("no_confirm", True))
         self.auto_save_check.setChecked(config.get("auto_save", True))
+        self.build_cache_check.setChecked(config.get("build_cache", True))
+        self.workpath_pool_check.setChecked(config.get("workpath_pool", True))
+        self.use_spec_check.setChecked(config.get("use_spec", False))
+        self.importtime_check.setChecked(config.get("importtime_hook", False))
+        self.pyi_worker_check.setChecked(config.get("pyi_worker", False))
+        self.bindep_cache_check.setChecked(config.get("bindep_cache", False))
+        self.build_nice_spin.setValue(config.get("build_nice", 0))
+        self.low_io_check.setChecked(config.get("low_io_priority", False))
+        self.memory_limit_spin.setValue(config.get("memory_limit_mb", 0))
+        self.remote_build_check.setChecked(config.get("remote_build", False))
+        self.artifact_store_check.setChecked(config.get("artifact_store", False))
+        self.artifact_versions_spin.setValue(config.get("artifact_versions", artifact_store.DEFAULT_KEEP_VERSIONS))
+        for fmt, check in self.archive_checks.items():
+            check.setChecked(fmt in (config.get("archive_formats") or []))
+        self.upx_check.setCheckState({True: Qt.Checked, False: Qt.Unchecked}.get(config.get("upx"), Qt.PartiallyChecked))
+        level_index = self.upx_level_combo.findData(config.get("upx_level", 10))
+        self.upx_level_combo.setCurrentIndex(max(0, level_index))
+        self.upx_dir.setText(config.get("upx_dir", ""))
         self.extra_args.setText(config.get("extra_args", ""))
+        self.incremental_data_check.setChecked(config.get("incremental_data", False))
+        self.data_excludes.setText(",".join(config.get("data_excludes") or []))
 
         # 恢复数据文件列表
         self.data_list.clear()
         for data in config.get("data_files", []):
-            self.data_list.addItem(data)
+            self.add_data_item(data)
+        self.scan_data_files()
 
         # 恢复隐藏依赖列表
         self.hidden_list.clear()
         for module in config.get("hidden_imports", []):
             self.hidden_list.addItem(module)
 
+        # 恢复排除模块列表
+        self.exclude_list.clear()
+        for module in config.get("exclude_modules", []):
+            self.exclude_list.addItem(module)
+
+        self.lazy_imports.setText(",".join(config.get("lazy_imports") or []))
+
     def select_script(self):
         file_path, _ = QFileDialog.getOpenFileName(
             self, "选择Python脚本", "", "Python文件 (*.py);;所有文件 (*.*)"
@@ -464,6 +911,8 @@ class PyInstallerPackager(QMainWindow):
             if not self.output_path.text():
                 output_dir = os.path.dirname(file_path)
                 self.output_path.setText(os.path.join(output_dir, "dist"))
+            # 后台分析依赖
+            self.analyze_imports()
 
     def select_output(self):
         dir_path = QFileDialog.getExistingDirectory(
@@ -472,6 +921,11 @@ class PyInstallerPackager(QMainWindow):
         if dir_path:
             self.output_path.setText(dir_path)
 
+    def select_upx_dir(self):
+        dir_path = QFileDialog.getExistingDirectory(self, "选择UPX所在目录")
+        if dir_path:
+            self.upx_dir.setText(dir_path)
+
     def select_icon(self):
         file_path, _ = QFileDialog.getOpenFileName(
             self, "选择图标文件", "", "图标文件 (*.ico);;所有文件 (*.*)"
@@ -493,8 +947,31 @@ class PyInstallerPackager(QMainWindow):
                 target = os.path.dirname(data)
             data = f"{data};{target}"
 
-        self.data_list.addItem(data)
+        self.add_data_item(data)
         self.data_path.clear()
+        self.scan_data_files()
+
+    def add_data_item(self, entry):
+        """数据文件列表项: 显示文本附带扫描结果，配置项保存在 UserRole 中"""
+        item = QListWidgetItem(entry)
+        item.setData(Qt.UserRole, entry)
+        self.data_list.addItem(item)
+
+    def scan_data_files(self):
+        """在后台统计每个数据文件配置的文件数和总大小"""
+        config = self.get_current_config()
+        if not config["data_files"]:
+            return
+        thread = DataScanThread(config, self)
+        thread.entry_scanned.connect(self.data_entry_scanned)
+        thread.finished.connect(thread.deleteLater)
+        thread.start()
+
+    def data_entry_scanned(self, entry, summary):
+        for i in range(self.data_list.count()):
+            item = self.data_list.item(i)
+            if item.data(Qt.UserRole) == entry:
+                item.setText(f"{entry}    [{summary}]")
 
     def add_hidden(self):
         modules = self.hidden_import.text().strip()
@@ -510,6 +987,58 @@ class PyInstallerPackager(QMainWindow):
 
         self.hidden_import.clear()
 
+    def add_exclude(self):
+        modules = self.exclude_module.text().strip()
+        if not modules:
+            QMessageBox.warning(self, "输入错误", "请输入要排除的模块名称")
+            return
+
+        # 支持逗号分隔的多个模块
+        for module in modules.split(","):
+            module = module.strip()
+            if module:
+                self.exclude_list.addItem(module)
+
+        self.exclude_module.clear()
+
+    def analyze_imports(self, show_dialog=False):
+        """在后台线程中分析脚本的导入"""
+        config = self.get_current_config()
+        if not os.path.isfile(config["script_path"]):
+            if show_dialog:
+                QMessageBox.warning(self, "提示", "请先选择要打包的Python脚本")
+            return
+        if getattr(self, "analysis_thread", None) and self.analysis_thread.isRunning():
+            return
+        self.analyze_btn.setEnabled(False)
+        self.statusBar().showMessage("正在分析依赖...")
+        self.analysis_thread = ImportAnalysisThread(config, show_dialog, self)
+        self.analysis_thread.analysis_finished.connect(self.analysis_finished)
+        self.analysis_thread.start()
+
+    def analysis_finished(self, result, show_dialog):
+        self.analyze_btn.setEnabled(True)
+        if "error" in result:
+            self.append_log(f"依赖分析失败: {result['error']}")
+            self.statusBar().showMessage("依赖分析失败")
+            return
+        self.append_log(import_analyzer.format_result(result))
+        count = len(result["hidden"]) + len(result["excludes"])
+        self.statusBar().showMessage(f"依赖分析完成: {count} 条建议")
+        if not show_dialog:
+            return
+        if not count:
+            QMessageBox.information(self, "依赖分析", "没有新的建议")
+            return
+
+        dialog = ImportSuggestionDialog(self, result)
+        if dialog.exec_() == QDialog.Accepted:
+            hidden, excludes = dialog.selected()
+            for module in hidden:
+                self.hidden_list.addItem(module)
+            for module in excludes:
+                self.exclude_list.addItem(module)
+
     def clear_settings(self):
         # 清除所有设置
         self.script_path.clear()
@@ -517,11 +1046,33 @@ class PyInstallerPackager(QMainWindow):
         self.icon_path.clear()
         self.data_list.clear()
         self.hidden_list.clear()
+        self.exclude_list.clear()
         self.onefile_check.setChecked(True)
+        self.onefile_cache_check.setChecked(False)
         self.window_combo.setCurrentIndex(0)
         self.clean_check.setChecked(True)
         self.no_confirm_check.setChecked(True)
         self.auto_save_check.setChecked(True)
+        self.build_cache_check.setChecked(True)
+        self.workpath_pool_check.setChecked(True)
+        self.use_spec_check.setChecked(False)
+        self.importtime_check.setChecked(False)
+        self.pyi_worker_check.setChecked(False)
+        self.bindep_cache_check.setChecked(False)
+        self.build_nice_spin.setValue(0)
+        self.low_io_check.setChecked(False)
+        self.memory_limit_spin.setValue(0)
+        self.remote_build_check.setChecked(False)
+        self.artifact_store_check.setChecked(False)
+        self.artifact_versions_spin.setValue(artifact_store.DEFAULT_KEEP_VERSIONS)
+        for check in self.archive_checks.values():
+            check.setChecked(False)
+        self.upx_check.setCheckState(Qt.PartiallyChecked)
+        self.upx_level_combo.setCurrentIndex(self.upx_level_combo.findData(10))
+        self.upx_dir.clear()
+        self.incremental_data_check.setChecked(False)
+        self.data_excludes.clear()
+        self.lazy_imports.clear()
         self.extra_args.clear()
         self.log_output.clear()
         self.progress_bar.reset()
@@ -529,198 +1080,243 @@ class PyInstallerPackager(QMainWindow):
 
     def build_command(self):
         """构建PyInstaller命令"""
-        script_path = self.script_path.text().strip()
-        if not script_path:
-            QMessageBox.critical(self, "错误", "请选择要打包的Python脚本")
-            return None
-
-        if not os.path.exists(script_path):
-            QMessageBox.critical(self, "错误", "Python脚本不存在")
+        config = self.get_current_config()
+        try:
+            cmd = packager_core.build_command(config)
+        except packager_core.ConfigError as e:
+            QMessageBox.critical(self, "错误", str(e))
             return None
 
-        output_dir = self.output_path.text().strip()
-        if not output_dir:
-            output_dir = os.path.join(os.path.dirname(script_path), "dist")
+        output_dir = packager_core.resolve_output_dir(config)
+        if not self.output_path.text().strip():
             self.output_path.setText(output_dir)
 
         # 创建输出目录
         os.makedirs(output_dir, exist_ok=True)
 
-        # 基本命令
-        cmd = ["pyinstaller"]
-
-        # 单文件选项
-        if self.onefile_check.isChecked():
-            cmd.append("--onefile")
-
-        # 窗口选项
-        window_mode = self.window_combo.currentData()
-        if window_mode:
-            cmd.append(window_mode)
-
-        # 添加图标
-        icon_path = self.icon_path.text().strip()
-        if icon_path and os.path.exists(icon_path):
-            # 处理包含空格的路径
-            if " " in icon_path:
-                icon_path = f'"{icon_path}"'
-            cmd.extend(["--icon", icon_path])
-
-        # 添加数据文件
-        for i in range(self.data_list.count()):
-            data_item = self.data_list.item(i).text()
-            cmd.extend(["--add-data", data_item])
-
-        # 添加隐藏依赖
-        for i in range(self.hidden_list.count()):
-            module = self.hidden_list.item(i).text()
-            cmd.extend(["--hidden-import", module])
-
-        # 清理选项
-        if self.clean_check.isChecked():
-            cmd.append("--clean")
-
-        if self.no_confirm_check.isChecked():
-            cmd.append("--noconfirm")
-
-        # 其他参数
-        extra_args = self.extra_args.text().strip()
-        if extra_args:
-            cmd.extend(extra_args.split())
-
-        # 添加输出目录和工作目录
-        cmd.extend(["--distpath", output_dir])
-        cmd.append(script_path)
-
         return cmd
 
+    def validate_config(self):
+        """检查当前配置能否打包（不生成spec文件），有问题时提示并返回 False"""
+        try:
+            packager_core.validate_config(self.get_current_config())
+        except packager_core.ConfigError as e:
+            QMessageBox.critical(self, "错误", str(e))
+            return False
+        return True
+
     def start_packaging(self):
+        if self.prepare_thread and self.prepare_thread.isRunning():
+            return
+        if self.post_build_thread and self.post_build_thread.isRunning():
+            QMessageBox.warning(self, "警告", "上次打包的收尾处理（保存记录、UPX压缩、归档）还没有完成，请稍后再打包")
+            return
         cmd = self.build_command()
         if not cmd:
             return
 
         # 使用完整路径执行 PyInstaller
-        # 获取Python解释器路径，如果用户没有设置，则使用字符串"python"（希望系统PATH中有）
-        # 尝试查找系统 PyInstaller
-        python_interpreter = self.python_path.text().strip()
-        if python_interpreter and not self.validate_python_path(python_interpreter):
-            QMessageBox.critical(self, "错误", "指定的Python解释器路径无效")
+        # 获取Python解释器路径，如果用户没有设置，则使用当前Python解释器
+        try:
+            cmd = packager_core.build_process_command(self.get_current_config(), cmd)
+        except packager_core.ConfigError as e:
+            QMessageBox.critical(self, "错误", str(e))
             return None
+        python_interpreter = cmd[0]
 
-        # if not python_interpreter.endswith("python") and not python_interpreter.endswith("python3"):
-        #
-        #     pyinstaller_paths = [
-        #         os.path.join(os.path.dirname(sys.executable), "Scripts", "python.exe"),
-        #         os.path.join(os.path.dirname(sys.executable), "python.exe"),
-        #         r"C:\Python38\Scripts\pyinstaller.exe",  # 常见路径
-        #         r"C:\Program Files\Python38\Scripts\pyinstaller.exe"
-        #     ]
-        #
-        #     found = False
-        #     for path in pyinstaller_paths:
-        #         if os.path.exists(path):
-        #             python_interpreter = path
-        #             found = True
-        #             break
-        #
-        #     if not found:
-        #         self.log_output.append("错误: 未找到 pyinstaller.exe")
-        #         self.log_output.append("请确保 PyInstaller 已安装")
-        #         return
-
-        cmd = [python_interpreter, "-m", "PyInstaller"] + cmd[1:]
+        self.clear_log(packager_core.script_name(self.get_current_config()))
+        self.append_log(f"python_interpreter: {python_interpreter}")
 
-        self.log_output.clear()
-        self.log_output.append(f"python_interpreter: {python_interpreter}")
-        self.log_output.append("开始打包...")
-        self.log_output.append(f"执行命令: {' '.join(cmd)}")
+        config = self.get_current_config()
+        if config["use_spec"]:
+            self.append_log(spec_builder.change_message(cmd[-1]))
+
+        # 构建缓存检查和取得共享工作目录需要运行解释器、遍历导入关系并等待其他进程的锁，在后台完成后再启动进程
+        self.statusBar().showMessage("正在准备打包...")
+        self.package_btn.setEnabled(False)
+        self.prepare_thread = PrepareBuildThread(config, cmd, parent=self)
+        self.prepare_thread.message.connect(self.append_log)
+        self.prepare_thread.prepared.connect(self.launch_packaging)
+        self.prepare_thread.finished.connect(self.run_pending_watch_build)
+        self.prepare_thread.start()
+
+    def launch_packaging(self, result):
+        """准备完成后启动打包进程；构建缓存命中时直接结束"""
+        config, cmd = result["config"], result["cmd"]
+        self.build_plan = result["build_plan"]
+        self.pool_workpath = result["workpath"]
+        if result["error"]:
+            self.append_log(f"准备打包失败: {result['error']}")
+            self.statusBar().showMessage("打包失败")
+            self.package_btn.setEnabled(True)
+            return
+        if result["skip"]:
+            self.package_btn.setEnabled(True)
+            self.packaging_skipped()
+            return
+
+        self.build_stopped = False
+        self.append_log("开始打包...")
+        self.append_log(f"执行命令: {' '.join(cmd)}")
         self.statusBar().showMessage("打包中...")
         self.package_btn.setEnabled(False)
         self.force_stop_btn.setEnabled(True)
 
-        # 重置进度条
+        # 重置进度条，进度根据PyInstaller日志中的阶段计算
         self.progress_value = 0
+        self.build_run = build_history.BuildRun(config, cmd)
+        self.build_run.start()
         self.progress_bar.setValue(0)
         self.progress_bar.setTextVisible(True)
         self.progress_bar.setFormat("正在启动打包进程...")
-        self.progress_timer.start(100)  # 每100毫秒更新一次进度
+        self.progress_timer.start(200)  # 每200毫秒更新一次进度
 
         # 设置工作目录为脚本所在目录
-        work_dir = os.path.dirname(self.script_path.text())
+        work_dir = os.path.dirname(config["script_path"])
 
         # 启动进程
         try:
             self.process.setWorkingDirectory(work_dir)
-            self.process.start(cmd[0], cmd[1:])
-
-            if not self.process.waitForStarted(5000):  # 5秒超时
-                self.log_output.append("进程启动超时！")
-                self.log_output.append(f"请检查 PyInstaller 是否安装: pip install pyinstaller")
-                self.packaging_finished(-1, QProcess.CrashExit)
+            launch_cmd = build_queue.launch_command(config, cmd)
+            # 启动结果通过 started/errorOccurred 信号通知，5秒内没有启动视为超时
+            self.start_timer.start(PROCESS_START_TIMEOUT)
+            self.process.start(launch_cmd[0], launch_cmd[1:])
         except Exception as e:
-            self.log_output.append(f"启动进程失败: {str(e)}")
+            self.append_log(f"启动进程失败: {str(e)}")
             self.packaging_finished(-1, QProcess.CrashExit)
 
-    def force_stop(self):
-        """强制停止打包进程"""
-        if self.process.state() == QProcess.Running:
-            self.log_output.append("<font color='red'>用户请求强制停止打包进程...</font>")
-            self.log_output.append("<font color='red'>正在终止打包进程...</font>")
-            self.statusBar().showMessage("正在强制停止...")
-
-            # 尝试优雅终止
-            self.process.terminate()
+    def process_error(self, error):
+        """进程无法启动时结束本次打包（运行中的错误由 finished 信号处理）"""
+        if error != QProcess.FailedToStart:
+            return
+        self.start_timer.stop()
+        if not self.build_stopped:
+            self.append_log(f"启动进程失败: {self.process.errorString()}")
+            self.append_log(f"请检查 PyInstaller 是否安装: pip install pyinstaller")
+        self.packaging_finished(-1, QProcess.CrashExit)
+
+    def start_timed_out(self):
+        """进程在超时时间内没有启动"""
+        if self.process.state() != QProcess.Starting:
+            return
+        self.append_log("进程启动超时！")
+        self.append_log(f"请检查 PyInstaller 是否安装: pip install pyinstaller")
+        # 启动中的进程被杀死后会发出 FailedToStart 错误，由 process_error 结束打包
+        self.process.kill()
 
-            # 设置超时，如果5秒内未终止则强制杀死
-            if not self.process.waitForFinished(5000):
-                self.log_output.append("<font color='red'>进程未响应，强制杀死...</font>")
-                self.process.kill()
+    def force_stop(self, keep_workpath=False):
+        """强制停止打包进程（不阻塞界面）
 
-            self.log_output.append("<font color='red'>打包进程已强制终止</font>")
-            self.statusBar().showMessage("打包已取消")
+        先终止整个进程树，超时仍未退出时强制杀死；再次点击时立即强制杀死。进程退出后由
+        packaging_finished 完成清理。keep_workpath 为 True 时（监视模式取消过期的打包）保留工作目录，
+        马上重新打包时仍可增量构建。
+        """
+        if self.process.state() == QProcess.NotRunning:
+            return
+        if self.process.state() == QProcess.Starting:
+            self.build_stopped = True
+            self.stop_keep_workpath = keep_workpath
+            self.process.kill()
+            return
+        if self.build_stopped:
+            self.kill_process_tree()
+            return
 
-            # 清理临时文件
-            self.cleanup_after_stop()
+        if keep_workpath:
+            self.append_log("源码已再次修改，取消当前打包...")
+        else:
+            self.append_log("用户请求强制停止打包进程...")
+        self.append_log("正在终止打包进程...")
+        self.statusBar().showMessage("正在强制停止...")
+        self.force_stop_btn.setText("立即结束")
+
+        # 尝试优雅终止整个进程树，超时后强制杀死
+        self.build_stopped = True
+        self.stop_keep_workpath = keep_workpath
+        self.stop_pids = proc_utils.process_tree(self.process.processId())
+        proc_utils.signal_processes(self.stop_pids[1:])
+        self.process.terminate()
+        self.kill_timer.start(int(proc_utils.STOP_TIMEOUT * 1000))
+
+    def kill_process_tree(self):
+        """强制杀死打包进程树（包括主进程已退出后遗留的子进程）"""
+        self.kill_timer.stop()
+        if self.process.state() != QProcess.NotRunning:
+            self.append_log("进程未响应，强制杀死...")
+            self.process.kill()
+        proc_utils.signal_processes(self.stop_pids[1:], kill=True)
+
+    def cleanup_after_stop(self, config, cmd=None):
+        """强制停止后在后台清理临时文件"""
+        # 共享工作目录在打包结束时已经丢弃，这里只处理脚本目录下的 build 目录
+        if packager_core.use_workpath_pool(config):
+            return
+        build_dir = packager_core.resolve_workpath(config, cmd)
 
-            # 重置UI状态
-            self.package_btn.setEnabled(True)
-            self.force_stop_btn.setEnabled(False)
-            self.progress_timer.stop()
-            self.progress_bar.setValue(0)
-            self.progress_bar.setFormat("已取消")
+        if os.path.exists(build_dir):
+            self.append_log(f"正在后台清理临时目录: {build_dir}")
+            packager_core.remove_tree_async(build_dir)
 
-    def cleanup_after_stop(self):
-        """强制停止后清理临时文件"""
-        script_path = self.script_path.text().strip()
-        if not script_path:
+    def update_progress(self):
+        """更新进度条显示"""
+        if self.process.state() == QProcess.Running and self.build_run:
+            self.progress_value = self.build_run.tracker.progress()
+            self.progress_bar.setValue(self.progress_value)
+            status = self.build_run.tracker.status_text()
+            self.progress_bar.setFormat(status)
+            self.statusBar().showMessage(f"打包中: {status}")
+
+    def append_log(self, text):
+        """追加一行日志"""
+        self.append_output(text + "\n")
+
+    def append_output(self, text):
+        """追加进程输出（原样追加，可能是不完整的行）"""
+        self.log_spool.write(text)
+        if not self.log_flush_timer.isActive():
+            self.log_flush_timer.start(LOG_FLUSH_INTERVAL)
+
+    def flush_log(self):
+        """把缓冲中的日志批量刷新到界面"""
+        text = self.log_spool.take_pending()
+        if not text:
             return
+        scrollbar = self.log_output.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 2
+        cursor = QTextCursor(self.log_output.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text)
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
+
+    def clear_log(self, name="session"):
+        """清空日志显示，并开始新的日志文件"""
+        self.log_spool.take_pending()
+        self.log_spool.close()
+        self.log_spool = log_spool.LogSpool(name or "session")
+        self.log_output.clear()
 
-        script_name = os.path.splitext(os.path.basename(script_path))[0]
-        build_dir = os.path.join(os.path.dirname(script_path), "build", script_name)
-
-        # 尝试删除build目录
+    def search_log(self):
+        """在完整日志文件中搜索"""
+        pattern = self.log_search.text()
+        if not pattern:
+            return
         try:
-            if os.path.exists(build_dir):
-                self.log_output.append(f"正在清理临时目录: {build_dir}")
-                subprocess.run(f'rmdir /s /q "{build_dir}"', shell=True, check=True)
-        except Exception as e:
-            self.log_output.append(f"清理临时目录失败: {str(e)}")
+            results = self.log_spool.search(pattern, regex=self.log_regex_check.isChecked())
+        except re.error as e:
+            QMessageBox.warning(self, "搜索失败", f"正则表达式错误: {str(e)}")
+            return
+        LogSearchDialog(self, pattern, results, self.log_spool.path).exec_()
 
-    def update_progress(self):
-        """更新进度条显示"""
-        if self.process.state() == QProcess.Running:
-            # 简单的进度模拟
-            if self.progress_value < 95:
-                self.progress_value += 1
-                self.progress_bar.setValue(self.progress_value)
-
-                # 更新进度文本
-                if self.progress_value < 30:
-                    self.progress_bar.setFormat("正在收集依赖...")
-                elif self.progress_value < 60:
-                    self.progress_bar.setFormat("正在编译二进制...")
-                else:
-                    self.progress_bar.setFormat("正在生成可执行文件...")
+    def open_log_file(self):
+        """用系统默认程序打开完整日志"""
+        self.log_spool.flush()
+        QDesktopServices.openUrl(QUrl.fromLocalFile(self.log_spool.path))
+
+    def process_started(self):
+        """进程启动后开始采样内存占用"""
+        if self.build_run:
+            self.build_run.process_started(self.process.processId())
 
     def process_state_changed(self, state):
         """处理进程状态变化"""
@@ -730,28 +1326,66 @@ class PyInstallerPackager(QMainWindow):
     def handle_stdout(self):
         data = self.process.readAllStandardOutput()
         stdout = bytes(data).decode("utf-8", errors="ignore")
-        self.log_output.append(stdout)
+        self.append_output(stdout)
 
         # 根据输出更新进度
-        if "INFO: Analyzing" in stdout:
-            self.progress_bar.setFormat("分析依赖中...")
-        elif "INFO: Building" in stdout:
-            self.progress_bar.setFormat("构建二进制中...")
-        elif "INFO: Appending" in stdout:
-            self.progress_bar.setFormat("添加依赖中...")
+        if self.build_run:
+            self.build_run.feed(stdout)
 
     def handle_stderr(self):
         data = self.process.readAllStandardError()
         stderr = bytes(data).decode("utf-8", errors="ignore")
-        self.log_output.append(f"<font color='red'>{stderr}</font>")
+        self.append_output(stderr)
+
+        # PyInstaller 的日志输出在 stderr 中
+        if self.build_run:
+            self.build_run.feed(stderr)
 
     def packaging_finished(self, exit_code, exit_status):
+        # 进程被信号终止（强制停止）时 Qt 报告的退出码为 0
+        if exit_status == QProcess.CrashExit and exit_code == 0:
+            exit_code = -1
         self.package_btn.setEnabled(True)
         self.force_stop_btn.setEnabled(False)
+        self.force_stop_btn.setText("强制停止")
         self.progress_timer.stop()
-
-        if exit_code == 0:
-            self.log_output.append("\n打包成功完成!")
+        self.start_timer.stop()
+        self.kill_timer.stop()
+        stopped = self.build_stopped
+        if stopped:
+            # 主进程退出时被终止的子进程可能还没有退出，超时后强制杀死遗留的进程
+            self.build_stopped = False
+            discard = not self.stop_keep_workpath
+            if self.stop_pids[1:]:
+                proc_utils.kill_later(self.stop_pids[1:])
+            self.stop_pids = []
+        else:
+            discard = False
+
+        # 释放共享工作目录（统计目录大小）、保存打包记录和检查性能退化需要遍历目录和读写数据库，
+        # 连同成功后的UPX压缩、存入对象库和归档一起在后台完成，最后写入构建缓存
+        build_config = self.build_run.config if self.build_run else self.get_current_config()
+        build_command = self.build_run.command if self.build_run else None
+        self.post_build_thread = PostBuildThread(
+            build_config, exit_code, build_run=self.build_run,
+            pool_workpath=self.pool_workpath, discard=discard, stopped=stopped, build_plan=self.build_plan, parent=self)
+        self.post_build_thread.message.connect(self.append_log)
+        self.post_build_thread.post_build_failed.connect(self.post_build_failed)
+        self.post_build_thread.finished.connect(self.run_pending_watch_build)
+        self.post_build_thread.start()
+        self.pool_workpath = None
+        self.build_run = None
+        self.build_plan = None
+
+        if stopped:
+            self.append_log("打包进程已强制终止")
+            self.statusBar().showMessage("打包已取消")
+            self.progress_bar.setValue(0)
+            self.progress_bar.setFormat("已取消")
+            if discard:
+                self.cleanup_after_stop(build_config, build_command)
+        elif exit_code == 0:
+            self.append_log("\n打包成功完成!")
             self.statusBar().showMessage("打包成功")
             self.progress_bar.setValue(100)
             self.progress_bar.setFormat("完成")
@@ -759,16 +1393,88 @@ class PyInstallerPackager(QMainWindow):
             # 打开输出目录
             output_dir = self.output_path.text()
             if os.path.exists(output_dir):
-                self.log_output.append(f"\n输出目录: {output_dir}")
-
-                # 添加打开文件夹按钮
-                self.log_output.append('<a href="open_folder">点击此处打开输出目录</a>')
+                self.append_log(f"\n输出目录: {output_dir}")
         else:
-            self.log_output.append("\n打包失败!")
+            self.append_log("\n打包失败!")
             self.statusBar().showMessage("打包失败")
             self.progress_bar.setValue(0)
             self.progress_bar.setFormat("失败")
-            QMessageBox.critical(self, "打包失败", "打包过程中发生错误，请查看日志获取详细信息")
+            # 监视模式下修改后会自动重新打包（后台处理结束后开始），不弹窗打断编辑
+            if not self.watcher:
+                QMessageBox.critical(self, "打包失败", "打包过程中发生错误，请查看日志获取详细信息")
+
+    def post_build_failed(self, error):
+        """打包后处理失败: 产物不完整，按打包失败处理（构建缓存没有写入，下次会重新打包）"""
+        self.append_log(error)
+        self.append_log("\n打包失败!")
+        self.statusBar().showMessage("打包失败")
+        self.progress_bar.setValue(0)
+        self.progress_bar.setFormat("失败")
+        if not self.watcher:
+            QMessageBox.critical(self, "打包失败", error)
+
+    def packaging_skipped(self):
+        """构建缓存命中: 产物没有变化，不执行后续处理（重复存入对象库、重新归档或压缩会改变产物）"""
+        self.append_log("\n打包成功完成（产物没有变化）!")
+        self.statusBar().showMessage("打包成功（未变化）")
+        self.progress_bar.setValue(100)
+        self.progress_bar.setFormat("完成")
+        output_dir = self.output_path.text()
+        if os.path.exists(output_dir):
+            self.append_log(f"\n输出目录: {output_dir}")
+
+    def toggle_watch(self, checked):
+        """开启或关闭监视模式"""
+        if not checked:
+            if self.watcher:
+                self.watcher.close()
+                self.watcher = None
+                self.watch_rebuild_pending = False
+                self.append_log("已停止监视")
+                self.statusBar().showMessage("已停止监视")
+            return
+        try:
+            packager_core.validate_config(self.get_current_config())
+        except packager_core.ConfigError as e:
+            QMessageBox.critical(self, "错误", str(e))
+            self.watch_btn.setChecked(False)
+            return
+        self.watcher = file_watcher.Watcher(self.watch_changed.emit)
+        files, directories = self.watcher.watch_config(self.get_current_config())
+        self.watcher.start()
+        self.append_log(f"开始监视 {len(files)} 个文件和 {len(directories)} 个目录（{self.watcher.backend_name}），"
+                        f"修改后自动打包")
+        self.statusBar().showMessage("监视中")
+        self.watch_rebuild_pending = True
+        self.run_pending_watch_build()
+
+    def on_watch_changed(self, paths):
+        """监视到修改: 打包中时取消当前打包，结束后使用最新的源码重新打包"""
+        if not self.watcher:
+            return
+        names = ", ".join(os.path.basename(path) for path in paths[:3])
+        more = f" 等 {len(paths)} 个文件" if len(paths) > 3 else ""
+        self.append_log(f"\n检测到修改: {names}{more}")
+        self.watch_rebuild_pending = True
+        if self.process.state() != QProcess.NotRunning:
+            self.force_stop(keep_workpath=True)
+        else:
+            self.run_pending_watch_build()
+
+    def run_pending_watch_build(self):
+        """监视模式下有等待的修改且当前没有打包时开始打包"""
+        if not self.watcher or not self.watch_rebuild_pending:
+            return
+        if self.process.state() != QProcess.NotRunning:
+            return
+        if self.prepare_thread and self.prepare_thread.isRunning():
+            return
+        if self.post_build_thread and self.post_build_thread.isRunning():
+            return
+        self.watch_rebuild_pending = False
+        # 导入关系可能已经变化，每次打包前更新监视范围
+        self.watcher.watch_config(self.get_current_config())
+        self.start_packaging()
 
     def show_about(self):
         """显示关于对话框"""
@@ -809,17 +1515,1040 @@ class PyInstallerPackager(QMainWindow):
 
     def validate_python_path(self, path):
         """验证Python解释器路径是否有效"""
-        if not os.path.isfile(path):
-            return False
+        return packager_core.validate_python_path(path)
+
+    def show_build_history(self):
+        """显示构建历史窗口"""
+        config = self.get_current_config()
+        config_hash = packager_core.config_hash(config) if config["script_path"] else None
+        BuildHistoryDialog(self, config_hash).exec_()
+
+    def show_bundle_analysis(self):
+        """显示产物分析窗口"""
+        config = self.get_current_config()
+        if not config["script_path"]:
+            QMessageBox.warning(self, "警告", "请先选择要打包的Python脚本")
+            return
+        BundleAnalysisDialog(self, packager_core.normalize_config(config)).exec_()
+
+    def show_workpath_pool(self):
+        """显示工作目录缓存窗口"""
+        WorkpathPoolDialog(self).exec_()
+
+    def show_build_agents(self):
+        """显示构建代理窗口"""
+        BuildAgentDialog(self).exec_()
+
+    def show_artifact_versions(self):
+        """显示产物版本窗口"""
+        if not self.script_path.text():
+            QMessageBox.warning(self, "警告", "请先选择Python脚本文件")
+            return
+        ArtifactStoreDialog(self.get_current_config(), self).exec_()
+
+    def show_benchmark(self):
+        """显示启动性能对比窗口"""
+        if not self.validate_config():
+            return
+        BenchmarkDialog(self, packager_core.normalize_config(self.get_current_config())).exec_()
+
+    def show_build_matrix(self):
+        """显示矩阵打包窗口"""
+        if not self.validate_config():
+            return
+        MatrixDialog(self, packager_core.normalize_config(self.get_current_config())).exec_()
+
+    def show_build_queue(self):
+        """显示批量打包窗口"""
+        if not hasattr(self, "queue_dialog"):
+            self.queue_dialog = BuildQueueDialog(self)
+        self.queue_dialog.show()
+        self.queue_dialog.raise_()
+
+
+class DataScanThread(QThread):
+    """后台扫描数据文件，逐项报告文件数和总大小"""
+
+    entry_scanned = pyqtSignal(str, str)
+
+    def __init__(self, config, parent=None):
+        super().__init__(parent)
+        self.config = config
+
+    def run(self):
+        config = packager_core.normalize_config(self.config)
+        base_dir = data_files.base_dir_for(config)
+        for entry in config["data_files"]:
+            files = data_files.resolve_entry(entry, base_dir, config["data_excludes"])[0]
+            self.entry_scanned.emit(entry, data_files.format_summary(files))
+
+
+class ImportAnalysisThread(QThread):
+    """后台运行依赖分析"""
+
+    analysis_finished = pyqtSignal(dict, bool)
+
+    def __init__(self, config, show_dialog, parent=None):
+        super().__init__(parent)
+        self.config = config
+        self.show_dialog = show_dialog
 
-        # 检查是否包含Python可执行文件
-        exe_name = os.path.basename(path).lower()
-        valid_names = {
-            "python", "python.exe",
-            "python3", "python3.exe",
-            "pythonw", "pythonw.exe"
+    def run(self):
+        try:
+            result = import_analyzer.analyze(self.config)
+        except Exception as e:
+            result = {"error": str(e)}
+        self.analysis_finished.emit(result, self.show_dialog)
+
+
+class ImportSuggestionDialog(QDialog):
+    """依赖分析建议，勾选后添加到配置"""
+
+    def __init__(self, parent, result):
+        super().__init__(parent)
+        self.setWindowTitle("依赖分析建议")
+        self.resize(700, 450)
+
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+
+        layout.addWidget(QLabel("建议添加的隐藏依赖:"))
+        self.hidden_list = self.create_list(result["hidden"])
+        layout.addWidget(self.hidden_list)
+
+        layout.addWidget(QLabel("建议排除的模块 (可减少打包时间和体积):"))
+        self.exclude_list = self.create_list(result["excludes"])
+        layout.addWidget(self.exclude_list)
+
+        if result["warnings"]:
+            warning_label = QLabel("\n".join(result["warnings"]))
+            warning_label.setWordWrap(True)
+            layout.addWidget(warning_label)
+
+        button_layout = QHBoxLayout()
+        layout.addLayout(button_layout)
+        button_layout.addStretch()
+        apply_btn = QPushButton("添加选中项")
+        apply_btn.clicked.connect(self.accept)
+        button_layout.addWidget(apply_btn)
+        cancel_btn = QPushButton("取消")
+        cancel_btn.clicked.connect(self.reject)
+        button_layout.addWidget(cancel_btn)
+
+    def create_list(self, suggestions):
+        list_widget = QListWidget()
+        for name, reason in suggestions:
+            item = QListWidgetItem(f"{name}    ({reason})")
+            item.setData(Qt.UserRole, name)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked)
+            list_widget.addItem(item)
+        return list_widget
+
+    def checked_names(self, list_widget):
+        return [list_widget.item(i).data(Qt.UserRole) for i in range(list_widget.count())
+                if list_widget.item(i).checkState() == Qt.Checked]
+
+    def selected(self):
+        """返回 (勾选的隐藏依赖, 勾选的排除模块)"""
+        return self.checked_names(self.hidden_list), self.checked_names(self.exclude_list)
+
+
+class PrepareBuildThread(QThread):
+    """打包前在后台检查构建缓存并取得共享工作目录，结果通过 prepared 信号返回:
+    {"config", "cmd", "skip", "build_plan", "workpath", "error"}"""
+
+    message = pyqtSignal(str)
+    prepared = pyqtSignal(dict)
+
+    def __init__(self, config, cmd, parent=None):
+        super().__init__(parent)
+        self.config = config
+        self.cmd = cmd
+
+    def run(self):
+        config, cmd = self.config, self.cmd
+        result = {"config": config, "cmd": cmd, "skip": False, "build_plan": None, "workpath": None, "error": ""}
+        try:
+            # 共享工作目录: 按配置和解释器复用 --workpath
+            if packager_core.use_workpath_pool(config):
+                cmd = build_queue.insert_options(cmd, ["--workpath", workpath_pool.workpath_for(config)])
+
+            # 构建缓存: 没有变化时跳过，只有源码变化时保留工作目录
+            if config["build_cache"]:
+                action, cmd, fingerprint, message = build_cache.plan_build(config, cmd)
+                self.message.emit(message)
+                if action == build_cache.SKIP:
+                    result["skip"] = True
+                    self.prepared.emit(result)
+                    return
+                result["build_plan"] = (config, fingerprint)
+
+            # 同一配置的另一个打包正在使用共享目录时得到独立的工作目录
+            if packager_core.use_workpath_pool(config):
+                workpath, hit = workpath_pool.acquire(config)
+                cmd = build_queue.replace_option(cmd, "--workpath", workpath)
+                result["workpath"] = workpath
+                self.message.emit(f"{'使用已有' if hit else '新建'}工作目录: {workpath}")
+        except Exception as e:
+            result["error"] = str(e)
+        result["cmd"] = cmd
+        self.prepared.emit(result)
+
+
+class PostBuildThread(QThread):
+    """打包结束后在后台完成收尾: 释放共享工作目录、保存打包记录并检查性能退化；
+    成功时再统计产物组成，执行UPX压缩、存入产物对象库和生成归档，完成后写入构建缓存"""
+
+    message = pyqtSignal(str)
+    # 打包后处理失败（如数据文件没有复制到产物中），产物不完整
+    post_build_failed = pyqtSignal(str)
+
+    def __init__(self, config, exit_code, build_run=None, pool_workpath=None, discard=False, stopped=False,
+                 build_plan=None, parent=None):
+        super().__init__(parent)
+        self.config = config
+        self.exit_code = exit_code
+        self.build_run = build_run
+        self.pool_workpath = pool_workpath
+        self.discard = discard
+        self.stopped = stopped
+        self.build_plan = build_plan
+
+    def run(self):
+        # QThread 中未处理的异常会使整个程序退出，各步骤的错误只输出到日志
+        try:
+            self.record_run()
+        except Exception as e:
+            self.message.emit(f"保存打包记录失败: {str(e)}")
+        if self.exit_code == 0 and not self.stopped:
+            try:
+                build_queue.post_build(self.config, self.message.emit)
+                if self.build_plan:
+                    build_cache.record_build(*self.build_plan)
+            except Exception as e:
+                self.post_build_failed.emit(f"打包后处理失败: {str(e)}")
+        # 最后释放工作目录: 产物分析需要读取其中的文件，独立的工作目录释放时会被删除
+        if self.pool_workpath:
+            try:
+                workpath_pool.release(self.pool_workpath, discard=self.discard)
+            except Exception as e:
+                self.message.emit(f"释放工作目录失败: {str(e)}")
+
+    def record_run(self):
+        """记录本次打包的阶段耗时、内存峰值和产物大小，检查性能退化"""
+        if self.build_run:
+            self.build_run.finish(self.exit_code)
+            summary = self.build_run.tracker.summary()
+            if self.exit_code == 0 and summary:
+                self.message.emit(summary)
+            if self.build_run.peak_rss:
+                self.message.emit(f"峰值内存: {proc_utils.format_size(self.build_run.peak_rss)}")
+            for message in build_history.find_regressions(packager_core.config_hash(self.build_run.config)):
+                self.message.emit(message)
+            # 产物中体积最大的包
+            if self.exit_code == 0 and not self.stopped:
+                try:
+                    workpath = packager_core.resolve_workpath(self.build_run.config, self.build_run.command)
+                    self.message.emit(bundle_analyzer.format_bundle(bundle_analyzer.analyze_bundle(workpath), top=5))
+                except (OSError, ValueError, SyntaxError):
+                    pass
+
+
+class StartupProfileThread(QThread):
+    """后台运行打包后的程序并统计导入耗时"""
+
+    profile_finished = pyqtSignal(dict)
+
+    def __init__(self, executable, parent=None, extra_env=None):
+        super().__init__(parent)
+        self.executable = executable
+        self.extra_env = extra_env
+
+    def run(self):
+        try:
+            result = bundle_analyzer.profile_startup(self.executable, extra_env=self.extra_env)
+        except Exception as e:
+            result = {"error": str(e)}
+        self.profile_finished.emit(result)
+
+
+class BundleAnalysisDialog(QDialog):
+    """产物分析窗口: 各个包占用的体积，启动时各模块的导入耗时，以及延迟导入建议"""
+
+    def __init__(self, parent, config):
+        super().__init__(parent)
+        self.setWindowTitle("产物分析")
+        self.resize(850, 600)
+        self.config = config
+        self.profile_thread = None
+
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+
+        self.result_output = QPlainTextEdit()
+        self.result_output.setReadOnly(True)
+        self.result_output.setFont(QFont("Consolas", 10))
+        layout.addWidget(self.result_output)
+
+        # 统计启动耗时后列出建议延迟导入的模块，勾选后应用到主窗口的配置
+        self.lazy_group = QGroupBox("延迟导入（勾选后应用，重新打包生效）")
+        lazy_layout = QHBoxLayout()
+        self.lazy_group.setLayout(lazy_layout)
+        self.lazy_list = QListWidget()
+        self.lazy_list.setMaximumHeight(120)
+        lazy_layout.addWidget(self.lazy_list)
+        self.lazy_apply_btn = QPushButton("应用")
+        self.lazy_apply_btn.clicked.connect(self.apply_lazy_imports)
+        lazy_layout.addWidget(self.lazy_apply_btn)
+        self.lazy_group.setVisible(False)
+        layout.addWidget(self.lazy_group)
+
+        button_layout = QHBoxLayout()
+        layout.addLayout(button_layout)
+        self.profile_btn = QPushButton("运行并统计启动耗时")
+        self.profile_btn.setToolTip("需要勾选\"启动耗时分析\"后打包")
+        self.profile_btn.setEnabled(config["importtime_hook"])
+        self.profile_btn.clicked.connect(self.start_profile)
+        button_layout.addWidget(self.profile_btn)
+        button_layout.addStretch()
+        close_btn = QPushButton("关闭")
+        close_btn.clicked.connect(self.reject)
+        button_layout.addWidget(close_btn)
+
+        try:
+            result = bundle_analyzer.analyze_bundle(packager_core.resolve_workpath(config))
+            self.result_output.setPlainText(bundle_analyzer.format_bundle(result, top=30))
+        except (OSError, ValueError, SyntaxError) as e:
+            self.result_output.setPlainText(f"无法读取打包中间文件，请先完成一次打包: {str(e)}")
+
+    def start_profile(self):
+        self.profile_btn.setEnabled(False)
+        self.result_output.appendPlainText("\n正在运行程序统计启动耗时...")
+        # 关闭已有的延迟导入，统计所有模块的实际导入耗时
+        self.profile_thread = StartupProfileThread(packager_core.executable_path(self.config), self,
+                                                   {lazy_imports.DISABLE_ENV: "0"})
+        self.profile_thread.profile_finished.connect(self.profile_finished)
+        self.profile_thread.start()
+
+    def profile_finished(self, result):
+        self.profile_btn.setEnabled(True)
+        if "error" in result:
+            self.result_output.appendPlainText(f"启动耗时分析失败: {result['error']}")
+        else:
+            self.result_output.appendPlainText(bundle_analyzer.format_startup(result, top=30))
+            self.show_lazy_suggestions(result)
+
+    def show_lazy_suggestions(self, result):
+        current = self.config["lazy_imports"]
+        rows = lazy_imports.suggest(result, self.config)
+        self.result_output.appendPlainText("\n" + lazy_imports.format_suggestions(rows, current))
+        # 已配置但这次没有达到阈值的模块也列出，便于取消
+        names = [name for name, _ in rows] + [name for name in current if name not in dict(rows)]
+        times = dict(rows)
+        self.lazy_list.clear()
+        for name in names:
+            label = f"{name}  ({times[name] * 1000:.0f}ms)" if name in times else name
+            item = QListWidgetItem(label)
+            item.setData(Qt.UserRole, name)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked if name in current else Qt.Unchecked)
+            self.lazy_list.addItem(item)
+        self.lazy_group.setVisible(bool(names))
+
+    def apply_lazy_imports(self):
+        modules = [self.lazy_list.item(i).data(Qt.UserRole) for i in range(self.lazy_list.count())
+                   if self.lazy_list.item(i).checkState() == Qt.Checked]
+        self.config["lazy_imports"] = modules
+        self.parent().lazy_imports.setText(",".join(modules))
+        self.result_output.appendPlainText(f"已设置延迟导入: {', '.join(modules) or '无'}，重新打包后生效")
+
+    def reject(self):
+        if self.profile_thread and self.profile_thread.isRunning():
+            self.profile_thread.wait()
+        super().reject()
+
+
+class BenchmarkThread(QThread):
+    """后台按各种打包方式打包并测量启动耗时"""
+
+    output = pyqtSignal(str)
+    benchmark_finished = pyqtSignal(str)
+
+    def __init__(self, config, options, parent=None):
+        super().__init__(parent)
+        self.config = config
+        self.options = options
+
+    def run(self):
+        try:
+            results = startup_benchmark.run_benchmark(self.config, on_output=self.output.emit, **self.options)
+            self.benchmark_finished.emit(startup_benchmark.format_results(results))
+        except Exception as e:
+            self.benchmark_finished.emit(f"启动性能对比失败: {str(e)}")
+
+
+class BenchmarkDialog(QDialog):
+    """启动性能对比: 同一配置分别以单文件/目录模式打包，多次启动比较耗时和体积"""
+
+    def __init__(self, parent, config):
+        super().__init__(parent)
+        self.setWindowTitle("启动性能对比")
+        self.resize(850, 500)
+        self.config = config
+        self.thread = None
+
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+
+        option_layout = QHBoxLayout()
+        layout.addLayout(option_layout)
+        option_layout.addWidget(QLabel("热启动次数:"))
+        self.runs_spin = QSpinBox()
+        self.runs_spin.setRange(1, 200)
+        self.runs_spin.setValue(10)
+        option_layout.addWidget(self.runs_spin)
+        option_layout.addWidget(QLabel("冷启动次数:"))
+        self.cold_runs_spin = QSpinBox()
+        self.cold_runs_spin.setRange(0, 50)
+        self.cold_runs_spin.setValue(3)
+        option_layout.addWidget(self.cold_runs_spin)
+        self.upx_check = QCheckBox("对比UPX压缩")
+        option_layout.addWidget(self.upx_check)
+        self.optimize_check = QCheckBox("对比 --optimize 2")
+        option_layout.addWidget(self.optimize_check)
+        self.lazy_check = QCheckBox("对比延迟导入")
+        self.lazy_check.setToolTip("每种方式再关闭延迟导入测量一次（同一产物，通过环境变量关闭）")
+        self.lazy_check.setEnabled(bool(config["lazy_imports"]))
+        option_layout.addWidget(self.lazy_check)
+        option_layout.addStretch()
+
+        args_layout = QHBoxLayout()
+        layout.addLayout(args_layout)
+        args_layout.addWidget(QLabel("测试参数:"))
+        self.args_edit = QLineEdit()
+        self.args_edit.setPlaceholderText("启动时传入的参数，程序需要能自行退出，例如 --version")
+        args_layout.addWidget(self.args_edit)
+
+        self.result_output = QPlainTextEdit()
+        self.result_output.setReadOnly(True)
+        self.result_output.setFont(QFont("Consolas", 10))
+        layout.addWidget(self.result_output)
+
+        button_layout = QHBoxLayout()
+        layout.addLayout(button_layout)
+        button_layout.addStretch()
+        self.start_btn = QPushButton("开始对比")
+        self.start_btn.clicked.connect(self.start_benchmark)
+        button_layout.addWidget(self.start_btn)
+
+    def start_benchmark(self):
+        self.start_btn.setEnabled(False)
+        self.result_output.clear()
+        options = {
+            "runs": self.runs_spin.value(),
+            "cold_runs": self.cold_runs_spin.value(),
+            "args": self.args_edit.text(),
+            "upx": self.upx_check.isChecked(),
+            "optimize_levels": [0, 2] if self.optimize_check.isChecked() else None,
+            "lazy": self.lazy_check.isChecked(),
         }
-        return exe_name in valid_names
+        self.thread = BenchmarkThread(self.config, options, self)
+        self.thread.output.connect(self.result_output.appendPlainText)
+        self.thread.benchmark_finished.connect(self.benchmark_finished)
+        self.thread.start()
+
+    def benchmark_finished(self, text):
+        self.start_btn.setEnabled(True)
+        self.result_output.appendPlainText("\n" + text)
+
+    def reject(self):
+        if self.thread and self.thread.isRunning():
+            QMessageBox.information(self, "提示", "正在对比中，请等待完成")
+            return
+        super().reject()
+
+
+class WorkpathPoolDialog(QDialog):
+    """工作目录缓存: 占用空间、命中率，以及手动清理"""
+
+    COLUMNS = ["名称", "大小", "最近使用", "命中/使用", "解释器"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("工作目录缓存")
+        self.resize(800, 400)
+        self.keys = []
+
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+
+        option_layout = QHBoxLayout()
+        layout.addLayout(option_layout)
+        self.summary_label = QLabel("")
+        option_layout.addWidget(self.summary_label)
+        option_layout.addStretch()
+        option_layout.addWidget(QLabel("大小上限 (GB):"))
+        self.max_spin = QSpinBox()
+        self.max_spin.setRange(1, 1024)
+        self.max_spin.setValue(max(1, round(workpath_pool.stats()["max_bytes"] / 1024 ** 3)))
+        self.max_spin.editingFinished.connect(self.apply_max_size)
+        option_layout.addWidget(self.max_spin)
+
+        self.entry_table = QTableWidget(0, len(self.COLUMNS))
+        self.entry_table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.entry_table.horizontalHeader().setSectionResizeMode(4, QHeaderView.Stretch)
+        self.entry_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.entry_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        layout.addWidget(self.entry_table)
+
+        button_layout = QHBoxLayout()
+        layout.addLayout(button_layout)
+        button_layout.addStretch()
+        remove_btn = QPushButton("删除选中")
+        remove_btn.clicked.connect(self.remove_selected)
+        button_layout.addWidget(remove_btn)
+        clear_btn = QPushButton("全部清空")
+        clear_btn.clicked.connect(self.remove_all)
+        button_layout.addWidget(clear_btn)
+
+        self.refresh()
+
+    def refresh(self):
+        stats = workpath_pool.stats()
+        hit_rate = "-" if stats["hit_rate"] is None else f"{stats['hit_rate'] * 100:.0f}%"
+        self.summary_label.setText(
+            f"共 {len(stats['entries'])} 个目录，占用 {proc_utils.format_size(stats['total'])} / "
+            f"{proc_utils.format_size(stats['max_bytes'])}，命中率 {hit_rate} "
+            f"({stats['hits']}/{stats['hits'] + stats['misses']})")
+        self.keys = [key for key, _ in stats["entries"]]
+        self.entry_table.setRowCount(len(stats["entries"]))
+        for row, (key, entry) in enumerate(stats["entries"]):
+            last_used = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry.get("last_used", 0)))
+            values = [entry.get("name", key), proc_utils.format_size(entry.get("size")), last_used,
+                      f"{entry.get('hits', 0)}/{entry.get('uses', 0)}", entry.get("python", "")]
+            for column, value in enumerate(values):
+                self.entry_table.setItem(row, column, QTableWidgetItem(value))
+
+    def apply_max_size(self):
+        workpath_pool.set_max_bytes(self.max_spin.value() * 1024 ** 3)
+        self.refresh()
+
+    def remove_selected(self):
+        rows = {index.row() for index in self.entry_table.selectedIndexes()}
+        if rows:
+            workpath_pool.remove([self.keys[row] for row in rows])
+            self.refresh()
+
+    def remove_all(self):
+        workpath_pool.remove()
+        self.refresh()
+
+
+class AgentStatusThread(QThread):
+    """后台查询所有构建代理的状态"""
+
+    statuses_ready = pyqtSignal(list)
+
+    def run(self):
+        self.statuses_ready.emit(build_agent.query_all())
+
+
+class BuildAgentDialog(QDialog):
+    """构建代理: 添加、移除代理，查看负载和可用的解释器"""
+
+    COLUMNS = ["地址", "主机", "打包中", "CPU/负载", "Python"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("构建代理")
+        self.resize(800, 350)
+        self.addresses = []
+        self.status_thread = None
+
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+
+        add_layout = QHBoxLayout()
+        layout.addLayout(add_layout)
+        add_layout.addWidget(QLabel("地址:"))
+        self.address_edit = QLineEdit()
+        self.address_edit.setPlaceholderText(f"主机:端口（默认端口 {build_agent.DEFAULT_PORT}）")
+        add_layout.addWidget(self.address_edit)
+        add_layout.addWidget(QLabel("令牌:"))
+        self.token_edit = QLineEdit()
+        self.token_edit.setPlaceholderText("代理启动时显示的令牌")
+        add_layout.addWidget(self.token_edit)
+        add_btn = QPushButton("添加")
+        add_btn.clicked.connect(self.add_agent)
+        add_layout.addWidget(add_btn)
+
+        self.summary_label = QLabel("")
+        layout.addWidget(self.summary_label)
+
+        self.agent_table = QTableWidget(0, len(self.COLUMNS))
+        self.agent_table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.agent_table.horizontalHeader().setSectionResizeMode(4, QHeaderView.Stretch)
+        self.agent_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.agent_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        layout.addWidget(self.agent_table)
+
+        button_layout = QHBoxLayout()
+        layout.addLayout(button_layout)
+        button_layout.addStretch()
+        refresh_btn = QPushButton("刷新")
+        refresh_btn.clicked.connect(self.refresh)
+        button_layout.addWidget(refresh_btn)
+        remove_btn = QPushButton("移除选中")
+        remove_btn.clicked.connect(self.remove_selected)
+        button_layout.addWidget(remove_btn)
+
+        self.refresh()
+
+    def refresh(self):
+        if self.status_thread and self.status_thread.isRunning():
+            return
+        self.summary_label.setText("正在查询代理状态...")
+        self.status_thread = AgentStatusThread(self)
+        self.status_thread.statuses_ready.connect(self.show_statuses)
+        self.status_thread.start()
+
+    def show_statuses(self, statuses):
+        self.addresses = [status["address"] for status in statuses]
+        self.agent_table.setRowCount(len(statuses))
+        for row, status in enumerate(statuses):
+            if "error" in status:
+                values = [status["address"], "", "", "", f"不可用: {status['error']}"]
+            else:
+                values = [status["address"], status["host"], f"{status['running']}/{status['max_jobs']}",
+                          f"{status['cpu_count']} 核 / {status['load']:.1f}",
+                          ", ".join(item["version"] for item in status["interpreters"])]
+            for column, value in enumerate(values):
+                self.agent_table.setItem(row, column, QTableWidgetItem(value))
+        self.summary_label.setText(f"共 {len(statuses)} 个代理，可用打包槽位 {build_agent.total_slots(statuses)}")
+
+    def add_agent(self):
+        address = self.address_edit.text().strip()
+        token = self.token_edit.text().strip()
+        if not address or not token:
+            QMessageBox.warning(self, "警告", "请输入代理地址和令牌")
+            return
+        build_agent.add_agent(address, token)
+        self.address_edit.clear()
+        self.token_edit.clear()
+        self.refresh()
+
+    def remove_selected(self):
+        rows = {index.row() for index in self.agent_table.selectedIndexes()}
+        for row in rows:
+            build_agent.remove_agent(self.addresses[row])
+        if rows:
+            self.refresh()
+
+    def done(self, result):
+        if self.status_thread:
+            self.status_thread.wait()
+        super().done(result)
+
+
+class ArtifactStoreDialog(QDialog):
+    """产物版本: 对象库占用、当前配置的历史版本，以及回滚"""
+
+    COLUMNS = ["版本", "时间", "文件数", "大小", "新增"]
+
+    def __init__(self, config, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("产物版本")
+        self.resize(750, 400)
+        self.config = config
+        self.versions = []
+
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+
+        self.summary_label = QLabel("")
+        layout.addWidget(self.summary_label)
+
+        self.version_table = QTableWidget(0, len(self.COLUMNS))
+        self.version_table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.version_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.version_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.version_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.version_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        layout.addWidget(self.version_table)
+
+        button_layout = QHBoxLayout()
+        layout.addLayout(button_layout)
+        button_layout.addStretch()
+        restore_btn = QPushButton("回滚到选中版本")
+        restore_btn.clicked.connect(self.restore_selected)
+        button_layout.addWidget(restore_btn)
+        gc_btn = QPushButton("清理未引用文件")
+        gc_btn.clicked.connect(self.collect_garbage)
+        button_layout.addWidget(gc_btn)
+
+        self.refresh()
+
+    def refresh(self):
+        stats = artifact_store.stats()
+        saved = max(0, stats["logical"] - stats["stored"])
+        self.summary_label.setText(
+            f"对象库共 {stats['objects']} 个文件，占用 {proc_utils.format_size(stats['stored'])}，"
+            f"所有版本合计 {proc_utils.format_size(stats['logical'])}，节省 {proc_utils.format_size(saved)}")
+        self.versions = artifact_store.list_versions(self.config)
+        self.version_table.setRowCount(len(self.versions))
+        for row, version in enumerate(self.versions):
+            created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(version["created_at"]))
+            values = [version["id"], created, str(len(version["files"])), proc_utils.format_size(version["size"]),
+                      proc_utils.format_size(version["added_bytes"])]
+            for column, value in enumerate(values):
+                self.version_table.setItem(row, column, QTableWidgetItem(value))
+
+    def restore_selected(self):
+        rows = {index.row() for index in self.version_table.selectedIndexes()}
+        if not rows:
+            return
+        version = self.versions[rows.pop()]
+        try:
+            artifact_store.restore(self.config, version["id"])
+        except (packager_core.ConfigError, OSError) as e:
+            QMessageBox.critical(self, "错误", f"回滚失败: {str(e)}")
+            return
+        QMessageBox.information(self, "完成", f"已回滚到版本 {version['id']}")
+
+    def collect_garbage(self):
+        freed = artifact_store.collect_garbage()
+        self.refresh()
+        QMessageBox.information(self, "完成", f"释放了 {proc_utils.format_size(freed)}")
+
+
+class BuildHistoryDialog(QDialog):
+    """构建历史窗口: 打包耗时、内存峰值、产物大小和阶段耗时趋势"""
+
+    COLUMNS = ["时间", "名称", "耗时", "退出码", "峰值内存", "产物大小", "最慢阶段"]
+
+    def __init__(self, parent=None, config_hash=None):
+        super().__init__(parent)
+        self.setWindowTitle("构建历史")
+        self.resize(850, 500)
+        self.config_hash = config_hash
+        self.builds = []
+
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+
+        self.current_only_check = QCheckBox("只显示当前配置")
+        self.current_only_check.setChecked(config_hash is not None)
+        self.current_only_check.setEnabled(config_hash is not None)
+        self.current_only_check.toggled.connect(self.refresh)
+        layout.addWidget(self.current_only_check)
+
+        self.build_table = QTableWidget(0, len(self.COLUMNS))
+        self.build_table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.build_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.build_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.build_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.build_table.itemSelectionChanged.connect(self.show_details)
+        layout.addWidget(self.build_table, 3)
+
+        self.detail_output = QTextEdit()
+        self.detail_output.setReadOnly(True)
+        self.detail_output.setFont(QFont("Consolas", 10))
+        layout.addWidget(self.detail_output, 2)
+
+        self.refresh()
+
+    def refresh(self):
+        config_hash = self.config_hash if self.current_only_check.isChecked() else None
+        self.builds = build_history.recent_builds(config_hash, limit=200)
+        self.build_table.setRowCount(len(self.builds))
+        for row, build in enumerate(self.builds):
+            for column, value in enumerate(build_history.format_build(build)):
+                self.build_table.setItem(row, column, QTableWidgetItem(value))
+        if self.builds:
+            self.build_table.selectRow(0)
+
+    def show_details(self):
+        """显示选中记录的阶段耗时以及同一配置的趋势"""
+        rows = {index.row() for index in self.build_table.selectedIndexes()}
+        if not rows:
+            return
+        build = self.builds[min(rows)]
+        lines = [f"命令: {' '.join(json.loads(build['command'])) if build['command'] else ''}", ""]
+        total = sum(build["phases"].values()) or 1
+        for phase, seconds in sorted(build["phases"].items(), key=lambda item: -item[1]):
+            label = build_progress.PHASE_LABELS.get(phase, phase)
+            lines.append(f"{label:<12}{seconds:8.1f}s {seconds * 100 / total:5.0f}%  {'#' * int(seconds * 40 / total)}")
+
+        # 同一配置最近几次成功打包的各阶段耗时
+        same = [b for b in self.builds if b["config_hash"] == build["config_hash"] and b["exit_code"] == 0][:10]
+        if len(same) > 1:
+            lines.append("")
+            lines.append("最近成功打包的耗时趋势（旧 → 新）:")
+            phases = sorted({phase for b in same for phase in b["phases"]},
+                            key=lambda phase: -max(b["phases"].get(phase, 0) for b in same))
+            for phase in phases:
+                values = " → ".join(f"{b['phases'].get(phase, 0):.1f}" for b in reversed(same))
+                lines.append(f"{build_progress.PHASE_LABELS.get(phase, phase):<12}{values}")
+
+        messages = build_history.find_regressions(build["config_hash"])
+        if messages:
+            lines.append("")
+            lines.extend(messages)
+        self.detail_output.setPlainText("\n".join(lines))
+
+
+class BuildQueueDialog(QDialog):
+    """批量打包窗口: 多个配置文件并发打包"""
+
+    COLUMNS = ["配置", "状态", "进度", "耗时", "退出码", "日志"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("批量打包")
+        self.resize(800, 450)
+        self.queue = None
+        self.config_files = []
+
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+
+        # 并发数设置
+        option_layout = QHBoxLayout()
+        layout.addLayout(option_layout)
+        option_layout.addWidget(QLabel("并发进程数:"))
+        self.jobs_spin = QSpinBox()
+        self.jobs_spin.setRange(1, 64)
+        self.jobs_spin.setValue(build_queue.default_workers())
+        option_layout.addWidget(self.jobs_spin)
+        option_layout.addWidget(QLabel("内存预算(MB):"))
+        self.memory_budget_spin = QSpinBox()
+        self.memory_budget_spin.setRange(0, 1024 * 1024)
+        self.memory_budget_spin.setSingleStep(1024)
+        self.memory_budget_spin.setSpecialValueText("自动")
+        self.memory_budget_spin.setToolTip("按各配置历史打包的峰值内存安排并发，合计不超过预算，超出时排队；\n"
+                                           "运行中实际占用超出预算时中止最后启动的任务并重新排队。自动为物理内存的80%")
+        option_layout.addWidget(self.memory_budget_spin)
+        option_layout.addStretch()
+
+        # 任务列表
+        self.job_table = QTableWidget(0, len(self.COLUMNS))
+        self.job_table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.job_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.job_table.horizontalHeader().setSectionResizeMode(5, QHeaderView.Stretch)
+        self.job_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.job_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        layout.addWidget(self.job_table)
+
+        # 按钮区域
+        button_layout = QHBoxLayout()
+        layout.addLayout(button_layout)
+
+        self.add_btn = QPushButton("添加配置...")
+        self.add_btn.clicked.connect(self.add_configs)
+        button_layout.addWidget(self.add_btn)
+
+        self.remove_btn = QPushButton("移除选中")
+        self.remove_btn.clicked.connect(self.remove_selected)
+        button_layout.addWidget(self.remove_btn)
+
+        self.start_btn = QPushButton("开始批量打包")
+        self.start_btn.setStyleSheet("background-color: #4CAF50; color: white; font-weight: bold;")
+        self.start_btn.clicked.connect(self.start_queue)
+        button_layout.addWidget(self.start_btn)
+
+        self.stop_btn = QPushButton("停止")
+        self.stop_btn.setStyleSheet("background-color: #f44336; color: white; font-weight: bold;")
+        self.stop_btn.clicked.connect(self.stop_queue)
+        self.stop_btn.setEnabled(False)
+        button_layout.addWidget(self.stop_btn)
+
+        self.summary_label = QLabel("")
+        layout.addWidget(self.summary_label)
+
+        # 任务状态在工作线程中更新，这里定时刷新表格
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh_table)
+
+    def add_configs(self):
+        """选择多个配置文件加入队列"""
+        file_paths, _ = QFileDialog.getOpenFileNames(
+            self, "选择配置文件", "", "JSON文件 (*.json);;所有文件 (*.*)"
+        )
+        for file_path in file_paths:
+            if file_path not in self.config_files:
+                self.config_files.append(file_path)
+        self.queue = None
+        self.refresh_table()
+
+    def remove_selected(self):
+        if self.queue and self.queue.is_running():
+            return
+        rows = sorted({index.row() for index in self.job_table.selectedIndexes()}, reverse=True)
+        for row in rows:
+            del self.config_files[row]
+        self.queue = None
+        self.refresh_table()
+
+    def start_queue(self):
+        """创建队列并开始执行"""
+        if not self.config_files:
+            QMessageBox.warning(self, "提示", "请先添加配置文件")
+            return
+
+        budget = self.memory_budget_spin.value()
+        build_scheduler.configure(budget * 1024 * 1024 if budget else None)
+        self.queue = build_queue.BuildQueue(max_workers=self.jobs_spin.value())
+        for file_path in self.config_files:
+            try:
+                self.queue.add_config_file(file_path)
+            except packager_core.ConfigError as e:
+                QMessageBox.critical(self, "错误", str(e))
+                self.queue = None
+                return
+
+        self.queue_start_time = time.time()
+        self.queue.start()
+        self.start_btn.setEnabled(False)
+        self.add_btn.setEnabled(False)
+        self.remove_btn.setEnabled(False)
+        self.stop_btn.setEnabled(True)
+        self.refresh_timer.start(500)
+        self.refresh_table()
+
+    def stop_queue(self):
+        if self.queue:
+            self.queue.cancel()
+
+    def refresh_table(self):
+        """刷新任务状态表格"""
+        if self.queue:
+            rows = [(job.name, job.state_label, f"{job.progress}%",
+                     "" if job.duration is None else f"{job.duration:.1f}s",
+                     "" if job.exit_code is None else str(job.exit_code),
+                     job.error or job.message or job.log_path or "")
+                    for job in self.queue.jobs]
+        else:
+            rows = [(os.path.basename(path), "", "", "", "", path) for path in self.config_files]
+
+        self.job_table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for column, value in enumerate(values):
+                self.job_table.setItem(row, column, QTableWidgetItem(value))
+
+        if self.queue and self.queue.is_running():
+            self.summary_label.setText(build_scheduler.format_status(self.queue.scheduler.status()))
+        if self.queue and not self.queue.is_running():
+            self.refresh_timer.stop()
+            self.start_btn.setEnabled(True)
+            self.add_btn.setEnabled(True)
+            self.remove_btn.setEnabled(True)
+            self.stop_btn.setEnabled(False)
+            succeeded = sum(1 for job in self.queue.jobs if job.state == build_queue.SUCCESS)
+            elapsed = time.time() - self.queue_start_time
+            self.summary_label.setText(f"完成: {succeeded}/{len(self.queue.jobs)} 成功，总耗时 {elapsed:.1f}s")
+
+
+class MatrixDialog(BuildQueueDialog):
+    """矩阵打包: 当前配置按 解释器 × 窗口模式 × 单文件/目录 展开后并发打包"""
+
+    def __init__(self, parent, config):
+        super().__init__(parent)
+        self.setWindowTitle("矩阵打包")
+        self.resize(900, 600)
+        self.config = config
+        self.reported = False
+        self.add_btn.hide()
+        self.remove_btn.hide()
+
+        options = QWidget()
+        option_layout = QVBoxLayout(options)
+        option_layout.setContentsMargins(0, 0, 0, 0)
+
+        python_header = QHBoxLayout()
+        python_header.addWidget(QLabel("解释器:"))
+        python_header.addStretch()
+        refresh_btn = QPushButton("重新扫描")
+        refresh_btn.clicked.connect(lambda: self.load_interpreters(refresh=True))
+        python_header.addWidget(refresh_btn)
+        option_layout.addLayout(python_header)
+        self.python_list = QListWidget()
+        self.python_list.setMaximumHeight(150)
+        option_layout.addWidget(self.python_list)
+
+        mode_layout = QHBoxLayout()
+        mode_layout.addWidget(QLabel("窗口模式:"))
+        self.window_checks = []
+        for index, (label, _) in enumerate(packager_core.WINDOW_MODES):
+            check = QCheckBox(label)
+            check.setChecked(index == config["window_mode"])
+            self.window_checks.append(check)
+            mode_layout.addWidget(check)
+        mode_layout.addStretch()
+        option_layout.addLayout(mode_layout)
+
+        layout_layout = QHBoxLayout()
+        layout_layout.addWidget(QLabel("打包方式:"))
+        self.onefile_check = QCheckBox("单文件 (--onefile)")
+        self.onefile_check.setChecked(config["onefile"])
+        layout_layout.addWidget(self.onefile_check)
+        self.onedir_check = QCheckBox("目录模式")
+        self.onedir_check.setChecked(not config["onefile"])
+        layout_layout.addWidget(self.onedir_check)
+        layout_layout.addStretch()
+        option_layout.addLayout(layout_layout)
+
+        self.layout().insertWidget(0, options)
+        self.load_interpreters()
+
+    def load_interpreters(self, refresh=False):
+        """列出解释器（默认使用缓存），勾选当前配置使用的解释器"""
+        current = os.path.normcase(os.path.realpath(packager_core.resolve_python(self.config)))
+        self.python_list.clear()
+        for item in interpreters.discover(refresh):
+            list_item = QListWidgetItem(interpreters.format_interpreter(item))
+            list_item.setData(Qt.UserRole, item["path"])
+            list_item.setFlags(list_item.flags() | Qt.ItemIsUserCheckable)
+            checked = os.path.normcase(os.path.realpath(item["path"])) == current
+            list_item.setCheckState(Qt.Checked if checked else Qt.Unchecked)
+            self.python_list.addItem(list_item)
+
+    def start_queue(self):
+        """展开矩阵并开始打包"""
+        pythons = [self.python_list.item(i).data(Qt.UserRole) for i in range(self.python_list.count())
+                   if self.python_list.item(i).checkState() == Qt.Checked]
+        window_modes = [index for index, check in enumerate(self.window_checks) if check.isChecked()]
+        layouts = [onefile for onefile, check in ((True, self.onefile_check), (False, self.onedir_check))
+                   if check.isChecked()]
+        if not pythons or not window_modes or not layouts:
+            QMessageBox.warning(self, "提示", "请至少选择一个解释器、窗口模式和打包方式")
+            return
+
+        budget = self.memory_budget_spin.value()
+        build_scheduler.configure(budget * 1024 * 1024 if budget else None)
+        self.queue = build_matrix.create_queue(self.config, pythons, window_modes, layouts, self.jobs_spin.value())
+        self.reported = False
+        self.queue_start_time = time.time()
+        self.queue.start()
+        self.start_btn.setEnabled(False)
+        self.stop_btn.setEnabled(True)
+        self.refresh_timer.start(500)
+        self.refresh_table()
+
+    def refresh_table(self):
+        super().refresh_table()
+        # 全部结束后保存汇总报告
+        if self.queue and not self.queue.is_running() and not self.reported:
+            self.reported = True
+            rows = build_matrix.report(self.queue)
+            report_path = os.path.join(packager_core.resolve_output_dir(self.config), "matrix", "matrix-report.json")
+            try:
+                os.makedirs(os.path.dirname(report_path), exist_ok=True)
+                build_matrix.save_report(rows, report_path)
+                self.summary_label.setText(f"{self.summary_label.text()}，报告: {report_path}")
+            except OSError:
+                pass
+
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -841,7 +2570,7 @@ if __name__ == "__main__":
             subcontrol-position: top center;
             padding: 0 5px;
         }
-        QTextEdit {
+        QTextEdit, QPlainTextEdit {
             background-color: #f0f0f0;
             border: 1px solid #c0c0c0;
         }
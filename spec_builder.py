@@ -0,0 +1,350 @@
+import os
+import ast
+import hashlib
+import argparse
+import difflib
+
+import packager_core
+import data_files
+
+
+# 使用spec文件时PyInstaller仍然接受的命令行参数
+BUILD_OPTIONS = {"--distpath", "--workpath", "--noconfirm", "-y", "--clean", "--upx-dir", "--log-level"}
+
+SPEC_HEADER = """\
+# -*- mode: python ; coding: utf-8 -*-
+# 由 pyinstaller_tool 根据配置生成，打包时会重新生成，请不要手动修改
+"""
+
+# 每个spec文件最近一次生成时的变化: spec路径 -> (变化的目标列表, 差异文本)
+_last_changes = {}
+
+
+def get_spec_root():
+    spec_root = os.path.join(packager_core.get_app_data_dir(), "specs")
+    os.makedirs(spec_root, exist_ok=True)
+    return spec_root
+
+
+def spec_dir_for(configs, name=None):
+    """spec文件所在目录，按入口脚本路径区分（与其他配置项无关，修改配置后仍能与上次的spec比较）"""
+    configs = [packager_core.normalize_config(config) for config in configs]
+    scripts = sorted(os.path.normcase(os.path.abspath(config["script_path"])) for config in configs)
+    name = name or packager_core.script_name(configs[0])
+    digest = hashlib.sha1("\n".join(scripts).encode("utf-8")).hexdigest()[:10]
+    return os.path.join(get_spec_root(), f"{name}-{digest}")
+
+
+def spec_path_for(configs, name=None):
+    """spec文件路径，文件名决定PyInstaller工作目录下的子目录名"""
+    name = name or packager_core.script_name(packager_core.normalize_config(configs[0]))
+    return os.path.join(spec_dir_for(configs, name), f"{name}.spec")
+
+
+def _extra_parser():
+    parser = argparse.ArgumentParser(add_help=False, exit_on_error=False)
+    parser.add_argument("--name", "-n")
+    parser.add_argument("--optimize", type=int)
+    parser.add_argument("--noupx", action="store_true")
+    parser.add_argument("--upx-exclude", action="append", default=[])
+    parser.add_argument("--strip", "-s", action="store_true")
+    parser.add_argument("--uac-admin", action="store_true")
+    parser.add_argument("--paths", "-p", action="append", default=[])
+    parser.add_argument("--additional-hooks-dir", action="append", default=[])
+    parser.add_argument("--runtime-hook", action="append", default=[])
+    parser.add_argument("--hidden-import", "--hiddenimport", action="append", default=[])
+    parser.add_argument("--exclude-module", action="append", default=[])
+    parser.add_argument("--add-data", action="append", default=[])
+    parser.add_argument("--add-binary", action="append", default=[])
+    parser.add_argument("--collect-submodules", action="append", default=[])
+    parser.add_argument("--collect-data", "--collect-datas", action="append", default=[])
+    parser.add_argument("--collect-all", action="append", default=[])
+    return parser
+
+
+def split_extra_args(config):
+    """把其他参数拆分为写入spec的选项和命令行上的构建参数，返回 (选项, 构建参数)
+
+    spec文件模式下PyInstaller只接受少数构建参数，其他不支持写入spec的参数会抛出 ConfigError。
+    """
+    args = config["extra_args"].split()
+    build_args = []
+    spec_args = []
+    index = 0
+    while index < len(args):
+        arg = args[index]
+        option = arg.split("=", 1)[0]
+        if option in BUILD_OPTIONS:
+            takes_value = option in ("--distpath", "--workpath", "--upx-dir", "--log-level") and "=" not in arg
+            build_args.extend(args[index:index + 1 + takes_value])
+            index += 1 + takes_value
+        else:
+            spec_args.append(arg)
+            index += 1
+    try:
+        options, unknown = _extra_parser().parse_known_args(spec_args)
+    except argparse.ArgumentError as e:
+        raise packager_core.ConfigError(f"其他参数无法写入spec文件: {str(e)}")
+    if unknown:
+        raise packager_core.ConfigError(f"其他参数中的 {' '.join(unknown)} 不支持spec文件模式，请去掉后重试")
+    return options, build_args
+
+
+def _console(config):
+    index = config["window_mode"]
+    if 0 <= index < len(packager_core.WINDOW_MODES):
+        return packager_core.WINDOW_MODES[index][1] != "--windowed"
+    return True
+
+
+def _list(values, indent="        "):
+    """列表值的多行字面量，空列表写为 []"""
+    if not values:
+        return "[]"
+    return "[\n" + "".join(f"{indent}{value},\n" for value in values) + indent[:-4] + "]"
+
+
+def generate_spec(configs, name=None):
+    """根据一个或多个配置生成spec文件内容
+
+    多个配置时所有入口脚本共用同一个 Analysis（依赖只分析一次）和 PYZ，每个脚本生成各自的 EXE；
+    目录模式下所有可执行文件收集到同一个 COLLECT 目录中。打包方式、窗口模式等以第一个配置为准。
+    """
+    configs = [packager_core.absolutize_paths(config) for config in configs]
+    first = configs[0]
+    names = [packager_core.script_name(config) for config in configs]
+    if len(set(names)) != len(names):
+        raise packager_core.ConfigError("多个入口脚本的文件名不能相同")
+
+    scripts, datas, binaries, hidden, excludes, pathex, hookspath, runtime_hooks = [], [], [], [], [], [], [], []
+    collect = []
+    options = []
+    for config in configs:
+        script_path = os.path.abspath(config["script_path"].strip())
+        if not os.path.exists(script_path):
+            raise packager_core.ConfigError(f"Python脚本不存在: {script_path}")
+        scripts.append(script_path)
+        option, _ = split_extra_args(config)
+        options.append(option)
+        base_dir = os.path.dirname(script_path)
+        for src, dst in data_files.expand_datas(config):
+            datas.append((os.path.join(base_dir, src), dst))
+        for entry in option.add_data:
+            src, dst = packager_core.split_data_entry(entry)
+            datas.append((os.path.join(base_dir, src), dst))
+        for entry in option.add_binary:
+            src, dst = packager_core.split_data_entry(entry)
+            binaries.append((os.path.join(base_dir, src), dst))
+        hidden.extend(config["hidden_imports"] + option.hidden_import)
+        excludes.extend(config["exclude_modules"] + option.exclude_module)
+        pathex.extend(os.path.join(base_dir, path) for path in option.paths)
+        hookspath.extend(os.path.join(base_dir, path) for path in option.additional_hooks_dir)
+        runtime_hooks.extend(os.path.join(base_dir, path) for path in option.runtime_hook)
+        if config["importtime_hook"]:
+            import bundle_analyzer
+            runtime_hooks.append(bundle_analyzer.importtime_hook_path())
+        import lazy_imports
+        runtime_hooks.extend(lazy_imports.runtime_hooks(config))
+        collect.extend(("collect_submodules", package) for package in option.collect_submodules)
+        collect.extend(("collect_data_files", package) for package in option.collect_data)
+        collect.extend(("collect_all", package) for package in option.collect_all)
+
+    def unique(values):
+        return list(dict.fromkeys(values))
+
+    first_option = options[0]
+    import upx_tool
+    upx, auto_exclude, _ = upx_tool.pyinstaller_options(first)
+    upx = upx and not first_option.noupx
+    upx_exclude = unique(auto_exclude + [value for option in options for value in option.upx_exclude])
+    strip = first_option.strip
+    optimize = first_option.optimize if first_option.optimize is not None else 0
+    onefile = first["onefile"]
+    if len(configs) == 1 and first_option.name:
+        names = [first_option.name]
+    suite_name = name or names[0]
+
+    lines = [SPEC_HEADER]
+    if collect:
+        lines.append("from PyInstaller.utils.hooks import collect_all, collect_data_files, collect_submodules\n")
+    lines.append("datas = " + _list([repr(item) for item in unique(datas)], "    "))
+    lines.append("binaries = " + _list([repr(item) for item in unique(binaries)], "    "))
+    lines.append("hiddenimports = " + _list([repr(item) for item in unique(hidden)], "    "))
+    for func, package in unique(collect):
+        if func == "collect_all":
+            lines.append(f"_collected = collect_all({package!r})")
+            lines.append("datas += _collected[0]; binaries += _collected[1]; hiddenimports += _collected[2]")
+        elif func == "collect_submodules":
+            lines.append(f"hiddenimports += collect_submodules({package!r})")
+        else:
+            lines.append(f"datas += collect_data_files({package!r})")
+    lines.append(f"""
+a = Analysis(
+    {_list([repr(script) for script in scripts])},
+    pathex={_list([repr(path) for path in unique(pathex)])},
+    binaries=binaries,
+    datas=datas,
+    hiddenimports=hiddenimports,
+    hookspath={_list([repr(path) for path in unique(hookspath)])},
+    hooksconfig={{}},
+    runtime_hooks={_list([repr(path) for path in unique(runtime_hooks)])},
+    excludes={_list([repr(module) for module in unique(excludes)])},
+    noarchive=False,
+    optimize={optimize},
+)
+pyz = PYZ(a.pure)
+""")
+
+    exe_names = []
+    for index, (config, exe_name) in enumerate(zip(configs, names)):
+        var = "exe" if len(configs) == 1 else f"exe_{index}"
+        exe_names.append(var)
+        if len(configs) == 1:
+            scripts_expr = "a.scripts"
+        else:
+            # 共用的 Analysis 包含所有入口脚本，每个可执行文件只运行自己的脚本
+            others = tuple(other for other in names if other != exe_name)
+            scripts_expr = f"[entry for entry in a.scripts if entry[0] not in {others!r}]"
+        icon = config["icon_path"].strip()
+        icon_line = f"\n    icon=[{icon!r}]," if icon and os.path.exists(icon) else ""
+        uac_line = "\n    uac_admin=True," if options[index].uac_admin else ""
+        if onefile:
+            contents = f"""    pyz,
+    {scripts_expr},
+    a.binaries,
+    a.datas,
+    [],"""
+            tail = f"""
+    upx_exclude={_list([repr(value) for value in upx_exclude])},
+    runtime_tmpdir=None,"""
+        else:
+            contents = f"""    pyz,
+    {scripts_expr},
+    [],
+    exclude_binaries=True,"""
+            tail = ""
+        lines.append(f"""{var} = EXE(
+{contents}
+    name={exe_name!r},
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip={strip},
+    upx={upx},{tail}
+    console={_console(config)},
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,{icon_line}{uac_line}
+)""")
+
+    if not onefile:
+        lines.append(f"""coll = COLLECT(
+    {", ".join(exe_names)},
+    a.binaries,
+    a.datas,
+    strip={strip},
+    upx={upx},
+    upx_exclude={_list([repr(value) for value in upx_exclude])},
+    name={suite_name!r},
+)""")
+    return "\n".join(lines) + "\n"
+
+
+def spec_targets(text):
+    """按目标类型拆分spec内容，返回 {目标类型: 源码}，用于判断哪些目标发生了变化"""
+    targets = {}
+    prelude = []
+    tree = ast.parse(text)
+    for node in tree.body:
+        source = ast.get_source_segment(text, node) or ""
+        value = getattr(node, "value", None)
+        if isinstance(value, ast.Call) and isinstance(value.func, ast.Name) and \
+                value.func.id in ("Analysis", "PYZ", "EXE", "COLLECT"):
+            targets[value.func.id] = targets.get(value.func.id, "") + source
+        else:
+            prelude.append(source)
+    # datas/hiddenimports 等变量都传给 Analysis
+    targets["Analysis"] = "\n".join(prelude) + targets.get("Analysis", "")
+    return targets
+
+
+def changed_targets(old_text, new_text):
+    """比较两个spec，返回有变化的目标类型列表"""
+    if old_text is None:
+        return ["Analysis", "PYZ", "EXE", "COLLECT"]
+    try:
+        old, new = spec_targets(old_text), spec_targets(new_text)
+    except SyntaxError:
+        return ["Analysis", "PYZ", "EXE", "COLLECT"]
+    return [target for target in ("Analysis", "PYZ", "EXE", "COLLECT") if old.get(target) != new.get(target)]
+
+
+def write_spec(configs, name=None, spec_path=None, write=True):
+    """生成spec文件并与上一次的内容比较，返回 (spec路径, 有变化的目标列表)
+
+    write=False 时只生成内容并比较（用于检查配置），不写入文件也不记录变化说明，
+    否则之后真正打包时会认为spec没有变化。
+    """
+    spec_path = spec_path or spec_path_for(configs, name)
+    text = generate_spec(configs, name)
+    old_text = None
+    if os.path.exists(spec_path):
+        with open(spec_path, 'r', encoding='utf-8') as f:
+            old_text = f.read()
+    changes = changed_targets(old_text, text)
+    if not write:
+        return spec_path, changes
+    diff = ""
+    if old_text is not None and changes:
+        diff = "".join(difflib.unified_diff(old_text.splitlines(True), text.splitlines(True),
+                                            "上次的spec", "本次的spec"))
+    os.makedirs(os.path.dirname(spec_path), exist_ok=True)
+    if old_text != text:
+        with open(spec_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+    _last_changes[os.path.abspath(spec_path)] = (changes, diff)
+    return spec_path, changes
+
+
+def change_message(spec_path):
+    """最近一次生成spec时的变化说明"""
+    changes, diff = _last_changes.get(os.path.abspath(spec_path), (None, ""))
+    if changes is None:
+        return ""
+    if not changes:
+        return f"spec文件没有变化: {spec_path}"
+    message = f"spec文件已更新 ({', '.join(changes)}): {spec_path}"
+    if diff:
+        message += "\n" + diff.rstrip("\n")
+    return message
+
+
+def build_command(configs, name=None, spec_path=None, write=True):
+    """生成spec文件并返回基于spec打包的命令（不含解释器部分）
+
+    只有 Analysis 部分有变化（或第一次打包）时才使用 --clean；其他情况保留工作目录，
+    由PyInstaller根据工作目录中的记录只重新生成有变化的 PYZ/EXE/COLLECT。
+    write=False 时不写入spec文件，只用于检查配置。
+    """
+    configs = [packager_core.normalize_config(config) for config in configs]
+    first = configs[0]
+    spec_path, changes = write_spec(configs, name, spec_path, write)
+    spec_dir = os.path.dirname(spec_path)
+    workpath = os.path.join(spec_dir, "build")
+    spec_name = os.path.splitext(os.path.basename(spec_path))[0]
+
+    cmd = ["pyinstaller"]
+    analysis_changed = "Analysis" in changes or not os.path.isdir(os.path.join(workpath, spec_name))
+    if first["clean"] and analysis_changed:
+        cmd.append("--clean")
+    if first["no_confirm"]:
+        cmd.append("--noconfirm")
+    _, build_args = split_extra_args(first)
+    cmd.extend(build_args)
+    import upx_tool
+    upx, _, upx_dir = upx_tool.pyinstaller_options(first)
+    if upx and upx_dir and "--upx-dir" not in build_args:
+        cmd.extend(["--upx-dir", upx_dir])
+    cmd.extend(["--distpath", packager_core.resolve_output_dir(first), "--workpath", workpath, spec_path])
+    return cmd
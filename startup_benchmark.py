@@ -0,0 +1,188 @@
+import os
+import sys
+import time
+import shlex
+import statistics
+import subprocess
+
+import packager_core
+import build_queue
+import proc_utils
+import upx_tool
+import lazy_imports
+
+
+# 单次启动的默认超时（秒）
+DEFAULT_TIMEOUT = 30
+
+
+def variant_configs(config, upx=False, optimize_levels=None, output_root=None):
+    """生成需要对比的打包方式，返回 [(名称, 配置)]
+
+    每种方式使用独立的输出目录: 单文件/目录模式，可选 UPX 压缩和字节码优化级别的组合。
+    """
+    config = packager_core.normalize_config(config)
+    name = packager_core.script_name(config)
+    if output_root is None:
+        output_root = os.path.join(packager_core.get_app_data_dir(), "benchmark",
+                                   f"{name}-{packager_core.config_hash(config)[:10]}")
+
+    upx_options = [("", config["upx"])]
+    if upx:
+        upx_options = [("", False), ("+upx", True)]
+    levels = optimize_levels or [None]
+
+    variants = []
+    for onefile in (True, False):
+        for upx_suffix, upx_enabled in upx_options:
+            for level in levels:
+                label = ("onefile" if onefile else "onedir") + upx_suffix
+                extra = [config["extra_args"].strip()]
+                if level is not None:
+                    label += f"-O{level}"
+                    extra.append(f"--optimize {level}")
+                variant = dict(config)
+                variant["onefile"] = onefile
+                variant["upx"] = upx_enabled
+                variant["extra_args"] = " ".join(arg for arg in extra if arg)
+                variant["output_path"] = os.path.join(output_root, label)
+                variants.append((label, variant))
+    return variants
+
+
+def drop_file_cache(path):
+    """尽量把产物文件从系统页缓存中移除，用于模拟冷启动（仅支持提供 posix_fadvise 的系统）"""
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    paths = [path]
+    if os.path.isdir(path):
+        paths = [os.path.join(root, name) for root, _, files in os.walk(path) for name in files]
+    for file_path in paths:
+        try:
+            fd = os.open(file_path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.fsync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+    return True
+
+
+def time_launch(executable, args=None, timeout=DEFAULT_TIMEOUT, env=None):
+    """启动一次程序并等待退出，返回 (耗时秒数, 退出码)；超时返回 (None, None)"""
+    start = time.perf_counter()
+    process = subprocess.Popen([executable] + list(args or []), env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        exit_code = process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+        return None, None
+    return time.perf_counter() - start, exit_code
+
+
+def percentile(values, percent):
+    """线性插值计算百分位数"""
+    values = sorted(values)
+    if not values:
+        return None
+    position = (len(values) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def measure(config, runs=10, cold_runs=3, args=None, timeout=DEFAULT_TIMEOUT, env=None):
+    """多次启动打包后的程序，返回冷启动和热启动耗时统计"""
+    executable = packager_core.executable_path(config)
+    artifact = packager_core.artifact_path(config)
+    result = {"size": packager_core.path_size(artifact), "cold": [], "warm": [], "errors": []}
+    if not os.path.exists(executable):
+        result["errors"].append(f"可执行文件不存在: {executable}")
+        return result
+
+    for index in range(cold_runs + runs):
+        cold = index < cold_runs
+        if cold:
+            drop_file_cache(artifact)
+        elapsed, exit_code = time_launch(executable, args, timeout, env)
+        if elapsed is None:
+            result["errors"].append(f"运行超过 {timeout}s 未退出，请指定能让程序立即退出的测试参数")
+            break
+        if exit_code != 0:
+            result["errors"].append(f"退出码 {exit_code}")
+        result["cold" if cold else "warm"].append(elapsed)
+    return result
+
+
+def run_benchmark(config, runs=10, cold_runs=3, args=None, upx=False, optimize_levels=None,
+                  jobs=None, timeout=DEFAULT_TIMEOUT, on_output=None, lazy=False):
+    """按各种打包方式分别打包并测量启动耗时，返回 [(名称, 测量结果)]
+
+    lazy 为 True 时每种方式再关闭延迟导入测量一次（同一产物，通过环境变量关闭），对比延迟导入的效果。
+    """
+    def output(text):
+        if on_output:
+            on_output(text)
+
+    if upx and not upx_tool.find_upx(config):
+        output("未找到 upx，跳过 UPX 压缩的对比")
+        upx = False
+    if lazy and not config.get("lazy_imports"):
+        output("配置中没有延迟导入的模块，跳过延迟导入的对比")
+        lazy = False
+    if isinstance(args, str):
+        args = shlex.split(args, posix=sys.platform != "win32")
+
+    variants = variant_configs(config, upx, optimize_levels)
+
+    def on_state(job):
+        if job.state not in (build_queue.PENDING, build_queue.RUNNING):
+            output(f"[{job.name}] 打包{job.state_label} {job.error}".rstrip())
+
+    queue = build_queue.BuildQueue(max_workers=jobs, on_state=on_state)
+    for label, variant in variants:
+        queue.add_config(variant, label)
+    output(f"正在打包 {len(variants)} 种方式...")
+    queue.run()
+
+    results = []
+    for job in queue.jobs:
+        if job.state != build_queue.SUCCESS:
+            results.append((job.name, {"size": None, "cold": [], "warm": [],
+                                       "errors": [f"打包失败: {job.error or job.exit_code}"]}))
+            continue
+        output(f"[{job.name}] 正在测量启动耗时...")
+        results.append((job.name, measure(job.config, runs, cold_runs, args, timeout)))
+        if lazy:
+            results.append((f"{job.name}-nolazy",
+                            measure(job.config, runs, cold_runs, args, timeout, lazy_imports.disabled_env())))
+    return results
+
+
+def format_results(results):
+    """对比表格及推荐的打包方式"""
+    def ms(value):
+        return "-" if value is None else f"{value * 1000:.0f}ms"
+
+    headers = ["方式", "大小", "冷启动p50", "冷启动p90", "热启动p50", "热启动p90", "热启动p95", "说明"]
+    rows = []
+    for label, result in results:
+        rows.append([label, proc_utils.format_size(result["size"]),
+                     ms(percentile(result["cold"], 50)), ms(percentile(result["cold"], 90)),
+                     ms(percentile(result["warm"], 50)), ms(percentile(result["warm"], 90)),
+                     ms(percentile(result["warm"], 95)), "; ".join(dict.fromkeys(result["errors"]))])
+    widths = [max(len(row[i]) for row in rows + [headers]) for i in range(len(headers))]
+    lines = ["  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip()
+             for row in [headers] + rows]
+
+    measured = [(label, result) for label, result in results if result["warm"] and not result["errors"]]
+    if measured:
+        label, result = min(measured, key=lambda item: statistics.median(item[1]["warm"]))
+        lines.append(f"\n启动最快: {label}（热启动中位数 {ms(statistics.median(result['warm']))}）")
+    return "\n".join(lines)
@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pytest
+
+# 测试直接导入仓库根目录下的模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def app_data_dir(tmp_path, monkeypatch):
+    """每个测试使用独立的数据目录（构建缓存记录、对象库、打包历史等都在其中）"""
+    data_dir = tmp_path / "appdata"
+    monkeypatch.setenv("XDG_DATA_HOME", str(data_dir))
+    monkeypatch.setenv("LOCALAPPDATA", str(data_dir))
+    return data_dir / "pyinstaller_tool"
+
+
+@pytest.fixture
+def onedir_artifact(tmp_path):
+    """一个已打包好的目录模式产物: 返回 (配置, 产物目录)"""
+    import packager_core
+
+    project = tmp_path / "project"
+    project.mkdir()
+    (project / "app.py").write_text("print('hello')\n", encoding="utf-8")
+    config = packager_core.normalize_config({
+        "script_path": str(project / "app.py"),
+        "output_path": str(tmp_path / "dist"),
+        "onefile": False,
+    })
+    artifact = packager_core.artifact_path(config)
+    os.makedirs(os.path.join(artifact, "_internal", "lib"))
+    with open(os.path.join(artifact, "app"), 'wb') as f:
+        f.write(b"\x7fELF" + os.urandom(2048))
+    os.chmod(os.path.join(artifact, "app"), 0o755)
+    with open(os.path.join(artifact, "_internal", "base_library.txt"), 'w', encoding='utf-8') as f:
+        f.write("text " * 20000)
+    with open(os.path.join(artifact, "_internal", "lib", "data.bin"), 'wb') as f:
+        f.write(os.urandom(300 * 1024))
+    return config, artifact
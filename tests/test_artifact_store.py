@@ -0,0 +1,127 @@
+import os
+import threading
+
+import pytest
+
+import artifact_store
+import packager_core
+
+
+def read_tree(path):
+    """目录中所有文件 {相对路径: 内容}"""
+    files = {}
+    for rel_path, full_path in artifact_store.artifact_files(path):
+        with open(full_path, 'rb') as f:
+            files[rel_path] = f.read()
+    return files
+
+
+def test_store_links_files_into_object_store(onedir_artifact):
+    config, artifact = onedir_artifact
+    version = artifact_store.store(config)
+    assert len(version["files"]) == 3
+    assert version["added_bytes"] == version["size"]
+    for rel_path, key, size in version["files"]:
+        blob = artifact_store.blob_path(key)
+        assert os.path.getsize(blob) == size
+        assert os.path.samefile(blob, os.path.join(artifact, *rel_path.split("/")))
+    # 可执行权限位不同的相同内容分开存放
+    app_key = dict((rel_path, key) for rel_path, key, _ in version["files"])["app"]
+    assert app_key.endswith("-x")
+
+
+def test_identical_store_does_not_add_version(onedir_artifact):
+    config, _ = onedir_artifact
+    first = artifact_store.store(config)
+    second = artifact_store.store(config)
+    assert second["id"] == first["id"]
+    assert second["added_bytes"] == 0
+    assert len(artifact_store.list_versions(config)) == 1
+
+
+def test_restore_previous_version(onedir_artifact):
+    config, artifact = onedir_artifact
+    original = read_tree(artifact)
+    first = artifact_store.store(config)
+
+    # 重新打包: 产物中的文件被替换（不是原地修改硬链接）并新增文件
+    data_path = os.path.join(artifact, "_internal", "lib", "data.bin")
+    os.remove(data_path)
+    with open(data_path, 'wb') as f:
+        f.write(b"new build")
+    with open(os.path.join(artifact, "extra.txt"), 'w', encoding='utf-8') as f:
+        f.write("extra")
+    second = artifact_store.store(config)
+    assert second["id"] != first["id"]
+    assert second["added_bytes"] == len(b"new build") + len("extra")
+
+    artifact_store.restore(config, first["id"])
+    assert read_tree(artifact) == original
+    assert os.access(os.path.join(artifact, "app"), os.X_OK)
+
+
+def test_restore_unknown_version(onedir_artifact):
+    config, _ = onedir_artifact
+    artifact_store.store(config)
+    with pytest.raises(packager_core.ConfigError):
+        artifact_store.restore(config, "19700101-000000-000")
+
+
+def test_prune_keeps_latest_versions_and_collects_garbage(onedir_artifact):
+    config, artifact = onedir_artifact
+    data_path = os.path.join(artifact, "_internal", "lib", "data.bin")
+    versions = []
+    for build in range(4):
+        os.remove(data_path)
+        with open(data_path, 'wb') as f:
+            f.write(f"build {build}".encode("ascii"))
+        versions.append(artifact_store.store(config, keep=10))
+
+    artifact_store.prune(config, 2)
+    remaining = [version["id"] for version in artifact_store.list_versions(config)]
+    assert remaining == [versions[3]["id"], versions[2]["id"]]
+
+    keys = {rel_path: key for rel_path, key, _ in versions[0]["files"]}
+    assert not os.path.exists(artifact_store.blob_path(keys["_internal/lib/data.bin"]))
+    # 仍被保留版本引用的文件不会被回收
+    assert os.path.exists(artifact_store.blob_path(keys["app"]))
+    assert artifact_store.stats()["objects"] == 4
+
+
+def test_artifact_stays_writable(onedir_artifact):
+    config, artifact = onedir_artifact
+    artifact_store.store(config)
+    for _, full_path in artifact_store.artifact_files(artifact):
+        assert os.access(full_path, os.W_OK)
+
+
+def test_concurrent_store_and_prune_keep_referenced_objects(onedir_artifact, tmp_path):
+    config, artifact = onedir_artifact
+    # 第二个配置的产物内容各不相同，每次存入后立即清理旧版本并回收
+    other = dict(config, output_path=str(tmp_path / "dist2"))
+    other_artifact = packager_core.artifact_path(other)
+    os.makedirs(other_artifact)
+
+    def store_other():
+        for build in range(20):
+            path = os.path.join(other_artifact, "data.bin")
+            if os.path.exists(path):
+                os.remove(path)
+            with open(path, 'wb') as f:
+                f.write(f"other {build}".encode("ascii"))
+            artifact_store.store(other, keep=1)
+
+    thread = threading.Thread(target=store_other)
+    thread.start()
+    data_path = os.path.join(artifact, "_internal", "lib", "data.bin")
+    for build in range(20):
+        os.remove(data_path)
+        with open(data_path, 'wb') as f:
+            f.write(f"build {build}".encode("ascii"))
+        artifact_store.store(config, keep=1)
+    thread.join()
+
+    for item in (config, other):
+        for version in artifact_store.list_versions(item):
+            for _, key, _ in version["files"]:
+                assert os.path.exists(artifact_store.blob_path(key))
@@ -0,0 +1,92 @@
+import os
+import sys
+
+import pytest
+
+import bindep_cache
+import packager_core
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    """在本进程中启用缓存: 替换目录、环境标签和统计，返回一个被计数的分析函数"""
+    monkeypatch.setitem(bindep_cache._state, "dir", str(tmp_path / "cache"))
+    monkeypatch.setitem(bindep_cache._state, "tag", ["linux", "x86_64", "3.11", "/usr/bin/python3", "6.0"])
+    monkeypatch.setitem(bindep_cache._state, "hashes", {})
+    monkeypatch.setitem(bindep_cache._state, "hits", 0)
+    monkeypatch.setitem(bindep_cache._state, "misses", 0)
+    calls = []
+
+    def analyze(filename, search_paths=None):
+        calls.append(filename)
+        return [["libc.so.6", None]]
+    return bindep_cache._cached("imports", analyze, bindep_cache._imports_valid), calls
+
+
+def write_binary(path, content=b"code"):
+    with open(path, 'wb') as f:
+        f.write(b"\x7fELF" + content)
+    return str(path)
+
+
+def test_hit_after_first_analysis(cache, tmp_path):
+    get_imports, calls = cache
+    library = write_binary(tmp_path / "libfoo.so")
+    assert get_imports(library) == [["libc.so.6", None]]
+    assert get_imports(library) == [["libc.so.6", None]]
+    assert calls == [library]
+    assert (bindep_cache._state["hits"], bindep_cache._state["misses"]) == (1, 1)
+
+
+def test_key_depends_on_content_path_arguments_and_environment(cache, tmp_path, monkeypatch):
+    get_imports, calls = cache
+    library = write_binary(tmp_path / "libfoo.so")
+    get_imports(library)
+
+    # 内容改变
+    write_binary(library, b"changed code")
+    get_imports(library)
+    # 相同内容在其他位置（$ORIGIN、rpath 的解析结果不同）
+    get_imports(write_binary(tmp_path / "libbar.so", b"changed code"))
+    # 不同的搜索路径
+    get_imports(library, ["/opt/lib"])
+    # 不同的 PyInstaller 版本
+    monkeypatch.setitem(bindep_cache._state, "tag", ["linux", "x86_64", "3.11", "/usr/bin/python3", "6.1"])
+    get_imports(library)
+    assert len(calls) == 5
+    assert bindep_cache._state["hits"] == 0
+
+
+def test_missing_dependency_invalidates_entry(cache, tmp_path):
+    dependency = write_binary(tmp_path / "libdep.so")
+    calls = []
+
+    def analyze(filename, search_paths=None):
+        calls.append(filename)
+        return [["libdep.so", dependency]]
+    get_imports = bindep_cache._cached("imports", analyze, bindep_cache._imports_valid)
+    library = write_binary(tmp_path / "libfoo.so")
+    get_imports(library)
+    get_imports(library)
+    os.remove(dependency)
+    get_imports(library)
+    assert len(calls) == 2
+
+
+def test_non_binary_files_are_not_cached(cache, tmp_path):
+    get_imports, calls = cache
+    script = tmp_path / "data.txt"
+    script.write_text("text", encoding="utf-8")
+    get_imports(str(script))
+    get_imports(str(script))
+    assert len(calls) == 2
+    assert not os.path.exists(bindep_cache._state["dir"])
+
+
+def test_disabled_by_default(tmp_path):
+    config = packager_core.normalize_config({"script_path": str(tmp_path / "app.py")})
+    cmd = [sys.executable, "-m", "PyInstaller", config["script_path"]]
+    assert bindep_cache.wrap_command(config, cmd) == cmd
+    wrapped = bindep_cache.wrap_command(dict(config, bindep_cache=True), cmd)
+    assert wrapped[1] == os.path.abspath(bindep_cache.__file__)
+    assert wrapped[-1] == config["script_path"]
@@ -0,0 +1,27 @@
+import os
+import socket
+import struct
+
+import pytest
+
+import build_agent
+
+
+@pytest.mark.parametrize("rel_path", ["../x", "a/../../x", "/etc/passwd", "a//b", "./a", "a\\..\\b", "", None])
+def test_safe_join_rejects_unsafe_paths(tmp_path, rel_path):
+    with pytest.raises(build_agent.AgentError):
+        build_agent.safe_join(str(tmp_path), rel_path)
+
+
+def test_safe_join(tmp_path):
+    assert build_agent.safe_join(str(tmp_path), "pkg/mod.py") == os.path.join(str(tmp_path), "pkg", "mod.py")
+
+
+def test_frame_size_limit():
+    left, right = socket.socketpair()
+    with left, right:
+        build_agent.send_json(left, {"auth": "x" * 100})
+        assert build_agent.recv_json(right, build_agent.AUTH_FRAME_SIZE) == {"auth": "x" * 100}
+        left.sendall(struct.pack("!I", build_agent.AUTH_FRAME_SIZE + 1))
+        with pytest.raises(ConnectionError):
+            build_agent.recv_frame(right, build_agent.AUTH_FRAME_SIZE)
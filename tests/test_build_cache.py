@@ -0,0 +1,108 @@
+import os
+import sys
+
+import pytest
+
+import build_cache
+import packager_core
+import venv_snapshot
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """入口脚本导入一个本地模块的项目；已安装的发行包替换为可修改的固定快照"""
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "app.py").write_text("import helper\nprint(helper.VALUE)\n", encoding="utf-8")
+    (src / "helper.py").write_text("VALUE = 1\n", encoding="utf-8")
+    packages = {"demo": ["1.0", "abc"]}
+    monkeypatch.setattr(venv_snapshot, "snapshot", lambda python: dict(packages))
+    config = packager_core.normalize_config({
+        "script_path": str(src / "app.py"),
+        "output_path": str(tmp_path / "dist"),
+        "onefile": False,
+    })
+    return config, packages
+
+
+def command(config, *options):
+    return [sys.executable, "-m", "PyInstaller", *options, "--clean", config["script_path"]]
+
+
+def build_and_record(config, cmd=None):
+    """按计划"打包"（生成产物目录）并写入构建缓存"""
+    action, cmd, fingerprint, _ = build_cache.plan_build(config, cmd or command(config))
+    path = packager_core.artifact_path(config)
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, "app"), 'w', encoding='utf-8') as f:
+        f.write("binary")
+    build_cache.record_build(config, fingerprint)
+    return action, cmd
+
+
+def test_first_build_is_full(project):
+    config, _ = project
+    cmd = command(config)
+    action, planned, fingerprint, message = build_cache.plan_build(config, cmd)
+    assert action == build_cache.FULL
+    assert planned == cmd
+    assert os.path.abspath(config["script_path"]) in fingerprint["sources"]
+    assert "没有上次打包的记录" in message
+
+
+def test_unchanged_inputs_skip_build(project):
+    config, _ = project
+    build_and_record(config)
+    action, cmd, _, message = build_cache.plan_build(config, command(config))
+    assert action == build_cache.SKIP
+    assert packager_core.artifact_path(config) in message
+
+
+def test_source_change_builds_incrementally(project):
+    config, _ = project
+    build_and_record(config)
+    helper = os.path.join(os.path.dirname(config["script_path"]), "helper.py")
+    with open(helper, 'w', encoding='utf-8') as f:
+        f.write("VALUE = 2\n")
+    action, cmd, _, message = build_cache.plan_build(config, command(config))
+    assert action == build_cache.INCREMENTAL
+    assert "--clean" not in cmd
+    assert "helper.py" in message
+
+
+def test_modified_artifact_is_rebuilt(project):
+    config, _ = project
+    build_and_record(config)
+    artifact = packager_core.artifact_path(config)
+    stat = os.stat(artifact)
+    os.utime(artifact, ns=(stat.st_atime_ns, stat.st_mtime_ns - 10 ** 9))
+    action, cmd, _, _ = build_cache.plan_build(config, command(config))
+    assert action == build_cache.INCREMENTAL
+    assert "--clean" not in cmd
+
+
+def test_missing_artifact_is_rebuilt(project):
+    config, _ = project
+    build_and_record(config)
+    packager_core.remove_tree(packager_core.artifact_path(config))
+    action, _, _, _ = build_cache.plan_build(config, command(config))
+    assert action == build_cache.INCREMENTAL
+
+
+def test_option_change_reuses_workpath(project):
+    config, _ = project
+    build_and_record(config)
+    action, cmd, _, _ = build_cache.plan_build(config, command(config, "--log-level", "WARN"))
+    assert action == build_cache.FULL
+    assert "--clean" not in cmd
+
+
+def test_package_change_forces_clean(project):
+    config, packages = project
+    cmd = [arg for arg in command(config) if arg != "--clean"]
+    build_and_record(config, cmd)
+    packages["demo"] = ["2.0", "def"]
+    action, planned, _, message = build_cache.plan_build(config, cmd)
+    assert action == build_cache.FULL
+    assert "--clean" in planned
+    assert "demo 1.0 → 2.0" in message
@@ -0,0 +1,64 @@
+import time
+
+import build_history
+import packager_core
+
+DAY = 86400
+
+
+def config(tmp_path):
+    return {"script_path": str(tmp_path / "app.py")}
+
+
+def record(config, started_at, duration, exit_code=0, graph=None, peak_rss=None):
+    timeline = [("analysis", 0.0, 1.0)]
+    if graph is not None:
+        timeline.append(("graph", 1.0, 1.0 + graph))
+    return build_history.record_build(config, started_at, duration, exit_code, timeline, peak_rss=peak_rss)
+
+
+def test_record_and_read_back(tmp_path):
+    cfg = config(tmp_path)
+    now = time.time()
+    record(cfg, now - 10, 12.5, graph=8.0, peak_rss=300 * 1024 ** 2)
+    builds = build_history.recent_builds(packager_core.config_hash(cfg))
+    assert len(builds) == 1
+    assert builds[0]["name"] == "app"
+    assert builds[0]["phases"] == {"analysis": 1.0, "graph": 8.0}
+    assert build_history.recent_builds("other") == []
+
+
+def test_resource_estimate_uses_successful_builds(tmp_path):
+    cfg = config(tmp_path)
+    key = packager_core.config_hash(cfg)
+    assert build_history.resource_estimate(key) == (None, None)
+    now = time.time()
+    record(cfg, now - 30, 10, peak_rss=100)
+    record(cfg, now - 20, 30, peak_rss=300)
+    record(cfg, now - 15, 20, peak_rss=200)
+    record(cfg, now - 10, 500, exit_code=1, peak_rss=9000)
+    # 峰值内存取最大值，耗时取中位数，失败的打包不计入
+    assert build_history.resource_estimate(key) == (300, 20)
+
+
+def test_regressions_against_last_week(tmp_path):
+    cfg = config(tmp_path)
+    key = packager_core.config_hash(cfg)
+    now = time.time()
+    for days in (10, 9, 8):
+        record(cfg, now - days * DAY, 20.0, graph=10.0, peak_rss=100 * 1024 ** 2)
+    record(cfg, now - DAY, 15.0, graph=5.0)
+    record(cfg, now, 30.0, graph=18.0, peak_rss=150 * 1024 ** 2)
+    messages = build_history.find_regressions(key)
+    assert "总耗时比上周慢 50% (20.0s → 30.0s)" in messages
+    assert any(message.startswith("模块依赖图 阶段比上周慢 80%") for message in messages)
+    assert any(message.startswith("峰值内存比上周高 50%") for message in messages)
+
+
+def test_small_changes_are_not_reported(tmp_path):
+    cfg = config(tmp_path)
+    now = time.time()
+    record(cfg, now - 100, 2.0)
+    # 变慢 50% 但不到 1 秒
+    record(cfg, now, 3.0 - 0.01)
+    assert build_history.find_regressions(packager_core.config_hash(cfg)) == []
@@ -0,0 +1,103 @@
+import build_progress
+import bindep_cache
+import pyi_worker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+LOG = """\
+123 INFO: PyInstaller: 6.10.0, contrib hooks: 2024.8
+456 INFO: Running Analysis Analysis-00.toc
+460 INFO: {graph} module dependency graph...
+470 INFO: Loading module hook 'hook-encodings.py' from '/site-packages/PyInstaller/hooks'...
+471 INFO: Loading module hook 'hook-pickle.py' from '/site-packages/PyInstaller/hooks'...
+480 INFO: Processing module hooks (post-graph stage)...
+490 INFO: Looking for dynamic libraries
+500 INFO: Building PYZ (ZlibArchive) /build/app/PYZ-00.pyz
+510 INFO: Building EXE from EXE-00.toc
+520 INFO: Building COLLECT COLLECT-00.toc
+530 INFO: Build complete! The results are available in: /dist
+"""
+
+
+def config(tmp_path):
+    return {"script_path": str(tmp_path / "app.py"), "onefile": False}
+
+
+def run_log(tracker, clock, graph="Initializing"):
+    tracker.start()
+    entered = []
+    for line in LOG.format(graph=graph).splitlines():
+        clock.now += 1
+        tracker.feed(line + "\n")
+        if tracker.current not in entered:
+            entered.append(tracker.current)
+    return entered
+
+
+def test_phases_from_log(tmp_path):
+    clock = Clock()
+    tracker = build_progress.ProgressTracker(config(tmp_path), clock=clock)
+    entered = run_log(tracker, clock)
+    assert entered == ["startup", "analysis", "graph", "hooks", "binaries", "pyz", "exe", "collect"]
+    assert tracker.hooks >= 2
+    assert tracker.done
+    assert tracker.progress() == 99
+    durations = tracker.finish(True)
+    assert durations["graph"] == 3
+    assert sum(durations.values()) == len(LOG.splitlines())
+
+
+def test_cached_dependency_graph_enters_graph_phase(tmp_path):
+    clock = Clock()
+    tracker = build_progress.ProgressTracker(config(tmp_path), clock=clock)
+    assert "graph" in run_log(tracker, clock, graph="Reusing cached")
+
+
+def test_progress_does_not_go_backwards(tmp_path):
+    clock = Clock()
+    tracker = build_progress.ProgressTracker(config(tmp_path), clock=clock)
+    tracker.start()
+    tracker.feed_line("INFO: Building PYZ (ZlibArchive) /build/app/PYZ-00.pyz")
+    value = tracker.progress()
+    # 重复的较早阶段标记（如多个 Analysis）不会让进度倒退
+    tracker.feed_line("INFO: Running Analysis Analysis-01.toc")
+    assert tracker.current == "pyz"
+    assert tracker.progress() >= value
+
+
+def test_partial_lines_and_report_lines(tmp_path):
+    clock = Clock()
+    tracker = build_progress.ProgressTracker(config(tmp_path), clock=clock)
+    tracker.start()
+    tracker.feed("456 INFO: Running Ana")
+    assert tracker.current == "startup"
+    tracker.feed("lysis Analysis-00.toc\n")
+    assert tracker.current == "analysis"
+    tracker.feed(f"{pyi_worker.BUILD_PID_PREFIX} 4321\n{bindep_cache.REPORT_PREFIX} 命中 7/10 (70%)，未命中的分析耗时 1.0s\n")
+    assert tracker.build_pid == 4321
+    assert tracker.bindep_cache == (7, 10)
+
+
+def test_history_drives_estimate(tmp_path):
+    clock = Clock()
+    first = build_progress.ProgressTracker(config(tmp_path), clock=clock)
+    assert first.eta() is None
+    run_log(first, clock)
+    first.finish(True)
+
+    second = build_progress.ProgressTracker(config(tmp_path), clock=clock)
+    assert second.has_history
+    second.start()
+    assert second.eta() == sum(second.expected[name] for name in second.phases)
+    # 失败的打包不记录耗时
+    clock.now += 50
+    second.finish(False)
+    third = build_progress.ProgressTracker(config(tmp_path), clock=clock)
+    assert third.expected["startup"] == second.expected["startup"]
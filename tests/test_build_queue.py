@@ -0,0 +1,118 @@
+import os
+import sys
+import time
+
+import pytest
+
+import build_cache
+import data_files
+import build_queue
+import build_scheduler
+
+
+@pytest.fixture
+def make_queue(tmp_path, monkeypatch):
+    """批量队列: 打包进程替换为按脚本名决定行为的 Python 命令，使用独立的调度器"""
+    behaviours = {
+        "ok": "print('building'); raise SystemExit(0)",
+        "fail": "print('error'); raise SystemExit(3)",
+        "slow": "import time; print('building', flush=True); time.sleep(60)",
+    }
+
+    def launch_command(config, cmd):
+        name = os.path.splitext(os.path.basename(config["script_path"]))[0].rstrip("0123456789")
+        return [sys.executable, "-c", behaviours[name]]
+
+    monkeypatch.setattr(build_queue, "launch_command", launch_command)
+
+    def make(names, max_workers=1, **options):
+        queue = build_queue.BuildQueue(max_workers=max_workers, work_root=str(tmp_path / "queue"),
+                                       scheduler=build_scheduler.ResourceScheduler(), **options)
+        for index, name in enumerate(names):
+            script = tmp_path / f"{name}{index}.py"
+            script.write_text("print('hello')\n", encoding="utf-8")
+            queue.add_config({"script_path": str(script), "output_path": str(tmp_path / f"dist{index}"),
+                              "workpath_pool": False})
+        return queue
+    return make
+
+
+def wait_until(condition, timeout=30):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "等待超时"
+        time.sleep(0.05)
+
+
+def test_success_and_failure_states(make_queue):
+    queue = make_queue(["ok", "fail"], max_workers=2)
+    assert not queue.run()
+    ok, failed = queue.jobs
+    assert (ok.state, ok.exit_code) == (build_queue.SUCCESS, 0)
+    assert (failed.state, failed.exit_code) == (build_queue.FAILED, 3)
+    assert ok.end_time is not None and failed.end_time is not None
+
+
+def test_launch_error_fails_job(make_queue, monkeypatch):
+    monkeypatch.setattr(build_queue, "launch_command", lambda config, cmd: ["/nonexistent/python"])
+    queue = make_queue(["ok"])
+    assert not queue.run()
+    assert queue.jobs[0].state == build_queue.FAILED
+    assert "启动进程失败" in queue.jobs[0].error
+
+
+def test_plan_build_error_fails_job(make_queue, monkeypatch):
+    def plan_build(config, cmd):
+        raise RuntimeError("broken record")
+    monkeypatch.setattr(build_cache, "plan_build", plan_build)
+    queue = make_queue(["ok"])
+    queue.jobs[0].config["build_cache"] = True
+    assert not queue.run()
+    assert queue.jobs[0].state == build_queue.FAILED
+    assert "broken record" in queue.jobs[0].error
+
+
+def test_post_build_error_fails_job(make_queue, monkeypatch):
+    def post_build(config, on_message):
+        raise ValueError("archive failed")
+    monkeypatch.setattr(build_queue, "post_build", post_build)
+    queue = make_queue(["ok"])
+    assert not queue.run()
+    assert queue.jobs[0].state == build_queue.FAILED
+    assert "archive failed" in queue.jobs[0].error
+
+
+def test_output_conflict_fails_job(make_queue):
+    queue = make_queue(["ok", "ok"])
+    queue.jobs[1].config["output_path"] = queue.jobs[0].config["output_path"]
+    queue.jobs[1].config["script_path"] = queue.jobs[0].config["script_path"]
+    queue.run()
+    assert queue.jobs[0].state == build_queue.SUCCESS
+    assert queue.jobs[1].state == build_queue.FAILED
+    assert "输出冲突" in queue.jobs[1].error
+
+
+def test_cancel_running_and_waiting_jobs(make_queue):
+    queue = make_queue(["slow", "ok"])
+    queue.start()
+    wait_until(lambda: queue.jobs[0].state == build_queue.RUNNING)
+    queue.cancel()
+    queue.wait()
+    assert [job.state for job in queue.jobs] == [build_queue.CANCELLED, build_queue.CANCELLED]
+    assert queue.jobs[0].process.poll() is not None
+
+
+def test_data_copy_failure_is_not_recorded(make_queue, monkeypatch):
+    recorded = []
+    monkeypatch.setattr(build_cache, "plan_build", lambda config, cmd: (build_cache.FULL, cmd, {"sources": {}}, ""))
+    monkeypatch.setattr(build_cache, "record_build", lambda config, fingerprint: recorded.append(fingerprint))
+
+    def after_build(config, on_message=None):
+        raise OSError("复制数据文件失败: disk full")
+    monkeypatch.setattr(data_files, "after_build", after_build)
+    queue = make_queue(["ok"])
+    queue.jobs[0].config["build_cache"] = True
+    assert not queue.run()
+    assert queue.jobs[0].state == build_queue.FAILED
+    assert "复制数据文件失败" in queue.jobs[0].error
+    assert recorded == []
@@ -0,0 +1,124 @@
+import pytest
+
+import build_scheduler
+import proc_utils
+
+GB = 1024 ** 3
+
+
+@pytest.fixture(autouse=True)
+def no_system_memory(monkeypatch):
+    """不受本机实际内存的影响"""
+    monkeypatch.setattr(build_scheduler, "system_memory", lambda: (None, None))
+
+
+def make_scheduler(**options):
+    return build_scheduler.ResourceScheduler(monitor_interval=0.01, **options)
+
+
+def try_take(scheduler, group):
+    """取得可以立即启动的任务，没有时返回 None（不等待）"""
+    checks = []
+
+    def cancelled():
+        checks.append(True)
+        return len(checks) > 1
+    return scheduler.take(group, cancelled)
+
+
+def submit(scheduler, group, name, memory=GB, duration=60.0, **options):
+    reservation = build_scheduler.Reservation(name, group, memory, duration, **options)
+    scheduler.submit(reservation)
+    return reservation
+
+
+def test_memory_budget_limits_concurrency():
+    scheduler = make_scheduler(memory_budget=3 * GB)
+    group = object()
+    submit(scheduler, group, "a", 2 * GB)
+    submit(scheduler, group, "b", 2 * GB)
+    first = try_take(scheduler, group)
+    assert first is not None
+    assert try_take(scheduler, group) is None
+    scheduler.release(first)
+    assert try_take(scheduler, group).name == "b"
+
+
+def test_single_job_always_starts():
+    scheduler = make_scheduler(memory_budget=GB)
+    group = object()
+    submit(scheduler, group, "huge", 8 * GB)
+    assert try_take(scheduler, group).name == "huge"
+
+
+def test_cpu_budget_and_remote_jobs():
+    scheduler = make_scheduler(memory_budget=100 * GB, cpu_budget=1)
+    group = object()
+    submit(scheduler, group, "local1")
+    submit(scheduler, group, "local2")
+    assert try_take(scheduler, group) is not None
+    assert try_take(scheduler, group) is None
+    # 远程打包不占用本机资源
+    submit(scheduler, group, "remote", local=False)
+    assert try_take(scheduler, group).name == "remote"
+
+
+def test_longest_job_starts_first():
+    scheduler = make_scheduler(memory_budget=100 * GB)
+    group = object()
+    submit(scheduler, group, "short", duration=10)
+    submit(scheduler, group, "long", duration=100)
+    assert try_take(scheduler, group).name == "long"
+
+
+def test_group_without_jobs_returns_none():
+    scheduler = make_scheduler(memory_budget=GB)
+    assert scheduler.take(object()) is None
+
+
+def test_over_budget_preempts_last_started(monkeypatch):
+    scheduler = make_scheduler(memory_budget=3 * GB)
+    group = object()
+    preempted = []
+    for name in ("first", "second"):
+        submit(scheduler, group, name, GB, on_preempt=lambda name=name: preempted.append(name))
+    first = try_take(scheduler, group)
+    second = try_take(scheduler, group)
+    first.started, second.started = 1.0, 2.0
+    scheduler.started(first, 101)
+    scheduler.started(second, 102)
+
+    # 实际占用远超估算
+    monkeypatch.setattr(proc_utils, "tree_rss", lambda pid: 2 * GB)
+    assert scheduler.check_memory() is second
+    assert preempted == ["second"]
+    # 正在中止的任务不会再次被选中
+    assert scheduler.check_memory() is None
+
+    scheduler.requeue(second)
+    assert second.memory == 2 * GB
+    assert second.pids == []
+    assert scheduler.status()["waiting"] == 1
+
+
+def test_repeatedly_preempted_job_runs_alone(monkeypatch):
+    scheduler = make_scheduler(memory_budget=3 * GB)
+    group = object()
+    monkeypatch.setattr(proc_utils, "tree_rss", lambda pid: 2 * GB)
+    first = submit(scheduler, group, "first", GB, duration=100, on_preempt=lambda: None)
+    victim = submit(scheduler, group, "victim", GB, on_preempt=lambda: None)
+    assert try_take(scheduler, group) is first
+    scheduler.started(first, 101)
+    for _ in range(build_scheduler.MAX_PREEMPTIONS):
+        victim.memory = GB
+        assert try_take(scheduler, group) is victim
+        victim.started = first.started + 1
+        scheduler.started(victim, 102)
+        assert scheduler.check_memory() is victim
+        scheduler.requeue(victim)
+    assert victim.exclusive
+    # 单独打包: 其他任务运行时不启动
+    victim.memory = 0
+    assert try_take(scheduler, group) is None
+    scheduler.release(first)
+    assert try_take(scheduler, group) is victim
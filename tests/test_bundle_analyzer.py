@@ -0,0 +1,58 @@
+import bundle_analyzer
+import packager_core
+
+
+def test_owner_of():
+    assert bundle_analyzer.owner_of("numpy/core/_multiarray.so") == "numpy"
+    assert bundle_analyzer.owner_of("numpy\\core\\x.pyd") == "numpy"
+    assert bundle_analyzer.owner_of("python3.11/lib-dynload/_ssl.cpython-311.so") == "_ssl"
+    assert bundle_analyzer.owner_of("libssl.so.3") == "(动态库)"
+    assert bundle_analyzer.owner_of("base_library.zip") == "base_library"
+
+
+def test_read_toc_nested(tmp_path):
+    toc = tmp_path / "COLLECT-00.toc"
+    toc.write_text(repr(("app", [("a.so", "/x/a.so", "BINARY")],
+                         {"datas": [("data/b.txt", "/x/b.txt", "DATA")]}, ["not", "an entry"])),
+                   encoding="utf-8")
+    entries = bundle_analyzer.read_toc(str(toc))
+    assert sorted(entries) == [("a.so", "/x/a.so", "BINARY"), ("data/b.txt", "/x/b.txt", "DATA")]
+
+
+def test_analyze_bundle_groups_by_package(tmp_path):
+    workpath = tmp_path / "build"
+    workpath.mkdir()
+    files = {}
+    for name, size in [("mod.pyc", 100), ("lib.so", 400), ("data.txt", 50), ("big.so", 1000)]:
+        path = tmp_path / name
+        path.write_bytes(b"x" * size)
+        files[name] = str(path)
+    (workpath / "PYZ-00.toc").write_text(repr([
+        ("pkg.mod", files["mod.pyc"], "PYMODULE"),
+    ]), encoding="utf-8")
+    (workpath / "COLLECT-00.toc").write_text(repr([
+        ("pkg/lib.so", files["lib.so"], "EXTENSION"),
+        ("pkg/data.txt", files["data.txt"], "DATA"),
+        ("libbig.so", files["big.so"], "BINARY"),
+        ("libbig.so", files["big.so"], "BINARY"),
+        ("missing.so", str(tmp_path / "missing.so"), "BINARY"),
+    ]), encoding="utf-8")
+
+    result = bundle_analyzer.analyze_bundle(str(workpath))
+    assert result["total"] == 1550
+    packages = {name: (total, categories) for name, total, categories in result["packages"]}
+    assert packages["pkg"] == (550, {"模块": 100, "二进制": 400, "数据": 50})
+    assert packages["(动态库)"] == (1000, {"二进制": 1000})
+    assert result["packages"][0][0] == "(动态库)"
+    assert result["files"][0] == ("libbig.so", "二进制", 1000)
+
+    text = bundle_analyzer.format_bundle(result)
+    assert "产物组成" in text and "libbig.so" in text
+
+
+def test_resolve_workpath_follows_name_option(tmp_path):
+    config = {"script_path": str(tmp_path / "main.py"), "extra_args": "--onedir -n tool"}
+    cmd = ["pyinstaller", "--workpath", str(tmp_path / "work"), "main.py"]
+    assert packager_core.resolve_workpath(config, cmd) == str(tmp_path / "work" / "tool")
+    assert packager_core.resolve_workpath(config) == str(tmp_path / "build" / "tool")
+    assert packager_core.resolve_workpath(dict(config, extra_args="")) == str(tmp_path / "build" / "main")
@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+import data_files
+import packager_core
+
+
+@pytest.fixture
+def project(tmp_path):
+    """assets/ 中有需要排除的 *.psd 和 __pycache__，other/ 中没有"""
+    for rel_path in ["main.py", "assets/a.txt", "assets/keep/x.png", "assets/keep/deep/y.png",
+                     "assets/mixed/b.txt", "assets/mixed/c.psd", "assets/skip.psd", "assets/__pycache__/m.pyc",
+                     "other/o.txt"]:
+        path = tmp_path / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(rel_path, encoding="utf-8")
+    return tmp_path
+
+
+def config_for(project, data, excludes):
+    return {"script_path": str(project / "main.py"), "data_files": data, "data_excludes": excludes}
+
+
+def test_glob_root():
+    assert data_files.glob_root("assets/**/*.png") == "assets"
+    assert data_files.glob_root("*.txt") == "."
+    assert data_files.glob_root("config.ini") == "config.ini"
+    # 绝对路径保留开头的分隔符
+    assert data_files.glob_root("/srv/app/assets/*.png") == os.path.normpath("/srv/app/assets")
+    assert data_files.glob_root("/*.png") == os.path.normpath("/")
+
+
+def test_entries_without_exclusions_pass_through(project):
+    datas = data_files.expand_datas(config_for(project, ["assets;assets", "other/*.txt;docs"], []))
+    assert datas == [("assets", "assets"), ("other/*.txt", "docs")]
+
+
+def test_excluded_files_collapse_to_clean_directories(project):
+    datas = data_files.expand_datas(config_for(project, ["assets;assets", "other;other"], ["*.psd", "__pycache__"]))
+    assets = str(project / "assets")
+    assert datas == [
+        (os.path.join(assets, "a.txt"), "assets"),
+        # 没有被排除内容的子目录整体添加
+        (os.path.join(assets, "keep"), "assets/keep"),
+        (os.path.join(assets, "mixed", "b.txt"), "assets/mixed"),
+        # 没有文件被排除的配置项原样传递
+        ("other", "other"),
+    ]
+
+
+def test_excluded_single_file_entry_is_dropped(project):
+    datas = data_files.expand_datas(config_for(project, ["assets/skip.psd;.", "assets/a.txt;."], ["*.psd"]))
+    assert datas == [("assets/a.txt", ".")]
+
+
+def test_collapsed_entries_cover_all_included_files(project):
+    config = config_for(project, ["assets;assets"], ["*.psd", "__pycache__"])
+    included = {dest for _, dest, _, _ in data_files.scan_entries(config)[0][1]}
+    assert included == {"assets/a.txt", "assets/keep/x.png", "assets/keep/deep/y.png", "assets/mixed/b.txt"}
+
+    expanded = set()
+    for src, dst in data_files.expand_datas(config):
+        if os.path.isdir(src):
+            for root, _, names in os.walk(src):
+                for name in names:
+                    rel_path = os.path.relpath(os.path.join(root, name), src).replace(os.sep, "/")
+                    expanded.add(f"{dst}/{rel_path}")
+        else:
+            expanded.add(f"{dst}/{os.path.basename(src)}")
+    assert expanded == included
+
+
+def test_incremental_copy_into_dist(project):
+    config = dict(config_for(project, ["assets;assets"], ["*.psd", "__pycache__"]), incremental_data=True, onefile=False,
+                  output_path=str(project / "dist"))
+    internal = os.path.join(packager_core.artifact_path(config), "_internal")
+    os.makedirs(internal)
+    open(os.path.join(internal, "base_library.zip"), 'w').close()
+    stats = data_files.after_build(config)
+    assert stats["copied"] == 4
+    assert os.path.exists(os.path.join(internal, "assets", "keep", "deep", "y.png"))
+    assert data_files.after_build(config)["copied"] == 0
+
+
+def test_failed_copy_raises(project):
+    config = dict(config_for(project, ["assets;assets"], []), incremental_data=True, onefile=False,
+                  output_path=str(project / "dist"))
+    # 产物中同名的文件挡住了数据目录
+    artifact = packager_core.artifact_path(config)
+    os.makedirs(artifact)
+    with open(os.path.join(artifact, "assets"), 'w') as f:
+        f.write("not a directory")
+    with pytest.raises(OSError, match="复制数据文件失败"):
+        data_files.after_build(config)
@@ -0,0 +1,57 @@
+import os
+import stat
+import hashlib
+import zipfile
+
+import pytest
+
+import dist_archive
+import packager_core
+
+
+def test_zip_is_valid_and_matches_artifact(onedir_artifact):
+    config, artifact = onedir_artifact
+    result = dist_archive.create_archive(config, "zip", workers=4)
+    assert result["path"] == dist_archive.archive_path(config, "zip")
+
+    with zipfile.ZipFile(result["path"]) as archive:
+        assert archive.testzip() is None
+        names = archive.namelist()
+        assert names == [arcname for arcname, _ in dist_archive.archive_members(artifact)]
+        for arcname, full_path in dist_archive.archive_members(artifact):
+            with open(full_path, 'rb') as f:
+                assert archive.read(arcname) == f.read()
+        # 已压缩过的随机数据直接存储，文本压缩
+        infos = {info.filename: info for info in archive.infolist()}
+        assert infos["app/_internal/lib/data.bin"].compress_type == zipfile.ZIP_STORED
+        assert infos["app/_internal/base_library.txt"].compress_type == zipfile.ZIP_DEFLATED
+        assert stat.S_IMODE(infos["app/app"].external_attr >> 16) & stat.S_IXUSR
+
+
+def test_zip_with_multiple_chunks(onedir_artifact, monkeypatch):
+    config, artifact = onedir_artifact
+    # 每个文件分成多块并行压缩，拼接后仍是合法的 deflate 数据
+    monkeypatch.setattr(dist_archive, "CHUNK_SIZE", 4096)
+    result = dist_archive.create_archive(config, "zip", workers=3)
+    with zipfile.ZipFile(result["path"]) as archive:
+        assert archive.testzip() is None
+        with open(os.path.join(artifact, "_internal", "base_library.txt"), 'rb') as f:
+            assert archive.read("app/_internal/base_library.txt") == f.read()
+
+
+def test_checksum_file(onedir_artifact):
+    config, _ = onedir_artifact
+    result = dist_archive.create_archive(config, "zip")
+    with open(result["path"], 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    assert result["sha256"] == digest
+    with open(result["path"] + ".sha256", 'r', encoding='utf-8') as f:
+        assert f.read() == f"{digest}  {os.path.basename(result['path'])}\n"
+
+
+def test_missing_artifact(onedir_artifact):
+    config, artifact = onedir_artifact
+    packager_core.remove_tree(artifact)
+    with pytest.raises(FileNotFoundError):
+        dist_archive.create_archive(config, "zip")
+    assert dist_archive.after_build(dict(config, archive_formats=["zip"])) == []
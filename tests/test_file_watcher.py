@@ -0,0 +1,64 @@
+import sys
+import time
+
+import pytest
+
+import file_watcher
+
+
+def project(tmp_path):
+    root = tmp_path / "project"
+    (root / "assets" / "img").mkdir(parents=True)
+    (root / "app.py").write_text("import helper\n", encoding="utf-8")
+    (root / "helper.py").write_text("x = 1\n", encoding="utf-8")
+    (root / "unused.py").write_text("", encoding="utf-8")
+    (root / "config.ini").write_text("[a]\n", encoding="utf-8")
+    (root / "app.ico").write_bytes(b"\0")
+    return root
+
+
+def test_watch_targets(tmp_path):
+    root = project(tmp_path)
+    files, directories = file_watcher.watch_targets({
+        "script_path": str(root / "app.py"),
+        "data_files": ["config.ini;.", "assets/**/*.png;assets"],
+        "icon_path": "app.ico",
+    })
+    assert files == {str(root / "app.py"), str(root / "helper.py"),
+                     str(root / "config.ini"), str(root / "app.ico")}
+    assert directories == {str(root / "assets")}
+
+
+def wait_for(changes, count=1, timeout=5):
+    deadline = time.time() + timeout
+    while len(changes) < count and time.time() < deadline:
+        time.sleep(0.02)
+    return changes
+
+
+def run_watcher(root, polling):
+    changes = []
+    watcher = file_watcher.Watcher(changes.append, debounce=0.2, polling=polling)
+    watcher.set_targets({str(root / "app.py"), str(root / "helper.py")}, {str(root / "assets")})
+    watcher.start()
+    return watcher, changes
+
+
+@pytest.mark.parametrize("polling", [True, False])
+def test_watcher_debounces_changes(tmp_path, polling):
+    if not polling and not sys.platform.startswith("linux"):
+        pytest.skip("inotify 只在 Linux 上可用")
+    root = project(tmp_path)
+    watcher, changes = run_watcher(root, polling)
+    try:
+        time.sleep(0.1)
+        # 无关文件的修改不触发
+        (root / "unused.py").write_text("y = 2\n", encoding="utf-8")
+        # 一批连续修改只触发一次
+        (root / "helper.py").write_text("x = 2\n", encoding="utf-8")
+        (root / "assets" / "img" / "new.png").write_bytes(b"png")
+        wait_for(changes)
+        time.sleep(0.6)
+    finally:
+        watcher.close()
+    assert changes == [[str(root / "assets" / "img" / "new.png"), str(root / "helper.py")]]
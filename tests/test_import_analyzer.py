@@ -0,0 +1,55 @@
+import sys
+
+import import_analyzer
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def test_dynamic_imports_become_hidden(tmp_path):
+    script = write(tmp_path / "app.py",
+                   "import importlib\nimport helper\nimportlib.import_module('json')\n")
+    write(tmp_path / "helper.py", "__import__('csv')\nimport json\n")
+    result = import_analyzer.analyze({"script_path": str(script), "python_path": sys.executable})
+    hidden = dict(result["hidden"])
+    # json 已被静态导入，不需要作为隐藏依赖
+    assert "csv" in hidden and "helper.py" in hidden["csv"]
+    assert "json" not in hidden
+    assert result["files"] == 2
+
+
+def test_pkgutil_plugin_package(tmp_path):
+    script = write(tmp_path / "app.py", "import plugins\n")
+    write(tmp_path / "plugins" / "__init__.py",
+          "import pkgutil\nfor info in pkgutil.iter_modules(__path__):\n    pass\n")
+    write(tmp_path / "plugins" / "alpha.py", "")
+    write(tmp_path / "plugins" / "beta.py", "")
+    result = import_analyzer.analyze({"script_path": str(script), "python_path": sys.executable})
+    hidden = dict(result["hidden"])
+    assert "plugins.alpha" in hidden and "plugins.beta" in hidden
+
+
+def test_heavy_modules_suggested_unless_used(tmp_path):
+    script = write(tmp_path / "app.py", "import unittest\n")
+    result = import_analyzer.analyze({
+        "script_path": str(script),
+        "python_path": sys.executable,
+        "exclude_modules": ["pydoc"],
+    })
+    excludes = dict(result["excludes"])
+    assert "doctest" in excludes
+    assert "unittest" not in excludes
+    assert "pydoc" not in excludes
+
+
+def test_format_result():
+    result = {"hidden": [("csv", "动态导入")], "excludes": [], "warnings": ["a.py:3 使用了 exec"],
+              "files": 2, "elapsed": 0.5}
+    text = import_analyzer.format_result(result)
+    assert "建议添加隐藏依赖: csv (动态导入)" in text
+    assert "注意: a.py:3 使用了 exec" in text
+    empty = dict(result, hidden=[], warnings=[])
+    assert "没有新的建议" in import_analyzer.format_result(empty)
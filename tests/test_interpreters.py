@@ -0,0 +1,46 @@
+import os
+import sys
+
+import interpreters
+
+
+def test_probe_current_interpreter():
+    info = interpreters.probe(sys.executable)
+    assert info["version"] == "%d.%d.%d" % sys.version_info[:3]
+    assert info["bits"] in (32, 64)
+    assert interpreters.probe(os.path.join(os.sep, "missing", "python")) is None
+
+
+def test_discover_dedupes_and_uses_cache(tmp_path, monkeypatch):
+    link = tmp_path / "python3"
+    os.symlink(sys.executable, link)
+    calls = []
+    monkeypatch.setattr(interpreters, "candidates",
+                        lambda: [(sys.executable, "PATH"), (str(link), "venv"),
+                                 (str(tmp_path / "python-broken"), "PATH")])
+    original_probe = interpreters.probe
+    monkeypatch.setattr(interpreters, "probe", lambda path: calls.append(path) or original_probe(path))
+
+    found = interpreters.discover(refresh=True)
+    assert [item["source"] for item in found] == ["PATH"]
+    assert found[0]["path"] == os.path.abspath(sys.executable)
+
+    # 再次调用只检查缓存，解释器未修改时不重新探测
+    calls.clear()
+    assert interpreters.discover() == found
+    assert calls == []
+
+
+def test_discover_drops_removed_interpreters(tmp_path):
+    path = str(tmp_path / "python3")
+    interpreters.save_cache([{"path": path, "version": "3.8.0", "pyinstaller": None,
+                              "bits": 64, "source": "venv", "mtime": 1}])
+    assert interpreters.discover() == []
+    assert interpreters.load_cache()["interpreters"] == []
+
+
+def test_format_interpreter():
+    item = {"path": "/usr/bin/python3", "version": "3.11.7", "pyinstaller": "6.3.0", "bits": 64, "source": "PATH"}
+    assert interpreters.format_interpreter(item) == \
+        "Python 3.11.7 (64位, PATH, PyInstaller 6.3.0)  /usr/bin/python3"
+    assert "未安装PyInstaller" in interpreters.format_interpreter(dict(item, pyinstaller=None))
@@ -0,0 +1,46 @@
+import sys
+import subprocess
+
+import lazy_imports
+
+
+def test_hook_path_depends_on_modules():
+    path = lazy_imports.hook_path(["numpy", "pandas"])
+    assert path == lazy_imports.hook_path(["pandas", "numpy", "numpy"])
+    assert path != lazy_imports.hook_path(["numpy"])
+    assert lazy_imports.pyinstaller_args({"lazy_imports": ["pandas", "numpy"]}) == ["--runtime-hook", path]
+    assert lazy_imports.pyinstaller_args({"lazy_imports": []}) == []
+
+
+def run_with_hook(tmp_path, env=None):
+    """执行 runtime hook 后导入一个导入时输出信息的模块"""
+    (tmp_path / "heavy.py").write_text("print('imported heavy')\nvalue = 42\n", encoding="utf-8")
+    code = (f"exec(open({lazy_imports.hook_path(['heavy'])!r}, encoding='utf-8').read())\n"
+            "import heavy\nprint('after import')\nprint(heavy.value)\n")
+    return subprocess.run([sys.executable, "-c", code], cwd=tmp_path, env=env,
+                          capture_output=True, text=True, timeout=30).stdout.split()
+
+
+def test_hook_defers_import(tmp_path):
+    assert run_with_hook(tmp_path) == ["after", "import", "imported", "heavy", "42"]
+    assert run_with_hook(tmp_path, lazy_imports.disabled_env()) == ["imported", "heavy", "after", "import", "42"]
+
+
+def test_suggest_top_level_third_party(tmp_path):
+    (tmp_path / "app.py").write_text("import helper\n", encoding="utf-8")
+    (tmp_path / "helper.py").write_text("", encoding="utf-8")
+    profile = {"imports": [
+        ("numpy", 0.01, 0.30, 0),
+        ("numpy.core", 0.10, 0.20, 1),
+        ("json", 0.01, 0.05, 0),
+        ("helper", 0.05, 0.05, 0),
+        ("pyimod02_importers", 0.05, 0.05, 0),
+        ("requests", 0.001, 0.01, 0),
+        ("yaml", 0.02, 0.04, 0),
+    ]}
+    rows = lazy_imports.suggest(profile, {"script_path": str(tmp_path / "app.py")})
+    assert rows == [("numpy", 0.30), ("yaml", 0.04)]
+
+    text = lazy_imports.format_suggestions(rows, current=["yaml"])
+    assert "numpy" in text and "[已延迟]" in text.splitlines()[2]
+    assert lazy_imports.format_suggestions([]) == "没有发现适合延迟导入的模块"
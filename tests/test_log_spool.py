@@ -0,0 +1,38 @@
+import os
+
+import log_spool
+
+
+def test_pending_text_and_file(tmp_path):
+    spool = log_spool.LogSpool("build: app", log_dir=str(tmp_path))
+    assert os.path.basename(spool.path).endswith("-build__app.log")
+    spool.write("line 1\n")
+    spool.write("")
+    spool.write("line 2\n")
+    assert spool.take_pending() == "line 1\nline 2\n"
+    assert spool.take_pending() == ""
+    spool.close()
+    with open(spool.path, 'r', encoding='utf-8') as f:
+        assert f.read() == "line 1\nline 2\n"
+    assert spool.total_chars == 14
+
+
+def test_search(tmp_path):
+    spool = log_spool.LogSpool(log_dir=str(tmp_path))
+    spool.write("INFO: Building PYZ\nWARNING: Hidden import 'foo' not found\nwarning: lower case\n")
+    assert spool.search("warning") == [(2, "WARNING: Hidden import 'foo' not found"), (3, "warning: lower case")]
+    assert spool.search("warning", case_sensitive=True) == [(3, "warning: lower case")]
+    assert spool.search(r"import '(\w+)'", regex=True) == [(2, "WARNING: Hidden import 'foo' not found")]
+    assert spool.search("'foo'") == [(2, "WARNING: Hidden import 'foo' not found")]
+    assert len(spool.search("i", limit=1)) == 1
+    spool.close()
+
+
+def test_old_logs_are_pruned(tmp_path):
+    for index in range(5):
+        path = tmp_path / f"old-{index}.log"
+        path.write_text("x", encoding="utf-8")
+        os.utime(path, (index, index))
+    (tmp_path / "notes.txt").write_text("kept", encoding="utf-8")
+    log_spool.prune_logs(str(tmp_path), keep=2)
+    assert sorted(os.listdir(tmp_path)) == ["notes.txt", "old-3.log", "old-4.log"]
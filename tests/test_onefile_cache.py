@@ -0,0 +1,80 @@
+import io
+import os
+import gzip
+import tarfile
+import subprocess
+
+import pytest
+
+import onefile_cache
+import packager_core
+
+pytestmark = pytest.mark.skipif(not onefile_cache.is_supported(), reason="启动脚本需要 /bin/sh")
+
+
+def make_bundle(path, name="app"):
+    """目录模式产物: 主程序是一个输出参数和数据文件内容的脚本"""
+    (path / "_internal").mkdir(parents=True)
+    (path / "_internal" / "data.txt").write_text("payload data", encoding="utf-8")
+    exe = path / name
+    exe.write_text('#!/bin/sh\necho "args: $*"\ncat "$(dirname "$0")/_internal/data.txt"\n', encoding="utf-8")
+    os.chmod(exe, 0o755)
+    return path
+
+
+def test_pyinstaller_config(tmp_path):
+    config = {"script_path": str(tmp_path / "app.py"), "onefile": True, "onefile_cache": True}
+    staged = onefile_cache.pyinstaller_config(config)
+    assert staged["onefile"] is False
+    assert staged["output_path"] == onefile_cache.stage_dir(config)
+    assert onefile_cache.pyinstaller_config(dict(config, onefile_cache=False)) == dict(config, onefile_cache=False)
+    assert not onefile_cache.enabled(dict(config, onefile=False))
+
+
+def test_payload_is_reproducible(tmp_path):
+    bundle = make_bundle(tmp_path / "bundle")
+    first, second = io.BytesIO(), io.BytesIO()
+    size, digest = onefile_cache.write_payload(str(bundle), first, workers=2)
+    os.utime(bundle / "app", (0, 0))
+    assert onefile_cache.write_payload(str(bundle), second, workers=1) == (size, digest)
+    assert size == len(first.getvalue())
+    with tarfile.open(fileobj=io.BytesIO(gzip.decompress(first.getvalue()))) as tar:
+        assert sorted(tar.getnames()) == ["_internal/data.txt", "app"]
+
+
+def test_packed_file_extracts_once(tmp_path):
+    bundle = make_bundle(tmp_path / "bundle")
+    output = str(tmp_path / "app")
+    result = onefile_cache.pack(str(bundle), output, "app")
+    cache = tmp_path / "cache"
+    env = dict(os.environ, PYI_ONEFILE_CACHE=str(cache))
+
+    def run():
+        return subprocess.run([output, "a", "b"], env=env, capture_output=True, text=True, timeout=30)
+
+    process = run()
+    assert process.returncode == 0, process.stderr
+    assert process.stdout == "args: a b\npayload data"
+    extracted = cache / f"app-{result['key']}"
+    assert (extracted / ".complete").exists()
+
+    # 再次启动直接使用缓存中的程序
+    (extracted / "_internal" / "data.txt").write_text("cached", encoding="utf-8")
+    assert run().stdout == "args: a b\ncached"
+
+
+def test_after_build_uses_name_option(tmp_path):
+    config = packager_core.normalize_config({
+        "script_path": str(tmp_path / "main.py"),
+        "output_path": str(tmp_path / "dist"),
+        "extra_args": "--name tool",
+        "onefile_cache": True,
+    })
+    make_bundle(tmp_path / "stage", "tool")
+    os.makedirs(onefile_cache.stage_dir(config))
+    os.rename(tmp_path / "stage", os.path.join(onefile_cache.stage_dir(config), "tool"))
+    messages = []
+    result = onefile_cache.after_build(config, messages.append)
+    assert result["path"] == str(tmp_path / "dist" / "tool")
+    assert os.access(result["path"], os.X_OK)
+    assert "生成单文件启动缓存产物失败" not in messages[0]
@@ -0,0 +1,59 @@
+import os
+import sys
+
+import pytest
+
+import bindep_cache
+import pyi_worker
+
+
+def test_request_excludes_from_args():
+    argv = ["--onefile", "--exclude-module", "tkinter", "--exclude-module=pytest", "app.py"]
+    assert pyi_worker.request_excludes(argv) == ["tkinter", "pytest"]
+    assert pyi_worker.request_excludes(["app.py"]) == []
+
+
+def test_request_excludes_from_spec(tmp_path):
+    spec = tmp_path / "app.spec"
+    spec.write_text("a = Analysis(['app.py'], excludes=['tkinter', 'unittest'])\n", encoding="utf-8")
+    assert pyi_worker.request_excludes(["--noconfirm", str(spec)]) == ["tkinter", "unittest"]
+    spec.write_text("a = Analysis(['app.py'])\n", encoding="utf-8")
+    assert pyi_worker.request_excludes([str(spec)]) == []
+    # 排除列表不是字面量时无法确定
+    spec.write_text("a = Analysis(['app.py'], excludes=EXCLUDES)\n", encoding="utf-8")
+    assert pyi_worker.request_excludes([str(spec)]) is None
+
+
+def test_is_stale(tmp_path):
+    python = tmp_path / "python"
+    python.write_text("")
+    init = tmp_path / "__init__.py"
+    init.write_text("")
+    info = {"python": str(python), "python_mtime": os.stat(python).st_mtime_ns,
+            "pyinstaller_file": str(init), "pyinstaller_mtime": os.stat(init).st_mtime_ns}
+    assert not pyi_worker.is_stale(info)
+    os.utime(init, ns=(0, 0))
+    assert pyi_worker.is_stale(info)
+    assert pyi_worker.is_stale({"python": str(python)})
+
+
+def test_info_path_per_interpreter():
+    path = pyi_worker.info_path_for(sys.executable)
+    assert path == pyi_worker.info_path_for(sys.executable)
+    assert path != pyi_worker.info_path_for(os.path.join(os.sep, "other", "python"))
+    assert os.path.dirname(path) == pyi_worker.get_worker_dir()
+
+
+@pytest.mark.skipif(not pyi_worker.is_supported(), reason="常驻进程只支持类 Unix 系统")
+def test_wrap_command():
+    cmd = ["/usr/bin/python3", "-m", "PyInstaller", "--onefile", "app.py"]
+    assert pyi_worker.wrap_command({"pyi_worker": False}, cmd) == cmd
+    assert pyi_worker.wrap_command({"pyi_worker": True}, ["pyinstaller", "app.py"]) == ["pyinstaller", "app.py"]
+
+    wrapped = pyi_worker.wrap_command({"pyi_worker": True}, cmd)
+    assert wrapped[:3] == [sys.executable, os.path.abspath(pyi_worker.__file__), "client"]
+    assert wrapped[3:] == ["--python", "/usr/bin/python3", "--", "--onefile", "app.py"]
+
+    if bindep_cache.is_supported():
+        wrapped = pyi_worker.wrap_command({"pyi_worker": True, "bindep_cache": True}, cmd)
+        assert wrapped[5:7] == ["--bindep-cache", bindep_cache.get_cache_dir()]
@@ -0,0 +1,98 @@
+import os
+import ast
+
+import pytest
+
+import packager_core
+import spec_builder
+
+
+@pytest.fixture
+def project(tmp_path):
+    for name in ("main.py", "tool.py"):
+        (tmp_path / name).write_text("print('hello')\n", encoding="utf-8")
+    return tmp_path
+
+
+def config_for(project, script="main.py", **options):
+    return packager_core.normalize_config(dict({
+        "script_path": str(project / script),
+        "output_path": str(project / "dist"),
+        "onefile": False,
+        "use_spec": True,
+    }, **options))
+
+
+def build_dir(config):
+    """PyInstaller 在spec目录下的工作目录（存在时说明之前打包过）"""
+    spec_path = spec_builder.spec_path_for([config])
+    return os.path.join(os.path.dirname(spec_path), "build", os.path.splitext(os.path.basename(spec_path))[0])
+
+
+def test_first_build_writes_spec_and_cleans(project):
+    config = config_for(project)
+    cmd = packager_core.build_command(config)
+    assert cmd[-1] == spec_builder.spec_path_for([config])
+    assert os.path.exists(cmd[-1])
+    assert "--clean" in cmd
+    assert "spec文件已更新 (Analysis, PYZ, EXE, COLLECT)" in spec_builder.change_message(cmd[-1])
+
+
+def test_exe_change_keeps_workpath(project):
+    config = config_for(project)
+    packager_core.build_command(config)
+    os.makedirs(build_dir(config))
+    cmd = packager_core.build_command(dict(config, window_mode=1))
+    assert "--clean" not in cmd
+    assert spec_builder.change_message(cmd[-1]).startswith("spec文件已更新 (EXE)")
+
+    cmd = packager_core.build_command(dict(config, window_mode=1))
+    assert spec_builder.change_message(cmd[-1]).startswith("spec文件没有变化")
+
+
+def test_analysis_change_cleans(project):
+    config = config_for(project)
+    packager_core.build_command(config)
+    os.makedirs(build_dir(config))
+    cmd = packager_core.build_command(dict(config, hidden_imports=["json"]))
+    assert "--clean" in cmd
+    assert "Analysis" in spec_builder.change_message(cmd[-1])
+
+
+def test_validation_does_not_write_spec(project):
+    config = config_for(project)
+    packager_core.build_command(config)
+    os.makedirs(build_dir(config))
+    changed = dict(config, hidden_imports=["json"])
+    # 开始监视、打开对比窗口等只检查配置，之后真正打包时仍能发现 Analysis 的变化
+    packager_core.validate_config(changed)
+    cmd = packager_core.build_command(changed)
+    assert "--clean" in cmd
+    assert "Analysis" in spec_builder.change_message(cmd[-1])
+
+
+def test_unsupported_extra_args(project):
+    with pytest.raises(packager_core.ConfigError):
+        packager_core.validate_config(config_for(project, extra_args="--onedir-unknown"))
+
+
+def test_multi_entry_suite_shares_analysis(project):
+    configs = [config_for(project), config_for(project, "tool.py")]
+    text = spec_builder.generate_spec(configs, "suite")
+    tree = ast.parse(text)
+    calls = [node.value.func.id for node in tree.body
+             if isinstance(node, ast.Assign) and isinstance(node.value, ast.Call)
+             and isinstance(node.value.func, ast.Name)]
+    assert calls == ["Analysis", "PYZ", "EXE", "EXE", "COLLECT"]
+    assert str(project / "main.py") in text and str(project / "tool.py") in text
+    # 每个可执行文件只运行自己的入口脚本
+    assert "if entry[0] not in ('tool',)" in text
+    assert "if entry[0] not in ('main',)" in text
+    assert "name='suite'" in text
+
+
+def test_multi_entry_requires_distinct_names(project):
+    (project / "sub").mkdir()
+    (project / "sub" / "main.py").write_text("print('other')\n", encoding="utf-8")
+    with pytest.raises(packager_core.ConfigError):
+        spec_builder.generate_spec([config_for(project), config_for(project, "sub/main.py")])
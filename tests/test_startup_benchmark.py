@@ -0,0 +1,44 @@
+import os
+import sys
+
+import startup_benchmark
+
+
+def test_percentile():
+    assert startup_benchmark.percentile([], 50) is None
+    assert startup_benchmark.percentile([3.0], 90) == 3.0
+    assert startup_benchmark.percentile([4, 1, 3, 2], 50) == 2.5
+    assert startup_benchmark.percentile([1, 2, 3, 4, 5], 90) == 4.6
+
+
+def test_variant_configs(tmp_path):
+    config = {"script_path": str(tmp_path / "app.py"), "extra_args": "--clean", "upx": False}
+    variants = startup_benchmark.variant_configs(config, upx=True, optimize_levels=[0, 2],
+                                                 output_root=str(tmp_path / "bench"))
+    labels = [label for label, _ in variants]
+    assert labels == ["onefile-O0", "onefile-O2", "onefile+upx-O0", "onefile+upx-O2",
+                      "onedir-O0", "onedir-O2", "onedir+upx-O0", "onedir+upx-O2"]
+    variant = dict(variants)["onedir+upx-O2"]
+    assert variant["onefile"] is False and variant["upx"] is True
+    assert variant["extra_args"] == "--clean --optimize 2"
+    assert variant["output_path"] == os.path.join(str(tmp_path / "bench"), "onedir+upx-O2")
+    # 每种方式的输出目录互不相同
+    assert len({variant["output_path"] for _, variant in variants}) == len(variants)
+
+
+def test_time_launch():
+    elapsed, exit_code = startup_benchmark.time_launch(sys.executable, ["-c", "raise SystemExit(3)"])
+    assert elapsed > 0 and exit_code == 3
+    assert startup_benchmark.time_launch(sys.executable, ["-c", "import time; time.sleep(5)"],
+                                         timeout=0.2) == (None, None)
+
+
+def test_format_results_picks_fastest():
+    results = [
+        ("onefile", {"size": 2048, "cold": [0.5], "warm": [0.30, 0.32], "errors": []}),
+        ("onedir", {"size": 4096, "cold": [0.2], "warm": [0.10, 0.12], "errors": []}),
+        ("onedir+upx", {"size": None, "cold": [], "warm": [], "errors": ["打包失败: 1"]}),
+    ]
+    text = startup_benchmark.format_results(results)
+    assert "打包失败: 1" in text
+    assert text.endswith("启动最快: onedir（热启动中位数 110ms）")
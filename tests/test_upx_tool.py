@@ -0,0 +1,112 @@
+import os
+import sys
+import stat
+
+import pytest
+
+import packager_core
+import upx_tool
+
+# 模拟的 upx: 内容含 FAIL 时报错，含 PACKED 时报告已压缩，否则输出一半大小的文件；每次压缩记录到 calls.log
+FAKE_UPX = """#!{python}
+import os, sys
+if sys.argv[1:] == ["--version"]:
+    print("upx 4.2.4")
+    raise SystemExit(0)
+source, output = sys.argv[-1], sys.argv[sys.argv.index("-o") + 1]
+with open(os.path.join(os.path.dirname(sys.argv[0]), "calls.log"), "a") as log:
+    log.write(os.path.basename(source) + "\\n")
+data = open(source, "rb").read()
+if b"FAIL" in data:
+    print("upx: " + source + ": IOException: temporary failure", file=sys.stderr)
+    raise SystemExit(1)
+if b"PACKED" in data:
+    print("upx: " + source + ": AlreadyPackedException: already packed by UPX", file=sys.stderr)
+    raise SystemExit(2)
+open(output, "wb").write(data[:len(data) // 2])
+"""
+
+
+@pytest.fixture
+def dist(tmp_path, monkeypatch):
+    """目录模式产物和模拟的 upx，返回 (配置, 读取调用记录的函数)"""
+    if sys.platform == "win32":
+        pytest.skip("模拟的 upx 是脚本")
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    upx = bin_dir / "upx"
+    upx.write_text(FAKE_UPX.format(python=sys.executable), encoding="utf-8")
+    upx.chmod(upx.stat().st_mode | stat.S_IXUSR)
+    (tmp_path / "app.py").write_text("print('hello')\n", encoding="utf-8")
+    config = packager_core.normalize_config({
+        "script_path": str(tmp_path / "app.py"),
+        "output_path": str(tmp_path / "dist"),
+        "onefile": False,
+        "upx": True,
+        "upx_dir": str(bin_dir),
+    })
+
+    def calls():
+        try:
+            with open(bin_dir / "calls.log", 'r') as f:
+                return f.read().split()
+        except OSError:
+            return []
+    return config, calls
+
+
+def make_dist(config, files):
+    """在产物中写入 {相对路径: 内容} 的 ELF 文件"""
+    for rel_path, content in files.items():
+        path = os.path.join(packager_core.artifact_path(config), *rel_path.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b"\x7fELF" + content)
+
+
+def statuses(rows):
+    return {row["name"]: row["status"] for row in rows}
+
+
+def test_compressed_files_are_cached(dist):
+    config, calls = dist
+    make_dist(config, {"app": b"x" * 1000, "_internal/libfoo.so": b"y" * 1000})
+    assert statuses(upx_tool.compress_dist(config)) == {"_internal/libfoo.so": upx_tool.COMPRESSED}
+    assert calls() == ["libfoo.so"]
+
+    # 重新打包后文件恢复为未压缩的内容，直接使用缓存的压缩结果
+    make_dist(config, {"_internal/libfoo.so": b"y" * 1000})
+    rows = upx_tool.compress_dist(config)
+    assert statuses(rows) == {"_internal/libfoo.so": upx_tool.CACHED}
+    assert calls() == ["libfoo.so"]
+    assert os.path.getsize(os.path.join(packager_core.artifact_path(config), "_internal", "libfoo.so")) == 502
+
+
+def test_no_gain_is_remembered_and_failure_is_retried(dist):
+    config, calls = dist
+    make_dist(config, {"app": b"x", "_internal/packed.so": b"PACKED", "_internal/broken.so": b"FAIL"})
+    assert statuses(upx_tool.compress_dist(config)) == {
+        "_internal/broken.so": upx_tool.FAILED,
+        "_internal/packed.so": upx_tool.NO_GAIN,
+    }
+    rows = upx_tool.compress_dist(config)
+    assert statuses(rows) == {"_internal/broken.so": upx_tool.FAILED, "_internal/packed.so": upx_tool.NO_GAIN}
+    assert sorted(calls()) == ["broken.so", "broken.so", "packed.so"]
+
+
+def test_renamed_executable_is_not_compressed(dist):
+    config, calls = dist
+    config = dict(config, extra_args="--name Renamed")
+    assert os.path.basename(packager_core.artifact_path(config)) == "Renamed"
+    make_dist(config, {"Renamed": b"z" * 1000, "_internal/libfoo.so": b"y" * 1000})
+    assert statuses(upx_tool.compress_dist(config)) == {"_internal/libfoo.so": upx_tool.COMPRESSED}
+    assert calls() == ["libfoo.so"]
+
+
+def test_excluded_files_are_skipped(dist):
+    config, calls = dist
+    make_dist(config, {"app": b"x", "_internal/libpython3.11.so.1.0": b"y" * 1000,
+                       "_internal/PyQt5/Qt5/plugins/platforms/libqxcb.so": b"z" * 1000})
+    rows = upx_tool.compress_dist(config)
+    assert set(statuses(rows).values()) == {upx_tool.SKIPPED}
+    assert calls() == []
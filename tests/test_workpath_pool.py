@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+import workpath_pool
+
+
+@pytest.fixture
+def config(tmp_path):
+    script = tmp_path / "app.py"
+    script.write_text("print('hello')\n", encoding="utf-8")
+    return {"script_path": str(script), "output_path": str(tmp_path / "dist"), "workpath_pool": True}
+
+
+def fill(workpath, size):
+    with open(os.path.join(workpath, "data"), 'wb') as f:
+        f.write(b"x" * size)
+
+
+def test_acquire_and_release(config):
+    workpath, hit = workpath_pool.acquire(config)
+    assert not hit
+    lease = os.path.join(workpath_pool.get_pool_dir(), "leases", f"{workpath_pool.pool_key(config)}.{os.getpid()}")
+    assert os.path.exists(lease)
+    fill(workpath, 1000)
+    workpath_pool.release(workpath)
+    assert not os.path.exists(lease)
+    entry = dict(workpath_pool.stats()["entries"])[workpath_pool.pool_key(config)]
+    assert entry["size"] == 1000
+
+
+def test_leased_workpath_is_not_evicted(config):
+    workpath, _ = workpath_pool.acquire(config)
+    fill(workpath, 1000)
+    workpath_pool.release(workpath)
+    # 模拟另一个仍在运行的进程（本进程的父进程）正在使用该目录
+    key = workpath_pool.pool_key(config)
+    lease = os.path.join(workpath_pool.get_pool_dir(), "leases", f"{key}.{os.getppid()}")
+    open(lease, 'w').close()
+    workpath_pool.set_max_bytes(0)
+    assert key in dict(workpath_pool.stats()["entries"])
+
+    # 租约的进程已经退出时删除租约，目录可以被淘汰
+    os.rename(lease, os.path.join(os.path.dirname(lease), f"{key}.999999999"))
+    workpath_pool.set_max_bytes(0)
+    assert key not in dict(workpath_pool.stats()["entries"])
+    assert os.listdir(os.path.dirname(lease)) == []
+
+
+def test_concurrent_use_gets_private_workpath(config):
+    workpath, _ = workpath_pool.acquire(config)
+    fill(workpath, 1000)
+    # 同一配置同时打包: 第二个使用独立的工作目录，不与第一个写入同一目录
+    private, hit = workpath_pool.acquire(config)
+    assert not hit
+    assert private != workpath and os.path.isdir(private)
+    workpath_pool.release(private, discard=True)
+    assert os.path.exists(os.path.join(workpath, "data"))
+
+    workpath_pool.release(workpath)
+    again, hit = workpath_pool.acquire(config)
+    assert again == workpath and not hit
+    workpath_pool.release(again)
+
+
+def test_hit_uses_name_option(config):
+    config = dict(config, extra_args="--name tool")
+    workpath, _ = workpath_pool.acquire(config)
+    os.makedirs(os.path.join(workpath, "tool"))
+    workpath_pool.release(workpath)
+    workpath, hit = workpath_pool.acquire(config)
+    assert hit
+    workpath_pool.release(workpath)
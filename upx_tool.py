@@ -0,0 +1,304 @@
+import os
+import sys
+import json
+import time
+import shutil
+import fnmatch
+import hashlib
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import packager_core
+import proc_utils
+
+
+# 压缩级别: 1-9 对应 upx -1 ~ -9，10 对应 --best
+LEVEL_FLAGS = {level: f"-{level}" for level in range(1, 10)}
+LEVEL_FLAGS[10] = "--best"
+
+# 压缩后无法加载、会被杀毒软件误报或者几乎没有收益的文件
+AUTO_EXCLUDE = [
+    "vcruntime*.dll", "msvcp*.dll", "ucrtbase.dll", "api-ms-win-*.dll", "concrt*.dll",
+    "python3.dll", "python3*.dll", "libpython3*.so*",
+    "qwindows.dll", "qminimal.dll", "qoffscreen.dll", "libqxcb.so",
+]
+
+# 压缩后小于原大小的该比例才替换，否则视为没有收益
+MIN_RATIO = 0.95
+
+# 记录结果
+COMPRESSED = "compressed"  # 本次压缩
+CACHED = "cached"          # 使用缓存中的压缩结果
+NO_GAIN = "no_gain"        # 没有收益（已压缩过、无法压缩或收益太小），保留原文件
+FAILED = "failed"          # UPX 报错，保留原文件
+SKIPPED = "skipped"        # 按排除规则跳过
+
+STATUS_LABELS = {
+    COMPRESSED: "已压缩",
+    CACHED: "缓存",
+    NO_GAIN: "无收益",
+    FAILED: "失败",
+    SKIPPED: "已排除",
+}
+
+_lock = threading.Lock()
+_version_cache = {}
+
+
+def get_cache_dir():
+    cache_dir = os.path.join(packager_core.get_app_data_dir(), "upx_cache")
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def find_upx(config):
+    """UPX 可执行文件路径: 配置中的 upx_dir 优先，其次从 PATH 查找；找不到时返回 None"""
+    name = "upx.exe" if sys.platform == "win32" else "upx"
+    upx_dir = (config.get("upx_dir") or "").strip()
+    if upx_dir:
+        path = os.path.join(upx_dir, name)
+        return path if os.path.isfile(path) else None
+    return shutil.which("upx")
+
+
+def upx_version(upx):
+    """UPX 版本（第一行输出），按可执行文件的修改时间缓存"""
+    try:
+        key = (upx, os.stat(upx).st_mtime_ns)
+    except OSError:
+        return ""
+    if key not in _version_cache:
+        try:
+            output = subprocess.run([upx, "--version"], capture_output=True, text=True, timeout=10).stdout
+            _version_cache[key] = output.splitlines()[0].strip() if output else ""
+        except (OSError, subprocess.SubprocessError):
+            _version_cache[key] = ""
+    return _version_cache[key]
+
+
+def level_flag(config):
+    return LEVEL_FLAGS.get(config.get("upx_level"), LEVEL_FLAGS[10])
+
+
+def is_supported():
+    """UPX 不支持新版 macOS 的可执行文件格式"""
+    return sys.platform != "darwin"
+
+
+def pyinstaller_options(config):
+    """PyInstaller 自身的 UPX 设置 (是否启用, 排除模式, upx目录)
+
+    目录模式由本工具在打包后并行压缩，PyInstaller 不使用 UPX；单文件模式下二进制文件被打包进
+    可执行文件，只能交给 PyInstaller 处理，此时自动加入排除列表。
+    配置中没有设置 "upx"（None）时不传任何UPX参数，保持PyInstaller的默认行为。
+    """
+    if config.get("upx") is None:
+        return True, [], None
+    if not config.get("upx") or not config["onefile"] or not is_supported():
+        return False, [], None
+    upx = find_upx(config)
+    return True, list(AUTO_EXCLUDE), os.path.dirname(upx) if upx else None
+
+
+def pyinstaller_args(config):
+    """对应 pyinstaller_options 的命令行参数，只有明确关闭时才传 --noupx"""
+    enabled, excludes, upx_dir = pyinstaller_options(config)
+    if not enabled:
+        return ["--noupx"]
+    args = ["--upx-dir", upx_dir] if upx_dir else []
+    for pattern in excludes:
+        args.extend(["--upx-exclude", pattern])
+    return args
+
+
+def _is_binary(path):
+    try:
+        with open(path, 'rb') as f:
+            magic = f.read(4)
+    except OSError:
+        return False
+    return magic[:2] == b"MZ" or magic == b"\x7fELF"
+
+
+def _is_qt_plugin(rel_path):
+    parts = rel_path.lower().split("/")
+    return "plugins" in parts and any(part.startswith("qt") or part.startswith("pyqt") or part.startswith("pyside")
+                                      for part in parts)
+
+
+def exclude_reason(rel_path):
+    """不应该使用UPX压缩的原因，可以压缩时返回 None"""
+    name = os.path.basename(rel_path)
+    for pattern in AUTO_EXCLUDE:
+        if fnmatch.fnmatch(name.lower(), pattern):
+            return f"匹配排除规则 {pattern}"
+    if _is_qt_plugin(rel_path):
+        return "Qt插件（压缩后插件加载器无法读取元数据）"
+    return None
+
+
+def binaries(dist_dir, executable):
+    """目录模式产物中的二进制文件 [(相对路径, 路径)]
+
+    主程序后面附带了PyInstaller的归档，压缩后无法运行，不包含在内。
+    """
+    executable = os.path.realpath(executable)
+    result = []
+    for root, _, names in os.walk(dist_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            if os.path.islink(path) or os.path.realpath(path) == executable:
+                continue
+            if _is_binary(path):
+                result.append((os.path.relpath(path, dist_dir).replace(os.sep, "/"), path))
+    result.sort()
+    return result
+
+
+def _cache_key(path, upx, flag):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    digest.update(f"\n{upx_version(upx)}\n{flag}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_index():
+    try:
+        with open(os.path.join(get_cache_dir(), "index.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_index(index):
+    path = os.path.join(get_cache_dir(), "index.json")
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+    except OSError:
+        pass
+
+
+def _replace(path, source):
+    """用 source 替换 path 的内容，保留权限位"""
+    temp_path = path + ".upx-tmp"
+    shutil.copyfile(source, temp_path)
+    shutil.copymode(path, temp_path)
+    os.replace(temp_path, path)
+
+
+def _compress(rel_path, path, upx, flag, index):
+    """压缩单个文件，返回结果记录"""
+    size = os.path.getsize(path)
+    row = {"name": rel_path, "size": size, "compressed": size, "seconds": 0.0}
+    reason = exclude_reason(rel_path)
+    if reason:
+        return dict(row, status=SKIPPED, reason=reason)
+
+    key = _cache_key(path, upx, flag)
+    cached = index.get(key)
+    cached_path = os.path.join(get_cache_dir(), key[:2], key)
+    if cached and cached["status"] == COMPRESSED and os.path.exists(cached_path):
+        _replace(path, cached_path)
+        return dict(row, status=CACHED, compressed=cached["compressed"], key=key)
+    if cached and cached["status"] == NO_GAIN:
+        return dict(row, status=NO_GAIN, reason=cached.get("reason", ""), key=key)
+
+    os.makedirs(os.path.dirname(cached_path), exist_ok=True)
+    temp_path = f"{cached_path}.{threading.get_ident()}.tmp"
+    start = time.time()
+    try:
+        process = subprocess.run([upx, "-q", flag, "-o", temp_path, path], capture_output=True, text=True,
+                                 errors="ignore")
+    except OSError as e:
+        return dict(row, status=FAILED, reason=str(e), key=key)
+    seconds = time.time() - start
+    if process.returncode != 0 or not os.path.exists(temp_path):
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        message = (process.stderr or process.stdout).strip().splitlines()
+        message = message[-1] if message else f"退出码 {process.returncode}"
+        # 已压缩过或无法压缩的文件以后不再尝试
+        status = NO_GAIN if "AlreadyPacked" in message or "NotCompressible" in message else FAILED
+        return dict(row, status=status, reason=message, seconds=seconds, key=key)
+
+    compressed = os.path.getsize(temp_path)
+    if compressed >= size * MIN_RATIO:
+        os.remove(temp_path)
+        return dict(row, status=NO_GAIN, reason=f"只减少了 {(1 - compressed / size) * 100:.1f}%",
+                    seconds=seconds, key=key)
+    os.replace(temp_path, cached_path)
+    _replace(path, cached_path)
+    return dict(row, status=COMPRESSED, compressed=compressed, seconds=seconds, key=key)
+
+
+def compress_dist(config, workers=None):
+    """并行压缩目录模式产物中的二进制文件，返回每个文件的结果记录
+
+    压缩结果按 输入内容哈希 + UPX版本 + 参数 缓存，未变化的文件直接使用缓存；没有收益的文件
+    也会记录，以后不再尝试。失败可能是暂时的（或新版UPX能够处理），不记录，下次打包时重试。
+    """
+    config = packager_core.normalize_config(config)
+    upx = find_upx(config)
+    if not upx:
+        raise FileNotFoundError("未找到 upx，请安装UPX或在配置中指定 upx_dir")
+    dist_dir = packager_core.artifact_path(config)
+    flag = level_flag(config)
+    index = load_index()
+    items = binaries(dist_dir, packager_core.executable_path(config))
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        rows = list(executor.map(lambda item: _compress(item[0], item[1], upx, flag, index), items))
+
+    with _lock:
+        index = load_index()
+        for row in rows:
+            if row.get("key") and row["status"] in (COMPRESSED, NO_GAIN):
+                index[row["key"]] = {"name": row["name"], "status": row["status"], "size": row["size"],
+                                     "compressed": row["compressed"], "seconds": row["seconds"],
+                                     "reason": row.get("reason", ""), "upx": upx_version(upx), "flag": flag}
+        save_index(index)
+    return rows
+
+
+def format_report(rows, top=10):
+    """压缩报告: 汇总以及节省最多的文件"""
+    saved = sum(row["size"] - row["compressed"] for row in rows)
+    seconds = sum(row["seconds"] for row in rows)
+    counts = {}
+    for row in rows:
+        counts[row["status"]] = counts.get(row["status"], 0) + 1
+    summary = "，".join(f"{STATUS_LABELS[status]} {count}" for status, count in counts.items())
+    lines = [f"UPX压缩 {len(rows)} 个二进制文件（{summary}），节省 {proc_utils.format_size(saved)}，"
+             f"UPX耗时 {seconds:.1f}s"]
+    ranked = sorted((row for row in rows if row["status"] in (COMPRESSED, CACHED)),
+                    key=lambda row: row["compressed"] - row["size"])
+    for row in ranked[:top]:
+        ratio = row["compressed"] / row["size"] * 100 if row["size"] else 100
+        time_text = "缓存" if row["status"] == CACHED else f"{row['seconds']:.2f}s"
+        lines.append(f"  {proc_utils.format_size(row['size']):>8} → {proc_utils.format_size(row['compressed']):>8}"
+                     f" ({ratio:.0f}%, {time_text})  {row['name']}")
+    for row in rows:
+        if row["status"] == FAILED:
+            lines.append(f"  失败: {row['name']}: {row.get('reason', '')}")
+    return "\n".join(lines)
+
+
+def after_build(config, on_message=None):
+    """打包成功后按配置压缩目录模式产物"""
+    config = packager_core.normalize_config(config)
+    if not config.get("upx") or config["onefile"] or not is_supported():
+        return None
+    try:
+        rows = compress_dist(config)
+    except OSError as e:
+        if on_message:
+            on_message(f"UPX压缩失败: {str(e)}")
+        return None
+    if on_message:
+        on_message(format_report(rows))
+    return rows
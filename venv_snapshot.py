@@ -0,0 +1,172 @@
+import os
+import re
+import json
+import hashlib
+import subprocess
+
+import packager_core
+
+
+# 在目标解释器中运行，列出 site-packages 目录
+SITE_DIRS_CODE = """\
+import sys, site, json
+dirs = []
+try:
+    dirs.extend(site.getsitepackages())
+except Exception:
+    pass
+try:
+    dirs.append(site.getusersitepackages())
+except Exception:
+    pass
+dirs.extend(p for p in sys.path if p.endswith(("site-packages", "dist-packages")))
+print(json.dumps(dirs))
+"""
+
+
+def get_cache_path():
+    return os.path.join(packager_core.get_app_data_dir(), "venv_snapshots.json")
+
+
+def load_cache():
+    try:
+        with open(get_cache_path(), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache):
+    path = get_cache_path()
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+    except OSError:
+        pass
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def site_dirs(python):
+    """解释器的 site-packages 目录（去重，只保留存在的目录），失败时返回空列表"""
+    try:
+        output = subprocess.run([python, "-c", SITE_DIRS_CODE], capture_output=True, text=True, timeout=30).stdout
+        dirs = json.loads(output)
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return []
+    result = []
+    for directory in dirs:
+        directory = os.path.normcase(os.path.realpath(directory))
+        if directory not in result and os.path.isdir(directory):
+            result.append(directory)
+    return result
+
+
+def normalize_name(name):
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def _read_metadata(path):
+    """从 METADATA / PKG-INFO 的头部读取 (Name, Version)"""
+    name = version = None
+    try:
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            for line in f:
+                if not line.strip():
+                    break
+                if line.startswith("Name:"):
+                    name = line[5:].strip()
+                elif line.startswith("Version:"):
+                    version = line[8:].strip()
+    except OSError:
+        pass
+    return name, version
+
+
+def _hash_file(path):
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()[:16]
+    except OSError:
+        return ""
+
+
+def scan_dir(directory):
+    """扫描一个 site-packages 目录中的发行包 {规范化名称: [版本, RECORD哈希]}
+
+    RECORD 列出了安装的每个文件及其哈希，重新安装或同版本替换文件时也会变化。
+    """
+    packages = {}
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return packages
+    for entry in names:
+        path = os.path.join(directory, entry)
+        if entry.endswith(".dist-info"):
+            metadata, record = os.path.join(path, "METADATA"), os.path.join(path, "RECORD")
+        elif entry.endswith(".egg-info"):
+            if os.path.isdir(path):
+                metadata = record = os.path.join(path, "PKG-INFO")
+            else:
+                metadata = record = path
+        else:
+            continue
+        name, version = _read_metadata(metadata)
+        if not name:
+            continue
+        # 同名包出现在多个目录时，以搜索路径中靠前的为准
+        packages.setdefault(normalize_name(name), [version or "", _hash_file(record)])
+    return packages
+
+
+def snapshot(python):
+    """解释器已安装发行包的快照 {规范化名称: [版本, RECORD哈希]}
+
+    按解释器缓存；site-packages 目录的修改时间都没有变化时（安装、卸载、升级都会增删
+    *.dist-info 目录）直接使用缓存，不重新扫描。
+    """
+    key = os.path.normcase(os.path.realpath(python))
+    cache = load_cache()
+    entry = cache.get(key)
+    python_mtime = _mtime(key)
+    if not entry or entry.get("python_mtime") != python_mtime:
+        entry = {"python_mtime": python_mtime, "site_dirs": site_dirs(python), "dir_mtimes": {}, "dirs": {}}
+
+    changed = False
+    packages = {}
+    for directory in entry["site_dirs"]:
+        mtime = _mtime(directory)
+        if entry["dir_mtimes"].get(directory) != mtime or directory not in entry["dirs"]:
+            entry["dir_mtimes"][directory] = mtime
+            entry["dirs"][directory] = scan_dir(directory)
+            changed = True
+        for name, value in entry["dirs"][directory].items():
+            packages.setdefault(name, value)
+
+    if changed or cache.get(key) is not entry:
+        cache[key] = entry
+        save_cache(cache)
+    return packages
+
+
+def diff(old, new):
+    """比较两个快照，返回变化说明列表，如 ["requests 2.31.0 → 2.32.3", "新增 rich 13.7.1"]"""
+    changes = []
+    for name in sorted(set(old) | set(new)):
+        if name not in old:
+            changes.append(f"新增 {name} {new[name][0]}")
+        elif name not in new:
+            changes.append(f"移除 {name} {old[name][0]}")
+        elif old[name][0] != new[name][0]:
+            changes.append(f"{name} {old[name][0]} → {new[name][0]}")
+        elif old[name][1] != new[name][1]:
+            changes.append(f"{name} {new[name][0]} 已重新安装")
+    return changes
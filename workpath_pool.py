@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+import contextlib
+
+import packager_core
+import proc_utils
+import build_cache
+
+
+# 工作目录缓存的默认总大小上限
+DEFAULT_MAX_BYTES = 5 * 1024 ** 3
+
+_lock = threading.Lock()
+# 本进程正在打包中使用的工作目录的键；其他进程的使用情况见 leases 目录中的租约文件
+_in_use = set()
+
+
+def get_pool_dir():
+    pool_dir = os.path.join(packager_core.get_app_data_dir(), "workpaths")
+    os.makedirs(pool_dir, exist_ok=True)
+    return pool_dir
+
+
+def get_index_path():
+    return os.path.join(get_pool_dir(), "index.json")
+
+
+@contextlib.contextmanager
+def _index_lock():
+    """保护索引读写和租约的锁: 进程内的线程锁加上索引锁文件的跨进程文件锁（界面、命令行、代理可能同时打包）"""
+    with _lock, proc_utils.file_lock(os.path.join(get_pool_dir(), "index.lock")):
+        yield
+
+
+def _lease_dir():
+    lease_dir = os.path.join(get_pool_dir(), "leases")
+    os.makedirs(lease_dir, exist_ok=True)
+    return lease_dir
+
+
+def _private_dir():
+    """共享目录已被占用时使用的独立工作目录所在位置"""
+    private_dir = os.path.join(get_pool_dir(), "private")
+    os.makedirs(private_dir, exist_ok=True)
+    return private_dir
+
+
+def _leased_keys():
+    """所有进程正在使用的工作目录；租约文件 <键>.<pid> 的进程已经退出时删除该租约（需持有索引锁）"""
+    keys = set(_in_use)
+    lease_dir = _lease_dir()
+    for name in os.listdir(lease_dir):
+        key, _, pid = name.rpartition(".")
+        if not pid.isdigit():
+            continue
+        pid = int(pid)
+        if pid != os.getpid() and proc_utils.pid_exists(pid):
+            keys.add(key)
+        elif pid != os.getpid() or key not in _in_use:
+            try:
+                os.remove(os.path.join(lease_dir, name))
+            except OSError:
+                pass
+    return keys
+
+
+def load_index():
+    """读取缓存索引 {"max_bytes", "hits", "misses", "entries": {键: 记录}}"""
+    index = {"max_bytes": DEFAULT_MAX_BYTES, "hits": 0, "misses": 0, "entries": {}}
+    try:
+        with open(get_index_path(), 'r', encoding='utf-8') as f:
+            index.update(json.load(f))
+    except (OSError, ValueError):
+        pass
+    return index
+
+
+def save_index(index):
+    path = get_index_path()
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False, indent=1)
+        os.replace(temp_path, path)
+    except OSError:
+        pass
+
+
+def pool_key(config):
+    """工作目录的缓存键: 影响产物的配置项 + 解释器路径和版本"""
+    python = packager_core.resolve_python(config)
+    data = "\n".join([packager_core.config_hash(config), python, build_cache.interpreter_version(python)])
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()[:16]
+
+
+def workpath_for(config):
+    """配置对应的 --workpath（PyInstaller 会在其下再创建以产物名命名的子目录）"""
+    return os.path.join(get_pool_dir(), pool_key(config))
+
+
+def acquire(config):
+    """独占配置的工作目录并记录命中情况，返回 (工作目录, 是否命中已有目录)
+
+    同一配置同时打包时（同一配置排队两次，或界面和命令行同时打包），共享目录已被占用，
+    后来者使用一个独立的空工作目录（结束后删除），两个 PyInstaller 不会同时写入同一目录。
+    返回的工作目录需要替换命令中由 workpath_for 得到的 --workpath。
+    """
+    key = pool_key(config)
+    workpath = os.path.join(get_pool_dir(), key)
+    hit = os.path.isdir(os.path.join(workpath, packager_core.artifact_name(config)))
+    with _index_lock():
+        if key in _leased_keys():
+            return tempfile.mkdtemp(prefix=f"{key}.{os.getpid()}.", dir=_private_dir()), False
+        _in_use.add(key)
+        with open(os.path.join(_lease_dir(), f"{key}.{os.getpid()}"), 'w'):
+            pass
+        index = load_index()
+        entry = index["entries"].setdefault(key, {"name": packager_core.script_name(config), "hits": 0, "uses": 0,
+                                                  "size": 0, "python": packager_core.resolve_python(config)})
+        entry["last_used"] = time.time()
+        entry["uses"] += 1
+        if hit:
+            entry["hits"] += 1
+            index["hits"] += 1
+        else:
+            index["misses"] += 1
+        save_index(index)
+    os.makedirs(workpath, exist_ok=True)
+    return workpath, hit
+
+
+def release(workpath, discard=False):
+    """打包结束后释放 acquire 得到的工作目录，更新目录大小并按需淘汰
+
+    打包被中止时 discard=True，在后台删除可能不完整的工作目录；独立的工作目录总是删除。
+    """
+    if os.path.dirname(os.path.abspath(workpath)) == _private_dir():
+        packager_core.remove_tree_async(workpath)
+        return
+    key = os.path.basename(workpath)
+    # 统计大小需要遍历目录，在锁外完成
+    size = None if discard else packager_core.path_size(workpath) or 0
+    with _index_lock():
+        _in_use.discard(key)
+        try:
+            os.remove(os.path.join(_lease_dir(), f"{key}.{os.getpid()}"))
+        except OSError:
+            pass
+        if discard:
+            packager_core.remove_tree_async(workpath)
+        index = load_index()
+        entry = index["entries"].get(key)
+        if entry is not None:
+            if not discard:
+                entry["size"] = size
+                entry["last_used"] = time.time()
+            else:
+                del index["entries"][key]
+        _evict(index)
+        save_index(index)
+
+
+def _evict(index):
+    """按最近使用时间淘汰，直到总大小不超过上限（需持有索引锁）"""
+    entries = index["entries"]
+    pool_dir = get_pool_dir()
+    in_use = _leased_keys()
+    _remove_stale_private()
+    for key in [key for key in entries if not os.path.isdir(os.path.join(pool_dir, key))]:
+        if key not in in_use:
+            del entries[key]
+
+    total = sum(entry.get("size", 0) for entry in entries.values())
+    for key in sorted(entries, key=lambda k: entries[k].get("last_used", 0)):
+        if total <= index["max_bytes"]:
+            break
+        if key in in_use:
+            continue
+        packager_core.remove_tree_async(os.path.join(pool_dir, key))
+        total -= entries.pop(key).get("size", 0)
+
+
+def _remove_stale_private():
+    """删除已经退出的进程留下的独立工作目录（目录名为 <键>.<pid>.<随机后缀>）"""
+    private_dir = _private_dir()
+    for name in os.listdir(private_dir):
+        pid = name.split(".")[1] if name.count(".") >= 2 else ""
+        if pid.isdigit() and int(pid) != os.getpid() and not proc_utils.pid_exists(int(pid)):
+            packager_core.remove_tree_async(os.path.join(private_dir, name))
+
+
+def set_max_bytes(max_bytes):
+    """修改缓存大小上限，并立即淘汰超出的部分"""
+    with _index_lock():
+        index = load_index()
+        index["max_bytes"] = max(0, int(max_bytes))
+        _evict(index)
+        save_index(index)
+
+
+def remove(keys=None):
+    """删除指定的（默认全部未使用的）工作目录"""
+    with _index_lock():
+        index = load_index()
+        in_use = _leased_keys()
+        for key in list(keys if keys is not None else index["entries"]):
+            if key in in_use:
+                continue
+            packager_core.remove_tree_async(os.path.join(get_pool_dir(), key))
+            index["entries"].pop(key, None)
+        save_index(index)
+
+
+def stats():
+    """缓存统计: {"total", "max_bytes", "hits", "misses", "hit_rate", "entries": [(键, 记录)]}，按最近使用排序"""
+    index = load_index()
+    requests = index["hits"] + index["misses"]
+    entries = sorted(index["entries"].items(), key=lambda item: -item[1].get("last_used", 0))
+    return {
+        "total": sum(entry.get("size", 0) for _, entry in entries),
+        "max_bytes": index["max_bytes"],
+        "hits": index["hits"],
+        "misses": index["misses"],
+        "hit_rate": index["hits"] / requests if requests else None,
+        "entries": entries,
+    }